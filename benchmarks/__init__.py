@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+""" Micro-benchmarks. Run from repository root: python -m benchmarks.<name> """
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+""" /distance micro-benchmark: per node haversine loop vs single vectorized pass """
+
+import heapq
+import random
+import timeit
+from typing import List, Tuple
+
+from mtg.geo import get_lat_lon_distance, nearest_points
+
+NODE_COUNT = 5000
+TOP = 10
+
+
+def synthetic_points(count: int) -> List[Tuple[float, float]]:
+    """
+    synthetic_points - node positions scattered around single region
+    """
+    return [(random.uniform(49.0, 51.0), random.uniform(29.0, 32.0)) for _ in range(count)]
+
+
+def loop_nearest(origin: Tuple[float, float], points: List[Tuple[float, float]]) -> List[Tuple[float, int]]:
+    """
+    loop_nearest - previous approach, haversine call per node
+    """
+    return heapq.nsmallest(TOP, ((get_lat_lon_distance(origin, point), pos) for pos, point in enumerate(points)))
+
+
+def main() -> None:
+    """
+    main - find closest nodes in synthetic mesh
+    """
+    origin = (50.0, 30.5)
+    points = synthetic_points(NODE_COUNT)
+    assert [pos for _, pos in loop_nearest(origin, points)] == [pos for pos, _ in nearest_points(origin, points, TOP)]
+    loop = timeit.timeit(lambda: loop_nearest(origin, points), number=20) / 20
+    vectorized = timeit.timeit(lambda: nearest_points(origin, points, TOP), number=200) / 200
+    print(f'{NODE_COUNT} nodes, top {TOP}')
+    print(f'  haversine loop: {loop * 1000:.3f} ms')
+    print(f'  vectorized:     {vectorized * 1000:.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+""" /nodes table micro-benchmark: cold render and cached render for large mesh """
+
+import logging
+import random
+import time
+import timeit
+from typing import Any, Dict
+
+from mtg.connection.meshtastic.nodeindex import NodeIndex
+from mtg.connection.meshtastic.nodetable import NodeTable
+
+NODE_COUNT = 300
+
+
+def synthetic_nodes(count: int) -> Dict[str, Dict[str, Any]]:
+    """
+    synthetic_nodes - node records shaped like interface.nodes
+    """
+    now = time.time()
+    nodes = {}
+    for num in range(count):
+        node_id = f'!{num:08x}'
+        nodes[node_id] = {
+            'num': num,
+            'user': {'id': node_id, 'longName': f'Node_{num} (test)', 'shortName': f'N{num % 100}',
+                     'hwModel': random.choice(['TBEAM', 'T_ECHO', 'HELTEC_V3'])},
+            'snr': random.uniform(-20, 10),
+            'hopsAway': random.randrange(4),
+            'lastHeard': int(now - random.randrange(86400)),
+        }
+    return nodes
+
+
+def main() -> None:
+    """
+    main - format table for synthetic mesh
+    """
+    index = NodeIndex(logging.getLogger(__name__))
+    index.rebuild(synthetic_nodes(NODE_COUNT))
+    table = NodeTable(lambda _: False)
+    cold = timeit.timeit(lambda: (table.cache.clear(), table.render(index.snapshot)), number=20) / 20
+    cached = timeit.timeit(lambda: table.render(index.snapshot), number=200) / 200
+    paged = timeit.timeit(lambda: table.render(index.snapshot, sort='snr', page=2, page_size=50), number=200) / 200
+    print(f'{NODE_COUNT} nodes')
+    print(f'  cold render:   {cold * 1000:.3f} ms')
+    print(f'  cached render: {cached * 1000:.3f} ms')
+    print(f'  cached page:   {paged * 1000:.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
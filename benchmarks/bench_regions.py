@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+""" admin1 lookup micro-benchmark: region polygons vs reverse_geocoder KD-tree """
+
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+import timeit
+from typing import Any, Dict, List
+
+from mtg.geo import RegionIndex
+
+QUERIES = 500
+REPEAT = 20
+VERTICES = 2000
+
+
+def synthetic_regions(columns: int = 6, rows: int = 4) -> Dict[str, Any]:
+    """
+    synthetic_regions - grid of jagged regions over Ukraine sized area
+    """
+    features = []
+    width, height = 18.0 / columns, 8.0 / rows
+    for column in range(columns):
+        for row in range(rows):
+            center_x, center_y = 22.0 + (column + 0.5) * width, 44.5 + (row + 0.5) * height
+            ring: List[List[float]] = []
+            for pos in range(VERTICES):
+                angle = 2 * math.pi * pos / VERTICES
+                # border wiggles of ~100 m, removed by ~1 km simplification
+                scale = 0.5 + random.uniform(-0.0005, 0.0005)
+                ring.append([center_x + math.cos(angle) * width * scale, center_y + math.sin(angle) * height * scale])
+            ring.append(ring[0])
+            features.append({'type': 'Feature', 'properties': {'name': f'Region {column}-{row}'},
+                             'geometry': {'type': 'Polygon', 'coordinates': [ring]}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def main() -> None:
+    """
+    main - batch lookup with both backends
+    """
+    points = [(random.uniform(44.5, 52.5), random.uniform(22.0, 40.0)) for _ in range(QUERIES)]
+    with tempfile.NamedTemporaryFile('w', suffix='.geojson', delete=False) as regions_file:
+        json.dump(synthetic_regions(), regions_file)
+    try:
+        index = RegionIndex(regions_file.name, logging.getLogger(__name__))
+        started = time.time()
+        index.load()
+        loaded = time.time() - started
+        batch = min(timeit.repeat(lambda: index.search(points), number=REPEAT, repeat=5)) / REPEAT
+        # unsimplified rings, cost of boundary cells does not grow with vertex count
+        full = RegionIndex(regions_file.name, logging.getLogger(__name__), tolerance=0)
+        full.load()
+        full_batch = min(timeit.repeat(lambda: full.search(points), number=REPEAT, repeat=5)) / REPEAT
+    finally:
+        os.unlink(regions_file.name)
+    print(f'{len(index.regions)} regions x {VERTICES} vertices, {QUERIES} points')
+    print(f'  regions load:        {loaded * 1000:.1f} ms')
+    print(f'  regions batch:       {batch * 1000:.2f} ms')
+    print(f'  unsimplified batch:  {full_batch * 1000:.2f} ms')
+    print(f'  pure cells:          {len(index.pure)}, boundary cells: {len(index.boundary)}')
+    try:
+        import reverse_geocoder as rg  # pylint:disable=import-outside-toplevel
+    except ImportError:
+        return
+    started = time.time()
+    rg.search(points[:1], mode=1, verbose=False)
+    print(f'  rg first query:      {(time.time() - started) * 1000:.1f} ms')
+    rg_batch = min(timeit.repeat(lambda: rg.search(points, mode=1, verbose=False), number=REPEAT, repeat=5)) / REPEAT
+    print(f'  rg batch (mode=1):   {rg_batch * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+""" split_message micro-benchmark: current splitter against the original len()-based one """
+
+import timeit
+from typing import Any, Callable, List
+
+from mtg.utils.message import split_message, split_text
+
+PAYLOAD_LEN = 233
+
+
+def legacy_split_message(msg: str, chunk_len: int, callback: Callable[..., Any], **kwargs: Any) -> None:
+    """
+    legacy_split_message - original implementation, kept for comparison
+    """
+    parts: List[List[str]] = []
+    part: List[str] = []
+    for line in msg.split('\n'):
+        if len(line) == 0:
+            continue
+        if len('\n'.join(part) + line) < chunk_len:
+            part.append(line)
+        else:
+            parts.append(part)
+            part = [line]
+    parts.append(part)
+    for part in parts:
+        if len(part) == 0:
+            continue
+        line = '\n'.join(part)
+        if len(line) < chunk_len:
+            callback(line, **kwargs)
+        else:
+            for i in range((len(line) // chunk_len) + 1):
+                callback(line[i*chunk_len:i*chunk_len + chunk_len], **kwargs)
+
+
+def oversized(chunks: List[str]) -> int:
+    """
+    oversized - number of chunks that do not fit into Meshtastic payload
+    """
+    return sum(1 for chunk in chunks if len(chunk.encode('utf-8')) > PAYLOAD_LEN)
+
+
+def main() -> None:
+    """
+    main - run benchmark for short lines (node lists) and long Cyrillic text (alerts)
+    """
+    cases = {
+        'many short lines': '\n'.join(f'Node {i}: -5.25 SNR, 3 hops' for i in range(2000)),
+        'cyrillic text': 'Повітряна тривога в Київській області. Прямуйте до укриття! ' * 200,
+    }
+    for name, text in cases.items():
+        legacy: List[str] = []
+        legacy_split_message(text, PAYLOAD_LEN // 2, legacy.append)
+        current = split_text(text, PAYLOAD_LEN, encoding='utf-8')
+        legacy_time = timeit.timeit(lambda: legacy_split_message(text, PAYLOAD_LEN // 2, lambda _: None), number=20)
+        current_time = timeit.timeit(lambda: split_text(text, PAYLOAD_LEN, encoding='utf-8'), number=20)
+        chars_time = timeit.timeit(lambda: split_message(text, PAYLOAD_LEN // 2, lambda _: None), number=20)
+        print(f'{name} ({len(text)} chars)')
+        print(f'  legacy:        {legacy_time / 20 * 1000:8.2f} ms, {len(legacy)} chunks, '
+              f'{oversized(legacy)} over {PAYLOAD_LEN} bytes')
+        print(f'  utf-8 bytes:   {current_time / 20 * 1000:8.2f} ms, {len(current)} chunks, '
+              f'{oversized(current)} over {PAYLOAD_LEN} bytes')
+        print(f'  characters:    {chars_time / 20 * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
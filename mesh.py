@@ -3,8 +3,14 @@
 """ Meshtastic Telegram Gateway """
 
 import os
-from mtg import cmd
+import sys
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['post2mesh']:
+        # lightweight client, does not load the gateway
+        from mtg.ingest.client import main as post2mesh_main
+        post2mesh_main(sys.argv[2:])
+        sys.exit(0)
+    from mtg import cmd
     basedir = os.path.abspath(os.path.dirname(__file__))
     cmd(basedir)
@@ -1,2 +1,12 @@
 """ Meshtastic Telegram Gateway package initializer. """
-from .mesh import cmd
+
+
+def cmd(basedir):
+    """
+    cmd - gateway command line. Imported lazily so that light submodules (mtg.ingest) load fast
+
+    :param basedir:
+    :return:
+    """
+    from .mesh import cmd as mesh_cmd  # pylint:disable=import-outside-toplevel
+    return mesh_cmd(basedir)
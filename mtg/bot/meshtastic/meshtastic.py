@@ -2,9 +2,8 @@
 """ Meshtastic bot module """
 
 import logging
-import re
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from importlib.metadata import version as importlib_version
 
@@ -20,20 +19,27 @@ from meshtastic import (
 from pubsub import pub
 
 from mtg.config import Config
+from mtg.connection.meshtastic import Priority
 from mtg.connection.rich import RichConnection
-from mtg.connection.telegram import TelegramConnection
+from mtg.connection.telegram import Priority as TelegramPriority, TelegramConnection
 from mtg.database import MeshtasticDB
 from mtg.filter import MeshtasticFilter
-from mtg.geo import get_lat_lon_distance, deg_to_cardinal
+from mtg.geo import deg_to_cardinal, nearest_points
 from mtg.log import VERSION
-from mtg.output.file import CSVFileWriter
-from mtg.utils import Memcache
+from mtg.output.file import NodeLogWriter
+from mtg.utils import KeyedWorkerPool, Memcache
+from .router import CommandRouter, PacketClassifier
+from .weather import WeatherCache
 
 
 class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
     """
     Meshtastic bot class
     """
+    # pings without reply are forgotten after this many seconds
+    ping_ttl = 300.0
+    # nodes listed by /distance
+    distance_count = 10
 
     # pylint:disable=too-many-arguments,too-many-positional-arguments
     def __init__(self, database: MeshtasticDB, config: Config, meshtastic_connection: RichConnection,
@@ -47,7 +53,7 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         # track ping request/reply
         self.ping_container: Dict[str, Dict[str, float]] = {}
         # file logger
-        self.writer = CSVFileWriter(dst=str(self.config.enforce_type(str, self.config.Meshtastic.NodeLogFile)))
+        self.writer = NodeLogWriter(**self.writer_options())
         # bot
         self.bot_handler = bot_handler
         # aprs
@@ -55,6 +61,65 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         # cache
         self.memcache = Memcache(self.logger)
         self.memcache.run_noblock()
+        # received packets are processed off the radio reader thread, packets of one sender in order.
+        # Registered as separate runner
+        self.workers = KeyedWorkerPool(
+            self.logger,
+            workers=int(self.config.enforce_type(int, self.config.Meshtastic.ReceiveWorkers)),
+            max_queue=int(self.config.enforce_type(int, self.config.Meshtastic.ReceiveQueueSize)),
+            name='Meshtastic Receive',
+        )
+        # weather is fetched off receive workers through pooled session, cached per ~5 km cell
+        self.session = requests.Session()
+        self.weather_workers = KeyedWorkerPool(self.logger, workers=2, max_queue=100, name='Weather Fetch')
+        self.weather = WeatherCache(
+            self.fetch_weather, self.memcache, self.weather_workers, self.logger,
+            ttl=float(self.config.enforce_type(float, self.config.DEFAULT.WeatherCacheTTL)),
+        )
+        # mesh commands, plugins may register their own
+        self.commands = CommandRouter(admin_fn=lambda node_id: node_id == self.config.Meshtastic.Admin)
+        self.classifier = PacketClassifier()
+        self.register_commands()
+
+    def register_commands(self) -> None:
+        """
+        Register built-in mesh commands
+
+        :return:
+        """
+        limit = int(self.config.enforce_type(int, self.config.Meshtastic.CommandRateLimit))
+        rate = (limit, 60.0) if limit > 0 else None
+        # handlers are looked up on call, so they can be replaced at runtime
+        # pylint:disable=unnecessary-lambda
+        self.commands.register('/w', lambda packet, interface: self.process_weather_command(packet, interface),
+                               rate=rate)
+        self.commands.register('/distance', lambda packet, interface: self.process_distance_command(packet, interface),
+                               rate=rate)
+        self.commands.register('/ping', lambda packet, interface: self.process_ping_command(packet, interface),
+                               rate=rate)
+        self.commands.register('/stats', lambda packet, interface: self.process_stats_command(packet, interface),
+                               rate=rate)
+        self.commands.register('/reboot', lambda packet, interface: self.meshtastic_connection.reboot(), admin=True)
+        self.commands.register('/reset_db', lambda packet, interface: self.meshtastic_connection.reset_db(),
+                               admin=True)
+
+    def writer_options(self) -> Dict[str, Any]:
+        """
+        writer_options - node log writer settings from configuration
+
+        :return:
+        """
+        config = self.config
+        return {
+            'dst': str(config.enforce_type(str, config.Meshtastic.NodeLogFile)),
+            'fmt': str(config.enforce_type(str, config.Meshtastic.NodeLogFormat)),
+            'flush_rows': int(config.enforce_type(int, config.Meshtastic.NodeLogFlushRows)),
+            'flush_interval': float(config.enforce_type(float, config.Meshtastic.NodeLogFlushInterval)),
+            'rotate_size': int(config.enforce_type(int, config.Meshtastic.NodeLogRotateSize)),
+            'rotate_daily': bool(config.enforce_type(bool, config.Meshtastic.NodeLogRotateDaily)),
+            'compress': bool(config.enforce_type(bool, config.Meshtastic.NodeLogCompress)),
+            'keep': int(config.enforce_type(int, config.Meshtastic.NodeLogKeep)),
+        }
 
     def set_aprs(self, aprs: Any) -> None:
         """
@@ -72,6 +137,9 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         self.logger = logger
         self.memcache.set_logger(logger)
         self.writer.set_logger(self.logger)
+        self.workers.logger = logger
+        self.weather_workers.logger = logger
+        self.weather.logger = logger
 
     def set_filter(self, filter_class: MeshtasticFilter) -> None:
         """
@@ -91,6 +159,8 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         :return:
         """
         self.logger.debug("connection on %s topic %s", interface, topic)
+        # node name may change after reconnect
+        self.classifier.invalidate()
 
     def on_node_info(self, node: Any, interface: meshtastic_serial_interface.SerialInterface) -> None:
         """
@@ -109,7 +179,7 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         :return:
         """
         subscription_map = {
-            "meshtastic.receive": self.on_receive,
+            "meshtastic.receive": self.dispatch_receive,
             "meshtastic.connection.established": self.on_connection,
             "meshtastic.connection.lost": self.on_connection,
         }
@@ -131,20 +201,23 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         from_id = str(packet.get('fromId', ''))
         mynode_info = interface.nodes.get(from_id)
         if not mynode_info:
-            self.meshtastic_connection.send_text("distance err: no node info", destinationId=from_id)
+            self.meshtastic_connection.send_text("distance err: no node info", destinationId=from_id,
+                                                 priority=Priority.COMMAND)
             return
         position = mynode_info.get('position', {})
         if not position:
-            self.meshtastic_connection.send_text("distance err: no position", destinationId=from_id)
+            self.meshtastic_connection.send_text("distance err: no position", destinationId=from_id,
+                                                 priority=Priority.COMMAND)
             return
         my_latitude = position.get('latitude')
         my_longitude = position.get('longitude')
         if not (my_latitude and my_longitude):
-            self.meshtastic_connection.send_text("distance err: no lat/lon", destinationId=from_id)
+            self.meshtastic_connection.send_text("distance err: no lat/lon", destinationId=from_id,
+                                                 priority=Priority.COMMAND)
             return
-        nodes_with_distance = []
-        for node in interface.nodes:
-            node_info = interface.nodes.get(node)
+        names: List[str] = []
+        points: List[Tuple[float, float]] = []
+        for node_info in interface.nodes.values():
             position = node_info.get('position', {})
             if not position:
                 continue
@@ -155,20 +228,16 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
             user = node_info.get('user', {})
             if not user:
                 continue
-            node_id = user.get('id', '')
-            if from_id == node_id:
+            if from_id == user.get('id', ''):
                 continue
-            long_name = user.get('longName', '')
-            distance = round(get_lat_lon_distance((my_latitude, my_longitude), (latitude, longitude)))
-            nodes_with_distance.append({'name': long_name, 'distance': distance})
-
-        for node in sorted(nodes_with_distance, key=lambda x: x.get('distance', 0))[:10]:
-            name = node.get('name')
-            distance_value = node.get('distance', 0)
-            distance_str = humanize.intcomma(distance_value)
-            msg = f"{name}: {distance_str}m"
-            self.meshtastic_connection.send_text(msg, destinationId=from_id)
+            names.append(user.get('longName', ''))
+            points.append((latitude, longitude))
 
+        lines = [f"{names[pos]}: {humanize.intcomma(round(distance))}m"
+                 for pos, distance in nearest_points((my_latitude, my_longitude), points, self.distance_count)]
+        if lines:
+            # one line per node, connection packs lines into as few packets as payload allows
+            self.meshtastic_connection.send_text('\n'.join(lines), destinationId=from_id, priority=Priority.COMMAND)
 
     def process_ping_command(
         self, packet: Dict[str, Any], _interface: meshtastic_serial_interface.SerialInterface
@@ -181,13 +250,19 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         :return:
         """
         from_id = str(packet.get('fromId', ''))
-        self.ping_container[from_id] = {'timestamp': time.time()}
+        now = time.time()
+        self.ping_container = {
+            node_id: value for node_id, value in self.ping_container.items()
+            if now - value.get('timestamp', 0) < self.ping_ttl
+        }
+        self.ping_container[from_id] = {'timestamp': now}
         payload = str.encode("test string")
         self.meshtastic_connection.send_data(payload,
                                              MESHTASTIC_BROADCAST_ADDR,
                                              # pylint:disable=no-member
                                              portNum=meshtastic_portnums_pb2.PortNum.REPLY_APP,
-                                             wantAck=True, wantResponse=True)
+                                             wantAck=True, wantResponse=True,
+                                             priority=Priority.COMMAND)
 
     # pylint: disable=unused-argument
     def process_stats_command(
@@ -202,9 +277,9 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         """
         from_id = str(packet.get('fromId', ''))
         msg = self.database.get_stats(from_id)
-        self.meshtastic_connection.send_text(msg, destinationId=from_id)
+        self.meshtastic_connection.send_text(msg, destinationId=from_id, priority=Priority.COMMAND)
 
-    def process_meshtastic_command(  # pylint:disable=too-many-return-statements
+    def process_meshtastic_command(
         self, packet: Dict[str, Any], interface: meshtastic_serial_interface.SerialInterface
     ) -> None:
         """
@@ -214,39 +289,23 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         :param interface:
         :return:
         """
-        decoded = packet.get('decoded')
-        if decoded is None:
+        if packet.get('decoded') is None:
             return
         from_id = str(packet.get('fromId', ''))
-        msg = decoded.get('text', '')
-        if msg.startswith("/w"):
-            self.process_weather_command(packet, interface)
-            return
-        if msg.startswith('/distance'):
-            self.process_distance_command(packet, interface)
-            return
-        if msg.startswith('/ping'):
-            self.process_ping_command(packet, interface)
-            return
-        if msg.startswith('/stats'):
-            self.process_stats_command(packet, interface)
-            return
-        if msg.startswith('/reboot') and from_id == self.config.Meshtastic.Admin:
-            self.meshtastic_connection.reboot()
-            return
-        if msg.startswith('/reset_db') and from_id == self.config.Meshtastic.Admin:
-            self.meshtastic_connection.reset_db()
-            return
-        self.meshtastic_connection.send_text("unknown command", destinationId=from_id)
+        handled = self.commands.dispatch(packet, interface)
+        if handled is None:
+            self.meshtastic_connection.send_text("unknown command", destinationId=from_id, priority=Priority.COMMAND)
+        elif not handled:
+            # do not spend airtime on replies to flooding sender
+            self.logger.debug("User %s exceeds command rate limit...", from_id)
 
 
-    @staticmethod
-    def get_cur_temp(lat: float, lon: float, key: str) -> str:
+    def get_cur_temp(self, lat: float, lon: float, key: str) -> str:
         """
         get_cur_temp - get current weather using OpenWeatherMap
         """
         url = f"https://api.openweathermap.org/data/2.5/weather?appid={key}&units=metric&lat={lat}&lon={lon}"
-        data = requests.get(url, timeout=10)
+        data = self.session.get(url, timeout=10)
         dataj = data.json()
         short = f"T:{int(dataj.get('main').get('temp'))}C, P:{int(dataj.get('main').get('pressure'))}mb"
         short = f"{short}, H:{dataj.get('main').get('humidity')}%"
@@ -255,6 +314,16 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         short = f"{short}, C:{dataj.get('weather')[0].get('main')}"
         return short
 
+    def fetch_weather(self, lat: float, lon: float) -> str:
+        """
+        fetch_weather - current weather with configured key, runs on weather workers
+
+        :param lat:
+        :param lon:
+        :return:
+        """
+        return self.get_cur_temp(lat, lon, self.config.DEFAULT.OpenWeatherKey)
+
     def process_weather_command(
         self, packet: Dict[str, Any], interface: meshtastic_serial_interface.SerialInterface
     ) -> None:
@@ -265,22 +334,23 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         found, _ = self.database.get_node_record(from_id)
         # not a new node
         if not found:
-            self.meshtastic_connection.send_text("no information about your node available yet", destinationId=from_id)
+            self.meshtastic_connection.send_text("no information about your node available yet", destinationId=from_id,
+                                                 priority=Priority.COMMAND)
             return
         lat, lon = self.meshtastic_connection.get_set_last_position(from_id)
         key = self.config.DEFAULT.OpenWeatherKey
         if len(key) == 0:
             self.meshtastic_connection.send_text(
-                "weather command disabled by configuration", destinationId=from_id
+                "weather command disabled by configuration", destinationId=from_id, priority=Priority.COMMAND
             )
             return
-        try:
-            text = self.get_cur_temp(lat, lon, key)
-        except Exception as exc:  # pylint:disable=broad-exception-caught
-            self.logger.error(repr(exc))
-            text = "could not get weather, see bot logs"
-        self.meshtastic_connection.send_text(text, destinationId=from_id)
 
+        def reply(text: Optional[str]) -> None:
+            if text is None:
+                text = "could not get weather, see bot logs"
+            self.meshtastic_connection.send_text(text, destinationId=from_id, priority=Priority.COMMAND)
+
+        self.weather.request(lat, lon, reply)
 
     def process_uptime(self, packet: Dict[str, Any], interface: meshtastic_serial_interface.SerialInterface) -> None:
         """
@@ -302,7 +372,7 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         )
         text = f'Bot v{VERSION}/FW: v{firmware}/Meshlib: v{the_version}/Reboots: {reboot_count}.'
         text += f'Started {formatted_time}'
-        self.meshtastic_connection.send_text(text, destinationId=from_id)
+        self.meshtastic_connection.send_text(text, destinationId=from_id, priority=Priority.COMMAND)
 
     def process_pong(self, packet: Dict[str, Any]) -> None:
         """
@@ -321,11 +391,10 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         user_info = node_info.get('user', {})
         remote_name = user_info.get('longName', to_id)
         #
-        if self.ping_container.get(from_id, {}):
-            timestamp = self.ping_container[from_id].get('timestamp', 0)
-            processing_time += time.time() - timestamp
+        if ping := self.ping_container.pop(from_id, {}):
+            processing_time += time.time() - ping.get('timestamp', 0)
         msg = f"Pong from {remote_name} at {rx_snr:.2f} SNR, time={processing_time:.3f}s"
-        self.meshtastic_connection.send_text(msg, destinationId=from_id)
+        self.meshtastic_connection.send_text(msg, destinationId=from_id, priority=Priority.COMMAND)
 
     def notify_on_new_node(
         self, packet: Dict[str, Any], interface: meshtastic_serial_interface.SerialInterface
@@ -370,7 +439,19 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
             self.meshtastic_connection.send_text(self.config.Meshtastic.WelcomeMessage, destinationId=from_id)
         self.telegram_connection.send_message_sync(chat_id=self.config.enforce_type(int,
                                                                                self.config.Telegram.NotificationsRoom),
-                                              text=f"New node: {msg}")
+                                              text=f"New node: {msg}",
+                                              priority=TelegramPriority.NOTIFICATION)
+
+    def dispatch_receive(self, packet: Dict[str, Any], interface: meshtastic_serial_interface.SerialInterface) -> None:
+        """
+        Radio reader thread callback. Hand packet over to worker chosen by sender
+
+        :param packet:
+        :param interface:
+        :return:
+        """
+        portnum = str((packet.get('decoded') or {}).get('portnum', 'UNKNOWN'))
+        self.workers.submit(packet.get('fromId') or packet.get('from'), portnum, self.on_receive, packet, interface)
 
     # pylint:disable=too-many-branches, too-many-statements, too-many-return-statements
     def on_receive(self, packet: Dict[str, Any], interface: meshtastic_serial_interface.SerialInterface) -> None:
@@ -382,6 +463,10 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
         :return:
         """
         self.logger.debug("Received: %s", packet)
+        # same packet heard by another radio
+        if self.meshtastic_connection.is_duplicate(packet, interface):
+            self.logger.debug("Duplicate packet %s", packet.get('id'))
+            return
         to_id = packet.get('toId')
         decoded = packet.get('decoded')
         from_id = str(packet.get('fromId', ''))
@@ -396,11 +481,11 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
             self.logger.debug("User %s is in a blacklist...", from_id)
             return
         # Send notifications if they're enabled
-        if from_id is not None and self.config.enforce_type(bool, self.config.Telegram.NotificationsEnabled):
+        if from_id is not None and self.config.Telegram.NotificationsEnabled:
             self.notify_on_new_node(packet, interface)
         # check hop count
         hop_limit = packet.get('hopLimit', 0)
-        if hop_limit > self.config.enforce_type(int, self.config.Meshtastic.MaxHopCount):
+        if hop_limit > self.config.Meshtastic.MaxHopCount:
             self.logger.debug("User %s exceeds %s...", from_id, hop_limit)
             return
         #
@@ -408,9 +493,11 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
             # notifications
             if decoded is not None and decoded.get('portnum') == 'POSITION_APP':
                 # Log if writer is enabled
-                if from_id is not None and self.config.enforce_type(bool, self.config.Meshtastic.NodeLogEnabled):
+                if from_id is not None and self.config.Meshtastic.NodeLogEnabled:
                     self.writer.write(packet)
                 self.database.store_location(packet)
+                if from_id is not None:
+                    self.meshtastic_connection.forget_position(from_id)
                 # Send Meshtastic node coordinates to APRS for licenced operators
                 if self.aprs is not None and from_id is not None:
                     self.aprs.send_location(packet)
@@ -429,11 +516,13 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
                 self.process_meshtastic_command(packet, interface)
                 return
 
-            text = self.bot_handler.get_response(from_id, msg)
-            if text:
+            def reply(text: str) -> None:
                 self.logger.info("%s: %s -> %s", from_id, msg, text)
                 self.meshtastic_connection.send_text(text, destinationId=from_id)
 
+            # answered by responder workers, radio packets keep flowing meanwhile
+            if not self.bot_handler.respond(from_id, msg, reply):
+                self.logger.debug("Bot query of %s rejected", from_id)
             return
         # Save messages
         try:
@@ -456,23 +545,17 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
             return
 
         # Range test module should not spam telegram room
-        if re.match(r'^seq\s[0-9]+', msg, re.I) is not None:
+        if self.classifier.is_range_test(msg):
             self.logger.debug("User %s has sent range test... %s", long_name, msg)
             return
 
         # Telemetry
-        node_part = from_id[5:]
-        if re.match(r'^(\-?[0-9]+,)+' + f'{node_part}$', msg) is not None:
+        if self.classifier.is_telemetry(from_id, msg):
             self.logger.debug('Banned telemetry: %s %s', from_id, msg)
             return
 
         # Meshtastic nodes sometimes duplicate messages sent by bot. Filter these.
-        self_name = (
-            self.meshtastic_connection.interface.getLongName()
-            if self.meshtastic_connection.interface is not None
-            else ''
-        )
-        if msg.startswith(self_name) or self_name == long_name:
+        if self.classifier.is_self_echo(msg, long_name, self.meshtastic_connection.interface):
             self.logger.debug("Bot duplicate via meshtastic... %s", msg)
             return
 
@@ -493,5 +576,5 @@ class MeshtasticBot:  # pylint:disable=too-many-instance-attributes
                 self.aprs.send_text(addressee, f'{long_name}: {new_msg}')
 
         self.logger.info("Queued %s: %s", long_name, msg)
-        self.telegram_connection.send_message_sync(chat_id=self.config.enforce_type(int, self.config.Telegram.Room),
+        self.telegram_connection.send_message_sync(chat_id=self.config.Telegram.Room,
                                               text=f"{long_name}: {msg}")
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+""" Meshtastic command router and packet classifiers """
+
+import re
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+RANGE_TEST = re.compile(r'^seq\s[0-9]+', re.I)
+# comma separated numbers followed by sender's node id part
+TELEMETRY = re.compile(r'^(?:-?[0-9]+,)+(.+)$')
+
+
+class Command(NamedTuple):
+    """
+    Command - registered mesh command
+    """
+    name: str
+    # handler(packet, interface, *args)
+    handler: Callable[..., None]
+    admin: bool
+    # max number of whitespace separated arguments passed to handler
+    max_args: int
+    # (calls, seconds) per sender, None - unlimited
+    rate: Optional[Tuple[int, float]]
+
+
+class CommandRouter:
+    """
+    CommandRouter - prefix trie of mesh commands. Longest registered prefix of message wins,
+    so /w and /wiki can coexist
+    """
+
+    def __init__(self, admin_fn: Callable[[str], bool], max_senders: int = 1024) -> None:
+        self.admin_fn = admin_fn
+        self.max_senders = max_senders
+        self.lock = RLock()
+        self.trie: Dict[str, Any] = {}
+        self.commands: Dict[str, Command] = {}
+        # (sender, command) -> recent call timestamps
+        self.calls: OrderedDict[Tuple[str, str], List[float]] = OrderedDict()
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def register(self, name: str, handler: Callable[..., None], admin: bool = False, max_args: int = 0,
+                 rate: Optional[Tuple[int, float]] = None) -> None:
+        """
+        register - add or replace command
+
+        :param name: command prefix, e.g. /distance
+        :param handler:
+        :param admin: only Meshtastic.Admin may call it
+        :param max_args:
+        :param rate: (calls, seconds) per sender
+        :return:
+        """
+        with self.lock:
+            node = self.trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[''] = name
+            self.commands[name] = Command(name, handler, admin, max_args, rate)
+
+    def match(self, text: str) -> Optional[Command]:
+        """
+        match - command with longest prefix of text
+
+        :param text:
+        :return:
+        """
+        found, node = None, self.trie
+        for char in text:
+            child = node.get(char)
+            if child is None:
+                break
+            node = child
+            if '' in node:
+                found = node['']
+        return self.commands.get(found) if found is not None else None
+
+    def allowed(self, sender: str, command: Command) -> bool:
+        """
+        allowed - sliding window rate limit per sender and command
+
+        :param sender:
+        :param command:
+        :return:
+        """
+        if command.rate is None:
+            return True
+        calls, period = command.rate
+        now = time.time()
+        key = (sender, command.name)
+        with self.lock:
+            recent = [stamp for stamp in self.calls.pop(key, []) if now - stamp < period]
+            allowed = len(recent) < calls
+            if allowed:
+                recent.append(now)
+            self.calls[key] = recent
+            while len(self.calls) > self.max_senders:
+                self.calls.popitem(last=False)
+        return allowed
+
+    def dispatch(self, packet: Dict[str, Any], interface: Any) -> Optional[bool]:
+        """
+        dispatch - run command handler
+
+        :param packet:
+        :param interface:
+        :return: True if handled, False if rate limited, None if there is no such command
+        """
+        text = (packet.get('decoded') or {}).get('text', '')
+        sender = str(packet.get('fromId', ''))
+        command = self.match(text)
+        if command is None or (command.admin and not self.admin_fn(sender)):
+            return None
+        if not self.allowed(sender, command):
+            return False
+        args = text[len(command.name):].split()[:command.max_args] if command.max_args else []
+        command.handler(packet, interface, *args)
+        return True
+
+
+class PacketClassifier:
+    """
+    PacketClassifier - constant cost checks for text packets that must not reach Telegram
+    """
+
+    def __init__(self, name_ttl: float = 300.0) -> None:
+        self.name_ttl = name_ttl
+        # interface id -> (long name, timestamp)
+        self.names: Dict[int, Tuple[str, float]] = {}
+
+    @staticmethod
+    def is_range_test(msg: str) -> bool:
+        """
+        is_range_test - range test module message
+
+        :param msg:
+        :return:
+        """
+        return RANGE_TEST.match(msg) is not None
+
+    @staticmethod
+    def is_telemetry(from_id: str, msg: str) -> bool:
+        """
+        is_telemetry - comma separated numbers ending with sender's node id part
+
+        :param from_id:
+        :param msg:
+        :return:
+        """
+        match = TELEMETRY.match(msg)
+        return match is not None and match.group(1) == from_id[5:]
+
+    def self_name(self, interface: Any) -> str:
+        """
+        self_name - cached long name of our own node
+
+        :param interface:
+        :return:
+        """
+        if interface is None:
+            return ''
+        now = time.time()
+        cached = self.names.get(id(interface))
+        if cached is None or now - cached[1] > self.name_ttl:
+            cached = (interface.getLongName() or '', now)
+            self.names = {id(interface): cached}
+        return cached[0]
+
+    def invalidate(self) -> None:
+        """
+        invalidate - forget cached node name, e.g. after reconnect
+
+        :return:
+        """
+        self.names = {}
+
+    def is_self_echo(self, msg: str, long_name: str, interface: Any) -> bool:
+        """
+        is_self_echo - message sent by bot and repeated by other node
+
+        :param msg:
+        :param long_name: sender name
+        :param interface:
+        :return:
+        """
+        name = self.self_name(interface)
+        return msg.startswith(name) or name == long_name
@@ -14,6 +14,7 @@ sys.modules['pubsub.pub'] = MagicMock()
 sys.modules['requests'] = MagicMock()
 
 from mtg.bot.meshtastic.meshtastic import MeshtasticBot
+from mtg.connection.meshtastic import Priority
 
 
 @pytest.fixture
@@ -60,6 +61,7 @@ def mock_meshtastic_connection():
     conn.reset_db = MagicMock()
     conn.get_startup_ts = 1234567890
     conn.get_set_last_position.return_value = (45.0, -90.0)
+    conn.is_duplicate.return_value = False
     conn.interface = MagicMock()
     conn.interface.getLongName.return_value = "TestBot"
     conn.interface.nodes = {}
@@ -98,7 +100,9 @@ def meshtastic_bot(mock_database, mock_config, mock_meshtastic_connection,
                 mock_telegram_connection, mock_bot_handler
             )
             bot.writer = mock_writer
-            return bot
+    yield bot
+    # stop reaper thread, it calls time.sleep() while other tests patch it
+    bot.memcache.shutdown()
 
 
 class TestMeshtasticBot:
@@ -146,6 +150,15 @@ class TestMeshtasticBot:
             assert "meshtastic.connection.established" in call_args
             assert "meshtastic.connection.lost" in call_args
 
+    def test_dispatch_receive(self, meshtastic_bot):
+        """Test received packet is handed over to worker chosen by sender"""
+        packet = {'fromId': '!12345678', 'decoded': {'portnum': 'TEXT_MESSAGE_APP'}}
+        mock_interface = MagicMock()
+        with patch.object(meshtastic_bot.workers, 'submit') as mock_submit:
+            meshtastic_bot.dispatch_receive(packet, mock_interface)
+        mock_submit.assert_called_once_with('!12345678', 'TEXT_MESSAGE_APP', meshtastic_bot.on_receive,
+                                            packet, mock_interface)
+
     def test_on_connection(self, meshtastic_bot):
         """Test on_connection method"""
         meshtastic_bot.logger = MagicMock()
@@ -177,6 +190,13 @@ class TestMeshtasticBot:
         assert meshtastic_bot.ping_container['!12345678']['timestamp'] == 1234567890
         mock_meshtastic_connection.send_data.assert_called_once()
 
+    def test_process_ping_command_evicts_stale(self, meshtastic_bot, mock_meshtastic_connection):
+        """Test pings without reply do not accumulate"""
+        meshtastic_bot.ping_container['!00000001'] = {'timestamp': 1000}
+        with patch('time.time', return_value=1234567890):
+            meshtastic_bot.process_ping_command({'fromId': '!12345678'}, MagicMock())
+        assert list(meshtastic_bot.ping_container) == ['!12345678']
+
     def test_process_stats_command(self, meshtastic_bot, mock_database, mock_meshtastic_connection):
         """Test process_stats_command method"""
         packet = {'fromId': '!12345678'}
@@ -187,7 +207,7 @@ class TestMeshtasticBot:
 
         mock_database.get_stats.assert_called_once_with('!12345678')
         mock_meshtastic_connection.send_text.assert_called_once_with(
-            "Test stats", destinationId='!12345678'
+            "Test stats", destinationId='!12345678', priority=Priority.COMMAND
         )
 
     def test_process_distance_command_no_node_info(self, meshtastic_bot, mock_meshtastic_connection):
@@ -199,7 +219,7 @@ class TestMeshtasticBot:
         meshtastic_bot.process_distance_command(packet, mock_interface)
 
         mock_meshtastic_connection.send_text.assert_called_once_with(
-            "distance err: no node info", destinationId='!12345678'
+            "distance err: no node info", destinationId='!12345678', priority=Priority.COMMAND
         )
 
     def test_process_distance_command_no_position(self, meshtastic_bot, mock_meshtastic_connection):
@@ -213,7 +233,7 @@ class TestMeshtasticBot:
         meshtastic_bot.process_distance_command(packet, mock_interface)
 
         mock_meshtastic_connection.send_text.assert_called_once_with(
-            "distance err: no position", destinationId='!12345678'
+            "distance err: no position", destinationId='!12345678', priority=Priority.COMMAND
         )
 
     def test_process_distance_command_success(self, meshtastic_bot, mock_meshtastic_connection):
@@ -231,15 +251,36 @@ class TestMeshtasticBot:
             }
         }
 
-        with patch('mtg.geo.get_lat_lon_distance', return_value=100000.5):
-            meshtastic_bot.process_distance_command(packet, mock_interface)
+        meshtastic_bot.process_distance_command(packet, mock_interface)
 
-        # Should send distance message
-        mock_meshtastic_connection.send_text.assert_called()
+        mock_meshtastic_connection.send_text.assert_called_once()
+        args, kwargs = mock_meshtastic_connection.send_text.call_args
+        assert args[0].startswith('TestNode2: ')
+        assert kwargs == {'destinationId': '!12345678', 'priority': Priority.COMMAND}
 
-    @patch('mtg.bot.meshtastic.meshtastic.requests.get')
-    def test_get_cur_temp_success(self, mock_get, meshtastic_bot):
+    def test_process_distance_command_packs_nodes(self, meshtastic_bot, mock_meshtastic_connection):
+        """Test /distance sends closest nodes in single message"""
+        packet = {'fromId': '!12345678'}
+        mock_interface = MagicMock()
+        mock_interface.nodes = {
+            '!12345678': {'user': {'id': '!12345678'}, 'position': {'latitude': 45.0, 'longitude': -90.0}},
+        }
+        for num in range(1, 15):
+            mock_interface.nodes[f'!{num:08x}'] = {
+                'user': {'id': f'!{num:08x}', 'longName': f'Node{num}'},
+                'position': {'latitude': 45.0 + num / 1000, 'longitude': -90.0},
+            }
+
+        meshtastic_bot.process_distance_command(packet, mock_interface)
+
+        mock_meshtastic_connection.send_text.assert_called_once()
+        lines = mock_meshtastic_connection.send_text.call_args[0][0].split('\n')
+        assert len(lines) == 10
+        assert [line.split(':')[0] for line in lines] == [f'Node{num}' for num in range(1, 11)]
+
+    def test_get_cur_temp_success(self, meshtastic_bot):
         """Test successful weather API call"""
+        mock_get = meshtastic_bot.session.get
         mock_response = MagicMock()
         mock_response.json.return_value = {
             'main': {'temp': 20.5, 'pressure': 1013, 'humidity': 65},
@@ -265,7 +306,7 @@ class TestMeshtasticBot:
         meshtastic_bot.process_weather_command(packet, mock_interface)
 
         mock_meshtastic_connection.send_text.assert_called_once_with(
-            "no information about your node available yet", destinationId='!12345678'
+            "no information about your node available yet", destinationId='!12345678', priority=Priority.COMMAND
         )
 
     def test_process_weather_command_no_api_key(self, meshtastic_bot, mock_config,
@@ -279,9 +320,25 @@ class TestMeshtasticBot:
             meshtastic_bot.process_weather_command(packet, mock_interface)
 
         mock_meshtastic_connection.send_text.assert_called_once_with(
-            "weather command disabled by configuration", destinationId='!12345678'
+            "weather command disabled by configuration", destinationId='!12345678', priority=Priority.COMMAND
         )
 
+    def test_process_weather_command_background(self, meshtastic_bot, mock_meshtastic_connection):
+        """Test weather is fetched by weather workers and cached for nearby nodes"""
+        packet = {'fromId': '!12345678'}
+        mock_meshtastic_connection.get_set_last_position.return_value = (45.0, -90.0)
+
+        with patch.object(meshtastic_bot, 'get_cur_temp', return_value='T:20C') as mock_temp:
+            meshtastic_bot.process_weather_command(packet, MagicMock())
+            mock_meshtastic_connection.send_text.assert_not_called()
+            meshtastic_bot.weather_workers.run_once(meshtastic_bot.weather_workers.worker_for(meshtastic_bot.weather.cell(45.0, -90.0)))
+            mock_meshtastic_connection.send_text.assert_called_once_with(
+                'T:20C', destinationId='!12345678', priority=Priority.COMMAND
+            )
+            meshtastic_bot.process_weather_command(packet, MagicMock())
+        mock_temp.assert_called_once_with(45.0, -90.0, 'test_key')
+        assert mock_meshtastic_connection.send_text.call_count == 2
+
     def test_process_uptime(self, meshtastic_bot, mock_meshtastic_connection):
         """Test process_uptime method"""
         packet = {'fromId': '!12345678'}
@@ -324,6 +381,7 @@ class TestMeshtasticBot:
         call_args = mock_meshtastic_connection.send_text.call_args
         assert "Pong from TestNode" in call_args[0][0]
         assert "-5.20 SNR" in call_args[0][0]
+        assert '!12345678' not in meshtastic_bot.ping_container
 
     def test_notify_on_new_node_existing_node(self, meshtastic_bot, mock_database):
         """Test notify_on_new_node with existing node"""
@@ -389,7 +447,7 @@ class TestMeshtasticBot:
         meshtastic_bot.process_meshtastic_command(packet, mock_interface)
 
         mock_meshtastic_connection.send_text.assert_called_once_with(
-            "unknown command", destinationId='!12345678'
+            "unknown command", destinationId='!12345678', priority=Priority.COMMAND
         )
 
     def test_on_receive_blacklisted_user(self, meshtastic_bot):
@@ -444,6 +502,7 @@ class TestMeshtasticBot:
 
         mock_database.store_location.assert_called_once_with(packet)
         meshtastic_bot.writer.write.assert_called_once_with(packet)
+        meshtastic_bot.meshtastic_connection.forget_position.assert_called_once_with('!12345678')
 
     def test_on_receive_text_message_broadcast(self, meshtastic_bot, mock_database, mock_config):
         """Test on_receive with broadcast text message"""
@@ -469,4 +528,26 @@ class TestMeshtasticBot:
         mock_database.store_message.assert_called_once_with(packet)
         meshtastic_bot.telegram_connection.send_message_sync.assert_called_once_with(
             chat_id=67890, text="TestNode: Hello mesh!"
-        )
\ No newline at end of file
+        )
+    def test_on_receive_direct_message_queued_for_bot(self, meshtastic_bot, mock_bot_handler,
+                                                      mock_meshtastic_connection, mock_config):
+        """Test direct message is answered through bot handler callback"""
+        packet = {
+            'fromId': '!87654321',
+            'toId': '!local',
+            'hopLimit': 2,
+            'decoded': {'portnum': 'TEXT_MESSAGE_APP', 'text': 'Hello bot'}
+        }
+        mock_interface = MagicMock()
+        mock_interface.nodes = {'!87654321': {'user': {'longName': 'TestNode'}}}
+        mock_interface.getLongName.return_value = "BotName"
+
+        with patch.object(meshtastic_bot, 'config', mock_config):
+            meshtastic_bot.on_receive(packet, mock_interface)
+
+        mock_bot_handler.respond.assert_called_once()
+        user, text, callback = mock_bot_handler.respond.call_args[0]
+        assert (user, text) == ('!87654321', 'Hello bot')
+        mock_meshtastic_connection.send_text.assert_not_called()
+        callback('Hi')
+        mock_meshtastic_connection.send_text.assert_called_once_with('Hi', destinationId='!87654321')
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+from unittest.mock import MagicMock
+
+from mtg.bot.meshtastic.router import CommandRouter, PacketClassifier
+
+
+def packet(text, from_id='!12345678'):
+    """ text packet """
+    return {'fromId': from_id, 'decoded': {'text': text}}
+
+
+def test_longest_prefix_wins():
+    """Test longest registered prefix handles command, unknown text is not routed"""
+    router = CommandRouter(admin_fn=lambda node_id: False)
+    weather, wiki = MagicMock(), MagicMock()
+    router.register('/w', weather)
+    router.register('/wiki', wiki)
+    assert router.dispatch(packet('/wiki moon'), None) is True
+    assert router.dispatch(packet('/w'), None) is True
+    assert router.dispatch(packet('/wi'), None) is True
+    assert wiki.call_count == 1
+    assert weather.call_count == 2
+    assert router.dispatch(packet('/unknown'), None) is None
+    assert router.dispatch(packet('hello'), None) is None
+
+
+def test_admin_only():
+    """Test admin commands are ignored for other nodes"""
+    router = CommandRouter(admin_fn=lambda node_id: node_id == '!admin')
+    handler = MagicMock()
+    router.register('/reboot', handler, admin=True)
+    assert router.dispatch(packet('/reboot'), None) is None
+    handler.assert_not_called()
+    assert router.dispatch(packet('/reboot', from_id='!admin'), None) is True
+    handler.assert_called_once()
+
+
+def test_arguments():
+    """Test arguments are split on whitespace and limited"""
+    router = CommandRouter(admin_fn=lambda node_id: False)
+    handler = MagicMock()
+    router.register('/distance', handler, max_args=1)
+    pkt = packet('/distance  10 20')
+    router.dispatch(pkt, 'iface')
+    handler.assert_called_once_with(pkt, 'iface', '10')
+
+
+def test_rate_limit():
+    """Test per sender rate limit and bounded sender table"""
+    router = CommandRouter(admin_fn=lambda node_id: False, max_senders=1)
+    handler = MagicMock()
+    router.register('/ping', handler, rate=(2, 60.0))
+    assert router.dispatch(packet('/ping'), None) is True
+    assert router.dispatch(packet('/ping'), None) is True
+    assert router.dispatch(packet('/ping'), None) is False
+    # other sender has own budget, first one is evicted
+    assert router.dispatch(packet('/ping', from_id='!87654321'), None) is True
+    assert len(router.calls) == 1
+    assert handler.call_count == 3
+
+
+def test_classifier():
+    """Test range test and telemetry packets are recognized"""
+    classifier = PacketClassifier()
+    assert classifier.is_range_test('seq 12')
+    assert classifier.is_range_test('SEQ 1')
+    assert not classifier.is_range_test('sequence')
+    assert classifier.is_telemetry('!12345678', '1,-2,3,5678')
+    assert not classifier.is_telemetry('!12345678', '1,2,3,1234')
+    assert not classifier.is_telemetry('!12345678', 'hello')
+
+
+def test_self_echo_name_cached():
+    """Test own long name is cached until invalidated"""
+    classifier = PacketClassifier()
+    interface = MagicMock()
+    interface.getLongName.return_value = 'Bot'
+    assert classifier.is_self_echo('Bot: hello', 'Alice', interface)
+    assert classifier.is_self_echo('hi', 'Bot', interface)
+    assert not classifier.is_self_echo('hi', 'Alice', interface)
+    interface.getLongName.assert_called_once()
+    classifier.invalidate()
+    classifier.self_name(interface)
+    assert interface.getLongName.call_count == 2
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import logging
+from unittest.mock import MagicMock
+
+from mtg.bot.meshtastic.weather import WeatherCache
+from mtg.utils import KeyedWorkerPool, Memcache
+
+
+def make_cache(fetch_fn, max_queue=10):
+    """Weather cache with single fetch worker"""
+    logger = logging.getLogger(__name__)
+    pool = KeyedWorkerPool(logger, workers=1, max_queue=max_queue, name='Weather Test')
+    return WeatherCache(fetch_fn, Memcache(logger), pool, logger), pool
+
+
+def test_concurrent_requests_coalesced():
+    """Test nearby requests share one fetch, later ones are served from cache"""
+    fetch = MagicMock(return_value='T:20C')
+    weather, pool = make_cache(fetch)
+    first, second = MagicMock(), MagicMock()
+    assert weather.request(50.4501, 30.5234, first) is False
+    # nearby node, same cell
+    assert weather.request(50.4510, 30.5240, second) is False
+    first.assert_not_called()
+    assert pool.run_once(0)
+    assert not pool.run_once(0, timeout=0.01)
+    fetch.assert_called_once_with(50.4501, 30.5234)
+    first.assert_called_once_with('T:20C')
+    second.assert_called_once_with('T:20C')
+    third = MagicMock()
+    assert weather.request(50.4505, 30.5238, third) is True
+    third.assert_called_once_with('T:20C')
+    assert weather.stats() == {'hits': 1, 'coalesced': 1, 'fetches': 1, 'errors': 0, 'pending': 0}
+
+
+def test_failed_fetch_not_cached():
+    """Test failed fetch is reported and retried on next request"""
+    fetch = MagicMock(side_effect=[OSError('timeout'), 'T:5C'])
+    weather, pool = make_cache(fetch)
+    callback = MagicMock()
+    weather.request(10.0, 10.0, callback)
+    pool.run_once(0)
+    callback.assert_called_once_with(None)
+    weather.request(10.0, 10.0, callback)
+    pool.run_once(0)
+    callback.assert_called_with('T:5C')
+    assert weather.stats()['errors'] == 1
+
+
+def test_full_queue_fails_fast():
+    """Test request is answered right away when fetch queue is full"""
+    weather, _ = make_cache(MagicMock(), max_queue=1)
+    weather.request(10.0, 10.0, MagicMock())
+    callback = MagicMock()
+    weather.request(-10.0, -10.0, callback)
+    callback.assert_called_once_with(None)
+    assert weather.stats()['pending'] == 1
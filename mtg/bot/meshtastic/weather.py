@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+""" Cached weather lookup module """
+
+import logging
+from threading import RLock
+from typing import Any, Callable, Dict, List, Optional
+
+from mtg.geo import geohash
+from mtg.utils import KeyedWorkerPool, Memcache
+
+WeatherCallback = Callable[[Optional[str]], None]
+
+
+# pylint:disable=too-many-instance-attributes
+class WeatherCache:
+    """
+    WeatherCache - current weather per geohash cell. Lookups are fetched by worker pool,
+    concurrent requests for the same cell wait for single upstream call
+    """
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, fetch_fn: Callable[[float, float], str], cache: Memcache, pool: KeyedWorkerPool,
+                 logger: logging.Logger, ttl: float = 600.0, precision: int = 5) -> None:
+        self.fetch_fn = fetch_fn
+        self.cache = cache
+        self.pool = pool
+        self.logger = logger
+        self.ttl = ttl
+        self.precision = precision
+        self.lock = RLock()
+        # cell -> callbacks waiting for fetch in progress
+        self.waiters: Dict[str, List[WeatherCallback]] = {}
+        self.counters = {'hits': 0, 'coalesced': 0, 'fetches': 0, 'errors': 0}
+
+    def cell(self, lat: float, lon: float) -> str:
+        """
+        cell - cache key of coordinates
+
+        :param lat:
+        :param lon:
+        :return:
+        """
+        return f'weather:{geohash(lat, lon, self.precision)}'
+
+    def request(self, lat: float, lon: float, callback: WeatherCallback) -> bool:
+        """
+        request - pass weather text to callback, None if it could not be fetched.
+        Never waits for network
+
+        :param lat:
+        :param lon:
+        :param callback:
+        :return: True if served from cache
+        """
+        cell = self.cell(lat, lon)
+        cached = self.cache.get(cell)
+        if cached is not None:
+            with self.lock:
+                self.counters['hits'] += 1
+            callback(cached)
+            return True
+        with self.lock:
+            waiting = cell in self.waiters
+            self.waiters.setdefault(cell, []).append(callback)
+            self.counters['coalesced' if waiting else 'fetches'] += 1
+        if not waiting and not self.pool.submit(cell, 'weather', self.refresh, cell, lat, lon):
+            self.complete(cell, None)
+        return False
+
+    def refresh(self, cell: str, lat: float, lon: float) -> None:
+        """
+        refresh - fetch weather for cell and notify waiting callbacks
+
+        :param cell:
+        :param lat:
+        :param lon:
+        :return:
+        """
+        text: Optional[str] = None
+        try:
+            text = self.fetch_fn(lat, lon)
+            self.cache.set(cell, text, expires=self.ttl)
+        except Exception as exc:  # pylint:disable=broad-exception-caught
+            with self.lock:
+                self.counters['errors'] += 1
+            self.logger.error(f'Weather fetch for {cell} failed: {exc!r}')
+        self.complete(cell, text)
+
+    def complete(self, cell: str, text: Optional[str]) -> None:
+        """
+        complete - notify callbacks waiting for cell
+
+        :param cell:
+        :param text:
+        :return:
+        """
+        with self.lock:
+            callbacks = self.waiters.pop(cell, [])
+        for callback in callbacks:
+            try:
+                callback(text)
+            except Exception as exc:  # pylint:disable=broad-exception-caught
+                self.logger.error(f'Weather callback for {cell} failed: {exc!r}')
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - cache and upstream counters
+
+        :return:
+        """
+        with self.lock:
+            return dict(self.counters, pending=len(self.waiters))
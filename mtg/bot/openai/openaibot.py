@@ -2,14 +2,52 @@
 """ OpenAI Bot module """
 
 import os
-from typing import Any, Optional
+import re
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import openai
 
+from mtg.utils import KeyedWorkerPool
 
-class OpenAIBot:
+# conservative text bytes per mesh packet, leaves room for (1/2) chunk markers
+PACKET_TEXT_BYTES = 200
+
+
+def normalize_prompt(query: str) -> str:
+    """
+    normalize_prompt - cache key of query: case, spacing and trailing punctuation do not matter
+
+    :param query:
+    :return:
+    """
+    return re.sub(r'\s+', ' ', query).strip().rstrip('?!.').strip().lower()
+
+
+def truncate_bytes(text: str, limit: int) -> str:
+    """
+    truncate_bytes - cut text to limit of UTF-8 bytes on word boundary
+
+    :param text:
+    :param limit:
+    :return:
+    """
+    text = text.strip()
+    if len(text.encode('utf-8')) <= limit:
+        return text
+    cut = text.encode('utf-8')[:limit - len('…'.encode('utf-8'))].decode('utf-8', errors='ignore')
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return f'{cut.rstrip()}…'
+
+
+class OpenAIBot:  # pylint:disable=too-many-instance-attributes
     """ OpenAI Bot container """
 
-    def __init__(self, logger: Any) -> None:
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, logger: Any, workers: int = 2, timeout: float = 20.0,
+                 rate: Tuple[int, float] = (3, 600.0), cache_size: int = 256, max_packets: int = 2) -> None:
         api_key = os.getenv("OPENAI_API_KEY", default='')
         self.logger = logger
         # Use modern OpenAI client initialization instead of deprecated api_key setting
@@ -18,6 +56,54 @@ class OpenAIBot:
                 "The following is a conversation with an AI assistant. "
                 + "The assistant is helpful, creative, clever, and very friendly.\n\n"
         )
+        self.timeout = timeout
+        self.rate = rate
+        self.cache_size = cache_size
+        self.max_bytes = max(1, max_packets) * PACKET_TEXT_BYTES
+        self.lock = RLock()
+        # normalized prompt -> response
+        self.cache: OrderedDict[str, str] = OrderedDict()
+        # user -> recent request timestamps
+        self.calls: Dict[str, List[float]] = {}
+        self.counters = {'hits': 0, 'queries': 0, 'limited': 0, 'errors': 0}
+        # queries of one user are answered in order, registered as separate runner
+        self.workers = KeyedWorkerPool(logger, workers=workers, max_queue=workers * 10, name='OpenAI Responder')
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def reconfigure(self, workers: int = 2, timeout: float = 20.0, rate: Tuple[int, float] = (3, 600.0),
+                    cache_size: int = 256, max_packets: int = 2) -> None:
+        """
+        reconfigure - apply new settings. Worker pool is resized, so it has to be stopped
+
+        :param workers:
+        :param timeout:
+        :param rate:
+        :param cache_size:
+        :param max_packets:
+        :return:
+        """
+        with self.lock:
+            self.timeout = timeout
+            self.rate = rate
+            self.cache_size = cache_size
+            max_bytes = max(1, max_packets) * PACKET_TEXT_BYTES
+            if max_bytes != self.max_bytes:
+                # cached answers were cut to old packet budget
+                self.cache.clear()
+            self.max_bytes = max_bytes
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        self.workers.resize(workers, workers * 10)
+
+    def set_logger(self, logger: Any) -> None:
+        """
+        set_logger - set logger (for lazy init)
+
+        :param logger:
+        :return:
+        """
+        self.logger = logger
+        self.workers.logger = logger
 
     def run_query(self, user: str, query: str) -> Any:
         """
@@ -27,19 +113,20 @@ class OpenAIBot:
         :param query:
         :return:
         """
-        messages = [{"role": "system", "content": self.seed},
+        messages = [{"role": "system", "content": f"{self.seed}Answer in at most {self.max_bytes} characters."},
                     {"role": "user", "content": f"{user}: Hello, who are you?"},
                     {"role": "assistant", "content": "AI: I am an AI created by OpenAI. How can I help you today?"},
                     {"role": "user", "content": query},
                     ]
+        # roughly 4 characters per token, answer is truncated anyway
         return self.client.chat.completions.create(model="gpt-3.5-turbo", messages=messages,
                                       temperature=0.9, top_p=1, presence_penalty=0.6,
-                                      frequency_penalty=0, max_tokens=256, user=user,
-                                      stop=[f" {user}:", " AI:"])
+                                      frequency_penalty=0, max_tokens=max(16, self.max_bytes // 4), user=user,
+                                      stop=[f" {user}:", " AI:"], timeout=self.timeout)
 
     def get_response(self, user: str, incoming: str) -> Optional[str]:
         """
-        Get response from OpenAI API
+        Get response from OpenAI API or cache
 
         :param user:
         :param incoming:
@@ -48,7 +135,102 @@ class OpenAIBot:
         if self.client is None:
             self.logger.error('OpenAIBot not initialized...')
             return None
+        key = normalize_prompt(incoming)
+        if (cached := self.cached(key)) is not None:
+            return cached
+        with self.lock:
+            self.counters['queries'] += 1
         response = self.run_query(user, incoming)
         self.logger.info(user, response)
         # Use modern OpenAI response format
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        if not content:
+            return None
+        text = truncate_bytes(content, self.max_bytes)
+        with self.lock:
+            self.cache[key] = text
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return text
+
+    def cached(self, key: str) -> Optional[str]:
+        """
+        cached - cached response to normalized prompt
+
+        :param key:
+        :return:
+        """
+        with self.lock:
+            if key not in self.cache:
+                return None
+            self.counters['hits'] += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+    def allowed(self, user: str) -> bool:
+        """
+        allowed - sliding window rate limit per user
+
+        :param user:
+        :return:
+        """
+        calls, period = self.rate
+        now = time.time()
+        with self.lock:
+            recent = [stamp for stamp in self.calls.get(user, []) if now - stamp < period]
+            allowed = len(recent) < calls
+            if allowed:
+                recent.append(now)
+            self.calls[user] = recent
+            # forget idle users
+            for key in [key for key, stamps in self.calls.items() if not stamps]:
+                del self.calls[key]
+            if not allowed:
+                self.counters['limited'] += 1
+        return allowed
+
+    def answer(self, user: str, incoming: str, callback: Callable[[str], None]) -> None:
+        """
+        answer - get response and pass it to callback, runs on responder workers
+
+        :param user:
+        :param incoming:
+        :param callback:
+        :return:
+        """
+        try:
+            text = self.get_response(user, incoming)
+        except Exception as exc:  # pylint:disable=broad-exception-caught
+            with self.lock:
+                self.counters['errors'] += 1
+            self.logger.error(f'OpenAI query of {user} failed: {exc!r}')
+            return
+        if text:
+            callback(text)
+
+    def respond(self, user: str, incoming: str, callback: Callable[[str], None]) -> bool:
+        """
+        respond - queue query, callback receives response. Never waits for network.
+        Cached responses do not count against user rate limit
+
+        :param user:
+        :param incoming:
+        :param callback:
+        :return: False if query was rejected
+        """
+        if self.client is None:
+            return False
+        if (cached := self.cached(normalize_prompt(incoming))) is not None:
+            return self.workers.submit(user, 'openai', callback, cached)
+        if not self.allowed(user):
+            return False
+        return self.workers.submit(user, 'openai', self.answer, user, incoming, callback)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - cache and query counters
+
+        :return:
+        """
+        with self.lock:
+            return dict(self.counters, cache=len(self.cache))
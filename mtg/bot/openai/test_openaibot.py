@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import logging
+from unittest.mock import MagicMock
+
+from mtg.bot.openai.openaibot import OpenAIBot, normalize_prompt, truncate_bytes
+
+
+def make_bot(answer='Hello there', **kwargs):
+    """Bot with mocked OpenAI client and single worker"""
+    bot = OpenAIBot(logging.getLogger(__name__), workers=1, **kwargs)
+    bot.client = MagicMock()
+    bot.client.chat.completions.create.return_value.choices[0].message.content = answer
+    return bot
+
+
+def test_normalize_and_truncate():
+    """Test prompt normalization and UTF-8 safe truncation"""
+    assert normalize_prompt('  What   is LoRa?? ') == normalize_prompt('what is lora')
+    assert truncate_bytes('short', 10) == 'short'
+    text = truncate_bytes('один два три чотири', 20)
+    assert len(text.encode('utf-8')) <= 20
+    assert text == 'один два…'
+
+
+def test_respond_runs_on_worker_and_caches():
+    """Test query runs on worker, same prompt is answered from cache"""
+    bot = make_bot()
+    callback = MagicMock()
+    assert bot.respond('!1', 'What is LoRa?', callback)
+    callback.assert_not_called()
+    bot.workers.run_once(0)
+    callback.assert_called_once_with('Hello there')
+    assert bot.respond('!2', 'what is lora', callback)
+    bot.workers.run_once(0)
+    assert callback.call_count == 2
+    create = bot.client.chat.completions.create
+    create.assert_called_once()
+    assert create.call_args.kwargs['timeout'] == 20.0
+    assert create.call_args.kwargs['max_tokens'] == 100
+    assert bot.stats() == {'hits': 1, 'queries': 1, 'limited': 0, 'errors': 0, 'cache': 1}
+
+
+def test_response_fits_packets():
+    """Test response is truncated to packet budget"""
+    bot = make_bot(answer='word ' * 200, max_packets=1)
+    callback = MagicMock()
+    bot.respond('!1', 'talk', callback)
+    bot.workers.run_once(0)
+    assert len(callback.call_args[0][0].encode('utf-8')) <= 200
+
+
+def test_rate_limit_and_errors():
+    """Test user rate limit and failed queries are counted"""
+    bot = make_bot(rate=(1, 60.0))
+    bot.client.chat.completions.create.side_effect = TimeoutError('slow')
+    callback = MagicMock()
+    assert bot.respond('!1', 'first', callback)
+    assert not bot.respond('!1', 'second', callback)
+    bot.workers.run_once(0)
+    callback.assert_not_called()
+    assert bot.stats()['limited'] == 1
+    assert bot.stats()['errors'] == 1
+
+
+def test_cached_response_not_rate_limited():
+    """Test cached answers do not use rate limit slots"""
+    bot = make_bot(rate=(1, 60.0))
+    callback = MagicMock()
+    assert bot.respond('!1', 'What is LoRa?', callback)
+    bot.workers.run_once(0)
+    for _ in range(3):
+        assert bot.respond('!1', 'what is lora', callback)
+        bot.workers.run_once(0)
+    assert callback.call_count == 4
+    assert not bot.respond('!1', 'something else', callback)
+    bot.client.chat.completions.create.assert_called_once()
+    assert bot.stats() == {'hits': 3, 'queries': 1, 'limited': 1, 'errors': 0, 'cache': 1}
+
+
+def test_disabled_without_key():
+    """Test bot without client rejects queries"""
+    bot = OpenAIBot(logging.getLogger(__name__))
+    bot.client = None
+    assert not bot.respond('!1', 'hi', MagicMock())
+
+
+def test_reconfigure():
+    """Test new settings apply, answers cut to old packet budget are dropped"""
+    bot = make_bot()
+    callback = MagicMock()
+    bot.respond('!1', 'What is LoRa?', callback)
+    bot.workers.run_once(0)
+    bot.reconfigure(workers=2, timeout=5.0, rate=(1, 60.0), cache_size=8, max_packets=3)
+    assert bot.timeout == 5.0
+    assert bot.rate == (1, 60.0)
+    assert bot.workers.size == 2
+    assert bot.stats()['cache'] == 0
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+""" Channel QR code cache module """
+
+import io
+from threading import RLock
+from typing import Any, Dict, Optional
+
+import pyqrcode
+
+
+def render_png(url: str, scale: int = 5) -> bytes:
+    """
+    render_png - QR code of URL as PNG bytes, rendered in memory
+
+    :param url:
+    :param scale:
+    :return:
+    """
+    output = io.BytesIO()
+    pyqrcode.create(url).png(output, scale=scale)
+    return output.getvalue()
+
+
+class ChannelQRCache:
+    """
+    ChannelQRCache - QR code of current channel URL. PNG is rendered once per URL and
+    Telegram file_id of first upload is reused, so repeat requests send no image at all
+    """
+
+    def __init__(self, scale: int = 5) -> None:
+        self.scale = scale
+        self.lock = RLock()
+        self.url: Optional[str] = None
+        self.image: Optional[bytes] = None
+        self.file_id: Optional[str] = None
+        self.counters = {'renders': 0, 'uploads': 0, 'reused': 0}
+
+    def photo(self, url: str) -> Any:
+        """
+        photo - file_id of uploaded QR code, PNG bytes if it was not uploaded yet.
+        Cache is reset when channel URL changes
+
+        :param url:
+        :return:
+        """
+        with self.lock:
+            if url != self.url:
+                self.url, self.image, self.file_id = url, None, None
+            if self.file_id is not None:
+                self.counters['reused'] += 1
+                return self.file_id
+            if self.image is None:
+                self.image = render_png(url, self.scale)
+                self.counters['renders'] += 1
+            self.counters['uploads'] += 1
+            return self.image
+
+    def uploaded(self, url: str, file_id: Optional[str]) -> None:
+        """
+        uploaded - remember Telegram file_id of QR code upload
+
+        :param url:
+        :param file_id:
+        :return:
+        """
+        with self.lock:
+            if url == self.url and isinstance(file_id, str):
+                self.file_id = file_id
+
+    def forget_upload(self) -> None:
+        """
+        forget_upload - file_id was rejected, next request uploads PNG again
+
+        :return:
+        """
+        with self.lock:
+            self.file_id = None
+
+    def invalidate(self) -> None:
+        """
+        invalidate - drop cached QR code, channel configuration may have changed
+
+        :return:
+        """
+        with self.lock:
+            self.url, self.image, self.file_id = None, None, None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - render and upload counters
+
+        :return:
+        """
+        with self.lock:
+            return dict(self.counters, cached=self.image is not None or self.file_id is not None)
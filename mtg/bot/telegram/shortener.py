@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+""" Async URL shortener module """
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from mtg.config import Config
+
+URL_RE = re.compile('https?://.+')
+
+# service -> API endpoint, config option with token, request field with long URL
+SERVICES = {
+    'pls': ('https://pls.st/api/v1/a/links/shorten', 'PLSST', 'url'),
+    'tly': ('https://t.ly/api/v1/link/shorten', 'TLYToken', 'long_url'),
+}
+
+
+# pylint:disable=too-many-instance-attributes
+class URLShortener:
+    """
+    URLShortener - shortens URLs on pooled async client without blocking Telegram event loop.
+    Long to short mappings are kept in persisted LRU/TTL cache, circuit breaker falls back
+    to long URL while shortening service keeps failing
+    """
+    # consecutive failures that open circuit and seconds it stays open
+    failure_threshold = 3
+    cooldown = 60.0
+    # minimum seconds between cache saves
+    save_interval = 60.0
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, config: Config, logger: logging.Logger, cache_file: str = '', cache_size: int = 1024,
+                 ttl: float = 30 * 86400.0, timeout: float = 3.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.config = config
+        self.logger = logger
+        self.cache_file = cache_file
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.timeout = timeout
+        self.transport = transport
+        self.client: Optional[httpx.AsyncClient] = None
+        # long URL -> (short URL, expiry timestamp)
+        self.cache: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self.failures = 0
+        self.open_until = 0.0
+        # half-open circuit: single trial request is running, other calls fall back meanwhile
+        self.trial = False
+        self.dirty = False
+        self.last_save = time.time()
+        self.counters = {'hits': 0, 'misses': 0, 'errors': 0, 'fallbacks': 0}
+
+    def set_logger(self, logger: logging.Logger) -> None:
+        """
+        set_logger - set class logger
+
+        :param logger:
+        :return:
+        """
+        self.logger = logger
+
+    def reconfigure(self, cache_file: str = '', cache_size: int = 1024, ttl: float = 30 * 86400.0,
+                    timeout: float = 3.0) -> None:
+        """
+        reconfigure - apply new settings, cached entries keep their expiry. Cache shrinks
+        to new size on next insert, it is touched only from Telegram event loop
+
+        :param cache_file:
+        :param cache_size:
+        :param ttl:
+        :param timeout:
+        :return:
+        """
+        if cache_file != self.cache_file:
+            self.dirty = True
+        self.cache_file = cache_file
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.timeout = timeout
+        if self.client is not None:
+            self.client.timeout = httpx.Timeout(timeout)
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        get_client - pooled client, created on first use within Telegram event loop
+
+        :return:
+        """
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(timeout=self.timeout, transport=self.transport,
+                                            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4))
+        return self.client
+
+    def cached(self, long_url: str) -> Optional[str]:
+        """
+        cached - short URL from cache, expired entries are dropped
+
+        :param long_url:
+        :return:
+        """
+        entry = self.cache.get(long_url)
+        if entry is None:
+            return None
+        short_url, expires = entry
+        if expires < time.time():
+            del self.cache[long_url]
+            self.dirty = True
+            return None
+        self.cache.move_to_end(long_url)
+        return short_url
+
+    def remember(self, long_url: str, short_url: str) -> None:
+        """
+        remember - cache mapping and evict least recently used ones
+
+        :param long_url:
+        :param short_url:
+        :return:
+        """
+        self.cache[long_url] = (short_url, time.time() + self.ttl)
+        self.cache.move_to_end(long_url)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        self.dirty = True
+
+    def available(self) -> bool:
+        """
+        available - circuit is closed, or cooldown has passed and no trial is running
+
+        :return:
+        """
+        return self.failures < self.failure_threshold or (time.time() >= self.open_until and not self.trial)
+
+    def allow(self) -> bool:
+        """
+        allow - may call service now. First call after cooldown becomes the only trial
+
+        :return:
+        """
+        if self.failures < self.failure_threshold:
+            return True
+        if not self.available():
+            return False
+        self.trial = True
+        return True
+
+    def failed(self, exc: Exception) -> None:
+        """
+        failed - count failure, open circuit when threshold is reached
+
+        :param exc:
+        :return:
+        """
+        self.counters['errors'] += 1
+        self.failures += 1
+        self.logger.error("URL shortening failed: %s", exc)
+        if self.failures >= self.failure_threshold:
+            self.open_until = time.time() + self.cooldown
+            self.logger.warning("URL shortener disabled for %.0fs after %d failures", self.cooldown, self.failures)
+
+    async def request(self, service: str, long_url: str) -> str:
+        """
+        request - call shortening service
+
+        :param service:
+        :param long_url:
+        :return:
+        """
+        url, token_option, field = SERVICES[service]
+        headers = {
+            'Authorization': f"Bearer {getattr(self.config.WebApp, token_option)}",
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        response = await self.get_client().post(url, headers=headers, json={field: long_url})
+        response.raise_for_status()
+        return str(response.json().get('short_url', long_url))
+
+    async def shorten(self, long_url: str) -> str:
+        """
+        shorten - short URL using configured service, long URL on failure
+
+        :param long_url:
+        :return:
+        """
+        service = self.config.WebApp.ShortenerService
+        if service not in SERVICES:
+            return long_url
+        short_url = self.cached(long_url)
+        if short_url is not None:
+            self.counters['hits'] += 1
+            return short_url
+        if not self.allow():
+            self.counters['fallbacks'] += 1
+            return long_url
+        self.counters['misses'] += 1
+        try:
+            short_url = await self.request(service, long_url)
+        except (httpx.HTTPError, ValueError, KeyError, AttributeError) as exc:
+            self.failed(exc)
+            return long_url
+        finally:
+            self.trial = False
+        self.failures = 0
+        self.remember(long_url, short_url)
+        self.schedule_save()
+        return short_url
+
+    async def shorten_in_text(self, message: str) -> str:
+        """
+        shorten_in_text - shorten URLs in text, all of them at once
+
+        :param message:
+        :return:
+        """
+        splits = message.split(' ')
+        urls: List[str] = list(dict.fromkeys(part for part in splits if URL_RE.match(part)))
+        if urls:
+            replacements = dict(zip(urls, await asyncio.gather(*(self.shorten(url) for url in urls))))
+            splits = [replacements.get(part, part) for part in splits]
+        return ' '.join([x for x in splits if x])
+
+    def load(self) -> None:
+        """
+        load - read persisted cache, expired entries are skipped
+
+        :return:
+        """
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError) as exc:
+            self.logger.error("Could not read shortener cache %s: %s", self.cache_file, exc)
+            return
+        now = time.time()
+        for long_url, (short_url, expires) in entries.items():
+            if expires > now:
+                self.cache[long_url] = (short_url, expires)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def write(self, entries: Dict[str, Any]) -> None:
+        """
+        write - persist cache entries, file is replaced atomically
+
+        :param entries:
+        :return:
+        """
+        try:
+            with open(f'{self.cache_file}.tmp', 'w', encoding='utf-8') as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(f'{self.cache_file}.tmp', self.cache_file)
+        except OSError as exc:
+            self.logger.error("Could not save shortener cache %s: %s", self.cache_file, exc)
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        snapshot - copy of changed cache to persist, None if there is nothing to save
+
+        :return:
+        """
+        if not self.cache_file or not self.dirty:
+            return None
+        self.dirty = False
+        self.last_save = time.time()
+        return dict(self.cache)
+
+    def save(self) -> None:
+        """
+        save - persist cache now, used on shutdown
+
+        :return:
+        """
+        if (entries := self.snapshot()) is not None:
+            self.write(entries)
+
+    def schedule_save(self) -> None:
+        """
+        schedule_save - persist cache off event loop when save interval has passed
+
+        :return:
+        """
+        if time.time() - self.last_save < self.save_interval:
+            return
+        if (entries := self.snapshot()) is not None:
+            asyncio.get_running_loop().run_in_executor(None, self.write, entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - cache and circuit breaker counters
+
+        :return:
+        """
+        return dict(self.counters, cache=len(self.cache), open=not self.available())
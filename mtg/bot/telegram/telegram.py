@@ -1,21 +1,18 @@
 # -*- coding: utf-8 -*-
 """ Telegram bot module """
 
+import asyncio
 import functools
 import logging
 import os
-import re
-import tempfile
 import time
 #
 from importlib.metadata import version as importlib_version
-from threading import Thread
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urlparse
 #
 import humanize
-import pyqrcode
-import requests
+from pubsub import pub
 #
 from telegram import Update
 from telegram.constants import MessageLimit
@@ -24,11 +21,14 @@ from telegram.ext import CommandHandler
 from telegram.ext import MessageHandler, filters
 #
 from mtg.config import Config
+from mtg.connection.meshtastic import TracerouteScheduler
 from mtg.connection.rich import RichConnection
 from mtg.connection.telegram import TelegramConnection
 from mtg.filter import TelegramFilter
 from mtg.log import VERSION
 from mtg.utils import split_message
+from .qr import ChannelQRCache
+from .shortener import URLShortener
 
 
 def check_room(func: Callable[..., Any]) -> Callable[..., Any]:
@@ -62,7 +62,7 @@ def check_room(func: Callable[..., Any]) -> Callable[..., Any]:
     return wrapper
 
 
-class TelegramBot:  # pylint:disable=too-many-public-methods
+class TelegramBot:  # pylint:disable=too-many-public-methods,too-many-instance-attributes
     """
     Telegram bot
     """
@@ -76,6 +76,11 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         self.telegram_connection = telegram_connection
         self.aprs = None
         self.name = 'Telegram Bot'
+        self.shortener = URLShortener(config, self.logger, **self.shortener_options())
+        self.shortener.load()
+        self.channel_qr = ChannelQRCache()
+        self.traceroutes = TracerouteScheduler(meshtastic_connection, self.logger, **self.traceroute_options())
+        self.traceroutes.load()
 
         application = self.telegram_connection.application
 
@@ -93,6 +98,34 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.echo))
 
 
+    def shortener_options(self) -> Dict[str, Any]:
+        """
+        shortener_options - URL shortener settings from configuration
+
+        :return:
+        """
+        config = self.config
+        return {
+            'cache_file': config.WebApp.ShortenerCacheFile,
+            'cache_size': int(config.enforce_type(int, config.WebApp.ShortenerCacheSize)),
+            'ttl': float(config.enforce_type(float, config.WebApp.ShortenerCacheTTL)),
+            'timeout': float(config.enforce_type(float, config.WebApp.ShortenerTimeout)),
+        }
+
+    def traceroute_options(self) -> Dict[str, Any]:
+        """
+        traceroute_options - traceroute scheduler settings from configuration
+
+        :return:
+        """
+        config = self.config
+        return {
+            'concurrency': int(config.enforce_type(int, config.Meshtastic.TracerouteConcurrency)),
+            'interval': float(config.enforce_type(float, config.Meshtastic.TracerouteInterval)),
+            'timeout': float(config.enforce_type(float, config.Meshtastic.TracerouteTimeout)),
+            'table_file': config.Meshtastic.RouteTableFile,
+        }
+
     def set_aprs(self, aprs: Any) -> None:
         """
         Set APRS connection
@@ -107,6 +140,8 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         :return:
         """
         self.logger = logger
+        self.shortener.set_logger(logger)
+        self.traceroutes.logger = logger
 
     def set_filter(self, filter_class: TelegramFilter) -> None:
         """
@@ -117,32 +152,6 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         """
         self.filter = filter_class
 
-    def shorten_p(self, long_url) -> str:
-        """
-        Shorten URL using configured service
-        """
-        if self.config.WebApp.ShortenerService == 'pls':
-            return self.shorten_pls(long_url)
-        if self.config.WebApp.ShortenerService == 'tly':
-            return self.shorten_tly(long_url)
-        return long_url
-
-    def shorten_in_text(self, message: str) -> str:
-        """
-        Shorten URLs in text messages
-        """
-        splits = message.split(' ')
-        replacements = {
-            pos: self.shorten_p(part)
-            for pos, part in enumerate(splits)
-            if re.match('https?://.+', part)
-        }
-        for pos in replacements:
-            replacement = replacements.get(pos)
-            if replacement is not None:
-                splits[pos] = replacement
-        return ' '.join([x for x in splits if x])
-
     async def echo(self, update: Update, _) -> None:  # pylint:disable=too-many-branches,too-many-statements,too-many-locals
         """
         Telegram bot echo handler. Does actual message forwarding
@@ -151,10 +160,9 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         :param _:
         :return:
         """
-        if update.effective_chat.id != self.config.enforce_type(int, self.config.Telegram.Room):
-            self.logger.debug("%d %s",
-                                  update.effective_chat.id,
-                                  self.config.enforce_type(int, self.config.Telegram.Room))
+        room = self.config.Telegram.Room
+        if update.effective_chat.id != room:
+            self.logger.debug("%d %s", update.effective_chat.id, room)
             return
         if self.filter is not None and self.filter.banned(str(update.effective_user.id)):
             self.logger.debug("User %s is in a blacklist...", update.effective_user.id)
@@ -176,7 +184,7 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
             full_user += f' {update.effective_user.last_name}'
         message = ''
         if update.message and update.message.text:
-            message += self.shorten_in_text(update.message.text)
+            message += await self.shortener.shorten_in_text(update.message.text)
 
         if update.message and update.message.sticker:
             message += f"sent sticker {update.message.sticker.set_name}: {update.message.sticker.emoji}"
@@ -200,7 +208,7 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
                 final_path = os.path.abspath(f'{photo_dir}/{safe_filename}')
             photo_file.download(final_path)
             long_url = f'{self.config.WebApp.ExternalURL}/static/t/{time_stamp}/{safe_filename}'
-            short_url = self.shorten_p(long_url)
+            short_url = await self.shortener.shorten(long_url)
             message += f"sent image: {short_url}"
             self.logger.info(message)
 
@@ -215,46 +223,25 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
                 self.aprs.send_text(addressee, f'{full_user}: {msg}')
         self.meshtastic_connection.send_text(f"{full_user}: {message}")
 
-    def shorten_tly(self, long_url: str) -> str:
+    def on_connection(self, interface: Any, topic: Any = pub.AUTO_TOPIC) -> None:
         """
-        Shorten URL using t.ly
+        on radio connection event, channels are read again and may have changed
+
+        :param interface:
+        :param topic:
+        :return:
         """
-        try:
-            tly_token = self.config.WebApp.TLYToken
-            url = 'https://t.ly/api/v1/link/shorten'
-            headers = {
-                  'Authorization': f"Bearer {tly_token}",
-                  'Content-Type': 'application/json',
-                  'Accept': 'application/json'
-            }
-            response = requests.request('POST', url, headers=headers, json={'long_url': long_url}, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            return result.get('short_url', long_url)
-        except (requests.RequestException, ValueError, KeyError) as exc:
-            self.logger.error("URL shortening failed: %s", exc)
-            return long_url
-
-    def shorten_pls(self, long_url: str) -> str:
-        """
-        Shorten URL using pls.st
+        self.logger.debug("connection on %s topic %s", interface, topic)
+        self.channel_qr.invalidate()
+
+    def subscribe(self) -> None:
         """
-        try:
-            token = self.config.WebApp.PLSST
-            url = 'https://pls.st/api/v1/a/links/shorten'
-            headers = {
-                  'Authorization': f"Bearer {token}",
-                  'Content-Type': 'application/json',
-                  'Accept': 'application/json'
-            }
-            response = requests.request('POST', url, headers=headers, json={'url': long_url}, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            return result.get('short_url', long_url)
-        except (requests.RequestException, ValueError, KeyError) as exc:
-            self.logger.error("URL shortening failed: %s", exc)
-            return long_url
+        Subscribe to Meshtastic events
 
+        :return:
+        """
+        for topic in ("meshtastic.connection.established", "meshtastic.connection.lost"):
+            pub.subscribe(self.on_connection, topic)
 
     def poll(self) -> None:
         """
@@ -324,8 +311,6 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         if update.effective_chat.id != self.config.enforce_type(int, self.config.Telegram.Admin):
             self.logger.info("Traceroute requested by non-admin: %d", update.effective_chat.id)
             return
-        bot = update.get_bot()
-        await bot.send_message(chat_id=update.effective_chat.id, text="Sending traceroute... See bot logs")
         if self.meshtastic_connection.interface is not None:
             lora_config = getattr(self.meshtastic_connection.interface.localNode.localConfig, 'lora')
         else:
@@ -333,7 +318,7 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         hop_limit = getattr(lora_config, 'hop_limit')
         dest = update.message.text.lstrip('/traceroute ')
         self.logger.info("Sending traceroute request to %s this could take a while)", dest)
-        self.bg_route(dest, hop_limit)
+        await self.trace([dest], hop_limit, update, "Sending traceroute...")
 
     @check_room
     async def routes(self, update: Update, _context: CallbackContext) -> None:
@@ -352,9 +337,27 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         else:
             return
         hop_limit = getattr(lora_config, 'hop_limit')
-        for node in self.meshtastic_connection.nodes_with_position:
-            if node_id := node.get('user', {}).get('id'):
-                self.bg_route(node_id, hop_limit)
+        nodes = [node_id for node in self.meshtastic_connection.nodes_with_position
+                 if (node_id := node.get('user', {}).get('id'))]
+        await self.trace(nodes, hop_limit, update, f"Tracing {len(nodes)} node(s), summary will follow")
+
+    async def trace(self, nodes: List[str], hop_limit: int, update: Update, text: str) -> None:
+        """
+        trace - queue traceroutes, summary is sent to requesting chat when all of them finish
+
+        :param nodes:
+        :param hop_limit:
+        :param update:
+        :param text: reply for queued request
+        :return:
+        """
+        chat_id = update.effective_chat.id
+        batch = self.traceroutes.submit(
+            nodes, hop_limit,
+            callback=lambda result: self.telegram_connection.send_message_sync(
+                chat_id=chat_id, text=self.traceroutes.summary(result)))
+        bot = update.get_bot()
+        await bot.send_message(chat_id=chat_id, text=text if batch is not None else "Traceroute queue is full")
 
     @check_room
     async def qr_code(self, update: Update, _context: CallbackContext) -> None:
@@ -370,13 +373,22 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
         else:
             return
         self.logger.debug("Primary channel URL %s", url)
-        qr_url = pyqrcode.create(url)
-        _, tmp = tempfile.mkstemp()
-        qr_url.png(tmp, scale=5)
+        chat_id = update.effective_chat.id
         bot = update.get_bot()
-        with open(tmp, 'rb') as photo_handle:
-            await bot.send_photo(chat_id=update.effective_chat.id, photo=photo_handle)
-            os.remove(tmp)
+        # PNG is rendered once per channel URL, off event loop
+        photo = await asyncio.to_thread(self.channel_qr.photo, url)
+        try:
+            message = await bot.send_photo(chat_id=chat_id, photo=photo)
+        except Exception as exc:  # pylint:disable=broad-exception-caught
+            if not isinstance(photo, str):
+                raise
+            # cached file_id is no longer accepted, upload image again
+            self.logger.warning("Cached QR code upload rejected: %s", exc)
+            self.channel_qr.forget_upload()
+            photo = await asyncio.to_thread(self.channel_qr.photo, url)
+            message = await bot.send_photo(chat_id=chat_id, photo=photo)
+        if not isinstance(photo, str) and message is not None and message.photo:
+            self.channel_qr.uploaded(url, message.photo[-1].file_id)
 
     @check_room
     async def channel_url(self, update: Update, _context: CallbackContext) -> None:
@@ -435,16 +447,24 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
                                  text=msg)
 
     @check_room
-    async def nodes(self, update: Update, _context: CallbackContext) -> None:
+    async def nodes(self, update: Update, context: CallbackContext) -> None:
         """
-        Returns list of nodes to user
+        Returns list of nodes to user. Usage: /nodes [lastheard|snr] [page]
 
         :param update:
-        :param _context:
+        :param context:
         :return:
         """
-        include_self = self.config.enforce_type(bool, self.config.Telegram.NodeIncludeSelf)
-        formatted = self.meshtastic_connection.format_nodes(include_self=include_self)
+        include_self = bool(self.config.enforce_type(bool, self.config.Telegram.NodeIncludeSelf))
+        page_size = int(self.config.enforce_type(int, self.config.Telegram.NodesPageSize))
+        sort, page = 'lastheard', 1
+        for arg in context.args or []:
+            if arg.isdigit():
+                page = int(arg)
+            else:
+                sort = arg.lower()
+        formatted = self.meshtastic_connection.format_nodes(include_self=include_self, sort=sort, page=page,
+                                                            page_size=page_size)
 
         bot = update.get_bot()
         if len(formatted) < MessageLimit.MAX_TEXT_LENGTH:
@@ -458,25 +478,11 @@ class TelegramBot:  # pylint:disable=too-many-public-methods
                                                            parse_mode='MarkdownV2')
                       )
 
-    def bg_route(self, dest: str, hop_limit: int) -> None:
-        """
-        Send a traceroute request in the background
-
-        :param dest:
-        :param hop_limit:
-        :return:
-        """
-        if not dest:
-            return
-        if self.meshtastic_connection.interface is not None:
-            thread = Thread(target=self.meshtastic_connection.interface.sendTraceRoute,
-                            args=(dest, hop_limit), name=f"Traceroute-{dest}")
-            thread.start()
-
     def shutdown(self) -> None:
         """
         Telegram bot shutdown method
         """
+        self.shortener.save()
         self.telegram_connection.shutdown()
 
     def run(self) -> None:
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+from unittest.mock import patch
+
+from mtg.bot.telegram.qr import ChannelQRCache
+
+
+def render(url, scale):
+    """Fake PNG renderer"""
+    return f'png:{url}'.encode()
+
+
+@patch('mtg.bot.telegram.qr.render_png', side_effect=render)
+def test_png_rendered_once_and_file_id_reused(mock_render):
+    """Test PNG is rendered once and file_id is reused after upload"""
+    cache = ChannelQRCache()
+    assert cache.photo('https://meshtastic.org/e/#a') == b'png:https://meshtastic.org/e/#a'
+    cache.uploaded('https://meshtastic.org/e/#a', 'file-a')
+    assert cache.photo('https://meshtastic.org/e/#a') == 'file-a'
+    assert cache.photo('https://meshtastic.org/e/#a') == 'file-a'
+    assert mock_render.call_count == 1
+    assert cache.stats() == {'renders': 1, 'uploads': 1, 'reused': 2, 'cached': True}
+
+
+@patch('mtg.bot.telegram.qr.render_png', side_effect=render)
+def test_channel_change_resets_cache(mock_render):
+    """Test new channel URL renders new code, late upload of old one is ignored"""
+    cache = ChannelQRCache()
+    cache.photo('https://meshtastic.org/e/#a')
+    cache.uploaded('https://meshtastic.org/e/#a', 'file-a')
+    assert cache.photo('https://meshtastic.org/e/#b') == b'png:https://meshtastic.org/e/#b'
+    # late upload of previous channel is ignored
+    cache.uploaded('https://meshtastic.org/e/#a', 'file-a')
+    assert cache.photo('https://meshtastic.org/e/#b') == b'png:https://meshtastic.org/e/#b'
+    assert mock_render.call_count == 2
+
+
+@patch('mtg.bot.telegram.qr.render_png', side_effect=render)
+def test_forget_upload_and_invalidate(mock_render):
+    """Test rejected file_id uploads PNG again, invalidate renders again"""
+    cache = ChannelQRCache()
+    cache.photo('https://meshtastic.org/e/#a')
+    cache.uploaded('https://meshtastic.org/e/#a', 'file-a')
+    cache.forget_upload()
+    assert cache.photo('https://meshtastic.org/e/#a') == b'png:https://meshtastic.org/e/#a'
+    assert mock_render.call_count == 1
+    cache.invalidate()
+    cache.photo('https://meshtastic.org/e/#a')
+    assert mock_render.call_count == 2
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import asyncio
+import json
+import os
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from mtg.bot.telegram.shortener import URLShortener
+
+
+def make_shortener(handler, service='pls', **kwargs):
+    """Shortener using mock transport"""
+    config = MagicMock()
+    config.WebApp.ShortenerService = service
+    config.WebApp.PLSST = 'token'
+    return URLShortener(config, MagicMock(), transport=httpx.MockTransport(handler), **kwargs)
+
+
+def shortening(calls, delay=0.0):
+    """Handler returning numbered short URLs"""
+    async def handler(request):
+        calls.append(json.loads(request.content)['url'])
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={'short_url': f'https://pls.st/{len(calls)}'})
+    return handler
+
+
+def failing(calls):
+    """Handler answering with service error"""
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(503)
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_shorten_is_cached():
+    """Test repeated URL is served from cache"""
+    calls = []
+    shortener = make_shortener(shortening(calls))
+    assert await shortener.shorten('https://example.com/a') == 'https://pls.st/1'
+    assert await shortener.shorten('https://example.com/a') == 'https://pls.st/1'
+    assert calls == ['https://example.com/a']
+    assert shortener.stats()['hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_service_keeps_long_url():
+    """Test long URL is kept when no service is configured"""
+    calls = []
+    shortener = make_shortener(shortening(calls), service='')
+    assert await shortener.shorten('https://example.com/a') == 'https://example.com/a'
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_shorten_in_text_runs_in_parallel():
+    """Test URLs of one text are shortened concurrently and once"""
+    calls = []
+    shortener = make_shortener(shortening(calls, delay=0.2))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    text = await shortener.shorten_in_text('see https://a.example https://b.example and https://a.example')
+    assert loop.time() - started < 0.35
+    assert sorted(calls) == ['https://a.example', 'https://b.example']
+    assert text.startswith('see https://pls.st/')
+    assert text.split(' ')[1] == text.split(' ')[4]
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_falls_back_to_long_url():
+    """Test open circuit returns long URL without calling service"""
+    calls = []
+    shortener = make_shortener(failing(calls))
+    for _ in range(5):
+        assert await shortener.shorten('https://example.com/a') == 'https://example.com/a'
+    assert len(calls) == shortener.failure_threshold
+    assert shortener.stats()['open']
+    assert shortener.stats()['fallbacks'] == 2
+    # trial call after cooldown
+    shortener.open_until = 0
+    await shortener.shorten('https://example.com/a')
+    assert len(calls) == shortener.failure_threshold + 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_single_trial():
+    """Test only one trial call reaches service after cooldown"""
+    calls = []
+    shortener = make_shortener(shortening(calls, delay=0.1))
+    shortener.failures = shortener.failure_threshold
+    shortener.open_until = 0
+    urls = [f'https://example.com/{pos}' for pos in range(5)]
+    results = await asyncio.gather(*(shortener.shorten(url) for url in urls))
+    # only trial call reached service, the rest kept long URLs
+    assert len(calls) == 1
+    assert results[0] == 'https://pls.st/1'
+    assert results[1:] == urls[1:]
+    assert shortener.stats()['fallbacks'] == 4
+    # successful trial closed circuit
+    assert not shortener.trial
+    assert await shortener.shorten(urls[1]) == 'https://pls.st/2'
+
+
+@pytest.mark.asyncio
+async def test_failed_trial_reopens_circuit():
+    """Test failed trial opens circuit for another cooldown"""
+    calls = []
+    shortener = make_shortener(failing(calls))
+    shortener.failures = shortener.failure_threshold
+    shortener.open_until = 0
+    assert await shortener.shorten('https://example.com/a') == 'https://example.com/a'
+    assert len(calls) == 1
+    assert not shortener.trial
+    assert shortener.stats()['open']
+    assert await shortener.shorten('https://example.com/a') == 'https://example.com/a'
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_and_ttl():
+    """Test least recently used and expired entries are dropped"""
+    calls = []
+    shortener = make_shortener(shortening(calls), cache_size=2, ttl=60)
+    for url in ('https://a.example', 'https://b.example', 'https://c.example'):
+        await shortener.shorten(url)
+    assert list(shortener.cache) == ['https://b.example', 'https://c.example']
+    shortener.cache['https://b.example'] = ('https://pls.st/2', 0)
+    assert shortener.cached('https://b.example') is None
+
+
+@pytest.mark.asyncio
+async def test_cache_persisted(tmp_path):
+    """Test cache survives restart"""
+    calls = []
+    cache_file = str(tmp_path / 'shortener.json')
+    shortener = make_shortener(shortening(calls), cache_file=cache_file)
+    await shortener.shorten('https://example.com/a')
+    shortener.save()
+
+    restored = make_shortener(shortening(calls), cache_file=cache_file)
+    restored.load()
+    assert await restored.shorten('https://example.com/a') == 'https://pls.st/1'
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_reconfigure(tmp_path):
+    """Test smaller cache applies on next insert, cache is saved to new file"""
+    calls = []
+    shortener = make_shortener(shortening(calls), cache_size=3)
+    for url in ('https://a.example', 'https://b.example', 'https://c.example'):
+        await shortener.shorten(url)
+    cache_file = str(tmp_path / 'shortener.json')
+    shortener.reconfigure(cache_file=cache_file, cache_size=1, timeout=1.0)
+    assert shortener.get_client().timeout.connect == 1.0
+    await shortener.shorten('https://d.example')
+    assert list(shortener.cache) == ['https://d.example']
+    shortener.save()
+    assert os.path.exists(cache_file)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 """ Config module """
 
-from .config import Config
+from .config import Config, ConfigSnapshot, MissingOption
+from .reload import ConfigReloader
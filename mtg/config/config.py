@@ -2,18 +2,190 @@
 """ Configuration module """
 
 import configparser
-from typing import Any, List, Optional, Type, Union
+from typing import Any, Dict, Mapping, Optional, Set, Type, Union
+
+ValueType = Type[Union[bool, int, float, str]]
+
+
+class MissingOption(KeyError, AttributeError):
+    """
+    MissingOption - option is neither in configuration file nor in defaults.
+    KeyError for older callers, AttributeError so getattr() defaults work
+    """
+
+
+class ConfigSection:
+    """
+    ConfigSection - read-only options of single section. Option names are case insensitive
+    like in configparser, value is stored as attribute on first access so later reads are plain attribute reads.
+    Options missing in section are looked up in fallback (DEFAULT) section, like configparser does
+    """
+
+    def __init__(self, name: str, values: Mapping[str, Any], fallback: Optional['ConfigSection'] = None) -> None:
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_values', {key.lower(): value for key, value in values.items()})
+        object.__setattr__(self, '_fallback', fallback)
+
+    def __getattr__(self, option: str) -> Any:
+        if option.startswith('__'):
+            raise AttributeError(option)
+        try:
+            value = self._values[option.lower()]
+        except KeyError:
+            if self._fallback is None or option not in self._fallback:
+                raise MissingOption(f'{self._name}.{option}') from None
+            value = getattr(self._fallback, option)
+        # same value for every thread, so racing writes are harmless
+        object.__setattr__(self, option, value)
+        return value
+
+    def __setattr__(self, option: str, value: Any) -> None:
+        raise AttributeError(f'{self._name}.{option} is read-only')
+
+    def __contains__(self, option: str) -> bool:
+        return option.lower() in self._values or (self._fallback is not None and option in self._fallback)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        as_dict - copy of options set in section itself, names are lower case. Fallback options are not included
+
+        :return:
+        """
+        return dict(self._values)
+
+
+class ConfigSnapshot:
+    """
+    ConfigSnapshot - immutable compiled configuration, replaced as a whole
+    """
+
+    def __init__(self, sections: Mapping[str, ConfigSection]) -> None:
+        object.__setattr__(self, 'sections', dict(sections))
+        for name, section in sections.items():
+            object.__setattr__(self, name, section)
+
+    def __getattr__(self, section: str) -> Any:
+        if section.startswith('__'):
+            raise AttributeError(section)
+        raise MissingOption(section)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f'{name} is read-only')
+
+    def diff(self, other: 'ConfigSnapshot') -> Set[str]:
+        """
+        diff - options whose values differ between snapshots, as Section.option (lower case option)
+
+        :param other:
+        :return:
+        """
+        changed: Set[str] = set()
+        for name in set(self.sections) | set(other.sections):
+            mine = self.sections[name].as_dict() if name in self.sections else {}
+            theirs = other.sections[name].as_dict() if name in other.sections else {}
+            changed.update(f'{name}.{option}' for option in set(mine) | set(theirs)
+                           if mine.get(option) != theirs.get(option))
+        return changed
 
 
 class Config:
     """
     Config - two level configuration with functionality similar to dotted dict
     """
+    # Values for options that older configuration files do not have
+    defaults: Dict[str, Dict[str, str]] = {
+        'DEFAULT': {
+            'WeatherCacheTTL': '600',
+        },
+        'Meshtastic': {
+            'ModemPreset': 'LongFast',
+            'DutyCycle': '10',
+            'DutyCycleWindow': '3600',
+            'OutboundQueueSize': '1000',
+            'NumberedChunks': 'false',
+            'IngestSocketEnabled': 'true',
+            'IngestSocket': '/tmp/mtg.sock',
+            'ChannelRoutes': '',
+            'ReconnectDelay': '5',
+            'ReconnectMaxDelay': '300',
+            'AckTimeout': '30',
+            'AckRetries': '2',
+            'ReceiveWorkers': '4',
+            'ReceiveQueueSize': '1000',
+            'CommandRateLimit': '5',
+            'NodeLogFormat': 'csv',
+            'NodeLogFlushRows': '100',
+            'NodeLogFlushInterval': '30',
+            'NodeLogRotateSize': '10485760',
+            'NodeLogRotateDaily': 'false',
+            'NodeLogCompress': 'true',
+            'NodeLogKeep': '30',
+            'TracerouteConcurrency': '2',
+            'TracerouteInterval': '30',
+            'TracerouteTimeout': '60',
+            'RouteTableFile': '',
+        },
+        'Telegram': {
+            'NodesPageSize': '0',
+        },
+        'OpenAI': {
+            'Workers': '2',
+            'Timeout': '20',
+            'RateLimit': '3',
+            'RatePeriod': '600',
+            'CacheSize': '256',
+            'MaxPackets': '2',
+        },
+        'WebApp': {
+            'RegionsFile': '',
+            'RegionsNameProperty': 'name',
+            'ShortenerService': '',
+            'ShortenerTimeout': '3',
+            'ShortenerCacheSize': '1024',
+            'ShortenerCacheTTL': '2592000',
+            'ShortenerCacheFile': '',
+        },
+    }
+
+    # Options parsed once when configuration is read, the rest are kept as strings
+    types: Dict[str, Dict[str, ValueType]] = {
+        'DEFAULT': {
+            'Debug': bool, 'SentryEnabled': bool, 'WeatherCacheTTL': float,
+        },
+        'Telegram': {
+            'Admin': int, 'Room': int, 'NotificationsRoom': int, 'NotificationsEnabled': bool,
+            'BotInRooms': bool, 'MapLinkEnabled': bool, 'NodeIncludeSelf': bool, 'NodesPageSize': int,
+        },
+        'Meshtastic': {
+            'MaxHopCount': int, 'WelcomeMessageEnabled': bool, 'NodeLogEnabled': bool, 'FIFOEnabled': bool,
+            'DutyCycle': float, 'DutyCycleWindow': float, 'OutboundQueueSize': int, 'NumberedChunks': bool,
+            'IngestSocketEnabled': bool, 'ReconnectDelay': float, 'ReconnectMaxDelay': float,
+            'AckTimeout': float, 'AckRetries': int, 'ReceiveWorkers': int, 'ReceiveQueueSize': int,
+            'CommandRateLimit': int, 'NodeLogFlushRows': int, 'NodeLogFlushInterval': float,
+            'NodeLogRotateSize': int, 'NodeLogRotateDaily': bool, 'NodeLogCompress': bool, 'NodeLogKeep': int,
+            'TracerouteConcurrency': int, 'TracerouteInterval': float, 'TracerouteTimeout': float,
+        },
+        'OpenAI': {
+            'Workers': int, 'Timeout': float, 'RateLimit': int, 'RatePeriod': float, 'CacheSize': int,
+            'MaxPackets': int,
+        },
+        'WebApp': {
+            'Enabled': bool, 'Port': int, 'AirRaidEnabled': bool, 'LastHeardDefault': int,
+            'Center_Latitude': float, 'Center_Longitude': float, 'ShortenerTimeout': float,
+            'ShortenerCacheSize': int, 'ShortenerCacheTTL': float,
+        },
+        'APRS': {
+            'Enabled': bool, 'FromMeshtastic': bool, 'ToMeshtastic': bool,
+        },
+        'MQTT': {
+            'Enabled': bool, 'Port': int,
+        },
+    }
 
     def __init__(self, config_path: str = "mesh.ini") -> None:
         self.config_path: str = config_path
         self.config: Optional[configparser.ConfigParser] = None
-        self.elements: List[str] = []
+        self.snapshot: Optional[ConfigSnapshot] = None
 
     def read(self) -> None:
         """
@@ -23,31 +195,80 @@ class Config:
         """
         self.config = configparser.ConfigParser()
         self.config.read(self.config_path)
+        self.snapshot = self.compile(self.config)
+
+    def reload(self) -> Set[str]:
+        """
+        reload - re-read configuration file and swap snapshot. Missing, unparsable or invalid file
+        raises and leaves current snapshot in place
+
+        :return: changed options as Section.option
+        """
+        parser = configparser.ConfigParser()
+        if not parser.read(self.config_path):
+            raise OSError(f'Could not read {self.config_path}')
+        snapshot = self.compile(parser)
+        previous = self.snapshot
+        # readers see either old or new snapshot, never a mix of both
+        self.config, self.snapshot = parser, snapshot
+        return snapshot.diff(previous) if previous is not None else set()
+
+    @classmethod
+    def compile(cls, parser: configparser.ConfigParser) -> ConfigSnapshot:
+        """
+        compile - merge defaults, parse typed options and build snapshot
+
+        :param parser:
+        :return:
+        """
+        sections: Dict[str, ConfigSection] = {}
+        inherited = dict(parser['DEFAULT'].items())
+        for name in ['DEFAULT', *parser.sections(), *cls.defaults]:
+            if name in sections:
+                continue
+            values: Dict[str, Any] = {key.lower(): value for key, value in cls.defaults.get(name, {}).items()}
+            if name == 'DEFAULT':
+                values.update(inherited)
+            elif parser.has_section(name):
+                # DEFAULT options are compiled into DEFAULT only and reached through fallback, so they
+                # do not show up as changes of every section. Option equal to inherited one resolves the same
+                values.update((key, value) for key, value in parser[name].items()
+                              if key not in inherited or value != inherited[key])
+            for option, value_type in cls.types.get(name, {}).items():
+                if option.lower() not in values:
+                    continue
+                try:
+                    values[option.lower()] = cls.enforce_type(value_type, values[option.lower()])
+                except ValueError:
+                    raise ValueError(f'{name}.{option}: {value_type.__name__} expected, '
+                                     f'got {values[option.lower()]!r}') from None
+            sections[name] = ConfigSection(name, values, None if name == 'DEFAULT' else sections['DEFAULT'])
+        return ConfigSnapshot(sections)
 
     @staticmethod
-    def enforce_type(value_type: Type[Union[bool, int, float, str]], value: str) -> Union[bool, int, float, str]:
+    def enforce_type(value_type: ValueType, value: Any) -> Union[bool, int, float, str]:
         """
-        Enforce selected type
+        Enforce selected type. Options compiled with their type are returned as is
 
         :param value_type:
         :param value:
         :return:
         """
+        if not isinstance(value, str):
+            return value if type(value) is value_type else value_type(value)  # pylint:disable=unidiomatic-typecheck
         return value.lower() == 'true' if value_type == bool else value_type(value)
 
     def __getattr__(self, attr: str) -> Any:
         """
-        Get attribute
+        Get configuration section of current snapshot
 
         :param attr:
         :return:
         """
-        if self.config is None:
-            raise AttributeError('config is empty')
-        if len(self.elements) < 2:
-            self.elements.append(attr)
-        if len(self.elements) == 2:
-            result = self.config[self.elements[0]][self.elements[1]]
-            self.elements = []
-            return result
-        return self
+        snapshot = self.__dict__.get('snapshot')
+        if snapshot is None:
+            parser = self.__dict__.get('config')
+            if parser is None or attr.startswith('__'):
+                raise AttributeError('config is empty')
+            snapshot = self.snapshot = self.compile(parser)
+        return getattr(snapshot, attr)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+""" Configuration reload module """
+
+import configparser
+import logging
+import signal
+from threading import Lock, Thread
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+from pubsub import pub
+
+from .config import Config
+
+
+def matching(changed: Set[str], options: Sequence[str]) -> Set[str]:
+    """
+    matching - changed options covered by option list. Section name alone covers whole section
+
+    :param changed: Section.option names
+    :param options: Section or Section.Option names
+    :return:
+    """
+    result: Set[str] = set()
+    for name in changed:
+        section, _, option = name.partition('.')
+        for item in options:
+            item_section, _, item_option = item.partition('.')
+            if item_section == section and (not item_option or item_option.lower() == option.lower()):
+                result.add(name)
+    return result
+
+
+class ConfigReloader:
+    """
+    ConfigReloader - re-reads configuration on SIGHUP or 'reload' FIFO command.
+    Options read on every use apply immediately, components that keep settings are notified
+    only when their options change
+    """
+    topic = 'mtg.config.reload'
+
+    def __init__(self, config: Config, logger: logging.Logger) -> None:
+        self.config = config
+        self.logger = logger
+        self.lock = Lock()
+        self.handlers: List[Tuple[str, Tuple[str, ...], Callable[[Set[str]], Any]]] = []
+        self.restart_options: Tuple[str, ...] = ()
+
+    def watch(self, name: str, options: Sequence[str], handler: Callable[[Set[str]], Any]) -> None:
+        """
+        watch - call handler with changed options when any of options changes
+
+        :param name: component name for logs
+        :param options: Section or Section.Option names
+        :param handler:
+        :return:
+        """
+        self.handlers.append((name, tuple(options), handler))
+
+    def require_restart(self, *options: str) -> None:
+        """
+        require_restart - options that can not be applied without gateway restart
+
+        :param options:
+        :return:
+        """
+        self.restart_options += options
+
+    def reload(self) -> Optional[Set[str]]:
+        """
+        reload - swap configuration snapshot and reconfigure affected components
+
+        :return: changed options, None if configuration is invalid
+        """
+        with self.lock:
+            try:
+                changed = self.config.reload()
+            except (configparser.Error, ValueError, OSError) as exc:
+                self.logger.error(f'Configuration reload failed, keeping current one: {exc}')
+                return None
+            self.logger.warning(f'Configuration reloaded, {len(changed)} option(s) changed')
+            if pending := matching(changed, self.restart_options):
+                self.logger.warning(f'Restart gateway to apply: {", ".join(sorted(pending))}')
+            for name, options, handler in self.handlers:
+                if affected := matching(changed, options):
+                    self.logger.info(f'Reconfiguring {name}...')
+                    try:
+                        handler(affected)
+                    except Exception as exc:  # pylint:disable=broad-exception-caught
+                        self.logger.error(f'Could not reconfigure {name}: {exc!r}')
+            return changed
+
+    def on_signal(self, _signum: int, _frame: Any) -> None:
+        """
+        on_signal - SIGHUP handler, reload runs outside of signal handler
+
+        :return:
+        """
+        Thread(target=self.reload, daemon=True, name='Config Reload').start()
+
+    def subscribe(self) -> None:
+        """
+        subscribe - reload on SIGHUP and on FIFO command
+
+        :return:
+        """
+        pub.subscribe(self.reload, self.topic)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.on_signal)
@@ -16,14 +16,14 @@ def test_config_init_default_path():
     config = Config()
     assert config.config_path == "mesh.ini"
     assert config.config is None
-    assert config.elements == []
+    assert config.snapshot is None
 
 def test_config_init_custom_path():
     """Test Config initialization with custom path"""
     config = Config("custom.ini")
     assert config.config_path == "custom.ini"
     assert config.config is None
-    assert config.elements == []
+    assert config.snapshot is None
 
 @patch('configparser.ConfigParser')
 def test_read_config(mock_configparser, config):
@@ -82,43 +82,105 @@ def test_getattr_no_config(config):
     with pytest.raises(AttributeError, match='config is empty'):
         _ = config.section.key
 
-@patch('configparser.ConfigParser')
-def test_getattr_first_level(mock_configparser, config):
-    """Test __getattr__ for first level access"""
-    mock_parser = MagicMock()
-    mock_configparser.return_value = mock_parser
-    config.config = mock_parser
-
-    result = config.section
+def make_config(text):
+    """Config compiled from INI text"""
+    config = Config("test.ini")
+    config.config = configparser.ConfigParser()
+    config.config.read_string(text)
+    config.snapshot = Config.compile(config.config)
+    return config
 
-    assert config.elements == ['section']
-    assert result == config
-
-@patch('configparser.ConfigParser')
-def test_getattr_second_level(mock_configparser, config):
-    """Test __getattr__ for second level access"""
-    mock_parser = MagicMock()
-    mock_parser.__getitem__.return_value = {'key': 'value'}
-    mock_configparser.return_value = mock_parser
-    config.config = mock_parser
 
-    result = config.section.key
+def test_getattr_second_level():
+    """Test section and option access"""
+    config = make_config("[section]\nkey = value\n")
+    assert config.section.key == 'value'
+    # case insensitive like configparser
+    assert config.section.KEY == 'value'
 
-    assert result == 'value'
-    assert config.elements == []
-    mock_parser.__getitem__.assert_called_with('section')
 
-@patch('configparser.ConfigParser')
-def test_getattr_multiple_accesses(mock_configparser, config):
+def test_getattr_multiple_accesses():
     """Test multiple attribute accesses"""
-    mock_parser = MagicMock()
-    mock_parser.__getitem__.return_value = {'key1': 'value1', 'key2': 'value2'}
-    mock_configparser.return_value = mock_parser
-    config.config = mock_parser
-
+    config = make_config("[section1]\nkey1 = value1\n[section2]\nkey2 = value2\n")
     result1 = config.section1.key1
     result2 = config.section2.key2
-
     assert result1 == 'value1'
     assert result2 == 'value2'
-    assert config.elements == []
\ No newline at end of file
+
+
+def test_getattr_lazy_compile():
+    """Test parser assigned directly is compiled on first access"""
+    config = Config("test.ini")
+    config.config = configparser.ConfigParser()
+    config.config.read_string("[section]\nkey = value\n")
+    assert config.section.key == 'value'
+    assert config.snapshot is not None
+
+
+def test_typed_options_and_defaults():
+    """Test known options are parsed once and defaults are merged"""
+    config = make_config("[DEFAULT]\nDebug = True\n[Telegram]\nRoom = -100\nNotificationsEnabled = false\n"
+                         "[Meshtastic]\nAdmin = !deadbeef\n")
+    assert config.Telegram.Room == -100
+    assert config.Telegram.NotificationsEnabled is False
+    assert config.DEFAULT.Debug is True
+    assert config.Meshtastic.Admin == '!deadbeef'
+    assert config.Meshtastic.DutyCycle == 10.0
+    assert config.OpenAI.Workers == 2
+    # typed values pass through enforce_type unchanged
+    assert Config.enforce_type(int, config.Telegram.Room) == -100
+    assert Config.enforce_type(bool, config.DEFAULT.Debug) is True
+    assert Config.enforce_type(str, config.Telegram.Room) == '-100'
+
+
+def test_invalid_type_rejected():
+    """Test invalid typed option fails on read"""
+    with pytest.raises(ValueError, match='Telegram.Room: int expected'):
+        make_config("[Telegram]\nRoom = lobby\n")
+
+
+def test_missing_option():
+    """Test missing option raises KeyError, getattr default still works"""
+    config = make_config("[section]\nkey = value\n")
+    with pytest.raises(KeyError):
+        _ = config.section.other
+    with pytest.raises(KeyError):
+        _ = config.nosection.key
+    assert getattr(config.section, 'other', 'fallback') == 'fallback'
+
+
+def test_snapshot_read_only():
+    """Test snapshot can not be modified"""
+    config = make_config("[section]\nkey = value\n")
+    with pytest.raises(AttributeError):
+        config.section.key = 'other'
+    with pytest.raises(AttributeError):
+        config.snapshot.section = None
+
+
+def test_concurrent_access():
+    """Test concurrent reads of different options do not interfere"""
+    import threading
+    config = make_config("[a]\nkey = 1\n[b]\nkey = 2\n")
+    errors = []
+
+    def reader(section, expected):
+        for _ in range(2000):
+            if getattr(config, section).key != expected:
+                errors.append(section)
+
+    threads = [threading.Thread(target=reader, args=(section, expected))
+               for section, expected in (('a', '1'), ('b', '2')) * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_example_config_compiles():
+    """Test shipped example configuration passes type validation"""
+    import os
+    config = Config(os.path.join(os.path.dirname(__file__), '..', '..', 'mesh.ini.example'))
+    config.read()
+    assert isinstance(config.Telegram.Room, int)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import logging
+from unittest.mock import MagicMock
+
+from mtg.config import Config, ConfigReloader
+from mtg.config.reload import matching
+
+
+def write(path, text):
+    """Write configuration file"""
+    with open(path, 'w', encoding='utf-8') as config_file:
+        config_file.write(text)
+
+
+def test_matching():
+    """Test changed options match section and option patterns"""
+    changed = {'MQTT.host', 'Telegram.room'}
+    assert matching(changed, ['MQTT']) == {'MQTT.host'}
+    assert matching(changed, ['Telegram.Room', 'MQTT.Port']) == {'Telegram.room'}
+    assert not matching(changed, ['APRS'])
+
+
+def test_reload_swaps_snapshot_and_notifies(tmp_path):
+    """Test reload swaps snapshot and calls affected handlers only"""
+    path = tmp_path / 'mesh.ini'
+    write(path, '[Telegram]\nRoom = 1\nToken = a\n[MQTT]\nHost = old\n')
+    config = Config(str(path))
+    config.read()
+    snapshot = config.snapshot
+    reloader = ConfigReloader(config, logging.getLogger(__name__))
+    mqtt, telegram = MagicMock(), MagicMock()
+    reloader.watch('MQTT', ['MQTT'], mqtt)
+    reloader.watch('Telegram', ['Telegram.Token'], telegram)
+
+    write(path, '[Telegram]\nRoom = 2\nToken = a\n[MQTT]\nHost = new\n')
+    assert reloader.reload() == {'Telegram.room', 'MQTT.host'}
+    assert config.Telegram.Room == 2
+    assert config.snapshot is not snapshot
+    mqtt.assert_called_once_with({'MQTT.host'})
+    telegram.assert_not_called()
+
+
+def test_invalid_reload_keeps_snapshot(tmp_path):
+    """Test invalid file keeps current snapshot, restart options are reported"""
+    path = tmp_path / 'mesh.ini'
+    write(path, '[Telegram]\nRoom = 1\n')
+    config = Config(str(path))
+    config.read()
+    snapshot = config.snapshot
+    logger = MagicMock()
+    reloader = ConfigReloader(config, logger)
+    reloader.require_restart('Telegram.Room')
+
+    write(path, '[Telegram]\nRoom = lobby\n')
+    assert reloader.reload() is None
+    assert config.snapshot is snapshot
+    assert config.Telegram.Room == 1
+
+    write(path, '[Telegram]\nRoom = 3\n')
+    reloader.reload()
+    assert 'Telegram.room' in logger.warning.call_args[0][0]
+
+
+def test_handler_failure_does_not_stop_others(tmp_path):
+    """Test failing handler does not stop other handlers"""
+    path = tmp_path / 'mesh.ini'
+    write(path, '[MQTT]\nHost = old\n')
+    config = Config(str(path))
+    config.read()
+    reloader = ConfigReloader(config, logging.getLogger(__name__))
+    failing, other = MagicMock(side_effect=RuntimeError('boom')), MagicMock()
+    reloader.watch('first', ['MQTT'], failing)
+    reloader.watch('second', ['MQTT.Host'], other)
+    write(path, '[MQTT]\nHost = new\n')
+    reloader.reload()
+    other.assert_called_once()
+
+
+def test_default_change_not_reported_for_sections(tmp_path):
+    """Test DEFAULT option change is reported once, sections still see it"""
+    path = tmp_path / 'mesh.ini'
+    write(path, '[DEFAULT]\nOpenWeatherKey = a\n[APRS]\nEnabled = false\n[Telegram]\nRoom = 1\n')
+    config = Config(str(path))
+    config.read()
+    logger = MagicMock()
+    reloader = ConfigReloader(config, logger)
+    reloader.require_restart('APRS')
+    assert config.APRS.OpenWeatherKey == 'a'
+
+    write(path, '[DEFAULT]\nOpenWeatherKey = b\n[APRS]\nEnabled = false\n[Telegram]\nRoom = 1\n')
+    assert reloader.reload() == {'DEFAULT.openweatherkey'}
+    assert not any('Restart' in call.args[0] for call in logger.warning.call_args_list)
+    # sections still see DEFAULT options, own option overrides them
+    assert config.APRS.OpenWeatherKey == 'b'
+    assert 'OpenWeatherKey' in config.Telegram
+
+    write(path, '[DEFAULT]\nOpenWeatherKey = b\n[APRS]\nEnabled = false\nOpenWeatherKey = c\n[Telegram]\nRoom = 1\n')
+    assert reloader.reload() == {'APRS.openweatherkey'}
+    assert config.APRS.OpenWeatherKey == 'c'
+    assert config.DEFAULT.OpenWeatherKey == 'b'
+
+
+def test_malformed_or_missing_file_keeps_snapshot(tmp_path):
+    """Test unparsable or missing file is rejected and current snapshot is kept"""
+    path = tmp_path / 'mesh.ini'
+    write(path, '[Telegram]\nRoom = 1\n')
+    config = Config(str(path))
+    config.read()
+    snapshot = config.snapshot
+    reloader = ConfigReloader(config, MagicMock())
+
+    write(path, 'Room = 2\n')
+    assert reloader.reload() is None
+    write(path, '[Telegram]\nRoom = 2\nRoom = 3\n')
+    assert reloader.reload() is None
+    path.unlink()
+    assert reloader.reload() is None
+    assert config.snapshot is snapshot
+    assert config.Telegram.Room == 1
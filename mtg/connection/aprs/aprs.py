@@ -3,6 +3,7 @@
 
 import logging
 import re
+import socket
 from typing import Any, Dict, List, Optional, Tuple
 #
 from datetime import datetime
@@ -25,7 +26,7 @@ class APRSStreamer:  # pylint:disable=too-many-instance-attributes
     """
 
     def __init__(self, config: Config, itu_prefix: ITUPrefix):
-        self.aprs_is = None
+        self.aprs_is: Optional[aprslib.IS] = None
         self.filter: Optional[CallSignFilter] = None
         self.config = config
         self.logger: logging.Logger = logging.getLogger('APRS') # default logger
@@ -236,32 +237,39 @@ class APRSStreamer:  # pylint:disable=too-many-instance-attributes
         self.prefixes = prefixes if prefixes is not None else []
         #
         self.logger.info('Starting APRS for country %s...', country)
-        self.aprs_is = aprslib.IS(self.config.APRS.Callsign,
-                                  self.config.APRS.Password,
-                                  host='rotate.aprs2.net',
-                                  port=14580)
+        self.aprs_is = aprs_is = aprslib.IS(self.config.APRS.Callsign,
+                                            self.config.APRS.Password,
+                                            host='rotate.aprs2.net',
+                                            port=14580)
         f_filter = f"r/{self.config.enforce_type(float, self.config.WebApp.Center_Latitude)}/"
         f_filter += f"{self.config.enforce_type(float, self.config.WebApp.Center_Longitude)}/50"
-        if self.aprs_is is not None:
-            self.aprs_is.set_filter(f_filter)
-        #
-        while not self.exit:
+        aprs_is.set_filter(f_filter)
+        # stops on shutdown, or when restarted streamer replaced connection
+        while not self.exit and self.aprs_is is aprs_is:
             try:
-                if self.aprs_is is not None:
-                    self.aprs_is.connect()
-                    self.aprs_is.consumer(self.callback, immortal=True)
+                aprs_is.connect()
+                # not immortal: loop reconnects itself, so shutdown can stop it
+                aprs_is.consumer(self.callback, immortal=False)
             except KeyboardInterrupt:
                 break
-            except aprslib.exceptions.ConnectionDrop:
+            except (aprslib.exceptions.ConnectionDrop, aprslib.exceptions.ConnectionError):
                 self.logger.debug("aprs conn drop")
             except aprslib.exceptions.LoginError:
                 self.logger.debug("aprs login error")
 
     def shutdown(self) -> None:
         """
-        Shutdown APRS streamer
+        Shutdown APRS streamer, blocked consumer is woken up by closing its socket
         """
         self.exit = True
+        sock = getattr(self.aprs_is, 'sock', None)
+        if isinstance(sock, socket.socket):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        # nothing is forwarded to APRS-IS while streamer is stopped
+        self.aprs_is = None
 
     def run(self) -> None:
         """
@@ -269,6 +277,7 @@ class APRSStreamer:  # pylint:disable=too-many-instance-attributes
 
         :return:
         """
+        self.exit = False
         pub.subscribe(self.process, 'APRS')
         thread = Thread(target=self.run_loop, daemon=True, name=self.name)
         thread.start()
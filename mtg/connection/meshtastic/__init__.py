@@ -2,6 +2,10 @@
 """ Meshtastic connection module """
 
 from .meshtastic import MeshtasticConnection
+from .nodeindex import NodeIndex, NodeSnapshot
+from .radio import Radio
+from .scheduler import OutboundScheduler, Priority
+from .traceroute import TracerouteBatch, TracerouteScheduler
 
 # Access class attributes
 FIFO = MeshtasticConnection.fifo
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+""" LoRa airtime estimation module """
+
+import math
+from typing import Dict, Tuple
+
+# Meshtastic modem presets: spreading factor, bandwidth (kHz), coding rate denominator (4/x)
+MODEM_PRESETS: Dict[str, Tuple[int, float, int]] = {
+    'SHORT_TURBO': (7, 500.0, 5),
+    'SHORT_FAST': (7, 250.0, 5),
+    'SHORT_SLOW': (8, 250.0, 5),
+    'MEDIUM_FAST': (9, 250.0, 5),
+    'MEDIUM_SLOW': (10, 250.0, 5),
+    'LONG_FAST': (11, 250.0, 5),
+    'LONG_MODERATE': (11, 125.0, 8),
+    'LONG_SLOW': (12, 125.0, 8),
+    'VERY_LONG_SLOW': (12, 62.5, 8),
+}
+DEFAULT_PRESET = 'LONG_FAST'
+# Meshtastic always uses 16 preamble symbols
+PREAMBLE_SYMBOLS = 16
+# Unencrypted radio header plus protobuf framing of the Data message
+PACKET_OVERHEAD = 16 + 6
+
+
+def normalize_preset(preset: str) -> str:
+    """
+    normalize_preset - convert LongFast / long_fast / LONG-FAST to LONG_FAST
+
+    :param preset:
+    :return:
+    """
+    name = preset.strip().replace('-', '_').replace(' ', '_')
+    if '_' not in name:
+        # CamelCase, as shown by the apps: LongFast, VeryLongSlow
+        name = ''.join(f'_{char}' if char.isupper() and pos > 0 else char for pos, char in enumerate(name))
+    name = name.upper()
+    return name if name in MODEM_PRESETS else DEFAULT_PRESET
+
+
+def lora_airtime(payload_len: int, preset: str = DEFAULT_PRESET) -> float:
+    """
+    lora_airtime - estimate time on air (seconds) for payload of given size (bytes)
+
+    :param payload_len:
+    :param preset:
+    :return:
+    """
+    spreading_factor, bandwidth, coding_rate = MODEM_PRESETS[normalize_preset(preset)]
+    symbol_time = (2 ** spreading_factor) / (bandwidth * 1000)
+    # low data rate optimization is mandatory for symbols longer than 16ms
+    low_dr = 1 if symbol_time > 0.016 else 0
+    packet_len = payload_len + PACKET_OVERHEAD
+    numerator = 8 * packet_len - 4 * spreading_factor + 28 + 16
+    denominator = 4 * (spreading_factor - 2 * low_dr)
+    payload_symbols = 8 + max(math.ceil(numerator / denominator) * coding_rate, 0)
+    preamble_time = (PREAMBLE_SYMBOLS + 4.25) * symbol_time
+    return preamble_time + payload_symbols * symbol_time
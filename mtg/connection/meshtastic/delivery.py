@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+""" Outbound packet delivery tracking module """
+
+import logging
+import time
+from collections import OrderedDict, deque
+from threading import RLock
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+# RTT histogram bucket upper bounds, seconds
+RTT_BUCKETS = (2.0, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Pending(NamedTuple):
+    """
+    Pending - packet waiting for ack
+    """
+    destination: str
+    sent: float
+    attempt: int
+    # resubmits packet, returns False if it was not accepted (e.g. no airtime left)
+    retry: Callable[[int], bool]
+
+
+def packet_id(packet: Any) -> Optional[int]:
+    """
+    packet_id - id of MeshPacket returned by interface send methods
+
+    :param packet:
+    :return:
+    """
+    value = getattr(packet, 'id', None)
+    return value if isinstance(value, int) and value else None
+
+
+def normalize_node(node: Any) -> str:
+    """
+    normalize_node - !abcdef12 style id of node given as number or !hex id. Other values are kept as is
+
+    :param node:
+    :return:
+    """
+    if isinstance(node, int) and not isinstance(node, bool):
+        return f'!{node & 0xFFFFFFFF:08x}'
+    text = str(node)
+    if text.startswith('!'):
+        try:
+            return f'!{int(text[1:], 16) & 0xFFFFFFFF:08x}'
+        except ValueError:
+            pass
+    return text
+
+
+def rtt_bucket(rtt: float) -> str:
+    """
+    rtt_bucket - histogram bucket label for round trip time
+
+    :param rtt:
+    :return:
+    """
+    for bound in RTT_BUCKETS:
+        if rtt <= bound:
+            return f'<={bound:g}s'
+    return f'>{RTT_BUCKETS[-1]:g}s'
+
+
+# pylint:disable=too-many-instance-attributes
+class DeliveryTracker:
+    """
+    DeliveryTracker - match ROUTING_APP acks/NAKs to sent packets, retry and keep per node delivery metrics
+    """
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, logger: logging.Logger, timeout: float = 30.0, retries: int = 2,
+                 window: int = 50, max_pending: int = 256, max_nodes: int = 1024) -> None:
+        self.logger = logger
+        self.timeout = timeout
+        self.retries = retries
+        self.window = window
+        self.max_pending = max_pending
+        self.max_nodes = max_nodes
+        self.lock = RLock()
+        self.pending: OrderedDict[int, Pending] = OrderedDict()
+        # node id -> recent outcomes: (delivered, rtt)
+        self.outcomes: OrderedDict[str, Deque[Tuple[bool, Optional[float]]]] = OrderedDict()
+        self.counters = {'registered': 0, 'acked': 0, 'nak': 0, 'timeout': 0, 'retried': 0, 'failed': 0}
+
+    def register(self, pid: int, destination: Any, retry: Callable[[int], bool], attempt: int = 0) -> None:
+        """
+        register - remember sent packet that requested ack
+
+        :param pid: packet id
+        :param destination: node number or id
+        :param retry:
+        :param attempt:
+        :return:
+        """
+        with self.lock:
+            self.pending[pid] = Pending(normalize_node(destination), time.time(), attempt, retry)
+            self.counters['registered'] += 1
+            while len(self.pending) > self.max_pending:
+                _, oldest = self.pending.popitem(last=False)
+                self._record(oldest.destination, False, None)
+                self.counters['failed'] += 1
+
+    def _record(self, destination: str, delivered: bool, rtt: Optional[float]) -> None:
+        outcomes = self.outcomes.pop(destination, None)
+        if outcomes is None:
+            outcomes = deque(maxlen=self.window)
+        outcomes.append((delivered, rtt))
+        self.outcomes[destination] = outcomes
+        while len(self.outcomes) > self.max_nodes:
+            self.outcomes.popitem(last=False)
+
+    def on_routing(self, packet: Dict[str, Any]) -> bool:
+        """
+        on_routing - process ROUTING_APP packet
+
+        :param packet:
+        :return: True if packet acknowledged one of tracked packets
+        """
+        decoded = packet.get('decoded') or {}
+        request_id = decoded.get('requestId')
+        error = (decoded.get('routing') or {}).get('errorReason', 'NONE')
+        if not isinstance(request_id, int):
+            return False
+        with self.lock:
+            entry = self.pending.get(request_id)
+            if entry is None:
+                return False
+            if error == 'NONE':
+                # implicit ack - packet was only rebroadcast by neighbour, wait for destination
+                # fromId is None for nodes missing from interface node DB, numeric id is always there
+                sender = packet.get('fromId') or packet.get('from')
+                if sender is None or normalize_node(sender) != entry.destination:
+                    return False
+                del self.pending[request_id]
+                self.counters['acked'] += 1
+                self._record(entry.destination, True, time.time() - entry.sent)
+                return True
+            del self.pending[request_id]
+            self.counters['nak'] += 1
+        self.logger.debug(f'NAK {error} for packet {request_id} to {entry.destination}')
+        self._retry_or_fail(entry)
+        return True
+
+    def expire(self) -> int:
+        """
+        expire - retry or fail packets without ack. Timeout doubles with each attempt
+
+        :return: number of expired packets
+        """
+        now = time.time()
+        with self.lock:
+            expired = [pid for pid, entry in self.pending.items()
+                       if now - entry.sent > self.timeout * 2 ** entry.attempt]
+            entries = [self.pending.pop(pid) for pid in expired]
+            self.counters['timeout'] += len(entries)
+        for entry in entries:
+            self._retry_or_fail(entry)
+        return len(entries)
+
+    def _retry_or_fail(self, entry: Pending) -> None:
+        if entry.attempt < self.retries:
+            try:
+                accepted = entry.retry(entry.attempt + 1)
+            except Exception as exc:  # pylint:disable=broad-exception-caught
+                self.logger.error(f'Retry to {entry.destination} failed: {exc}')
+                accepted = False
+            if accepted:
+                with self.lock:
+                    self.counters['retried'] += 1
+                return
+        with self.lock:
+            self.counters['failed'] += 1
+            self._record(entry.destination, False, None)
+        self.logger.debug(f'Delivery to {entry.destination} failed after {entry.attempt + 1} attempt(s)')
+
+    def node_stats(self, destination: str) -> Dict[str, Any]:
+        """
+        node_stats - rolling delivery ratio and RTT histogram for node
+
+        :param destination:
+        :return:
+        """
+        with self.lock:
+            outcomes: List[Tuple[bool, Optional[float]]] = list(self.outcomes.get(normalize_node(destination), ()))
+        rtts = [rtt for delivered, rtt in outcomes if delivered and rtt is not None]
+        histogram = {rtt_bucket(bound): 0 for bound in RTT_BUCKETS}
+        histogram[rtt_bucket(float('inf'))] = 0
+        for rtt in rtts:
+            histogram[rtt_bucket(rtt)] += 1
+        return {
+            'sent': len(outcomes),
+            'delivered': len(rtts),
+            'ratio': round(len(rtts) / len(outcomes), 3) if outcomes else 0.0,
+            'rtt_avg': round(sum(rtts) / len(rtts), 3) if rtts else 0.0,
+            'rtt': histogram,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - counters and per node delivery metrics
+
+        :return:
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            pending = len(self.pending)
+            destinations = list(self.outcomes)
+        return dict(counters, pending=pending,
+                    nodes={destination: self.node_stats(destination) for destination in destinations})
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+""" Local ingestion socket module """
+
+import json
+import logging
+import os
+import selectors
+import socket
+import stat
+from threading import Thread
+from typing import Any, Callable, Dict, Optional
+# 3rd party
+from setproctitle import setthreadtitle
+
+from mtg.ingest import parse_line
+
+
+class IngestServer:  # pylint:disable=too-many-instance-attributes
+    """
+    IngestServer - Unix domain socket that accepts newline separated requests
+    (JSON object, JSON array for batches or plain text to broadcast).
+    After client closes its write side, server answers with single JSON summary line.
+    """
+    name = 'Meshtastic Ingest'
+    read_size = 65536
+    max_line = 1024 * 1024
+    max_errors = 10
+
+    def __init__(self, logger: logging.Logger, path: str, submit: Callable[..., Any], mode: int = 0o660) -> None:
+        self.logger = logger
+        self.path = path
+        self.submit = submit
+        self.mode = mode
+        self.selector: Optional[selectors.BaseSelector] = None
+        self.listener: Optional[socket.socket] = None
+        self.clients: Dict[socket.socket, Dict[str, Any]] = {}
+        self.exit = False
+
+    def open(self) -> None:
+        """
+        open - bind socket, replacing stale one
+
+        :return:
+        """
+        if os.path.exists(self.path) and stat.S_ISSOCK(os.stat(self.path).st_mode):
+            os.unlink(self.path)
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        os.chmod(self.path, self.mode)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+    def accept(self) -> None:
+        """
+        accept - register new client
+
+        :return:
+        """
+        if self.listener is None or self.selector is None:
+            return
+        try:
+            client, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        client.setblocking(False)
+        self.clients[client] = {'buffer': bytearray(), 'queued': 0, 'failed': 0, 'errors': []}
+        self.selector.register(client, selectors.EVENT_READ)
+
+    def process_line(self, state: Dict[str, Any], line: str) -> None:
+        """
+        process_line - parse request line and submit messages
+
+        :param state:
+        :param line:
+        :return:
+        """
+        try:
+            messages = parse_line(line)
+        except ValueError as exc:
+            state['failed'] += 1
+            if len(state['errors']) < self.max_errors:
+                state['errors'].append(str(exc))
+            return
+        for message in messages:
+            try:
+                # False means link is down or outbound queue dropped message
+                accepted, error = self.submit(**message) is not False, 'message was not queued'
+            except Exception as exc:  # pylint:disable=broad-exception-caught
+                self.logger.error(f'Ingest submit failed: {exc}')
+                accepted, error = False, str(exc)
+            if accepted:
+                state['queued'] += 1
+                continue
+            state['failed'] += 1
+            if len(state['errors']) < self.max_errors:
+                state['errors'].append(error)
+
+    def read(self, client: socket.socket) -> None:
+        """
+        read - process complete request lines, answer and close on EOF
+
+        :param client:
+        :return:
+        """
+        state = self.clients[client]
+        try:
+            data = client.recv(self.read_size)
+        except BlockingIOError:
+            return
+        except OSError as exc:
+            self.logger.warning(f'Ingest client error: {exc}')
+            self.close_client(client)
+            return
+        buffer = state['buffer']
+        buffer.extend(data)
+        while (pos := buffer.find(b'\n')) >= 0:
+            self.process_line(state, buffer[:pos].decode('utf-8', errors='replace'))
+            del buffer[:pos + 1]
+        if len(buffer) > self.max_line:
+            state['failed'] += 1
+            buffer.clear()
+        if data:
+            return
+        if buffer:
+            self.process_line(state, buffer.decode('utf-8', errors='replace'))
+        summary = {'queued': state['queued'], 'failed': state['failed'], 'errors': state['errors']}
+        try:
+            client.setblocking(True)
+            client.settimeout(1.0)
+            client.sendall(json.dumps(summary).encode('utf-8') + b'\n')
+        except OSError as exc:
+            self.logger.debug(f'Ingest client went away: {exc}')
+        self.close_client(client)
+
+    def close_client(self, client: socket.socket) -> None:
+        """
+        close_client - forget client
+
+        :param client:
+        :return:
+        """
+        if self.selector is not None:
+            self.selector.unregister(client)
+        self.clients.pop(client, None)
+        client.close()
+
+    def run_once(self, timeout: float = 0.5) -> None:
+        """
+        run_once - wait for connections and data
+
+        :param timeout:
+        :return:
+        """
+        if self.selector is None:
+            return
+        for key, _ in self.selector.select(timeout):
+            if key.fileobj is self.listener:
+                self.accept()
+            else:
+                self.read(key.fileobj)  # type: ignore[arg-type]
+
+    def close(self) -> None:
+        """
+        close - close clients and remove socket
+
+        :return:
+        """
+        for client in list(self.clients):
+            self.close_client(client)
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def run_loop(self) -> None:
+        """
+        run_loop - ingestion thread
+
+        :return:
+        """
+        setthreadtitle(self.name)
+        self.open()
+        try:
+            while not self.exit:
+                self.run_once()
+        finally:
+            self.close()
+
+    def run(self) -> None:
+        """
+        run - start ingestion thread
+
+        :return:
+        """
+        self.exit = False
+        thread = Thread(target=self.run_loop, daemon=True, name=self.name)
+        thread.start()
+
+    def shutdown(self) -> None:
+        """
+        shutdown - stop ingestion thread
+
+        :return:
+        """
+        self.exit = True
@@ -2,52 +2,66 @@
 """ Meshtastic connection module """
 
 import logging
-import re
-import sys
 import time
+from collections import OrderedDict
+from functools import partial
 #
 from threading import RLock, Thread
 from typing import (
     Any,
+    Callable,
     Dict,
     List,
     Optional,
+    Sequence,
+    Tuple,
 )
 #
 from meshtastic import (
     LOCAL_ADDR as MESHTASTIC_LOCAL_ADDR,
     BROADCAST_ADDR as MESHTASTIC_BROADCAST_ADDR,
-    serial_interface as meshtastic_serial_interface,
-    tcp_interface as meshtastic_tcp_interface,
     mesh_pb2
 )
 # 3rd party
+from pubsub import pub
 from setproctitle import setthreadtitle
 
-from mtg.utils import create_fifo, split_message
-from mtg.connection.mqtt import MQTTInterface
+from mtg.config import ConfigReloader
+from mtg.utils import FifoReader, KeyedWorkerPool, split_text
+from .ingest import IngestServer
+from .nodeindex import NodeIndex, NodeSnapshot
+from .nodetable import DEFAULT_SORT, NodeTable
+from .airtime import DEFAULT_PRESET
+from .delivery import DeliveryTracker, packet_id
+from .radio import LinkState, Radio, split_list
+from .scheduler import Priority, Requeue
 
 
-# pylint:disable=too-many-instance-attributes
+# pylint:disable=too-many-instance-attributes,too-many-public-methods
 class MeshtasticConnection:
     """
     Meshtastic device connection
     """
     fifo = '/tmp/mtg.fifo'
     fifo_cmd = '/tmp/mtg.cmd.fifo'
+    # cross-device dedup window
+    seen_size = 4096
+    seen_ttl = 600.0
+    # device reboots in 10 seconds, give it time to come back
+    reboot_delay = 20.0
+    # retries may use up to this share of duty cycle budget
+    retry_airtime_share = 0.5
     # pylint:disable=too-many-arguments,too-many-positional-arguments
     def __init__(
         self, dev_path: str, logger: logging.Logger, config: Any, filter_class: Any, startup_ts: float = time.time()
     ):
         self.dev_path = dev_path
-        self.interface: Optional[Any] = None
         self.logger = logger
         self.config = config
         self.startup_ts = startup_ts
         self.mqtt_nodes: Dict[str, Any] = {}
         self.name = 'Meshtastic Connection'
         self.lock = RLock()
-        self.fifo_lock = RLock()  # Add separate lock for FIFO operations
         self.filter = filter_class
         # Get configurable FIFO paths, use defaults if not set
         try:
@@ -58,6 +72,34 @@ class MeshtasticConnection:
             self.fifo_cmd = getattr(config.Meshtastic, 'FIFOCmdPath', self.fifo_cmd)
         except KeyError:
             pass
+        # one or more radios (comma separated devices), each with own airtime scheduler.
+        # First radio is primary one: used for admin commands, channel URL etc.
+        presets = split_list(config.Meshtastic.ModemPreset) or [DEFAULT_PRESET]
+        self.radios = [
+            Radio(path, logger, config, presets[min(pos, len(presets) - 1)])
+            for pos, path in enumerate(split_list(dev_path) or [dev_path])
+        ]
+        self.scheduler = self.radios[0].scheduler
+        self.channel_routes = self.parse_channel_routes(config.Meshtastic.ChannelRoutes)
+        # node_id -> radio that heard it last, used to route direct messages
+        self.heard_by: Dict[str, Radio] = {}
+        # (from, packet id) -> (radio interface, timestamp) for cross-device dedup
+        self.seen_packets: OrderedDict[Tuple[Any, Any], Tuple[int, float]] = OrderedDict()
+        self.numbered_chunks = config.enforce_type(bool, config.Meshtastic.NumberedChunks)
+        # local ingestion socket, registered as separate runner
+        self.ingest: Optional[IngestServer] = None
+        if config.enforce_type(bool, config.Meshtastic.IngestSocketEnabled):
+            self.ingest = IngestServer(logger, str(config.Meshtastic.IngestSocket), self.post_message)
+        # node table, updated by radio events
+        self.node_index = NodeIndex(logger, position_fn=self.node_position, prefetch_fn=self.prefetch_positions)
+        self.node_table = NodeTable(self.node_banned)
+        # direct messages acks
+        self.delivery = DeliveryTracker(logger,
+                                        timeout=config.enforce_type(float, config.Meshtastic.AckTimeout),
+                                        retries=config.enforce_type(int, config.Meshtastic.AckRetries))
+        # FIFO commands run one at a time off the reader thread
+        self.commands = KeyedWorkerPool(logger, workers=1, max_queue=16, name='Meshtastic Command')
+        self.thread: Optional[Thread] = None
         # exit
         self.exit = False
 
@@ -70,53 +112,372 @@ class MeshtasticConnection:
         """
         return self.startup_ts
 
-    def connect(self):
+    @property
+    def interface(self) -> Optional[Any]:
+        """
+        Primary radio interface
+
+        :return:
+        """
+        return self.radios[0].interface
+
+    @interface.setter
+    def interface(self, interface: Optional[Any]) -> None:
+        self.radios[0].interface = interface
+
+    @property
+    def connected_radios(self) -> List[Radio]:
+        """
+        Radios with interface
+
+        :return:
+        """
+        return [radio for radio in self.radios if radio.interface is not None]
+
+    @property
+    def link_up(self) -> bool:
+        """
+        Some radio is connected or reconnecting. Packets are buffered until link is restored
+
+        :return:
+        """
+        return bool(self.connected_radios) or any(radio.state == LinkState.RECONNECTING for radio in self.radios)
+
+    def parse_channel_routes(self, value: Any) -> Dict[int, Radio]:
+        """
+        Parse ChannelRoutes: comma separated channel:radio pairs, radio numbers start from 1
+
+        :param value:
+        :return:
+        """
+        routes = {}
+        for item in split_list(value):
+            channel, _, number = item.partition(':')
+            if channel.strip().isdigit() and number.strip().isdigit() and 0 < int(number) <= len(self.radios):
+                routes[int(channel)] = self.radios[int(number) - 1]
+            else:
+                self.logger.warning(f'Ignoring channel route {item}')
+        return routes
+
+    def connect(self, radios: Optional[List[Radio]] = None) -> None:
+        """
+        Connect to Meshtastic devices. Interface can be later updated during reboot procedure
+
+        :param radios: radios to (re)connect, all by default
+        :return:
+        """
+        for radio in radios or self.radios:
+            radio.connect()
+        self.subscribe()
+
+    def radio_for(self, interface: Any) -> Optional[Radio]:
+        """
+        Find radio by its interface
+
+        :param interface:
+        :return:
+        """
+        for radio in self.radios:
+            if radio.interface is interface:
+                return radio
+        return None
+
+    def is_duplicate(self, packet: Dict, interface: Any) -> bool:
+        """
+        Same packet heard by another radio. Safe to call from several subscribers of the same packet
+
+        :param packet:
+        :param interface:
+        :return:
+        """
+        pid = packet.get('id')
+        if not pid or len(self.radios) < 2:
+            return False
+        key = (packet.get('from'), pid)
+        now = time.time()
+        with self.lock:
+            while self.seen_packets and (len(self.seen_packets) > self.seen_size or
+                                         next(iter(self.seen_packets.values()))[1] < now - self.seen_ttl):
+                self.seen_packets.popitem(last=False)
+            first = self.seen_packets.get(key)
+            if first is None:
+                self.seen_packets[key] = (id(interface), now)
+                return False
+        return first[0] != id(interface)
+
+    def subscribe(self) -> None:
+        """
+        Subscribe to radio events that change node table
+
+        :return:
         """
-        Connect to Meshtastic device. Interface can be later updated during reboot procedure
+        subscription_map: Dict[str, Callable[..., None]] = {
+            "meshtastic.receive": self.on_node_packet,
+            "meshtastic.node.updated": self.on_node_updated,
+            "meshtastic.connection.established": self.on_node_table,
+            "meshtastic.connection.lost": self.on_connection_lost,
+        }
+        for topic, callback in subscription_map.items():
+            pub.subscribe(callback, topic)
 
+    def on_node_packet(self, packet, interface) -> None:
+        """
+        Sender's lastHeard, SNR and metrics change with every received packet
+
+        :param packet:
+        :param interface:
         :return:
         """
-        if self.dev_path.startswith('tcp:'):
-            self.interface = meshtastic_tcp_interface.TCPInterface(self.dev_path.removeprefix('tcp:'),
-                                                                   debugOut=sys.stdout)
-        elif self.dev_path == 'mqtt':
-            self.interface = MQTTInterface(debugOut=sys.stdout, cfg=self.config, logger=self.logger)
-            # start node info thread. BUGGY
-            # Thread(target=self.interface.node_publisher).start()
+        if self.is_duplicate(packet, interface):
+            return
+        if (packet.get('decoded') or {}).get('portnum') == 'ROUTING_APP':
+            self.delivery.on_routing(packet)
+        self.delivery.expire()
+        if not (from_id := packet.get('fromId')):
+            return
+        if (radio := self.radio_for(interface)) is not None:
+            self.heard_by[from_id] = radio
+        self.refresh_node(from_id)
+
+    def on_node_updated(self, node, interface) -> None:  # pylint:disable=unused-argument
+        """
+        Node info / position update
+
+        :param node:
+        :param interface:
+        :return:
+        """
+        if node_id := node.get('user', {}).get('id'):
+            self.refresh_node(node_id)
+
+    def on_node_table(self, interface) -> None:  # pylint:disable=unused-argument
+        """
+        Full node table is available after (re)connect
+
+        :param interface:
+        :return:
+        """
+        self.node_index.rebuild(self.nodes)
+
+    def on_connection_lost(self, interface) -> None:
+        """
+        Serial / TCP link dropped. Events of interfaces that were already replaced are ignored
+
+        :param interface:
+        :return:
+        """
+        if (radio := self.radio_for(interface)) is not None:
+            radio.connection_lost()
+
+    def refresh_node(self, node_id: str) -> None:
+        """
+        Copy single node from radio into node index
+
+        :param node_id:
+        :return:
+        """
+        if node_info := self.nodes.get(node_id):
+            self.node_index.update(node_id, node_info)
         else:
-            self.interface = meshtastic_serial_interface.SerialInterface(devPath=self.dev_path, debugOut=sys.stdout)
+            self.node_index.remove(node_id)
 
+    def node_position(self, node_info: Dict) -> Optional[Dict]:
+        """
+        Position stored in node index. Called only when radio reports new position,
+        by thread reading node snapshot rather than radio thread
 
-    def send_text(self, msg, **kwargs) -> None:
+        :param node_info:
+        :return:
         """
-        Send Meshtastic message
+        return node_info.get('position') or None
 
-        :param args:
+    def prefetch_positions(self, nodes: List[Dict]) -> None:
+        """
+        Prepare positions of many nodes at once, before node_position is called for each of them
+
+        :param nodes:
+        :return:
+        """
+
+    def node_banned(self, node_id: str) -> bool:
+        """
+        Check node against filter
+
+        :param node_id:
+        :return:
+        """
+        if self.filter.banned(node_id):
+            self.logger.debug(f"Node {node_id} is in a blacklist...")
+            return True
+        return False
+
+    def send_text(self, msg, priority: Optional[Priority] = None, **kwargs) -> bool:
+        """
+        Queue Meshtastic message. Direct messages are sent before broadcasts unless priority is set
+
+        :param msg:
+        :param priority:
+        :param kwargs:
+        :return: False if link is down or any chunk was dropped by outbound scheduler
+        """
+        if not self.link_up:
+            return False
+        destination = kwargs.get('destinationId', MESHTASTIC_BROADCAST_ADDR)
+        if priority is None:
+            priority = Priority.BROADCAST if destination == MESHTASTIC_BROADCAST_ADDR else Priority.DIRECT
+        # pylint:disable=no-member
+        chunks = split_text(msg, mesh_pb2.Constants.DATA_PAYLOAD_LEN, encoding='utf-8',
+                            numbered=self.numbered_chunks)
+        dropped = sum(1 for chunk in chunks if not self.queue_text(chunk, priority=priority, **kwargs))
+        if dropped:
+            self.logger.warning(f'Message to {destination}: {dropped} of {len(chunks)} chunk(s) were not queued')
+        return not dropped
+
+    def post_message(self, text: str, destination: Any = MESHTASTIC_BROADCAST_ADDR, channel: int = 0,
+                     priority: Optional[str] = None) -> bool:
+        """
+        Message received from local ingestion socket
+
+        :param text:
+        :param destination:
+        :param channel:
+        :param priority: priority name, by default chosen by destination
+        :return: False if message was not queued
+        """
+        return self.send_text(text, priority=Priority[priority.upper()] if priority else None,
+                       destinationId=destination, channelIndex=channel)
+
+    def route(self, destination: Any = MESHTASTIC_BROADCAST_ADDR, channel: Optional[int] = None) -> Radio:
+        """
+        Pick radio for outbound packet: by channel route, by radio that heard destination,
+        otherwise least loaded one
+
+        :param destination:
+        :param channel:
+        :return:
+        """
+        radios = self.connected_radios or self.radios
+        if len(radios) == 1:
+            return radios[0]
+        if channel is not None and (radio := self.channel_routes.get(channel)) is not None:
+            return radio
+        if destination != MESHTASTIC_BROADCAST_ADDR and (radio := self.heard_by.get(destination)) in radios:
+            return radio  # type: ignore[return-value]
+        return min(radios, key=lambda radio: (radio.queue_depth, radio.channel_utilization))
+
+    def queue_text(self, msg, priority: Priority = Priority.BROADCAST, attempt: int = 0, **kwargs) -> bool:
+        """
+        Put single (already split) text packet into outbound scheduler. Direct messages request ack
+
+        :param msg:
+        :param priority:
+        :param attempt: retry number, 0 for first transmission
+        :param kwargs:
+        :return:
+        """
+        destination = kwargs.get('destinationId', MESHTASTIC_BROADCAST_ADDR)
+        if destination != MESHTASTIC_BROADCAST_ADDR:
+            kwargs.setdefault('wantAck', True)
+        radio = self.route(destination, kwargs.get('channelIndex'))
+        return radio.scheduler.submit(self.transmit_text, len(msg.encode('utf-8')), priority,
+                                      args=(radio, msg, priority, attempt), kwargs=kwargs)
+
+    def transmit_text(self, radio: Radio, msg: str, priority: Priority, attempt: int, **kwargs) -> None:
+        """
+        Send text packet through radio and track its delivery. Called by scheduler
+
+        :param radio:
+        :param msg:
+        :param priority:
+        :param attempt:
         :param kwargs:
         :return:
         """
-        if self.interface is None:
+        packet = radio.transmit_text(msg, **kwargs)
+        destination = kwargs.get('destinationId', MESHTASTIC_BROADCAST_ADDR)
+        if not kwargs.get('wantAck') or destination == MESHTASTIC_BROADCAST_ADDR:
             return
-        if len(msg) < mesh_pb2.Constants.DATA_PAYLOAD_LEN // 2:  # pylint:disable=no-member
-            with self.lock:
-                self.interface.sendText(msg, **kwargs)
-                return
-        # pylint:disable=no-member
-        split_message(msg, mesh_pb2.Constants.DATA_PAYLOAD_LEN // 2, self.interface.sendText, **kwargs)
-        return
+        if (pid := packet_id(packet)) is not None:
+            self.delivery.register(pid, destination, partial(self.retry_text, msg, priority, kwargs), attempt)
+
+    def retry_text(self, msg: str, priority: Priority, kwargs: Dict, attempt: int) -> bool:
+        """
+        Queue unacknowledged packet again unless retries used their share of airtime budget
+
+        :param msg:
+        :param priority:
+        :param kwargs:
+        :param attempt:
+        :return:
+        """
+        scheduler = self.route(kwargs.get('destinationId', MESHTASTIC_BROADCAST_ADDR),
+                               kwargs.get('channelIndex')).scheduler
+        if scheduler.used_airtime >= scheduler.budget * self.retry_airtime_share:
+            return False
+        return self.queue_text(msg, priority=priority, attempt=attempt, **kwargs)
 
-    def send_data(self, *args, **kwargs) -> None:
+    def send_data(self, *args, priority: Priority = Priority.DIRECT,
+                  on_transmit: Optional[Callable[[], None]] = None, **kwargs) -> bool:
         """
-        Send Meshtastic data message
+        Queue Meshtastic data message
 
+        :param args:
+        :param priority:
+        :param on_transmit: called once packet was handed to the radio or its transmission failed,
+                            not when it was queued
+        :param kwargs:
+        :return: False if link is down or packet was dropped by outbound scheduler
+        """
+        if not self.link_up:
+            return False
+        payload_len = len(args[0]) if args else 0
+        destination = kwargs.get('destinationId', MESHTASTIC_BROADCAST_ADDR)
+        radio = self.route(destination, kwargs.get('channelIndex'))
+        if not radio.scheduler.submit(self.transmit_data, payload_len, priority,
+                                      args=(radio, on_transmit, *args), kwargs=kwargs):
+            self.logger.warning(f'Data packet to {destination} was not queued')
+            return False
+        return True
+
+    def transmit_data(self, radio: Radio, on_transmit: Optional[Callable[[], None]], *args, **kwargs) -> None:
+        """
+        Send data packet through radio and notify sender. Called by scheduler. Sender is notified
+        on failure as well, only requeued packet is still pending
+
+        :param radio:
+        :param on_transmit:
         :param args:
         :param kwargs:
         :return:
         """
-        if self.interface is None:
-            return
-        with self.lock:
-            self.interface.sendData(*args, **kwargs)
+        requeued = False
+        try:
+            radio.transmit_data(*args, **kwargs)
+        except Requeue:
+            # packet stays queued, sender is notified when it is sent again
+            requeued = True
+            raise
+        finally:
+            if on_transmit is not None and not requeued:
+                on_transmit()
+
+    @property
+    def outbound_stats(self) -> Dict:
+        """
+        Outbound queue depth, wait times and airtime usage
+
+        :return:
+        """
+        stats = self.scheduler.stats()
+        stats['link'] = self.radios[0].state.value
+        stats['reconnects'] = self.radios[0].reconnects
+        if len(self.radios) > 1:
+            stats['radios'] = {
+                radio.dev_path: dict(radio.scheduler.stats(), channel_utilization=radio.channel_utilization,
+                                     link=radio.state.value, reconnects=radio.reconnects)
+                for radio in self.radios
+            }
+        return stats
 
     def node_info(self, node_id) -> Dict:
         """
@@ -125,20 +486,18 @@ class MeshtasticConnection:
         :param node_id:
         :return:
         """
-        return {} if self.interface is None else self.interface.nodes.get(node_id, {})
+        return self.nodes.get(node_id, {})
 
     def reboot(self):
         """
-        Execute Meshtastic device reboot
+        Execute Meshtastic device reboot. Does not wait for device, it is reconnected in background
 
         :return:
         """
         self.logger.info("Reboot requested...")
         self.interface.getNode(MESHTASTIC_LOCAL_ADDR).reboot(10)
-        self.interface.close()
-        time.sleep(20)
-        self.connect()
-        self.logger.info("Reboot completed...")
+        self.radios[0].reconnect(delay=self.reboot_delay)
+        self.logger.info("Reboot scheduled, reconnecting in background...")
 
     def reset_db(self):
         """
@@ -148,6 +507,7 @@ class MeshtasticConnection:
         """
         self.logger.info('Reset node DB requested...')
         self.interface.getNode(MESHTASTIC_LOCAL_ADDR).resetNodeDb()
+        self.node_index.rebuild(self.nodes)
         self.logger.info('Reset node DB completed...')
 
     def on_mqtt_node(self, node_id, payload):
@@ -195,143 +555,143 @@ class MeshtasticConnection:
 
         :return:
         """
-        if self.interface is None:
-            return {}
-        return self.interface.nodes or {}
+        interfaces = [radio.interface for radio in self.radios if radio.interface is not None]
+        if len(interfaces) < 2:
+            return (interfaces[0].nodes or {}) if interfaces else {}
+        # merge node tables, most recently heard record wins
+        nodes: Dict[str, Any] = {}
+        for interface in interfaces:
+            for node_id, node_info in (interface.nodes or {}).items():
+                current = nodes.get(node_id)
+                if current is None or (node_info.get('lastHeard') or 0) > (current.get('lastHeard') or 0):
+                    nodes[node_id] = node_info
+        return nodes
 
     @property
-    def nodes_with_info(self) -> List:
+    def node_snapshot(self) -> NodeSnapshot:
         """
-        Return list of nodes with information
+        Current node table snapshot. Built from radio on first access, then kept up to date by events
 
         :return:
         """
-        return [self.nodes.get(node) for node in self.nodes]
+        if self.node_index.version == 0 and self.interface is not None:
+            self.node_index.rebuild(self.nodes)
+        return self.node_index.snapshot
 
     @property
-    def nodes_with_position(self) -> List:
+    def nodes_with_info(self) -> Sequence[Dict]:
         """
-        Filter out nodes without position
+        Return nodes with information
 
         :return:
         """
-        return [
-            node_info
-            for node_info in self.nodes_with_info
-            if node_info.get('position')
-        ]
+        return self.node_snapshot.with_info
 
     @property
-    def nodes_with_user(self) -> List:
+    def nodes_with_position(self) -> Sequence[Dict]:
         """
-        Filter out nodes without position or user
+        Nodes with position
 
         :return:
         """
-        return [
-            node_info
-            for node_info in self.nodes_with_position
-            if node_info.get('user')
-        ]
+        return self.node_snapshot.with_position
 
-    # pylint:disable=too-many-branches
-    def format_nodes(self, include_self=False):
+    @property
+    def nodes_with_user(self) -> Sequence[Dict]:
         """
-        Formats node list to be more compact
+        Nodes with position and user
+
+        :return:
+        """
+        return self.node_snapshot.with_user
+
+    def format_nodes(self, include_self: bool = False, sort: str = DEFAULT_SORT, page: int = 1,
+                     page_size: int = 0) -> str:
+        """
+        Formats node list for Telegram (MarkdownV2). Banned nodes are skipped
 
         :param include_self:
-        :param nodes:
+        :param sort: lastheard or snr
+        :param page:
+        :param page_size: nodes per page, 0 returns all nodes
         :return:
         """
-        table = self.interface.showNodes(includeSelf=include_self)
-        if not table:
-            return "No other nodes"
-
-        nodes = re.sub(r'[╒═╤╕╘╧╛╞╪╡├─┼┤]', '', table)
-        nodes = nodes.replace('│', ',')
-        new_nodes = []
-        header = True
-        for line in nodes.split('\n'):
-            line = line.lstrip(',').rstrip(',').rstrip('\n')
-            if not line:
-                continue
-            # clear column value
-            i = 0
-            new_line = []
-            for column in line.split(','):
-                column = column.strip()
-                if i == 0:
-                    column = f'**{column}**'.replace('.', r'\.') if header else f'**{column}**`'
-                new_line.append(f'{column}, ')
-                if not header:
-                    i += 1
-            reassembled_line = ''.join(new_line).rstrip(', ')
-            reassembled_line = f'{reassembled_line}' if header else f'{reassembled_line}`'
-            header = False
-            new_nodes.append(reassembled_line)
-        filtered_nodes = []
-        for line in new_nodes:
-            node_id = line.split(', ')[3]
-            if not node_id.startswith('!'):
-                continue
-            if self.filter.banned(node_id):
-                self.logger.debug(f"Node {node_id} is in a blacklist...")
-                continue
-            filtered_nodes.append(line)
-        return '\n'.join(new_nodes)
+        local_num = None
+        if self.interface is not None and (my_info := getattr(self.interface, 'myInfo', None)) is not None:
+            local_num = getattr(my_info, 'my_node_num', None)
+        return self.node_table.render(self.node_snapshot, include_self=include_self, local_num=local_num,
+                                      sort=sort, page=page, page_size=page_size)
 
-    def run_loop(self):
+    def on_fifo_message(self, line: str) -> None:
         """
-        Meshtastic loop runner. Used for messages
+        Message received over FIFO, broadcast it
 
+        :param line:
         :return:
         """
-        setthreadtitle(self.name)
+        self.send_text(line, destinationId=MESHTASTIC_BROADCAST_ADDR)
+
+    def on_fifo_command(self, line: str) -> None:
+        """
+        Command received over FIFO. Executed by command worker so that messages keep flowing
+
+        :param line:
+        :return:
+        """
+        self.commands.submit('fifo', 'command', self.run_command, line)
 
-        self.logger.debug("Opening FIFO...")
-        create_fifo(self.fifo)
-        while not self.exit:
-            with self.fifo_lock:  # Prevent race conditions
-                with open(self.fifo, encoding='utf-8') as fifo:
-                    for line in fifo:
-                        line = line.rstrip('\n')
-                        self.send_text(line, destinationId=MESHTASTIC_BROADCAST_ADDR)
+    def run_command(self, line: str) -> None:
+        """
+        Execute FIFO command
 
-    def run_cmd_loop(self):
+        :param line:
+        :return:
         """
-        Meshtastic loop runner. Used for commands
+        if line.startswith("reboot"):
+            self.logger.warning("Reboot requested using CMD...")
+            self.reboot()
+        if line.startswith("reset_db"):
+            self.logger.warning("Reset DB requested using CMD...")
+            self.reset_db()
+        if line.startswith("reload"):
+            self.logger.warning("Configuration reload requested using CMD...")
+            pub.sendMessage(ConfigReloader.topic)
+
+    def run_loop(self):
+        """
+        Meshtastic loop runner. Reads both message and command FIFOs
 
         :return:
         """
-        setthreadtitle("MeshtasticCmd")
+        setthreadtitle(self.name)
 
-        self.logger.debug("Opening FIFO...")
-        create_fifo(self.fifo_cmd)
-        while not self.exit:
-            with self.fifo_lock:  # Use same lock to prevent race conditions
-                with open(self.fifo_cmd, encoding='utf-8') as fifo:
-                    for line in fifo:
-                        line = line.rstrip('\n')
-                        if line.startswith("reboot"):
-                            self.logger.warning("Reboot requested using CMD...")
-                            self.reboot()
-                        if line.startswith("reset_db"):
-                            self.logger.warning("Reset DB requested using CMD...")
-                            self.reset_db()
+        self.logger.debug("Opening FIFOs...")
+        reader = FifoReader(self.logger)
+        reader.add(self.fifo, self.on_fifo_message)
+        reader.add(self.fifo_cmd, self.on_fifo_command)
+        try:
+            while not self.exit:
+                reader.run_once()
+                self.delivery.expire()
+        finally:
+            reader.close()
 
     def shutdown(self):
         """
         Stop Meshtastic connection
         """
         self.exit = True
+        self.commands.shutdown()
+        for radio in self.radios:
+            radio.shutdown()
 
     def run(self):
         """
-        Meshtastic connection runner
+        Meshtastic connection runner. FIFO and command threads that are still alive are kept
 
         :return:
         """
-        thread = Thread(target=self.run_loop, daemon=True, name=self.name)
-        thread.start()
-        cmd_thread = Thread(target=self.run_cmd_loop, daemon=True, name="MeshtasticCmd")
-        cmd_thread.start()
+        self.commands.run()
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = Thread(target=self.run_loop, daemon=True, name=self.name)
+            self.thread.start()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+""" Versioned Meshtastic node index module """
+
+import copy
+import logging
+import time
+from threading import Lock, RLock
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+
+class NodeSnapshot(NamedTuple):
+    """
+    NodeSnapshot - immutable view of known nodes. Entries must be treated as read-only
+    """
+    version: int
+    timestamp: float
+    nodes: Mapping[str, Dict[str, Any]]
+    with_info: Tuple[Dict[str, Any], ...]
+    with_position: Tuple[Dict[str, Any], ...]
+    with_user: Tuple[Dict[str, Any], ...]
+
+
+EMPTY_SNAPSHOT = NodeSnapshot(0, 0.0, MappingProxyType({}), (), (), ())
+
+
+def raw_position(node_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    raw_position - position as reported by the radio
+
+    :param node_info:
+    :return:
+    """
+    return node_info.get('position') or None
+
+
+# pylint:disable=too-many-instance-attributes
+class NodeIndex:
+    """
+    NodeIndex - incrementally updated node table. Radio events only queue copies of changed nodes,
+    positions are computed and new snapshot is published when snapshot is read next time.
+    Readers take current snapshot without locking unless changes are pending
+    """
+
+    def __init__(self, logger: logging.Logger,
+                 position_fn: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]] = raw_position,
+                 prefetch_fn: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> None:
+        self.logger = logger
+        self.position_fn = position_fn
+        # called with all nodes which position has to be computed during flush, allows batching
+        self.prefetch_fn = prefetch_fn
+        # serializes flushes, held while positions are computed
+        self.lock = RLock()
+        # guards pending changes only, so radio thread never waits for flush
+        self.pending_lock = Lock()
+        # node_id -> copy of changed radio record, None for removed node
+        self.pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        # copy of whole radio node table replacing index on next flush
+        self.pending_table: Optional[Dict[str, Dict[str, Any]]] = None
+        # node_id -> copy of radio record, used to detect changes
+        self.raw: Dict[str, Dict[str, Any]] = {}
+        # node_id -> record with precomputed position
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.published = EMPTY_SNAPSHOT
+
+    @property
+    def snapshot(self) -> NodeSnapshot:
+        """
+        snapshot - current node table, pending changes are applied first
+
+        :return:
+        """
+        self.flush()
+        return self.published
+
+    @property
+    def version(self) -> int:
+        """
+        version - current snapshot version, 0 means index was never built
+
+        :return:
+        """
+        return self.snapshot.version
+
+    def _entry(self, node_id: str, node_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        _entry - build index entry, reusing computed position if radio position did not change
+        """
+        entry = dict(node_info)
+        previous = self.raw.get(node_id)
+        if previous is not None and previous.get('position') == node_info.get('position'):
+            position = self.entries[node_id].get('position')
+        else:
+            position = self.position_fn(node_info)
+        if position:
+            entry['position'] = position
+        return entry
+
+    def _publish(self) -> None:
+        """
+        _publish - replace snapshot with a new version
+        """
+        with_info = tuple(self.entries.values())
+        with_position = tuple(entry for entry in with_info if entry.get('position'))
+        self.published = NodeSnapshot(
+            version=self.published.version + 1,
+            timestamp=time.time(),
+            nodes=MappingProxyType(dict(self.entries)),
+            with_info=with_info,
+            with_position=with_position,
+            with_user=tuple(entry for entry in with_position if entry.get('user')),
+        )
+
+    def _known(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """
+        _known - latest copy of node, pending one if any. Called with pending_lock held
+        """
+        if node_id in self.pending:
+            return self.pending[node_id]
+        if self.pending_table is not None:
+            return self.pending_table.get(node_id)
+        return self.raw.get(node_id)
+
+    def update(self, node_id: str, node_info: Dict[str, Any]) -> bool:
+        """
+        update - queue refresh of single node. Only changed node is copied
+
+        :param node_id:
+        :param node_info:
+        :return: True if node changed and will be in next snapshot
+        """
+        with self.pending_lock:
+            if self._known(node_id) == node_info:
+                return False
+            try:
+                self.pending[node_id] = copy.deepcopy(node_info)
+            except RuntimeError as exc:
+                # record is being modified by radio thread, next event will bring it
+                self.logger.warning(f'Node {node_id} changed during update: {exc}')
+                return False
+        return True
+
+    def remove(self, node_id: str) -> bool:
+        """
+        remove - forget node
+
+        :param node_id:
+        :return: True if node was known
+        """
+        with self.pending_lock:
+            if self._known(node_id) is None:
+                return False
+            self.pending[node_id] = None
+        return True
+
+    def rebuild(self, nodes: Dict[str, Dict[str, Any]]) -> None:
+        """
+        rebuild - replace whole index, e.g. after (re)connect or node DB reset
+
+        :param nodes:
+        :return:
+        """
+        try:
+            table = {node_id: node_info for node_id, node_info in copy.deepcopy(dict(nodes)).items() if node_info}
+        except RuntimeError as exc:
+            self.logger.warning(f'Node table changed during rebuild: {exc}')
+            return
+        with self.pending_lock:
+            self.pending_table = table
+            self.pending = {}
+
+    def flush(self) -> None:
+        """
+        flush - apply pending changes: compute positions of changed nodes and publish new snapshot
+
+        :return:
+        """
+        if self.pending_table is None and not self.pending:
+            return
+        with self.lock:
+            with self.pending_lock:
+                table, self.pending_table = self.pending_table, None
+                changes, self.pending = self.pending, {}
+            if table is None and not changes:
+                # applied by another reader meanwhile
+                return
+            if table is not None:
+                changes = {**table, **changes}
+            if self.prefetch_fn is not None:
+                self.prefetch_fn([
+                    node_info for node_id, node_info in changes.items()
+                    if node_info and (node_id not in self.raw or
+                                      self.raw[node_id].get('position') != node_info.get('position'))
+                ])
+            # whole table replaces index, keeping its node order
+            entries = {} if table is not None else self.entries
+            raw = {} if table is not None else self.raw
+            for node_id, node_info in changes.items():
+                if node_info is None:
+                    entries.pop(node_id, None)
+                    raw.pop(node_id, None)
+                    continue
+                entries[node_id] = self._entry(node_id, node_info)
+                raw[node_id] = node_info
+            self.entries, self.raw = entries, raw
+            self._publish()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+""" Telegram node table formatter module """
+
+import math
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .nodeindex import NodeSnapshot
+
+# https://core.telegram.org/bots/api#markdownv2-style
+MARKDOWN_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+CODE_SPECIAL = re.compile(r'([`\\])')
+HEADER = 'N, User, AKA, ID, Hardware, SNR, Hops, LastHeard'
+NO_NODES = 'No other nodes'
+
+# newest / strongest first, nodes without value go last
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Tuple[bool, float]]] = {
+    'lastheard': lambda node: (node.get('lastHeard') is None, -(node.get('lastHeard') or 0)),
+    'snr': lambda node: (node.get('snr') is None, -(node.get('snr') or 0)),
+}
+DEFAULT_SORT = 'lastheard'
+
+
+def escape_markdown(text: str) -> str:
+    """
+    escape_markdown - escape MarkdownV2 special characters in plain text
+
+    :param text:
+    :return:
+    """
+    return MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def escape_code(text: str) -> str:
+    """
+    escape_code - escape MarkdownV2 special characters inside code span
+
+    :param text:
+    :return:
+    """
+    return CODE_SPECIAL.sub(r'\\\1', text)
+
+
+def format_node(position: int, node: Dict[str, Any]) -> str:
+    """
+    format_node - single node line: bold number followed by code span with node details
+
+    :param position:
+    :param node:
+    :return:
+    """
+    user = node.get('user', {})
+    snr = node.get('snr')
+    hops = node.get('hopsAway')
+    last_heard = node.get('lastHeard')
+    columns = [
+        user.get('longName', 'N/A'),
+        user.get('shortName', 'N/A'),
+        user.get('id', 'N/A'),
+        user.get('hwModel', 'N/A'),
+        f'{snr:.2f} dB' if snr is not None else 'N/A',
+        str(hops) if hops is not None else 'N/A',
+        datetime.fromtimestamp(last_heard).strftime('%Y-%m-%d %H:%M:%S') if last_heard else 'N/A',
+    ]
+    return f'*{position}* `{escape_code(", ".join(str(column) for column in columns))}`'
+
+
+class NodeTable:
+    """
+    NodeTable - renders node snapshot for Telegram. Formatted lines are cached until snapshot changes
+    """
+
+    def __init__(self, banned_fn: Callable[[str], bool]) -> None:
+        self.banned_fn = banned_fn
+        self.version = -1
+        self.cache: Dict[Tuple[bool, Optional[int], str], Tuple[str, ...]] = {}
+
+    def select(self, nodes: Iterable[Dict[str, Any]], include_self: bool, local_num: Optional[int],
+               sort: str) -> List[Dict[str, Any]]:
+        """
+        select - drop own node, nodes without ID and banned ones, then sort
+
+        :param nodes:
+        :param include_self:
+        :param local_num:
+        :param sort:
+        :return:
+        """
+        selected = []
+        for node in nodes:
+            node_id = node.get('user', {}).get('id', '')
+            if not node_id.startswith('!'):
+                continue
+            if not include_self and local_num is not None and node.get('num') == local_num:
+                continue
+            if self.banned_fn(node_id):
+                continue
+            selected.append(node)
+        return sorted(selected, key=SORT_KEYS[sort])
+
+    def lines(self, snapshot: NodeSnapshot, include_self: bool = False, local_num: Optional[int] = None,
+              sort: str = DEFAULT_SORT) -> Tuple[str, ...]:
+        """
+        lines - formatted node lines, computed once per snapshot version
+
+        :param snapshot:
+        :param include_self:
+        :param local_num:
+        :param sort:
+        :return:
+        """
+        sort = sort.lower() if sort.lower() in SORT_KEYS else DEFAULT_SORT
+        if snapshot.version != self.version:
+            self.cache = {}
+            self.version = snapshot.version
+        key = (include_self, local_num, sort)
+        if (cached := self.cache.get(key)) is None:
+            nodes = self.select(snapshot.with_info, include_self, local_num, sort)
+            cached = tuple(format_node(position, node) for position, node in enumerate(nodes, start=1))
+            self.cache[key] = cached
+        return cached
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def render(self, snapshot: NodeSnapshot, include_self: bool = False, local_num: Optional[int] = None,
+               sort: str = DEFAULT_SORT, page: int = 1, page_size: int = 0) -> str:
+        """
+        render - MarkdownV2 node table, optionally paged
+
+        :param snapshot:
+        :param include_self:
+        :param local_num:
+        :param sort:
+        :param page: 1-based page number, clamped to available pages
+        :param page_size: nodes per page, 0 disables paging
+        :return:
+        """
+        lines = self.lines(snapshot, include_self, local_num, sort)
+        if not lines:
+            return NO_NODES
+        header = f'{HEADER} ({len(lines)} nodes)'
+        if page_size > 0:
+            pages = math.ceil(len(lines) / page_size)
+            page = min(max(page, 1), pages)
+            lines = lines[(page - 1) * page_size:page * page_size]
+            header = f'{header}, page {page}/{pages}'
+        return '\n'.join((escape_markdown(header),) + lines)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+""" Single Meshtastic radio module """
+
+import logging
+import sys
+from enum import Enum
+from threading import Event, RLock, Thread
+from typing import Any, List, Optional
+#
+from meshtastic import (
+    serial_interface as meshtastic_serial_interface,
+    tcp_interface as meshtastic_tcp_interface,
+)
+
+from mtg.connection.mqtt import MQTTInterface
+from .scheduler import OutboundScheduler, Requeue
+
+
+def split_list(value: Any) -> List[str]:
+    """
+    split_list - comma separated config value to list of non-empty items
+
+    :param value:
+    :return:
+    """
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+class LinkState(Enum):
+    """
+    LinkState - radio connection state
+    """
+    DOWN = 'down'
+    CONNECTED = 'connected'
+    RECONNECTING = 'reconnecting'
+
+
+# pylint:disable=too-many-instance-attributes
+class Radio:
+    """
+    Radio - device interface together with its own outbound scheduler
+    """
+
+    def __init__(self, dev_path: str, logger: logging.Logger, config: Any, preset: str) -> None:
+        self.dev_path = dev_path
+        self.logger = logger
+        self.config = config
+        self.interface: Optional[Any] = None
+        self.lock = RLock()
+        self.state = LinkState.DOWN
+        self.reconnects = 0
+        self.reconnect_delay = config.enforce_type(float, config.Meshtastic.ReconnectDelay)
+        self.reconnect_max_delay = config.enforce_type(float, config.Meshtastic.ReconnectMaxDelay)
+        self.reconnect_thread: Optional[Thread] = None
+        self.exit = Event()
+        self.scheduler = OutboundScheduler(
+            logger,
+            preset=preset,
+            duty_cycle=config.enforce_type(float, config.Meshtastic.DutyCycle),
+            window=config.enforce_type(float, config.Meshtastic.DutyCycleWindow),
+            max_queue=config.enforce_type(int, config.Meshtastic.OutboundQueueSize),
+            ready=self.ready,
+        )
+
+    def ready(self) -> bool:
+        """
+        Whether outbound packets can be transmitted. Scheduler keeps them queued otherwise
+
+        :return:
+        """
+        return self.interface is not None and self.state != LinkState.RECONNECTING
+
+    def connect(self) -> None:
+        """
+        Connect to device. Interface can be later updated during reboot procedure
+
+        :return:
+        """
+        self.interface = self.open_interface()
+        with self.scheduler.condition:
+            self.state = LinkState.CONNECTED
+            # wake up scheduler to drain packets buffered while link was down
+            self.scheduler.condition.notify_all()
+        self.scheduler.start()
+
+    def open_interface(self) -> Any:
+        """
+        Create device interface according to device path
+
+        :return:
+        """
+        if self.dev_path.startswith('tcp:'):
+            return meshtastic_tcp_interface.TCPInterface(self.dev_path.removeprefix('tcp:'), debugOut=sys.stdout)
+        if self.dev_path == 'mqtt':
+            # node info thread (interface.node_publisher) is not started. BUGGY
+            return MQTTInterface(debugOut=sys.stdout, cfg=self.config, logger=self.logger)
+        return meshtastic_serial_interface.SerialInterface(devPath=self.dev_path, debugOut=sys.stdout)
+
+    def reconnect(self, delay: Optional[float] = None) -> bool:
+        """
+        Start background reconnect unless it is already running
+
+        :param delay: seconds to wait before first attempt, reconnect delay by default
+        :return: True if reconnect was started
+        """
+        with self.lock:
+            if self.state == LinkState.RECONNECTING or self.exit.is_set():
+                return False
+            self.state = LinkState.RECONNECTING
+            self.reconnect_thread = Thread(target=self.reconnect_loop,
+                                           args=(self.reconnect_delay if delay is None else delay,),
+                                           daemon=True, name='Meshtastic Reconnect')
+            self.reconnect_thread.start()
+        return True
+
+    def reconnect_loop(self, delay: float) -> None:
+        """
+        Reconnect with exponential backoff until connected or shut down
+
+        :param delay:
+        :return:
+        """
+        self.close_interface()
+        backoff = max(self.reconnect_delay, 1.0)
+        while not self.exit.wait(delay):
+            try:
+                self.connect()
+            except Exception as exc:  # pylint:disable=broad-exception-caught
+                delay = min(backoff, self.reconnect_max_delay)
+                backoff *= 2
+                self.logger.warning(f'Reconnect to {self.dev_path} failed: {exc}. Next attempt in {delay:.0f}s')
+                continue
+            self.reconnects += 1
+            self.logger.info(f'Reconnected to {self.dev_path}')
+            return
+        self.state = LinkState.DOWN
+
+    def close_interface(self) -> None:
+        """
+        Close current interface, ignoring errors of already broken link
+
+        :return:
+        """
+        interface, self.interface = self.interface, None
+        if interface is None:
+            return
+        try:
+            interface.close()
+        except Exception as exc:  # pylint:disable=broad-exception-caught
+            self.logger.debug(f'Interface close failed: {exc}')
+
+    def connection_lost(self) -> None:
+        """
+        Link went away - keep outbound packets queued and reconnect in background
+
+        :return:
+        """
+        if self.reconnect():
+            self.logger.warning(f'Connection to {self.dev_path} lost, reconnecting...')
+
+    def shutdown(self) -> None:
+        """
+        Stop reconnecting and outbound scheduler
+
+        :return:
+        """
+        self.exit.set()
+        self.scheduler.shutdown()
+
+    @property
+    def channel_utilization(self) -> float:
+        """
+        Channel utilization (percent) reported by the device itself
+
+        :return:
+        """
+        if self.interface is None:
+            return 100.0
+        try:
+            info = self.interface.getMyNodeInfo() or {}
+            return float(info.get('deviceMetrics', {}).get('channelUtilization') or 0.0)
+        except Exception:  # pylint:disable=broad-exception-caught
+            return 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Number of packets waiting in outbound scheduler
+
+        :return:
+        """
+        return len(self.scheduler.queue)
+
+    def transmit_text(self, msg, **kwargs) -> Any:
+        """
+        Send text packet to the radio right away. Called by scheduler
+
+        :param msg:
+        :param kwargs:
+        :return: sent packet
+        """
+        if self.interface is None:
+            self.logger.warning("No interface, dropping message...")
+            return None
+        try:
+            with self.lock:
+                return self.interface.sendText(msg, **kwargs)
+        except OSError as exc:
+            self.connection_lost()
+            raise Requeue(str(exc)) from exc
+
+    def transmit_data(self, *args, **kwargs) -> None:
+        """
+        Send data packet to the radio right away. Called by scheduler
+
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        if self.interface is None:
+            self.logger.warning("No interface, dropping data...")
+            return
+        try:
+            with self.lock:
+                self.interface.sendData(*args, **kwargs)
+        except OSError as exc:
+            self.connection_lost()
+            raise Requeue(str(exc)) from exc
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+""" Outbound Meshtastic scheduler module """
+
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from threading import Condition, Thread
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+# 3rd party
+from setproctitle import setthreadtitle
+
+from .airtime import DEFAULT_PRESET, lora_airtime, normalize_preset
+
+
+class Priority(IntEnum):
+    """
+    Priority - outbound priority classes. Lower value is sent first
+    """
+    COMMAND = 0
+    DIRECT = 1
+    BROADCAST = 2
+    BULK = 3
+
+
+class Requeue(Exception):
+    """
+    Requeue - raised by transmit callback when packet should be kept and sent later
+    """
+
+
+# pylint:disable=too-many-instance-attributes
+class OutboundScheduler:
+    """
+    OutboundScheduler - priority queue in front of the radio that paces packets by their airtime
+    and keeps transmissions within duty cycle budget
+    """
+    name = 'Meshtastic Scheduler'
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, logger: logging.Logger, preset: str = DEFAULT_PRESET, duty_cycle: float = 10.0,
+                 window: float = 3600.0, max_queue: int = 1000, ready: Optional[Callable[[], bool]] = None) -> None:
+        self.logger = logger
+        # packets are held in queue while ready() is False, e.g. radio is reconnecting
+        self.ready = ready
+        self.preset = normalize_preset(preset)
+        self.window = float(window)
+        # airtime seconds allowed per window
+        self.budget = self.window * float(duty_cycle) / 100
+        self.max_queue = int(max_queue)
+        self.condition = Condition()
+        self.queue: List[Tuple[int, int, float, float, Callable[..., Any], Tuple[Any, ...], Dict[str, Any]]] = []
+        self.counter = itertools.count()
+        # (timestamp, airtime) for every transmission inside window
+        self.history: Deque[Tuple[float, float]] = deque()
+        self.used_airtime = 0.0
+        self.radio_free_at = 0.0
+        self.wait_stats: Dict[Priority, Dict[str, float]] = {
+            priority: {'sent': 0, 'dropped': 0, 'wait_total': 0.0, 'wait_max': 0.0} for priority in Priority
+        }
+        self.exit = False
+        self.thread: Optional[Thread] = None
+
+    def estimate(self, payload_len: int) -> float:
+        """
+        estimate - time on air for payload using configured preset
+
+        :param payload_len:
+        :return:
+        """
+        return lora_airtime(payload_len, self.preset)
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def submit(self, callback: Callable[..., Any], payload_len: int, priority: Priority = Priority.BROADCAST,
+               args: Tuple[Any, ...] = (), kwargs: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        submit - queue callback(*args, **kwargs) transmission
+
+        :param callback:
+        :param payload_len:
+        :param priority:
+        :param args:
+        :param kwargs:
+        :return: False if queue is full or packet would never fit into airtime budget
+        """
+        airtime = self.estimate(payload_len)
+        with self.condition:
+            if airtime > self.budget:
+                self.wait_stats[priority]['dropped'] += 1
+                self.logger.warning(f'{priority.name} packet needs {airtime:.2f}s of airtime, '
+                                    f'more than {self.budget:.2f}s budget, dropping')
+                return False
+            if len(self.queue) >= self.max_queue:
+                self.wait_stats[priority]['dropped'] += 1
+                self.logger.warning(f'Outbound queue is full, dropping {priority.name} packet')
+                return False
+            heapq.heappush(self.queue, (int(priority), next(self.counter), time.time(),
+                                        airtime, callback, args, kwargs or {}))
+            self.condition.notify()
+        return True
+
+    def _expire(self, now: float) -> None:
+        """
+        _expire - forget transmissions that left the duty cycle window
+        """
+        while self.history and self.history[0][0] < now - self.window:
+            _, airtime = self.history.popleft()
+            self.used_airtime -= airtime
+
+    def _delay(self, airtime: float, now: float) -> float:
+        """
+        _delay - seconds until packet with given airtime can be sent
+        """
+        self._expire(now)
+        delay = max(self.radio_free_at - now, 0.0)
+        excess = self.used_airtime + airtime - self.budget
+        if excess > 0 and self.history:
+            # wait until enough old transmissions leave the window
+            released = 0.0
+            for timestamp, spent in self.history:
+                released += spent
+                if released >= excess:
+                    delay = max(delay, timestamp + self.window - now)
+                    break
+        return delay
+
+    def run_once(self, timeout: float = 0.5) -> bool:
+        """
+        run_once - transmit the most important queued packet when budget allows
+
+        :param timeout: maximum time to wait for a packet or budget
+        :return: True if packet was sent
+        """
+        with self.condition:
+            if not self.queue:
+                self.condition.wait(timeout)
+                if not self.queue:
+                    return False
+            if self.ready is not None and not self.ready():
+                self.condition.wait(timeout)
+                return False
+            delay = self._delay(self.queue[0][3], time.time())
+            if delay > 0:
+                self.condition.wait(min(delay, timeout))
+                return False
+            item = heapq.heappop(self.queue)
+            priority, _, enqueued, airtime, callback, args, kwargs = item
+            now = time.time()
+            self.history.append((now, airtime))
+            self.used_airtime += airtime
+            self.radio_free_at = now + airtime
+            stats = self.wait_stats[Priority(priority)]
+            wait = now - enqueued
+            stats['sent'] += 1
+            stats['wait_total'] += wait
+            stats['wait_max'] = max(stats['wait_max'], wait)
+        try:
+            callback(*args, **kwargs)
+        except Requeue as exc:
+            # keep original sequence number, so packet order is preserved
+            self.logger.warning(f'Outbound transmission postponed: {exc}')
+            with self.condition:
+                heapq.heappush(self.queue, item)
+                # nothing went on air, give airtime back
+                if (now, airtime) in self.history:
+                    self.history.remove((now, airtime))
+                    self.used_airtime -= airtime
+                self.radio_free_at = now
+                stats['sent'] -= 1
+                stats['wait_total'] -= wait
+            return False
+        except Exception as exc:  # pylint:disable=broad-exception-caught
+            self.logger.error(f'Outbound transmission failed: {exc}')
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - queue depth, wait times and airtime usage
+
+        :return:
+        """
+        with self.condition:
+            self._expire(time.time())
+            depth = {priority.name: 0 for priority in Priority}
+            for item in self.queue:
+                depth[Priority(item[0]).name] += 1
+            return {
+                'preset': self.preset,
+                'queue_depth': depth,
+                'airtime_used': round(self.used_airtime, 3),
+                'airtime_budget': round(self.budget, 3),
+                'wait': {
+                    priority.name: {
+                        'sent': int(stats['sent']),
+                        'dropped': int(stats['dropped']),
+                        'avg': round(stats['wait_total'] / stats['sent'], 3) if stats['sent'] else 0.0,
+                        'max': round(stats['wait_max'], 3),
+                    } for priority, stats in self.wait_stats.items()
+                },
+            }
+
+    def run_loop(self) -> None:
+        """
+        run_loop - scheduler thread
+
+        :return:
+        """
+        setthreadtitle(self.name)
+        while not self.exit:
+            self.run_once()
+
+    def start(self) -> None:
+        """
+        start - start scheduler thread (once)
+
+        :return:
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.exit = False
+        self.thread = Thread(target=self.run_loop, daemon=True, name=self.name)
+        self.thread.start()
+
+    def shutdown(self) -> None:
+        """
+        shutdown - stop scheduler thread
+
+        :return:
+        """
+        self.exit = True
+        with self.condition:
+            self.condition.notify_all()
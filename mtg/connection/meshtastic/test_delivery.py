@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import pytest
+import logging
+from unittest.mock import MagicMock, patch
+
+from mtg.connection.meshtastic.delivery import DeliveryTracker, normalize_node, packet_id, rtt_bucket
+
+
+@pytest.fixture
+def tracker():
+    """Tracker with 10 second ack timeout and two retries"""
+    return DeliveryTracker(MagicMock(spec=logging.Logger), timeout=10, retries=2, window=5, max_pending=3)
+
+
+def routing(request_id, from_id, error='NONE'):
+    """ROUTING_APP packet as delivered by meshtastic library"""
+    return {'fromId': from_id,
+            'decoded': {'portnum': 'ROUTING_APP', 'requestId': request_id, 'routing': {'errorReason': error}}}
+
+
+def test_packet_id():
+    """Test only real packet ids are tracked"""
+    assert packet_id(MagicMock(id=42)) == 42
+    assert packet_id(MagicMock()) is None
+    assert packet_id(None) is None
+
+
+def test_rtt_bucket():
+    """Test histogram buckets"""
+    assert rtt_bucket(1.5) == '<=2s'
+    assert rtt_bucket(7) == '<=10s'
+    assert rtt_bucket(500) == '>120s'
+
+
+@patch('mtg.connection.meshtastic.delivery.time')
+def test_ack(mock_time, tracker):
+    """Test ack from destination records RTT, implicit ack is ignored"""
+    mock_time.time.return_value = 100.0
+    tracker.register(1, '!a1b2c3d4', MagicMock())
+    mock_time.time.return_value = 104.0
+    assert tracker.on_routing(routing(1, '!local')) is False
+    assert tracker.on_routing(routing(1, '!a1b2c3d4')) is True
+    assert tracker.on_routing(routing(1, '!a1b2c3d4')) is False
+    stats = tracker.node_stats('!a1b2c3d4')
+    assert (stats['sent'], stats['delivered'], stats['ratio'], stats['rtt_avg']) == (1, 1, 1.0, 4.0)
+    assert stats['rtt']['<=5s'] == 1
+    assert tracker.stats()['pending'] == 0
+
+
+def test_normalize_node():
+    """Test node numbers and hex ids map to !hex id"""
+    assert normalize_node(0xa1b2c3d4) == '!a1b2c3d4'
+    assert normalize_node('!A1B2C3D4') == '!a1b2c3d4'
+    assert normalize_node('!c') == '!0000000c'
+    assert normalize_node(-1) == '!ffffffff'
+    assert normalize_node('^all') == '^all'
+
+
+@patch('mtg.connection.meshtastic.delivery.time')
+def test_ack_int_destination(mock_time, tracker):
+    """Test packet sent to node number is acked by fromId or numeric sender"""
+    mock_time.time.return_value = 100.0
+    tracker.register(1, 0xa1b2c3d4, MagicMock())
+    tracker.register(2, 0xa1b2c3d4, MagicMock())
+    mock_time.time.return_value = 102.0
+    assert tracker.on_routing(routing(1, '!a1b2c3d4')) is True
+    # sender unknown to interface node DB, only numeric id is set
+    assert tracker.on_routing({'from': 0xa1b2c3d4, 'fromId': None,
+                               'decoded': {'portnum': 'ROUTING_APP', 'requestId': 2,
+                                           'routing': {'errorReason': 'NONE'}}}) is True
+    assert tracker.node_stats(0xa1b2c3d4)['delivered'] == 2
+    assert list(tracker.stats()['nodes']) == ['!a1b2c3d4']
+
+
+@patch('mtg.connection.meshtastic.delivery.time')
+def test_nak_retry_and_fail(mock_time, tracker):
+    """Test NAK triggers retry, last attempt is counted as failure"""
+    mock_time.time.return_value = 100.0
+    retry = MagicMock(return_value=True)
+    tracker.register(1, '!a1b2c3d4', retry)
+    assert tracker.on_routing(routing(1, '!local', 'MAX_RETRANSMIT')) is True
+    retry.assert_called_once_with(1)
+    tracker.register(2, '!a1b2c3d4', retry, attempt=2)
+    tracker.on_routing(routing(2, '!local', 'NO_ROUTE'))
+    assert retry.call_count == 1
+    assert tracker.node_stats('!a1b2c3d4')['ratio'] == 0.0
+    assert tracker.stats()['failed'] == 1
+
+
+@patch('mtg.connection.meshtastic.delivery.time')
+def test_expire_backoff(mock_time, tracker):
+    """Test timeout doubles with every attempt and rejected retry fails packet"""
+    mock_time.time.return_value = 100.0
+    tracker.register(1, '!a', MagicMock(return_value=True))
+    tracker.register(2, '!b', MagicMock(return_value=True), attempt=1)
+    tracker.register(3, '!c', MagicMock(return_value=False))
+    mock_time.time.return_value = 115.0
+    assert tracker.expire() == 2
+    assert list(tracker.pending) == [2]
+    assert tracker.stats()['retried'] == 1
+    assert tracker.node_stats('!c')['sent'] == 1
+    mock_time.time.return_value = 125.0
+    assert tracker.expire() == 1
+
+
+def test_bounded(tracker):
+    """Test pending packets and per node history are bounded"""
+    for pid in range(1, 6):
+        tracker.register(pid, '!a', MagicMock())
+    assert list(tracker.pending) == [3, 4, 5]
+    tracker.max_nodes = 2
+    for node in ('!b', '!c', '!d'):
+        tracker.register(10, node, MagicMock(return_value=False), attempt=2)
+        tracker.on_routing(routing(10, '!local', 'NO_ROUTE'))
+    assert list(tracker.outcomes) == ['!0000000c', '!0000000d']
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import logging
+import os
+import threading
+import pytest
+from unittest.mock import MagicMock
+
+from mtg.connection.meshtastic.ingest import IngestServer
+from mtg.ingest import IngestClient, encode_message
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Ingestion server running in background thread"""
+    submit = MagicMock()
+    server = IngestServer(MagicMock(spec=logging.Logger), str(tmp_path / 'mtg.sock'), submit)
+    server.open()
+
+    def serve():
+        while not server.exit:
+            server.run_once(0.05)
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.close()
+
+
+def test_post_single_and_batch(server):
+    """Test single, batched and plain text requests over one connection"""
+    result = IngestClient(server.path, timeout=5).post([
+        encode_message('one', destination='!a1b2c3d4', priority='direct'),
+        b'[{"text": "two"}, {"text": "three", "channel": 1}]\n',
+        'plain text\n'.encode('utf-8'),
+    ])
+    assert result == {'queued': 4, 'failed': 0, 'errors': []}
+    texts = [call.kwargs['text'] for call in server.submit.call_args_list]
+    assert texts == ['one', 'two', 'three', 'plain text']
+    assert server.submit.call_args_list[0].kwargs['destination'] == '!a1b2c3d4'
+    assert server.submit.call_args_list[0].kwargs['priority'] == 'direct'
+    assert server.submit.call_args_list[2].kwargs['channel'] == 1
+
+
+def test_post_stream_with_errors(server):
+    """Test large stream, invalid lines are reported and do not stop processing"""
+    lines = (encode_message(f'message {num}') for num in range(2000))
+    result = IngestClient(server.path, timeout=5).post(list(lines) + [b'{"text": ""}\n', b'last'])
+    assert result['queued'] == 2001
+    assert result['failed'] == 1
+    assert result['errors'] == ['text is required']
+
+
+def test_submit_failure_counted(server):
+    """Test submit exception is reported to client"""
+    server.submit.side_effect = RuntimeError('queue is gone')
+    result = IngestClient(server.path, timeout=5).post([encode_message('one')])
+    assert result == {'queued': 0, 'failed': 1, 'errors': ['queue is gone']}
+
+
+def test_dropped_message_counted(server):
+    """Test message not accepted by outbound queue is reported to client"""
+    server.submit.side_effect = [True, False]
+    result = IngestClient(server.path, timeout=5).post([encode_message('one'), encode_message('two')])
+    assert result == {'queued': 1, 'failed': 1, 'errors': ['message was not queued']}
+
+
+def test_stale_socket_replaced_and_removed(tmp_path):
+    """Test stale socket file is replaced on open and removed on close"""
+    path = str(tmp_path / 'stale.sock')
+    first = IngestServer(MagicMock(spec=logging.Logger), path, MagicMock())
+    first.open()
+    first.listener.close()
+    first.listener = None
+    second = IngestServer(MagicMock(spec=logging.Logger), path, MagicMock())
+    second.open()
+    assert oct(os.stat(path).st_mode & 0o777) == oct(0o660)
+    second.close()
+    assert not os.path.exists(path)
+    first.close()
@@ -7,6 +7,8 @@ from unittest.mock import patch, MagicMock, Mock, call, mock_open, PropertyMock,
 from threading import Thread
 
 from mtg.connection.meshtastic.meshtastic import MeshtasticConnection
+from mtg.connection.meshtastic.radio import LinkState
+from mtg.connection.meshtastic.scheduler import Priority, Requeue
 
 
 class TestMeshtasticConnection:
@@ -38,13 +40,16 @@ class TestMeshtasticConnection:
     @pytest.fixture
     def meshtastic_connection(self, mock_config, mock_logger, mock_filter):
         """Create MeshtasticConnection instance"""
-        return MeshtasticConnection(
+        connection = MeshtasticConnection(
             dev_path="/dev/ttyUSB0",
             logger=mock_logger,
             config=mock_config,
             filter_class=mock_filter,
             startup_ts=1234567890.0
         )
+        # mock config makes 1% duty cycle of 1 second window, too small for any packet
+        connection.scheduler.budget = 3600
+        return connection
 
     def test_init(self, mock_config, mock_logger, mock_filter):
         """Test MeshtasticConnection initialization"""
@@ -68,7 +73,6 @@ class TestMeshtasticConnection:
         assert connection.fifo_cmd == "/tmp/test.cmd.fifo"
         assert connection.exit is False
         assert connection.lock is not None
-        assert connection.fifo_lock is not None
 
     def test_init_default_fifo_paths(self, mock_logger, mock_filter):
         """Test initialization with default FIFO paths when config doesn't provide them"""
@@ -92,7 +96,7 @@ class TestMeshtasticConnection:
         """Test get_startup_ts property"""
         assert meshtastic_connection.get_startup_ts == 1234567890.0
 
-    @patch('mtg.connection.meshtastic.meshtastic.meshtastic_serial_interface')
+    @patch('mtg.connection.meshtastic.radio.meshtastic_serial_interface')
     def test_connect_serial(self, mock_serial_module, meshtastic_connection):
         """Test connect with serial interface"""
         mock_interface = MagicMock()
@@ -106,7 +110,7 @@ class TestMeshtasticConnection:
         )
         assert meshtastic_connection.interface == mock_interface
 
-    @patch('mtg.connection.meshtastic.meshtastic.meshtastic_tcp_interface')
+    @patch('mtg.connection.meshtastic.radio.meshtastic_tcp_interface')
     def test_connect_tcp(self, mock_tcp_module, mock_config, mock_logger, mock_filter):
         """Test connect with TCP interface"""
         mock_interface = MagicMock()
@@ -127,7 +131,7 @@ class TestMeshtasticConnection:
         )
         assert connection.interface == mock_interface
 
-    @patch('mtg.connection.meshtastic.meshtastic.MQTTInterface')
+    @patch('mtg.connection.meshtastic.radio.MQTTInterface')
     def test_connect_mqtt(self, mock_mqtt_interface, mock_config, mock_logger, mock_filter):
         """Test connect with MQTT interface"""
         mock_interface = MagicMock()
@@ -154,7 +158,7 @@ class TestMeshtasticConnection:
         meshtastic_connection.interface = None
 
         # Should not raise exception
-        meshtastic_connection.send_text("Test message")
+        assert meshtastic_connection.send_text("Test message") is False
 
     @patch('mtg.connection.meshtastic.meshtastic.mesh_pb2')
     def test_send_text_short_message(self, mock_mesh_pb2, meshtastic_connection):
@@ -164,33 +168,68 @@ class TestMeshtasticConnection:
         meshtastic_connection.interface = mock_interface
 
         meshtastic_connection.send_text("Short message")
+        # queued, not sent yet
+        mock_interface.sendText.assert_not_called()
+        assert meshtastic_connection.scheduler.run_once(timeout=0) is True
 
         mock_interface.sendText.assert_called_once_with("Short message")
 
-    @patch('mtg.connection.meshtastic.meshtastic.split_message')
     @patch('mtg.connection.meshtastic.meshtastic.mesh_pb2')
-    def test_send_text_long_message(self, mock_mesh_pb2, mock_split_message, meshtastic_connection):
+    def test_send_text_priority(self, mock_mesh_pb2, meshtastic_connection):
+        """Test direct messages and command replies overtake broadcasts"""
+        mock_mesh_pb2.Constants.DATA_PAYLOAD_LEN = 256
+        mock_interface = MagicMock()
+        meshtastic_connection.interface = mock_interface
+        meshtastic_connection.scheduler.budget = 3600
+        meshtastic_connection.scheduler.max_queue = 10
+        sent = []
+        mock_interface.sendText.side_effect = lambda msg, **kwargs: sent.append(msg)
+
+        meshtastic_connection.send_text("broadcast")
+        meshtastic_connection.send_text("direct", destinationId="!12345678")
+        meshtastic_connection.send_text("reply", destinationId="!12345678", priority=Priority.COMMAND)
+        for _ in range(3):
+            meshtastic_connection.scheduler.radio_free_at = 0
+            meshtastic_connection.scheduler.run_once(timeout=0)
+
+        assert sent == ["reply", "direct", "broadcast"]
+
+    @patch('mtg.connection.meshtastic.meshtastic.mesh_pb2')
+    def test_send_text_long_message(self, mock_mesh_pb2, meshtastic_connection):
         """Test send_text with long message that needs splitting"""
         mock_mesh_pb2.Constants.DATA_PAYLOAD_LEN = 20
         mock_interface = MagicMock()
         meshtastic_connection.interface = mock_interface
+        meshtastic_connection.numbered_chunks = False
 
         long_message = "This is a very long message that needs to be split"
-        meshtastic_connection.send_text(long_message, destinationId="12345")
+        with patch.object(meshtastic_connection, 'queue_text') as mock_queue_text:
+            meshtastic_connection.send_text(long_message, destinationId="12345")
 
-        mock_split_message.assert_called_once_with(
-            long_message,
-            10,  # DATA_PAYLOAD_LEN // 2
-            mock_interface.sendText,
-            destinationId="12345"
-        )
+        chunks = [call_args[0][0] for call_args in mock_queue_text.call_args_list]
+        assert chunks == ["This is a very long", "message that needs", "to be split"]
+        mock_queue_text.assert_called_with("to be split", priority=Priority.DIRECT, destinationId="12345")
+
+    @patch('mtg.connection.meshtastic.meshtastic.mesh_pb2')
+    def test_send_text_numbered_utf8(self, mock_mesh_pb2, meshtastic_connection):
+        """Test send_text packs chunks by UTF-8 size and numbers them"""
+        mock_mesh_pb2.Constants.DATA_PAYLOAD_LEN = 30
+        meshtastic_connection.interface = MagicMock()
+        meshtastic_connection.numbered_chunks = True
+
+        with patch.object(meshtastic_connection, 'queue_text') as mock_queue_text:
+            meshtastic_connection.send_text("Повітряна тривога в Київській області")
+
+        chunks = [call_args[0][0] for call_args in mock_queue_text.call_args_list]
+        assert chunks[0] == "Повітряна (1/4)"
+        assert all(len(chunk.encode('utf-8')) <= 30 for chunk in chunks)
 
     def test_send_data_no_interface(self, meshtastic_connection):
         """Test send_data when interface is None"""
         meshtastic_connection.interface = None
 
         # Should not raise exception
-        meshtastic_connection.send_data(b"data")
+        assert meshtastic_connection.send_data(b"data") is False
 
     def test_send_data_with_interface(self, meshtastic_connection):
         """Test send_data with interface"""
@@ -198,9 +237,64 @@ class TestMeshtasticConnection:
         meshtastic_connection.interface = mock_interface
 
         meshtastic_connection.send_data(b"data", destinationId="12345")
+        meshtastic_connection.scheduler.run_once(timeout=0)
 
         mock_interface.sendData.assert_called_once_with(b"data", destinationId="12345")
 
+    def test_send_data_on_transmit(self, meshtastic_connection):
+        """Test on_transmit is called when packet goes to radio, not when it is queued"""
+        mock_interface = MagicMock()
+        meshtastic_connection.interface = mock_interface
+        on_transmit = MagicMock()
+
+        assert meshtastic_connection.send_data(b"data", destinationId="!12345678", on_transmit=on_transmit)
+        on_transmit.assert_not_called()
+        meshtastic_connection.scheduler.run_once(timeout=0)
+
+        mock_interface.sendData.assert_called_once_with(b"data", destinationId="!12345678")
+        on_transmit.assert_called_once_with()
+
+    def test_send_data_on_transmit_failure(self, meshtastic_connection):
+        """Test on_transmit is called when transmission fails, not when packet is requeued"""
+        mock_interface = MagicMock()
+        meshtastic_connection.interface = mock_interface
+        on_transmit = MagicMock()
+
+        mock_interface.sendData.side_effect = ValueError('bad packet')
+        assert meshtastic_connection.send_data(b"data", destinationId="!12345678", on_transmit=on_transmit)
+        meshtastic_connection.scheduler.run_once(timeout=0)
+        on_transmit.assert_called_once_with()
+
+        # requeued packet is still pending, sender is notified once it is sent again
+        on_transmit.reset_mock()
+        mock_interface.sendData.side_effect = Requeue('radio busy')
+        assert meshtastic_connection.send_data(b"data", destinationId="!12345678", on_transmit=on_transmit)
+        meshtastic_connection.scheduler.run_once(timeout=0)
+        on_transmit.assert_not_called()
+        assert len(meshtastic_connection.scheduler.queue) == 1
+
+    @patch('mtg.connection.meshtastic.meshtastic.mesh_pb2')
+    def test_send_dropped_by_scheduler(self, mock_mesh_pb2, meshtastic_connection):
+        """Test packets dropped by full outbound queue are logged and reported to caller"""
+        mock_mesh_pb2.Constants.DATA_PAYLOAD_LEN = 256
+        meshtastic_connection.interface = MagicMock()
+        meshtastic_connection.scheduler.max_queue = 1
+
+        assert meshtastic_connection.send_text("first") is True
+        assert meshtastic_connection.send_text("second") is False
+        assert meshtastic_connection.send_data(b"data") is False
+        assert meshtastic_connection.logger.warning.call_count >= 2
+
+    def test_outbound_stats(self, meshtastic_connection):
+        """Test outbound_stats reports queue depth"""
+        meshtastic_connection.interface = MagicMock()
+
+        meshtastic_connection.send_data(b"data", priority=Priority.COMMAND)
+
+        stats = meshtastic_connection.outbound_stats
+        assert stats['queue_depth']['COMMAND'] == 1
+        assert stats['queue_depth']['BULK'] == 0
+
     def test_node_info_no_interface(self, meshtastic_connection):
         """Test node_info when interface is None"""
         result = meshtastic_connection.node_info("12345")
@@ -225,25 +319,29 @@ class TestMeshtasticConnection:
         result = meshtastic_connection.node_info("12345")
         assert result == {}
 
-    @patch('mtg.connection.meshtastic.meshtastic.time.sleep')
     @patch('mtg.connection.meshtastic.meshtastic.MESHTASTIC_LOCAL_ADDR', 0xFFFFFFFF)
-    def test_reboot(self, mock_sleep, meshtastic_connection):
-        """Test reboot method"""
+    def test_reboot(self, meshtastic_connection):
+        """Test reboot returns right away and device is reconnected in background"""
         mock_interface = MagicMock()
         mock_node = MagicMock()
         mock_interface.getNode.return_value = mock_node
         meshtastic_connection.interface = mock_interface
+        meshtastic_connection.reboot_delay = 0
+        radio = meshtastic_connection.radios[0]
+        new_interface = MagicMock()
 
-        with patch.object(meshtastic_connection, 'connect') as mock_connect:
+        with patch.object(radio, 'open_interface', return_value=new_interface):
             meshtastic_connection.reboot()
+            radio.reconnect_thread.join(timeout=5)
 
         meshtastic_connection.logger.info.assert_any_call("Reboot requested...")
         mock_interface.getNode.assert_called_once_with(0xFFFFFFFF)
         mock_node.reboot.assert_called_once_with(10)
         mock_interface.close.assert_called_once()
-        mock_sleep.assert_called_once_with(20)
-        mock_connect.assert_called_once()
-        meshtastic_connection.logger.info.assert_any_call("Reboot completed...")
+        assert meshtastic_connection.interface is new_interface
+        assert radio.state == LinkState.CONNECTED
+        assert radio.reconnects == 1
+        meshtastic_connection.shutdown()
 
     @patch('mtg.connection.meshtastic.meshtastic.MESHTASTIC_LOCAL_ADDR', 0xFFFFFFFF)
     def test_reset_db(self, meshtastic_connection):
@@ -361,53 +459,50 @@ class TestMeshtasticConnection:
         assert len(result) == 2
         assert all("position" in node and "user" in node for node in result)
 
-    def test_format_nodes_no_table(self, meshtastic_connection):
-        """Test format_nodes when showNodes returns empty"""
+    def test_format_nodes_no_nodes(self, meshtastic_connection):
+        """Test format_nodes when there are no nodes"""
         mock_interface = MagicMock()
-        mock_interface.showNodes.return_value = ""
+        mock_interface.nodes = {}
         meshtastic_connection.interface = mock_interface
 
         result = meshtastic_connection.format_nodes()
         assert result == "No other nodes"
+        mock_interface.showNodes.assert_not_called()
 
-    def test_format_nodes_with_table(self, meshtastic_connection):
-        """Test format_nodes with table data"""
+    def test_format_nodes_with_nodes(self, meshtastic_connection):
+        """Test format_nodes builds table from node records"""
         mock_interface = MagicMock()
-        table_data = """╒══════════╤═══════╤═════════╤═══════════╤══════════╕
-│ User     │ AKA   │ ID      │ !ID       │ SNR      │
-╞══════════╪═══════╪═════════╪═══════════╪══════════╡
-│ TestUser │ TU    │ abc123  │ !abc123   │ -5.25    │
-│ Node2    │ N2    │ def456  │ !def456   │ -3.0     │
-╘══════════╧═══════╧═════════╧═══════════╧══════════╛"""
-
-        mock_interface.showNodes.return_value = table_data
+        mock_interface.myInfo.my_node_num = 1
+        mock_interface.nodes = {
+            "!00000001": {"num": 1, "user": {"id": "!00000001", "longName": "Gateway"}, "lastHeard": 1700000300},
+            "!abc123": {"num": 2, "user": {"id": "!abc123", "longName": "Test.User", "shortName": "TU"},
+                        "snr": -5.25, "lastHeard": 1700000000},
+            "!def456": {"num": 3, "user": {"id": "!def456", "longName": "Node2"}, "snr": 3.0,
+                        "lastHeard": 1700000100},
+        }
         meshtastic_connection.interface = mock_interface
         meshtastic_connection.filter.banned.return_value = False
 
-        result = meshtastic_connection.format_nodes()
-
-        # Verify formatting
-        lines = result.split('\n')
-        assert len(lines) > 0
-        assert "User" in lines[0]
-        assert "TestUser" in result
-        assert "!abc123" in result
-
-        # Verify filter.banned was called
+        lines = meshtastic_connection.format_nodes().split('\n')
+        assert lines[0].startswith(r"N, User, AKA, ID, Hardware, SNR, Hops, LastHeard \(2 nodes\)")
+        # most recently heard first, own node skipped
+        assert lines[1].startswith("*1* `Node2, N/A, !def456")
+        assert lines[2].startswith("*2* `Test.User, TU, !abc123, N/A, -5.25 dB")
         meshtastic_connection.filter.banned.assert_any_call("!abc123")
         meshtastic_connection.filter.banned.assert_any_call("!def456")
 
+        result = meshtastic_connection.format_nodes(include_self=True, sort='snr')
+        assert "Gateway" in result.split('\n')[3]
+        assert "Node2" in result.split('\n')[1]
+        mock_interface.showNodes.assert_not_called()
+
     def test_format_nodes_with_banned_nodes(self, meshtastic_connection):
         """Test format_nodes filters out banned nodes"""
         mock_interface = MagicMock()
-        table_data = """╒══════════╤═══════╤═════════╤═══════════╤══════════╕
-│ User     │ AKA   │ ID      │ !ID       │ SNR      │
-╞══════════╪═══════╪═════════╪═══════════╪══════════╡
-│ TestUser │ TU    │ abc123  │ !abc123   │ -5.25    │
-│ Banned   │ BN    │ ban456  │ !ban456   │ -3.0     │
-╘══════════╧═══════╧═════════╧═══════════╧══════════╛"""
-
-        mock_interface.showNodes.return_value = table_data
+        mock_interface.nodes = {
+            "!abc123": {"user": {"id": "!abc123", "longName": "TestUser"}},
+            "!ban456": {"user": {"id": "!ban456", "longName": "Banned"}},
+        }
         meshtastic_connection.interface = mock_interface
 
         # Mock filter to ban the second node
@@ -418,73 +513,103 @@ class TestMeshtasticConnection:
 
         result = meshtastic_connection.format_nodes(include_self=True)
 
-        # Verify banned node is logged
+        assert "TestUser" in result
+        assert "Banned" not in result
         meshtastic_connection.logger.debug.assert_called_with("Node !ban456 is in a blacklist...")
 
-    @patch('mtg.connection.meshtastic.meshtastic.create_fifo')
+    def test_format_nodes_cached_by_version(self, meshtastic_connection):
+        """Test node table is formatted once per node snapshot version"""
+        mock_interface = MagicMock()
+        mock_interface.nodes = {"!abc123": {"user": {"id": "!abc123", "longName": "TestUser"}}}
+        meshtastic_connection.interface = mock_interface
+
+        first = meshtastic_connection.format_nodes()
+        assert meshtastic_connection.format_nodes() == first
+        assert meshtastic_connection.filter.banned.call_count == 1
+
+        mock_interface.nodes["!abc123"]["snr"] = 1.5
+        meshtastic_connection.refresh_node("!abc123")
+        assert "1.50 dB" in meshtastic_connection.format_nodes()
+        assert meshtastic_connection.filter.banned.call_count == 2
+
+    @patch('mtg.connection.meshtastic.meshtastic.FifoReader')
     @patch('mtg.connection.meshtastic.meshtastic.setthreadtitle')
-    @patch('builtins.open', new_callable=mock_open, read_data="Test message\nAnother message\n")
-    @patch('mtg.connection.meshtastic.meshtastic.MESHTASTIC_BROADCAST_ADDR', 0xFFFFFFFF)
-    def test_run_loop(self, mock_file, mock_setthreadtitle, mock_create_fifo, meshtastic_connection):
-        """Test run_loop method"""
-        # Set exit flag after first iteration
-        def side_effect(*args, **kwargs):
-            if mock_file.return_value.__enter__.call_count >= 1:
-                meshtastic_connection.exit = True
-            return mock_file.return_value
+    def test_run_loop(self, mock_setthreadtitle, mock_reader_class, meshtastic_connection):
+        """Test run_loop reads both FIFOs in single reader"""
+        reader = mock_reader_class.return_value
 
-        mock_file.side_effect = side_effect
+        def run_once():
+            meshtastic_connection.exit = True
+
+        reader.run_once.side_effect = run_once
 
         meshtastic_connection.run_loop()
 
         mock_setthreadtitle.assert_called_once_with('Meshtastic Connection')
-        mock_create_fifo.assert_called_once_with('/tmp/test.fifo')
-        mock_file.assert_called_with('/tmp/test.fifo', encoding='utf-8')
-
-    @patch('mtg.connection.meshtastic.meshtastic.create_fifo')
-    @patch('mtg.connection.meshtastic.meshtastic.setthreadtitle')
-    @patch('builtins.open', new_callable=mock_open, read_data="reboot\n")
-    def test_run_cmd_loop_reboot(self, mock_file, mock_setthreadtitle, mock_create_fifo, meshtastic_connection):
-        """Test run_cmd_loop with reboot command"""
-        # Set exit flag after first iteration
-        def side_effect(*args, **kwargs):
-            if mock_file.return_value.__enter__.call_count >= 1:
-                meshtastic_connection.exit = True
-            return mock_file.return_value
-
-        mock_file.side_effect = side_effect
+        reader.add.assert_any_call('/tmp/test.fifo', meshtastic_connection.on_fifo_message)
+        reader.add.assert_any_call('/tmp/test.cmd.fifo', meshtastic_connection.on_fifo_command)
+        reader.run_once.assert_called_once()
+        reader.close.assert_called_once()
 
+    @patch('mtg.connection.meshtastic.meshtastic.MESHTASTIC_BROADCAST_ADDR', 0xFFFFFFFF)
+    def test_on_fifo_message(self, meshtastic_connection):
+        """Test FIFO messages are broadcast"""
+        with patch.object(meshtastic_connection, 'send_text') as mock_send_text:
+            meshtastic_connection.on_fifo_message("Test message")
+        mock_send_text.assert_called_once_with("Test message", destinationId=0xFFFFFFFF)
+
+    def test_on_fifo_command_runs_in_background(self, meshtastic_connection):
+        """Test FIFO commands are queued for single command worker"""
+        with patch.object(meshtastic_connection.commands, 'submit') as mock_submit:
+            meshtastic_connection.on_fifo_command("reboot")
+        mock_submit.assert_called_once_with('fifo', 'command', meshtastic_connection.run_command, "reboot")
+
+    def test_fifo_commands_run_one_at_a_time(self, meshtastic_connection):
+        """Test two reboot lines are not executed concurrently"""
+        running = []
+        overlaps = []
+
+        def reboot():
+            overlaps.append(len(running))
+            running.append(1)
+            time.sleep(0.05)
+            running.pop()
+
+        with patch.object(meshtastic_connection, 'reboot', side_effect=reboot):
+            meshtastic_connection.commands.run()
+            meshtastic_connection.on_fifo_command("reboot")
+            meshtastic_connection.on_fifo_command("reboot")
+            for _ in range(100):
+                if len(overlaps) == 2 and not running:
+                    break
+                time.sleep(0.01)
+            meshtastic_connection.commands.shutdown()
+        assert overlaps == [0, 0]
+
+    def test_run_command_reboot(self, meshtastic_connection):
+        """Test reboot command"""
         with patch.object(meshtastic_connection, 'reboot') as mock_reboot:
-            meshtastic_connection.run_cmd_loop()
+            meshtastic_connection.run_command("reboot")
 
-        mock_setthreadtitle.assert_called_once_with("MeshtasticCmd")
-        mock_create_fifo.assert_called_once_with('/tmp/test.cmd.fifo')
-        mock_file.assert_called_with('/tmp/test.cmd.fifo', encoding='utf-8')
         meshtastic_connection.logger.warning.assert_called_with("Reboot requested using CMD...")
         mock_reboot.assert_called_once()
 
-    @patch('mtg.connection.meshtastic.meshtastic.create_fifo')
-    @patch('mtg.connection.meshtastic.meshtastic.setthreadtitle')
-    @patch('builtins.open', new_callable=mock_open, read_data="reset_db\n")
-    def test_run_cmd_loop_reset_db(self, mock_file, mock_setthreadtitle, mock_create_fifo, meshtastic_connection):
-        """Test run_cmd_loop with reset_db command"""
-        # Set exit flag after first iteration
-        def side_effect(*args, **kwargs):
-            if mock_file.return_value.__enter__.call_count >= 1:
-                meshtastic_connection.exit = True
-            return mock_file.return_value
-
-        mock_file.side_effect = side_effect
-
+    def test_run_command_reset_db(self, meshtastic_connection):
+        """Test reset_db command"""
         with patch.object(meshtastic_connection, 'reset_db') as mock_reset_db:
-            meshtastic_connection.run_cmd_loop()
+            meshtastic_connection.run_command("reset_db")
 
-        mock_setthreadtitle.assert_called_once_with("MeshtasticCmd")
-        mock_create_fifo.assert_called_once_with('/tmp/test.cmd.fifo')
-        mock_file.assert_called_with('/tmp/test.cmd.fifo', encoding='utf-8')
         meshtastic_connection.logger.warning.assert_called_with("Reset DB requested using CMD...")
         mock_reset_db.assert_called_once()
 
+    @patch('mtg.connection.meshtastic.meshtastic.pub')
+    def test_run_command_reload(self, mock_pub, meshtastic_connection):
+        """Test reload command is published to configuration reloader"""
+        meshtastic_connection.run_command("reload")
+
+        meshtastic_connection.logger.warning.assert_called_with("Configuration reload requested using CMD...")
+        mock_pub.sendMessage.assert_called_once_with('mtg.config.reload')
+
     def test_shutdown(self, meshtastic_connection):
         """Test shutdown method"""
         meshtastic_connection.shutdown()
@@ -492,43 +617,31 @@ class TestMeshtasticConnection:
 
     @patch('mtg.connection.meshtastic.meshtastic.Thread')
     def test_run_fifo_enabled(self, mock_thread, meshtastic_connection):
-        """Test run method when FIFO is enabled"""
-        meshtastic_connection.config.enforce_type.return_value = True
-
-        mock_thread_instance1 = MagicMock()
-        mock_thread_instance2 = MagicMock()
-        mock_thread.side_effect = [mock_thread_instance1, mock_thread_instance2]
-
+        """Test run method starts single FIFO thread"""
         meshtastic_connection.run()
 
-        # Verify two threads were created
-        assert mock_thread.call_count == 2
-
-        # First thread for run_loop
-        mock_thread.assert_any_call(
+        mock_thread.assert_called_once_with(
             target=meshtastic_connection.run_loop,
             daemon=True,
             name='Meshtastic Connection'
         )
-        mock_thread_instance1.start.assert_called_once()
+        mock_thread.return_value.start.assert_called_once()
 
-        # Second thread for run_cmd_loop
-        mock_thread.assert_any_call(
-            target=meshtastic_connection.run_cmd_loop,
-            daemon=True,
-            name="MeshtasticCmd"
-        )
-        mock_thread_instance2.start.assert_called_once()
+    @patch('mtg.connection.meshtastic.meshtastic.Thread')
+    def test_run_keeps_alive_thread(self, mock_thread, meshtastic_connection):
+        """Test restart by thread manager does not start second FIFO reader"""
+        mock_thread.return_value.is_alive.return_value = True
+        meshtastic_connection.run()
+        meshtastic_connection.run()
+        mock_thread.assert_called_once()
 
     def test_thread_safety(self, meshtastic_connection):
         """Test thread safety locks are initialized"""
         # Test that locks are properly initialized
         assert meshtastic_connection.lock is not None
-        assert meshtastic_connection.fifo_lock is not None
 
-        # Verify they are RLock instances by checking type name
+        # Verify it is RLock instance by checking type name
         assert 'RLock' in str(type(meshtastic_connection.lock))
-        assert 'RLock' in str(type(meshtastic_connection.fifo_lock))
 
     def test_empty_interface_handling(self, meshtastic_connection):
         """Test various methods handle None interface gracefully"""
@@ -537,32 +650,171 @@ class TestMeshtasticConnection:
         # Test all methods that check for None interface
         assert meshtastic_connection.node_info("test") == {}
         assert meshtastic_connection.nodes == {}
-        assert meshtastic_connection.nodes_with_info == []
-        assert meshtastic_connection.nodes_with_position == []
-        assert meshtastic_connection.nodes_with_user == []
+        assert meshtastic_connection.nodes_with_info == ()
+        assert meshtastic_connection.nodes_with_position == ()
+        assert meshtastic_connection.nodes_with_user == ()
 
         # These should not raise exceptions
         meshtastic_connection.send_text("test")
         meshtastic_connection.send_data(b"test")
 
-    def test_format_nodes_edge_cases(self, meshtastic_connection):
-        """Test format_nodes with various edge cases"""
+    def test_node_index_events(self, meshtastic_connection):
+        """Test node index follows radio events"""
         mock_interface = MagicMock()
+        mock_interface.nodes = {"!00000001": {"user": {"id": "!00000001"}, "position": {"latitude": 1.0}}}
         meshtastic_connection.interface = mock_interface
 
-        # Test with None return
-        mock_interface.showNodes.return_value = None
-        assert meshtastic_connection.format_nodes() == "No other nodes"
+        meshtastic_connection.on_node_table(interface=mock_interface)
+        snapshot = meshtastic_connection.node_snapshot
+        assert len(snapshot.with_user) == 1
 
-        # Test with empty lines
-        table_data = """╒══════════╤═══════╤═════════╤═══════════╤══════════╕
-│ User     │ AKA   │ ID      │ !ID       │ SNR      │
-╞══════════╪═══════╪═════════╪═══════════╪══════════╡
+        mock_interface.nodes["!00000002"] = {"user": {"id": "!00000002"}, "position": {"latitude": 2.0}}
+        meshtastic_connection.on_node_updated(node=mock_interface.nodes["!00000002"], interface=mock_interface)
+        assert len(meshtastic_connection.nodes_with_user) == 2
 
+        mock_interface.nodes["!00000001"]["lastHeard"] = 1700000000
+        meshtastic_connection.on_node_packet(packet={"fromId": "!00000001"}, interface=mock_interface)
+        assert meshtastic_connection.node_snapshot.nodes["!00000001"]["lastHeard"] == 1700000000
+        assert meshtastic_connection.node_snapshot.version == snapshot.version + 2
+        # old snapshot is not affected
+        assert len(snapshot.with_user) == 1
 
-╘══════════╧═══════╧═════════╧═══════════╧══════════╛"""
+        del mock_interface.nodes["!00000002"]
+        meshtastic_connection.on_node_packet(packet={"fromId": "!00000002"}, interface=mock_interface)
+        assert len(meshtastic_connection.nodes_with_user) == 1
 
-        mock_interface.showNodes.return_value = table_data
-        result = meshtastic_connection.format_nodes()
-        lines = [line for line in result.split('\n') if line.strip()]
-        assert len(lines) >= 1  # At least header should be present
\ No newline at end of file
+    @patch('mtg.connection.meshtastic.meshtastic.mesh_pb2')
+    def test_direct_message_delivery(self, mock_mesh_pb2, meshtastic_connection):
+        """Test direct messages want ack, are tracked and retried after NAK"""
+        mock_mesh_pb2.Constants.DATA_PAYLOAD_LEN = 256
+        mock_interface = MagicMock()
+        mock_interface.sendText.side_effect = [MagicMock(id=101), MagicMock(id=102)]
+        meshtastic_connection.interface = mock_interface
+        meshtastic_connection.scheduler.budget = 3600
+        meshtastic_connection.scheduler.max_queue = 10
+        meshtastic_connection.delivery.retries = 1
+
+        meshtastic_connection.send_text("hello", destinationId="!a1b2c3d4")
+        assert meshtastic_connection.scheduler.run_once(timeout=0) is True
+        mock_interface.sendText.assert_called_once_with("hello", destinationId="!a1b2c3d4", wantAck=True)
+        assert list(meshtastic_connection.delivery.pending) == [101]
+
+        nak = {"fromId": "!local", "decoded": {"portnum": "ROUTING_APP", "requestId": 101,
+                                               "routing": {"errorReason": "MAX_RETRANSMIT"}}}
+        meshtastic_connection.on_node_packet(packet=nak, interface=mock_interface)
+        meshtastic_connection.scheduler.radio_free_at = 0
+        assert meshtastic_connection.scheduler.run_once(timeout=0) is True
+        assert mock_interface.sendText.call_count == 2
+        assert meshtastic_connection.delivery.pending[102].attempt == 1
+
+        ack = {"fromId": "!a1b2c3d4", "decoded": {"portnum": "ROUTING_APP", "requestId": 102}}
+        meshtastic_connection.on_node_packet(packet=ack, interface=mock_interface)
+        assert meshtastic_connection.delivery.node_stats("!a1b2c3d4")["ratio"] == 1.0
+
+    def test_post_message(self, meshtastic_connection):
+        """Test ingestion request is queued with destination, channel and priority"""
+        with patch.object(meshtastic_connection, 'send_text') as mock_send_text:
+            meshtastic_connection.post_message("hi", destination="!a1b2c3d4", channel=1, priority="bulk")
+            meshtastic_connection.post_message("all")
+        mock_send_text.assert_any_call("hi", priority=Priority.BULK, destinationId="!a1b2c3d4", channelIndex=1)
+        mock_send_text.assert_any_call("all", priority=None, destinationId="^all", channelIndex=0)
+
+
+class TestMultiRadio:
+    """Test MeshtasticConnection with several devices"""
+
+    @pytest.fixture
+    def connection(self):
+        """Connection with two radios, channel 1 routed to the second one"""
+        config = MagicMock()
+        config.Meshtastic.ModemPreset = "LongFast, ShortFast"
+        config.Meshtastic.ChannelRoutes = "1:2, bad"
+        config.enforce_type.side_effect = lambda type_cls, value: type_cls(100) if type_cls in (int, float) else True
+        connection = MeshtasticConnection(
+            dev_path="/dev/ttyUSB0, tcp:10.0.0.2",
+            logger=MagicMock(spec=logging.Logger),
+            config=config,
+            filter_class=MagicMock(),
+        )
+        for radio in connection.radios:
+            radio.interface = MagicMock()
+            radio.interface.nodes = {}
+            radio.interface.getMyNodeInfo.return_value = {}
+        return connection
+
+    def test_init(self, connection):
+        """Test radios, presets and channel routes"""
+        first, second = connection.radios
+        assert (first.dev_path, second.dev_path) == ("/dev/ttyUSB0", "tcp:10.0.0.2")
+        assert (first.scheduler.preset, second.scheduler.preset) == ("LONG_FAST", "SHORT_FAST")
+        assert connection.scheduler is first.scheduler
+        assert connection.interface is first.interface
+        assert connection.channel_routes == {1: second}
+        connection.logger.warning.assert_called_once_with("Ignoring channel route bad")
+
+    @patch('mtg.connection.meshtastic.radio.meshtastic_tcp_interface')
+    @patch('mtg.connection.meshtastic.radio.meshtastic_serial_interface')
+    def test_connect_all(self, mock_serial_module, mock_tcp_module, connection):
+        """Test every radio gets own interface"""
+        connection.connect()
+        assert connection.radios[0].interface is mock_serial_module.SerialInterface.return_value
+        assert connection.radios[1].interface is mock_tcp_module.TCPInterface.return_value
+        connection.shutdown()
+
+    def test_route_by_channel_destination_and_load(self, connection):
+        """Test channel route, then radio that heard destination, then least loaded radio"""
+        first, second = connection.radios
+        assert connection.route(channel=1) is second
+        connection.on_node_packet(packet={"fromId": "!a1b2c3d4", "id": 1, "from": 1}, interface=second.interface)
+        assert connection.route("!a1b2c3d4") is second
+        first.interface.getMyNodeInfo.return_value = {"deviceMetrics": {"channelUtilization": 30.0}}
+        assert connection.route() is second
+        second.scheduler.submit(MagicMock(), 10)
+        assert connection.route() is first
+
+    def test_send_text_load_balanced(self, connection):
+        """Test broadcasts are spread across radios by queue depth"""
+        connection.send_text("one")
+        connection.send_text("two")
+        assert [radio.queue_depth for radio in connection.radios] == [1, 1]
+        connection.radios[1].scheduler.run_once()
+        connection.radios[1].interface.sendText.assert_called_once_with("two")
+
+    def test_send_text_one_radio_down(self, connection):
+        """Test traffic goes through remaining radio"""
+        connection.radios[0].interface = None
+        connection.send_text("one", destinationId="!a1b2c3d4")
+        assert [radio.queue_depth for radio in connection.radios] == [0, 1]
+
+    def test_dedup(self, connection):
+        """Test packet heard by both radios is processed once, repeated checks are stable"""
+        first, second = connection.radios
+        packet = {"id": 42, "from": 1, "fromId": "!00000001"}
+        assert not connection.is_duplicate(packet, first.interface)
+        assert not connection.is_duplicate(packet, first.interface)
+        assert connection.is_duplicate(packet, second.interface)
+        assert not connection.is_duplicate({"id": 43, "from": 1}, second.interface)
+        assert not connection.is_duplicate({"from": 1}, second.interface)
+
+    def test_dedup_window(self, connection):
+        """Test dedup memory is bounded"""
+        connection.seen_size = 10
+        for packet_id in range(1, 50):
+            connection.is_duplicate({"id": packet_id, "from": 1}, connection.radios[0].interface)
+        assert len(connection.seen_packets) <= 11
+
+    def test_merged_nodes(self, connection):
+        """Test node tables are merged, most recently heard record wins"""
+        first, second = connection.radios
+        first.interface.nodes = {"!1": {"lastHeard": 10, "snr": 1.0}, "!2": {"lastHeard": 5}}
+        second.interface.nodes = {"!1": {"lastHeard": 20, "snr": 2.0}, "!3": {}}
+        nodes = connection.nodes
+        assert set(nodes) == {"!1", "!2", "!3"}
+        assert nodes["!1"]["snr"] == 2.0
+        assert connection.node_info("!2") == {"lastHeard": 5}
+
+    def test_outbound_stats_per_radio(self, connection):
+        """Test stats list every radio"""
+        stats = connection.outbound_stats
+        assert set(stats['radios']) == {"/dev/ttyUSB0", "tcp:10.0.0.2"}
+        assert stats['radios']["tcp:10.0.0.2"]['preset'] == "SHORT_FAST"
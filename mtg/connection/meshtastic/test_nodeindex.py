@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import pytest
+import logging
+from unittest.mock import MagicMock
+
+from mtg.connection.meshtastic.nodeindex import NodeIndex
+
+
+NODES = {
+    '!00000001': {'user': {'id': '!00000001', 'longName': 'One'}, 'position': {'latitude': 50.1, 'longitude': 30.1}},
+    '!00000002': {'user': {'id': '!00000002', 'longName': 'Two'}},
+    '!00000003': {'position': {'latitude': 50.3, 'longitude': 30.3}},
+}
+
+
+@pytest.fixture
+def index():
+    """Index with radio positions only"""
+    return NodeIndex(MagicMock(spec=logging.Logger))
+
+
+def test_empty_index(index):
+    """Test index is empty and unversioned before first build"""
+    assert index.version == 0
+    assert index.snapshot.with_info == ()
+    assert len(index.snapshot.nodes) == 0
+
+
+def test_rebuild(index):
+    """Test rebuild splits nodes by position and user"""
+    index.rebuild(NODES)
+    snapshot = index.snapshot
+    assert snapshot.version == 1
+    assert len(snapshot.with_info) == 3
+    assert [node.get('user', {}).get('id') for node in snapshot.with_position] == ['!00000001', None]
+    assert [node['user']['id'] for node in snapshot.with_user] == ['!00000001']
+    assert snapshot.nodes['!00000002']['user']['longName'] == 'Two'
+
+
+def test_snapshot_is_isolated_from_radio(index):
+    """Test later changes of radio node table do not leak into published snapshot"""
+    nodes = {'!00000001': {'user': {'id': '!00000001'}, 'position': {'latitude': 50.1, 'longitude': 30.1}}}
+    index.rebuild(nodes)
+    snapshot = index.snapshot
+    nodes['!00000001']['position']['latitude'] = 0
+    assert snapshot.with_position[0]['position']['latitude'] == 50.1
+    with pytest.raises(TypeError):
+        snapshot.nodes['!00000002'] = {}
+
+
+def test_update_bumps_version_only_on_change(index):
+    """Test unchanged node does not produce new snapshot"""
+    index.rebuild(NODES)
+    assert not index.update('!00000001', NODES['!00000001'])
+    assert index.version == 1
+    changed = dict(NODES['!00000001'], lastHeard=1700000000)
+    assert index.update('!00000001', changed)
+    assert index.version == 2
+    assert index.snapshot.nodes['!00000001']['lastHeard'] == 1700000000
+    # node order is kept
+    assert list(index.snapshot.nodes) == list(NODES)
+
+
+def test_old_snapshot_is_unchanged_by_update(index):
+    """Test readers holding old snapshot see consistent data"""
+    index.rebuild(NODES)
+    old = index.snapshot
+    index.update('!00000004', {'user': {'id': '!00000004'}, 'position': {'latitude': 1.0, 'longitude': 1.0}})
+    assert len(old.with_info) == 3
+    assert len(index.snapshot.with_info) == 4
+    assert len(index.snapshot.with_user) == 2
+
+
+def test_remove(index):
+    """Test node removal"""
+    index.rebuild(NODES)
+    assert index.version == 1
+    assert index.remove('!00000002')
+    assert not index.remove('!00000002')
+    assert '!00000002' not in index.snapshot.nodes
+    assert index.version == 2
+
+
+def test_position_fn_called_only_for_new_position():
+    """Test position enrichment is reused while radio position stays the same"""
+    position_fn = MagicMock(side_effect=lambda node: dict(node.get('position', {}), admin1='Kyiv'))
+    index = NodeIndex(MagicMock(spec=logging.Logger), position_fn=position_fn)
+    index.rebuild(NODES)
+    assert index.version == 1
+    assert position_fn.call_count == 3
+    index.update('!00000001', dict(NODES['!00000001'], snr=5.0))
+    assert index.snapshot.nodes['!00000001']['position']['admin1'] == 'Kyiv'
+    assert position_fn.call_count == 3
+    index.update('!00000001', dict(NODES['!00000001'], position={'latitude': 51.0, 'longitude': 31.0}))
+    assert index.version == 3
+    assert position_fn.call_count == 4
+    # generated position makes node visible in position list
+    assert len(index.snapshot.with_position) == 3
+
+
+def test_changes_applied_on_read():
+    """Test radio events only queue node copies, positions are computed and snapshot published on read"""
+    position_fn = MagicMock(side_effect=lambda node: node.get('position'))
+    prefetch_fn = MagicMock()
+    index = NodeIndex(MagicMock(spec=logging.Logger), position_fn=position_fn, prefetch_fn=prefetch_fn)
+    index.rebuild(NODES)
+    for lat in (50.0, 50.5, 51.0):
+        assert index.update('!00000004', {'user': {'id': '!00000004'}, 'position': {'latitude': lat, 'longitude': 1.0}})
+    assert index.update('!00000001', dict(NODES['!00000001'], snr=5.0))
+    assert index.remove('!00000003')
+    position_fn.assert_not_called()
+    prefetch_fn.assert_not_called()
+    snapshot = index.snapshot
+    # all changes are published at once, only latest position of node is resolved
+    assert snapshot.version == 1
+    assert position_fn.call_count == 3
+    prefetch_fn.assert_called_once()
+    assert snapshot.nodes['!00000004']['position']['latitude'] == 51.0
+    assert list(snapshot.nodes) == ['!00000001', '!00000002', '!00000004']
+    assert index.snapshot is snapshot
+
+
+def test_update_copies_changed_node_only():
+    """Test node equal to pending or published copy is neither copied nor queued"""
+    index = NodeIndex(MagicMock(spec=logging.Logger))
+    node = {'user': {'id': '!00000001'}, 'lastHeard': 1}
+    assert index.update('!00000001', node)
+    assert not index.update('!00000001', node)
+    node['lastHeard'] = 2
+    # queued copy is isolated from later radio changes
+    assert index.snapshot.nodes['!00000001']['lastHeard'] == 1
+    assert index.update('!00000001', node)
+    assert index.snapshot.nodes['!00000001']['lastHeard'] == 2
+    assert not index.update('!00000001', {'user': {'id': '!00000001'}, 'lastHeard': 2})
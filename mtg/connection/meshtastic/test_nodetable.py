@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import pytest
+import logging
+from unittest.mock import MagicMock
+
+from mtg.connection.meshtastic.nodeindex import NodeIndex
+from mtg.connection.meshtastic.nodetable import NodeTable, escape_code, escape_markdown, format_node
+
+
+@pytest.fixture
+def snapshot():
+    """Snapshot with five nodes"""
+    index = NodeIndex(MagicMock(spec=logging.Logger))
+    index.rebuild({
+        f'!0000000{num}': {'num': num, 'user': {'id': f'!0000000{num}', 'longName': f'Node{num}'},
+                           'snr': float(num % 3), 'lastHeard': 1700000000 + num}
+        for num in range(1, 6)
+    })
+    return index.snapshot
+
+
+def test_escape_markdown():
+    """Test MarkdownV2 special characters are escaped"""
+    assert escape_markdown('a_b*c.d(e)!') == r'a\_b\*c\.d\(e\)\!'
+    assert escape_markdown('plain') == 'plain'
+
+
+def test_escape_code():
+    """Test only backtick and backslash are escaped inside code span"""
+    assert escape_code('a`b\\c.d') == 'a\\`b\\\\c.d'
+
+
+def test_format_node_missing_fields():
+    """Test node without optional fields"""
+    assert format_node(1, {'user': {'id': '!00000001'}}) == '*1* `N/A, N/A, !00000001, N/A, N/A, N/A, N/A`'
+
+
+def test_sort_by_snr(snapshot):
+    """Test strongest SNR first, stable for same SNR"""
+    lines = NodeTable(lambda _: False).lines(snapshot, include_self=True, sort='SNR')
+    assert [line.split('`')[1].split(',')[0] for line in lines] == ['Node2', 'Node5', 'Node1', 'Node4', 'Node3']
+
+
+def test_paging(snapshot):
+    """Test page selection and clamping"""
+    table = NodeTable(lambda _: False)
+    page = table.render(snapshot, include_self=True, page=2, page_size=2).split('\n')
+    assert page[0].endswith(r'page 2/3')
+    assert len(page) == 3
+    assert page[1].startswith('*3* `Node3')
+    last = table.render(snapshot, include_self=True, page=10, page_size=2).split('\n')
+    assert last[0].endswith('page 3/3')
+    assert len(last) == 2
+
+
+def test_unknown_sort_and_own_node(snapshot):
+    """Test unknown sort falls back to lastHeard and own node is skipped"""
+    lines = NodeTable(lambda _: False).lines(snapshot, local_num=5, sort='bogus')
+    assert len(lines) == 4
+    assert lines[0].startswith('*1* `Node4')
+
+
+def test_cache_reset_on_new_version(snapshot):
+    """Test banned check runs once per node per snapshot version"""
+    banned = MagicMock(return_value=False)
+    table = NodeTable(banned)
+    table.render(snapshot)
+    table.render(snapshot, sort='snr')
+    assert banned.call_count == 10
+    table.render(snapshot)
+    assert banned.call_count == 10
+    table.render(snapshot._replace(version=snapshot.version + 1))
+    assert banned.call_count == 15
+    assert len(table.cache) == 1
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import pytest
+import logging
+from unittest.mock import MagicMock, patch
+
+from mtg.connection.meshtastic.radio import LinkState, Radio, split_list
+from mtg.connection.meshtastic.scheduler import Requeue
+
+
+@pytest.fixture
+def radio():
+    """Radio without interface"""
+    config = MagicMock()
+    config.enforce_type.side_effect = lambda type_cls, value: type_cls(100)
+    return Radio('tcp:10.0.0.2', MagicMock(spec=logging.Logger), config, 'LongFast')
+
+
+def test_split_list():
+    """Test comma separated config values"""
+    assert split_list('/dev/ttyUSB0, tcp:10.0.0.2,') == ['/dev/ttyUSB0', 'tcp:10.0.0.2']
+    assert split_list('') == []
+
+
+@patch('mtg.connection.meshtastic.radio.meshtastic_tcp_interface')
+def test_connect(mock_tcp_module, radio):
+    """Test TCP device connect starts scheduler"""
+    with patch.object(radio.scheduler, 'start') as mock_start:
+        radio.connect()
+    mock_tcp_module.TCPInterface.assert_called_once()
+    assert mock_tcp_module.TCPInterface.call_args[0][0] == '10.0.0.2'
+    assert radio.interface is mock_tcp_module.TCPInterface.return_value
+    mock_start.assert_called_once()
+
+
+def test_channel_utilization(radio):
+    """Test utilization from device metrics"""
+    assert radio.channel_utilization == 100.0
+    radio.interface = MagicMock()
+    radio.interface.getMyNodeInfo.return_value = {'deviceMetrics': {'channelUtilization': 12.5}}
+    assert radio.channel_utilization == 12.5
+    radio.interface.getMyNodeInfo.return_value = None
+    assert radio.channel_utilization == 0.0
+
+
+def test_transmit(radio):
+    """Test packets go to own interface"""
+    radio.transmit_text('hi', destinationId='!a1b2c3d4')
+    radio.logger.warning.assert_called_once()
+    radio.interface = MagicMock()
+    radio.transmit_text('hi', destinationId='!a1b2c3d4')
+    radio.transmit_data(b'data', portNum=1)
+    radio.interface.sendText.assert_called_once_with('hi', destinationId='!a1b2c3d4')
+    radio.interface.sendData.assert_called_once_with(b'data', portNum=1)
+
+
+def test_transmit_link_lost(radio):
+    """Test broken link requeues packet and starts reconnect"""
+    radio.interface = MagicMock()
+    radio.interface.sendText.side_effect = BrokenPipeError('gone')
+    with patch.object(radio, 'reconnect', return_value=True) as mock_reconnect:
+        with pytest.raises(Requeue):
+            radio.transmit_text('hi')
+    mock_reconnect.assert_called_once_with()
+
+
+def test_ready(radio):
+    """Test scheduler holds packets without interface or while reconnecting"""
+    assert radio.ready() is False
+    radio.interface = MagicMock()
+    assert radio.ready() is True
+    radio.state = LinkState.RECONNECTING
+    assert radio.ready() is False
+
+
+def test_reconnect_backoff(radio):
+    """Test failed attempts are retried with growing delay until connected"""
+    radio.reconnect_delay = 0.01
+    radio.reconnect_max_delay = 0.02
+    old_interface = radio.interface = MagicMock()
+    new_interface = MagicMock()
+    with patch.object(radio, 'open_interface', side_effect=[OSError('busy'), OSError('busy'), new_interface]), \
+            patch.object(radio.scheduler, 'start'):
+        assert radio.reconnect(delay=0) is True
+        assert radio.reconnect() is False
+        radio.reconnect_thread.join(timeout=5)
+    old_interface.close.assert_called_once()
+    assert radio.interface is new_interface
+    assert radio.state == LinkState.CONNECTED
+    assert radio.reconnects == 1
+    assert radio.logger.warning.call_count == 2
+
+
+def test_shutdown_stops_reconnect(radio):
+    """Test shutdown ends reconnect loop"""
+    with patch.object(radio, 'open_interface', side_effect=OSError('busy')):
+        radio.reconnect(delay=100)
+        radio.shutdown()
+        radio.reconnect_thread.join(timeout=5)
+    assert not radio.reconnect_thread.is_alive()
+    assert radio.state == LinkState.DOWN
+    assert radio.reconnect() is False
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import pytest
+import logging
+from unittest.mock import MagicMock, patch
+
+from mtg.connection.meshtastic.airtime import lora_airtime, normalize_preset
+from mtg.connection.meshtastic.scheduler import OutboundScheduler, Priority, Requeue
+
+
+@pytest.fixture
+def scheduler():
+    """Scheduler with 10% duty cycle over 100 seconds"""
+    return OutboundScheduler(MagicMock(spec=logging.Logger), preset='LongFast', duty_cycle=10, window=100)
+
+
+def test_normalize_preset():
+    """Test preset names in different notations"""
+    assert normalize_preset('LongFast') == 'LONG_FAST'
+    assert normalize_preset('long_fast') == 'LONG_FAST'
+    assert normalize_preset('VeryLongSlow') == 'VERY_LONG_SLOW'
+    assert normalize_preset('SHORT-TURBO') == 'SHORT_TURBO'
+    assert normalize_preset('unknown') == 'LONG_FAST'
+
+
+def test_lora_airtime():
+    """Test airtime grows with payload size and slower presets"""
+    short = lora_airtime(10, 'LongFast')
+    full = lora_airtime(200, 'LongFast')
+    assert 0.2 < short < full < 2.5
+    assert lora_airtime(200, 'ShortFast') < full < lora_airtime(200, 'LongSlow')
+
+
+def test_submit_and_priority_order(scheduler):
+    """Test higher priority packets are sent first, same priority in FIFO order"""
+    sent = []
+    callback = lambda msg: sent.append(msg)
+    scheduler.submit(callback, 10, Priority.BULK, args=('bulk',))
+    scheduler.submit(callback, 10, Priority.BROADCAST, args=('broadcast1',))
+    scheduler.submit(callback, 10, Priority.BROADCAST, args=('broadcast2',))
+    scheduler.submit(callback, 10, Priority.COMMAND, args=('command',))
+
+    for _ in range(4):
+        scheduler.radio_free_at = 0
+        assert scheduler.run_once(timeout=0) is True
+
+    assert sent == ['command', 'broadcast1', 'broadcast2', 'bulk']
+
+
+def test_run_once_empty_queue(scheduler):
+    """Test run_once returns False without packets"""
+    assert scheduler.run_once(timeout=0) is False
+
+
+def test_hold_while_not_ready_and_requeue(scheduler):
+    """Test packets stay queued while link is down and requeued packet keeps its place"""
+    link = {'up': False}
+    scheduler.ready = lambda: link['up']
+    sent = []
+
+    def callback(msg):
+        if msg == 'first' and not sent:
+            sent.append(None)
+            raise Requeue('link lost')
+        sent.append(msg)
+
+    scheduler.submit(callback, 10, args=('first',))
+    scheduler.submit(callback, 10, args=('second',))
+    assert scheduler.run_once(timeout=0) is False
+    assert len(scheduler.queue) == 2
+
+    link['up'] = True
+    assert scheduler.run_once(timeout=0) is False
+    assert len(scheduler.queue) == 2
+    for _ in range(2):
+        scheduler.radio_free_at = 0
+        assert scheduler.run_once(timeout=0) is True
+    assert sent == [None, 'first', 'second']
+    assert scheduler.stats()['wait']['BROADCAST']['sent'] == 2
+
+
+def test_pacing_by_airtime(scheduler):
+    """Test next packet waits until previous one left the radio"""
+    callback = MagicMock()
+    scheduler.submit(callback, 200, args=('first',))
+    scheduler.submit(callback, 200, args=('second',))
+
+    assert scheduler.run_once(timeout=0) is True
+    assert scheduler.run_once(timeout=0) is False
+    callback.assert_called_once_with('first')
+
+
+def test_duty_cycle_budget(scheduler):
+    """Test packets wait when airtime budget is spent"""
+    callback = MagicMock()
+    with patch('mtg.connection.meshtastic.scheduler.time.time', return_value=1000.0):
+        scheduler.history.append((990.0, 9.9))
+        scheduler.used_airtime = 9.9
+        scheduler.submit(callback, 200)
+        assert scheduler.run_once(timeout=0) is False
+    callback.assert_not_called()
+    # old transmission left the window
+    with patch('mtg.connection.meshtastic.scheduler.time.time', return_value=1091.0):
+        assert scheduler.run_once(timeout=0) is True
+    callback.assert_called_once()
+    assert len(scheduler.history) == 1
+
+
+def test_queue_full(scheduler):
+    """Test submit drops packets when queue is full"""
+    scheduler.max_queue = 1
+    assert scheduler.submit(MagicMock(), 10) is True
+    assert scheduler.submit(MagicMock(), 10, Priority.BULK) is False
+    assert scheduler.stats()['wait']['BULK']['dropped'] == 1
+
+
+def test_packet_over_budget_rejected(scheduler):
+    """Test packet that would not fit into whole window budget is dropped at submit"""
+    scheduler.budget = lora_airtime(10, 'LongFast') * 2
+    assert scheduler.submit(MagicMock(), 10) is True
+    assert scheduler.submit(MagicMock(), 200, Priority.DIRECT) is False
+    assert scheduler.stats()['wait']['DIRECT']['dropped'] == 1
+    assert len(scheduler.queue) == 1
+    scheduler.logger.warning.assert_called_once()
+
+
+def test_callback_exception_logged(scheduler):
+    """Test failing transmission does not stop scheduler"""
+    scheduler.submit(MagicMock(side_effect=RuntimeError('boom')), 10)
+    assert scheduler.run_once(timeout=0) is True
+    scheduler.logger.error.assert_called_once()
+
+
+def test_stats(scheduler):
+    """Test stats report depth, wait times and airtime"""
+    scheduler.submit(MagicMock(), 10, Priority.DIRECT)
+    scheduler.submit(MagicMock(), 10, Priority.BULK)
+    stats = scheduler.stats()
+    assert stats['preset'] == 'LONG_FAST'
+    assert stats['queue_depth'] == {'COMMAND': 0, 'DIRECT': 1, 'BROADCAST': 0, 'BULK': 1}
+    assert stats['airtime_budget'] == 10.0
+
+    scheduler.run_once(timeout=0)
+    stats = scheduler.stats()
+    assert stats['wait']['DIRECT']['sent'] == 1
+    assert stats['airtime_used'] > 0
+
+
+@patch('mtg.connection.meshtastic.scheduler.Thread')
+def test_start_and_shutdown(mock_thread, scheduler):
+    """Test scheduler thread lifecycle"""
+    scheduler.start()
+    mock_thread.assert_called_once_with(target=scheduler.run_loop, daemon=True, name='Meshtastic Scheduler')
+    mock_thread.return_value.start.assert_called_once()
+    # already running
+    mock_thread.return_value.is_alive.return_value = True
+    scheduler.start()
+    assert mock_thread.call_count == 1
+
+    scheduler.shutdown()
+    assert scheduler.exit is True
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import json
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+
+from mtg.connection.meshtastic.scheduler import Priority
+from mtg.connection.meshtastic.traceroute import TracerouteScheduler, parse_route
+
+
+def response(route, snr=None):
+    """TRACEROUTE_APP answer as delivered by meshtastic library"""
+    return {'decoded': {'portnum': 'TRACEROUTE_APP',
+                        'traceroute': {'route': route, 'snrTowards': snr or [40] * (len(route) + 1)}}}
+
+
+@pytest.fixture
+def connection():
+    """Connection mock without node names"""
+    conn = MagicMock()
+    conn.node_info.return_value = {}
+    return conn
+
+
+@pytest.fixture
+def tracer(connection):
+    """Scheduler without pacing, two traceroutes in flight"""
+    return TracerouteScheduler(connection, MagicMock(spec=logging.Logger), concurrency=2, interval=0, timeout=60)
+
+
+def sent_nodes(connection):
+    """Destinations of queued traceroute requests"""
+    return [call.kwargs['destinationId'] for call in connection.send_data.call_args_list]
+
+
+def transmit(connection):
+    """Outbound scheduler puts every queued request on air"""
+    for call in connection.send_data.call_args_list:
+        call.kwargs['on_transmit']()
+
+
+def test_parse_route():
+    """Test route ids are normalized and unknown SNR is None"""
+    route = parse_route(response([0x11, 0xdeadbeef], [20, -128, 38]))
+    assert route['route'] == ['!00000011', '!deadbeef']
+    assert route['snr'] == [5.0, None, 9.5]
+    assert parse_route({'decoded': {'portnum': 'ROUTING_APP', 'routing': {'errorReason': 'NO_RESPONSE'}}}) is None
+
+
+def test_concurrency_cap(tracer, connection):
+    """Test only concurrency traceroutes are in flight, next one is sent after answer"""
+    tracer.submit(['!a', '!b', '!c'], 3)
+    assert tracer.run_once(0)
+    assert tracer.run_once(0)
+    assert not tracer.run_once(0)
+    assert sent_nodes(connection) == ['!a', '!b']
+    kwargs = connection.send_data.call_args.kwargs
+    assert kwargs['priority'] == Priority.BULK
+    assert kwargs['hopLimit'] == 3
+    kwargs['onResponse'](response([]))
+    assert tracer.run_once(0)
+    assert sent_nodes(connection) == ['!a', '!b', '!c']
+
+
+def test_pacing(connection):
+    """Test requests are spaced by interval"""
+    tracer = TracerouteScheduler(connection, MagicMock(spec=logging.Logger), concurrency=5, interval=30)
+    tracer.submit(['!a', '!b'], 3)
+    assert tracer.run_once(0)
+    assert not tracer.run_once(0)
+    tracer.next_send = 0
+    assert tracer.run_once(0)
+
+
+def test_duplicate_nodes_traced_once(tracer, connection):
+    """Test node queued by several batches is traced once"""
+    tracer.submit(['!a', '!a'], 3)
+    tracer.submit(['!a'], 3)
+    while tracer.run_once(0):
+        pass
+    assert sent_nodes(connection) == ['!a']
+
+
+def test_batch_summary_after_timeouts(tracer, connection):
+    """Test callback gets summary once every node answered or timed out"""
+    results = []
+    tracer.submit(['!a', '!b', '!c'], 3, callback=results.append)
+    tracer.run_once(0)
+    tracer.run_once(0)
+    on_a = connection.send_data.call_args_list[0].kwargs['onResponse']
+    on_b = connection.send_data.call_args_list[1].kwargs['onResponse']
+    on_a(response([]))
+    on_b(response([0x1234]))
+    tracer.run_once(0)
+    transmit(connection)
+    assert results == []
+    # !c does not answer
+    tracer.in_flight['!c'] -= 61
+    tracer.run_once(0)
+    assert len(results) == 1
+    summary = tracer.summary(results[0])
+    assert summary.startswith('Traceroute: 2/3 nodes answered')
+    assert 'Hops: 0: 1, 1: 1' in summary
+    assert 'Top relays: !00001234 (1)' in summary
+    assert 'No answer: !c' in summary
+    assert tracer.stats()['timeouts'] == 1
+
+
+def test_single_node_route(tracer, connection):
+    """Test single node batch is summarized as route"""
+    connection.node_info.side_effect = lambda node: {'user': {'longName': 'Relay'}} if node == '!00001234' else {}
+    results = []
+    tracer.submit(['!a'], 3, callback=results.append)
+    tracer.run_once(0)
+    connection.send_data.call_args.kwargs['onResponse'](response([0x1234], [40, 22]))
+    assert tracer.summary(results[0]) == 'me -> Relay -> !a (5.5dB)'
+
+
+def test_route_table_persisted(tmp_path, connection):
+    """Test route table is saved and loaded"""
+    table_file = str(tmp_path / 'routes.json')
+    tracer = TracerouteScheduler(connection, MagicMock(spec=logging.Logger), interval=0, table_file=table_file)
+    tracer.submit(['!a'], 3)
+    tracer.run_once(0)
+    connection.send_data.call_args.kwargs['onResponse'](response([0x1234]))
+    with open(table_file) as table:
+        assert json.load(table)['!a']['route'] == ['!00001234']
+
+    restored = TracerouteScheduler(connection, MagicMock(spec=logging.Logger), table_file=table_file)
+    restored.load()
+    assert restored.routes['!a']['route'] == ['!00001234']
+
+
+def test_timeout_starts_at_transmit(tracer, connection):
+    """Test request waiting for airtime does not time out, answer timeout counts from transmission"""
+    results = []
+    tracer.submit(['!a'], 3, callback=results.append)
+    tracer.run_once(0)
+    assert list(tracer.in_flight) == ['!a'] and not tracer.on_air
+    assert tracer.stats()['sent'] == 0
+    tracer.timeout = 0
+    tracer.run_once(0)
+    assert results == []
+    tracer.timeout = 60
+    transmit(connection)
+    assert tracer.stats()['sent'] == 1
+    tracer.in_flight['!a'] -= 61
+    tracer.run_once(0)
+    assert len(results) == 1
+    assert tracer.stats()['timeouts'] == 1
+    # transmission after timeout is ignored
+    transmit(connection)
+    assert tracer.in_flight == {}
+
+
+def test_request_never_transmitted(tracer, connection):
+    """Test request lost in outbound scheduler frees its slot after queue timeout"""
+    results = []
+    tracer.submit(['!a', '!b', '!c'], 3, callback=results.append)
+    tracer.run_once(0)
+    tracer.run_once(0)
+    assert not tracer.run_once(0)
+    tracer.in_flight['!a'] -= tracer.queue_timeout
+    tracer.in_flight['!b'] -= tracer.queue_timeout
+    assert tracer.run_once(0)
+    assert sent_nodes(connection) == ['!a', '!b', '!c']
+    assert tracer.stats()['errors'] == 2
+    assert tracer.stats()['timeouts'] == 0
+    assert tracer.stats()['in_flight'] == 1
+    connection.send_data.call_args.kwargs['onResponse'](response([]))
+    assert len(results) == 1
+
+
+def test_request_rejected_by_scheduler(tracer, connection):
+    """Test request dropped by outbound scheduler finishes batch right away"""
+    connection.send_data.return_value = False
+    results = []
+    tracer.submit(['!a'], 3, callback=results.append)
+    assert not tracer.run_once(0)
+    assert len(results) == 1
+    assert tracer.stats()['errors'] == 1
+    assert tracer.in_flight == {}
+
+
+def test_queue_limit(connection):
+    """Test batch not fitting into queue is rejected"""
+    tracer = TracerouteScheduler(connection, MagicMock(spec=logging.Logger), max_queue=2)
+    assert tracer.submit(['!a', '!b', '!c'], 3) is None
+    assert tracer.submit(['!a', '!b'], 3) is not None
+
+
+def test_reconfigure(connection):
+    """Test new concurrency and interval apply to queued requests"""
+    tracer = TracerouteScheduler(connection, MagicMock(spec=logging.Logger), concurrency=1, interval=3600)
+    tracer.submit(['!a', '!b', '!c'], 3)
+    assert tracer.run_once(0)
+    assert not tracer.run_once(0)
+    tracer.reconfigure(concurrency=3, interval=0, timeout=60)
+    assert tracer.run_once(0)
+    assert tracer.run_once(0)
+    assert sent_nodes(connection) == ['!a', '!b', '!c']
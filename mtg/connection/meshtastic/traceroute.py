@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+""" Traceroute scheduler module """
+
+import json
+import logging
+import os
+import time
+from collections import Counter, deque
+from functools import partial
+from threading import Condition, Thread
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from meshtastic import (
+    mesh_pb2,
+    portnums_pb2,
+)
+# 3rd party
+from setproctitle import setthreadtitle
+
+from .scheduler import Priority
+
+# SNR value meaning unknown, reported in quarter dB otherwise
+UNKNOWN_SNR = -128
+
+
+def node_id(num: Any) -> str:
+    """
+    node_id - !abcdef12 style id of numeric node id
+
+    :param num:
+    :return:
+    """
+    return f'!{int(num) & 0xFFFFFFFF:08x}'
+
+
+def parse_route(packet: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    parse_route - route of traceroute response, None if destination did not answer with route
+
+    :param packet:
+    :return:
+    """
+    decoded = packet.get('decoded', {})
+    if decoded.get('portnum') != 'TRACEROUTE_APP':
+        return None
+    discovery = decoded.get('traceroute', {})
+    snr = discovery.get('snrTowards', [])
+    return {
+        'route': [node_id(num) for num in discovery.get('route', [])],
+        'route_back': [node_id(num) for num in discovery.get('routeBack', [])],
+        'snr': [None if value == UNKNOWN_SNR else value / 4 for value in snr],
+        'updated': time.time(),
+    }
+
+
+class TracerouteBatch:  # pylint:disable=too-few-public-methods
+    """
+    TracerouteBatch - traceroutes requested at once, callback receives batch when all of them finish
+    """
+
+    def __init__(self, nodes: List[str], callback: Optional[Callable[['TracerouteBatch'], Any]] = None) -> None:
+        self.nodes = list(dict.fromkeys(nodes))
+        self.pending: Set[str] = set(self.nodes)
+        self.answered: Set[str] = set()
+        self.callback = callback
+        self.started = time.time()
+
+
+# pylint:disable=too-many-instance-attributes
+class TracerouteScheduler:
+    """
+    TracerouteScheduler - traceroute job queue. Only few traceroutes are in flight at once,
+    requests are spaced by interval and go through outbound airtime scheduler as bulk traffic.
+    Answers are collected into persisted route table
+    """
+    name = 'Traceroute Scheduler'
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, connection: Any, logger: logging.Logger, concurrency: int = 2, interval: float = 30.0,
+                 timeout: float = 60.0, table_file: str = '', max_queue: int = 500,
+                 queue_timeout: float = 900.0) -> None:
+        self.connection = connection
+        self.logger = logger
+        self.concurrency = max(1, concurrency)
+        self.interval = interval
+        self.timeout = timeout
+        # request that never went on air gives its slot back after queue_timeout
+        self.queue_timeout = queue_timeout
+        self.table_file = table_file
+        self.max_queue = max_queue
+        self.condition = Condition()
+        self.queue: Deque[Tuple[str, int]] = deque()
+        # node -> batches waiting for it
+        self.waiting: Dict[str, List[TracerouteBatch]] = {}
+        # node -> answer deadline, transmission deadline while request waits in outbound scheduler
+        self.in_flight: Dict[str, float] = {}
+        self.on_air: Set[str] = set()
+        self.next_send = 0.0
+        # node -> last known route
+        self.routes: Dict[str, Dict[str, Any]] = {}
+        self.counters = {'sent': 0, 'answered': 0, 'timeouts': 0, 'errors': 0}
+        self.exit = False
+        self.thread: Optional[Thread] = None
+
+    def reconfigure(self, concurrency: int = 2, interval: float = 30.0, timeout: float = 60.0,
+                    table_file: str = '') -> None:
+        """
+        reconfigure - apply new settings, traceroutes in flight keep their deadlines
+
+        :param concurrency:
+        :param interval:
+        :param timeout:
+        :param table_file:
+        :return:
+        """
+        with self.condition:
+            self.concurrency = max(1, concurrency)
+            self.next_send = min(self.next_send, time.time() + interval)
+            self.interval = interval
+            self.timeout = timeout
+            moved = table_file != self.table_file
+            self.table_file = table_file
+            self.condition.notify()
+        if moved:
+            self.save()
+
+    def submit(self, nodes: List[str], hop_limit: int,
+               callback: Optional[Callable[[TracerouteBatch], Any]] = None) -> Optional[TracerouteBatch]:
+        """
+        submit - queue traceroutes, node already queued or in flight is not traced twice
+
+        :param nodes:
+        :param hop_limit:
+        :param callback: called with batch once all nodes answered or timed out
+        :return: batch, None if queue has no room for it
+        """
+        batch = TracerouteBatch([node for node in nodes if node], callback)
+        with self.condition:
+            new = [node for node in batch.nodes if node not in self.waiting]
+            if len(self.queue) + len(new) > self.max_queue:
+                self.logger.warning(f'Traceroute queue is full, rejecting {len(batch.nodes)} node(s)')
+                return None
+            for node in batch.nodes:
+                if node not in self.waiting:
+                    self.queue.append((node, hop_limit))
+                self.waiting.setdefault(node, []).append(batch)
+            self.condition.notify()
+        if not batch.nodes and callback is not None:
+            callback(batch)
+        return batch
+
+    def send(self, node: str, hop_limit: int) -> bool:
+        """
+        send - queue traceroute request for outbound scheduler, answer is passed to on_response
+
+        :param node:
+        :param hop_limit:
+        :return: False if outbound scheduler did not accept request
+        """
+        # pylint:disable=no-member
+        return self.connection.send_data(mesh_pb2.RouteDiscovery().SerializeToString(), destinationId=node,
+                                         portNum=portnums_pb2.PortNum.TRACEROUTE_APP, wantResponse=True,
+                                         onResponse=partial(self.on_response, node), hopLimit=hop_limit,
+                                         priority=Priority.BULK, on_transmit=partial(self.transmitted, node)
+                                         ) is not False
+
+    def transmitted(self, node: str) -> None:
+        """
+        transmitted - request went on air, answer timeout starts now. Called by outbound scheduler
+
+        :param node:
+        :return:
+        """
+        with self.condition:
+            if node in self.in_flight and node not in self.on_air:
+                self.on_air.add(node)
+                self.in_flight[node] = time.time() + self.timeout
+                self.counters['sent'] += 1
+
+    def on_response(self, node: str, packet: Dict[str, Any]) -> None:
+        """
+        on_response - traceroute answer, called by Meshtastic receive thread
+
+        :param node:
+        :param packet:
+        :return:
+        """
+        route = parse_route(packet)
+        if route is None:
+            self.logger.info(f'Traceroute to {node} failed: {packet.get("decoded", {}).get("routing")}')
+        self.finish(node, route)
+
+    def finish(self, node: str, route: Optional[Dict[str, Any]]) -> None:
+        """
+        finish - record traceroute result and complete batches waiting for node
+
+        :param node:
+        :param route:
+        :return:
+        """
+        done = []
+        with self.condition:
+            if route is not None:
+                self.routes[node] = route
+                self.counters['answered'] += 1
+            if node not in self.in_flight:
+                # late answer, route table is updated anyway
+                return
+            del self.in_flight[node]
+            self.on_air.discard(node)
+            for batch in self.waiting.pop(node, []):
+                batch.pending.discard(node)
+                if route is not None:
+                    batch.answered.add(node)
+                if not batch.pending:
+                    done.append(batch)
+            self.condition.notify()
+        if done:
+            self.save()
+        for batch in done:
+            if batch.callback is not None:
+                try:
+                    batch.callback(batch)
+                except Exception as exc:  # pylint:disable=broad-exception-caught
+                    self.logger.error(f'Traceroute batch callback failed: {exc!r}')
+
+    def _expire(self, now: float) -> List[Tuple[str, bool]]:
+        """
+        _expire - nodes that did not answer in time or whose request never went on air
+        """
+        return [(node, node in self.on_air) for node, deadline in self.in_flight.items() if now >= deadline]
+
+    def run_once(self, timeout: float = 1.0) -> bool:
+        """
+        run_once - time out unanswered traceroutes and send next one when concurrency and pacing allow
+
+        :param timeout: maximum time to wait
+        :return: True if traceroute was queued for transmission
+        """
+        with self.condition:
+            now = time.time()
+            expired = self._expire(now)
+        for node, on_air in expired:
+            with self.condition:
+                self.counters['timeouts' if on_air else 'errors'] += 1
+            if on_air:
+                self.logger.info(f'Traceroute to {node} timed out')
+            else:
+                self.logger.error(f'Traceroute to {node} was not transmitted in {self.queue_timeout:.0f}s')
+            self.finish(node, None)
+        with self.condition:
+            now = time.time()
+            if not self.queue or len(self.in_flight) >= self.concurrency or now < self.next_send:
+                delay = self.next_send - now if self.queue and now < self.next_send else timeout
+                self.condition.wait(max(0.0, min(delay, timeout)))
+                return False
+            node, hop_limit = self.queue.popleft()
+            self.in_flight[node] = now + self.queue_timeout
+            self.next_send = now + self.interval
+        try:
+            accepted, error = self.send(node, hop_limit), 'outbound queue is full'
+        except Exception as exc:  # pylint:disable=broad-exception-caught
+            accepted, error = False, repr(exc)
+        if not accepted:
+            with self.condition:
+                self.counters['errors'] += 1
+            self.logger.error(f'Traceroute to {node} could not be sent: {error}')
+            self.finish(node, None)
+            return False
+        return True
+
+    def node_name(self, node: str) -> str:
+        """
+        node_name - long name of node, id if it is unknown
+
+        :param node:
+        :return:
+        """
+        try:
+            return str(self.connection.node_info(node).get('user', {}).get('longName') or node)
+        except (AttributeError, KeyError):
+            return node
+
+    def describe(self, node: str) -> str:
+        """
+        describe - known route to node
+
+        :param node:
+        :return:
+        """
+        route = self.routes.get(node)
+        if route is None:
+            return f'No route to {self.node_name(node)}'
+        hops = ['me', *[self.node_name(hop) for hop in route['route']], self.node_name(node)]
+        snr = route['snr'][-1] if route['snr'] else None
+        return f'{" -> ".join(hops)}' + (f' ({snr}dB)' if snr is not None else '')
+
+    def summary(self, batch: TracerouteBatch, limit: int = 10) -> str:
+        """
+        summary - batch results: answers, hop count distribution, busiest relays
+
+        :param batch:
+        :param limit: maximum number of nodes listed
+        :return:
+        """
+        if len(batch.nodes) == 1:
+            return self.describe(batch.nodes[0])
+        with self.condition:
+            routes = {node: self.routes[node] for node in batch.answered if node in self.routes}
+        hops = Counter(len(route['route']) for route in routes.values())
+        relays = Counter(hop for route in routes.values() for hop in route['route'])
+        lines = [f'Traceroute: {len(batch.answered)}/{len(batch.nodes)} nodes answered '
+                 f'in {int(time.time() - batch.started)}s']
+        if hops:
+            lines.append('Hops: ' + ', '.join(f'{count}: {nodes}' for count, nodes in sorted(hops.items())))
+        if relays:
+            lines.append('Top relays: ' + ', '.join(f'{self.node_name(relay)} ({count})'
+                                                   for relay, count in relays.most_common(limit)))
+        missing = [node for node in batch.nodes if node not in batch.answered]
+        if missing:
+            more = f' and {len(missing) - limit} more' if len(missing) > limit else ''
+            lines.append('No answer: ' + ', '.join(self.node_name(node) for node in missing[:limit]) + more)
+        return '\n'.join(lines)
+
+    def load(self) -> None:
+        """
+        load - read persisted route table
+
+        :return:
+        """
+        if not self.table_file or not os.path.exists(self.table_file):
+            return
+        try:
+            with open(self.table_file, 'r', encoding='utf-8') as table_file:
+                routes = json.load(table_file)
+        except (OSError, ValueError) as exc:
+            self.logger.error(f'Could not read route table {self.table_file}: {exc}')
+            return
+        with self.condition:
+            self.routes.update(routes)
+
+    def save(self) -> None:
+        """
+        save - persist route table, file is replaced atomically
+
+        :return:
+        """
+        if not self.table_file:
+            return
+        with self.condition:
+            routes = dict(self.routes)
+        try:
+            with open(f'{self.table_file}.tmp', 'w', encoding='utf-8') as table_file:
+                json.dump(routes, table_file)
+            os.replace(f'{self.table_file}.tmp', self.table_file)
+        except OSError as exc:
+            self.logger.error(f'Could not save route table {self.table_file}: {exc}')
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - queue depth and traceroute counters
+
+        :return:
+        """
+        with self.condition:
+            return dict(self.counters, queued=len(self.queue), in_flight=len(self.in_flight),
+                        routes=len(self.routes))
+
+    def run_loop(self) -> None:
+        """
+        run_loop - scheduler thread
+
+        :return:
+        """
+        setthreadtitle(self.name)
+        while not self.exit:
+            self.run_once()
+
+    def run(self) -> None:
+        """
+        run - start scheduler thread
+
+        :return:
+        """
+        self.exit = False
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = Thread(target=self.run_loop, daemon=True, name=self.name)
+            self.thread.start()
+
+    def shutdown(self) -> None:
+        """
+        shutdown - stop scheduler thread and persist route table
+
+        :return:
+        """
+        with self.condition:
+            self.exit = True
+            self.condition.notify_all()
+        self.save()
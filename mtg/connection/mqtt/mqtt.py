@@ -46,6 +46,18 @@ class MQTT:  # pylint:disable=too-many-instance-attributes
         self.config = config
         self.common.set_config(config)
 
+    def reconfigure(self, config: Any) -> None:
+        """
+        reconfigure - apply new broker settings, client reconnects from run loop
+
+        :param config:
+        :return:
+        """
+        self.topic = config.MQTT.Topic
+        self.client.username_pw_set(config.MQTT.User, config.MQTT.Password)
+        self.set_config(config)
+        self.client.disconnect()
+
     def on_connect(self, client: Any, _userdata: Any, _flags: Any, result_code: int) -> None:
         """
         on_connect - MQTT callback for connection event
@@ -98,5 +110,7 @@ class MQTT:  # pylint:disable=too-many-instance-attributes
         :return:
         """
         self.logger.info('Starting MQTT client...')
+        self.exit = False
+        self.common.set_exit(False)
         thread = Thread(target=self.common.run_loop, daemon=True, name=self.name)
         thread.start()
@@ -4,10 +4,11 @@
 import logging
 import random
 import time
-from typing import Any, Callable, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from mtg.database import MeshtasticDB
 from mtg.connection.meshtastic import MeshtasticConnection
+from mtg.geo import ReverseGeocoder
 
 
 class RichConnection(MeshtasticConnection):
@@ -24,14 +25,69 @@ class RichConnection(MeshtasticConnection):
         self.logger = logger
         random.seed()
         self.rg_fn = rg_fn
+        # admin1 memo, misses of one node table rebuild are resolved by single search
+        self.geocoder = ReverseGeocoder(self.reverse_search)
+        # node_id -> generated coordinates of nodes without position
+        self.fallback_positions: Dict[str, Tuple[float, float]] = {}
+
+    def set_region_search(self, rg_fn: Optional[Callable]) -> None:
+        """
+        Replace reverse geocoding function, admin1 memo and node index are rebuilt
+
+        :param rg_fn:
+        :return:
+        """
+        self.rg_fn = rg_fn
+        self.geocoder = ReverseGeocoder(self.reverse_search)
+        if self.interface is not None:
+            self.node_index.rebuild(self.nodes)
+
+    def reverse_search(self, coordinates: List[Tuple[float, float]]) -> Any:
+        """
+        Resolve coordinates using reverse geocoding function (if any)
+
+        :param coordinates:
+        :return:
+        """
+        if self.rg_fn is None:
+            return None
+        return self.rg_fn(coordinates)
 
     def get_set_last_position(self, node_id: str) -> Tuple[float, float]:
         """
-        Get last position from DB or generate random one
+        Get last position from DB or generate random one. Generated position is kept in memory
+        until node reports its own one, last known coordinates are read from DB every time
+
+        :param node_id:
+        :return:
+        """
+        with self.lock:
+            if (cached := self.fallback_positions.get(node_id)) is not None:
+                return cached
+        # DB is queried outside of lock, it is shared with receive thread
+        position, generated = self.load_last_position(node_id)
+        if not generated:
+            return position
+        with self.lock:
+            return self.fallback_positions.setdefault(node_id, position)
+
+    def forget_position(self, node_id: str) -> None:
+        """
+        Drop generated position, node reported its own one
 
         :param node_id:
         :return:
         """
+        with self.lock:
+            self.fallback_positions.pop(node_id, None)
+
+    def load_last_position(self, node_id: str) -> Tuple[Tuple[float, float], bool]:
+        """
+        Get last position from DB or generate random one and store it
+
+        :param node_id:
+        :return: coordinates and whether any of them was generated
+        """
         lat_r = self.config.enforce_type(float,
                                          self.config.WebApp.Center_Latitude) + random.randrange(1000) / 10000
         lon_r = self.config.enforce_type(float,
@@ -42,37 +98,55 @@ class RichConnection(MeshtasticConnection):
         except RuntimeError:
             # no coordinates in DB
             self.database.set_coordinates(node_id, lat_r, lon_r)
+        generated = not (lat and lon)
         lat = lat or lat_r
         lon = lon or lon_r
-        return lat, lon
+        return (lat, lon), generated
+
+    def base_position(self, node_info: Dict) -> Dict:
+        """
+        Position reported by node, otherwise last known or generated one
+
+        :param node_info:
+        :return:
+        """
+        node_id = node_info.get('user', {}).get('id')
+        position = dict(node_info.get('position', {}))
+        if position.get('latitude') and position.get('longitude'):
+            # node has GPS again, newer coordinates are in DB now
+            self.forget_position(node_id)
+        else:
+            self.logger.debug(f"Node {node_id} doesn't have position...")
+            lat, lon = self.get_set_last_position(node_id)
+            latitude_i = str(lat).replace('.', '')[:9]
+            longitude_i = str(lon).replace('.', '')[:9]
+            position = {'latitude': lat, 'longitude': lon,
+                        'latitudeI': latitude_i, 'longitudeI': longitude_i,
+                        'altitude': 100}
+        return position
+
+    def prefetch_positions(self, nodes: List[Dict]) -> None:
+        """
+        Reverse geocode all node positions with single search before index rebuild
+
+        :param nodes:
+        :return:
+        """
+        if self.rg_fn is None or not nodes:
+            return
+        positions = [self.base_position(node_info) for node_info in nodes]
+        self.geocoder.lookup_many([(position['latitude'], position['longitude']) for position in positions])
 
-    @property
-    def nodes_with_position(self) -> List:
+    def node_position(self, node_info: Dict) -> Optional[Dict]:
         """
-        Filter out nodes without position
+        Position stored in node index. Nodes without coordinates get last known or generated ones
         'position': {'latitudeI': 464305648, 'longitudeI': 306971256, 'altitude': 107,
-                     'latitude': 46.4305648, 'longitude': 30.6971256}
+                     'latitude': 46.4305648, 'longitude': 30.6971256, 'admin1': 'Odesa'}
 
+        :param node_info:
         :return:
         """
-        node_list = []
-        for node_info in self.nodes_with_info:
-            node_id = node_info.get('user', {}).get('id')
-            position = node_info.get('position', {})
-            if not (position.get('latitude') and position.get('longitude')):
-                self.logger.debug(f"Node {node_id} doesn't have position...")
-                lat, lon = self.get_set_last_position(node_id)
-                latitude_i = str(lat).replace('.', '')[:9]
-                longitude_i = str(lon).replace('.', '')[:9]
-                node_info['position'] = {'latitude': lat, 'longitude': lon,
-                                         'latitudeI': latitude_i, 'longitudeI': longitude_i,
-                                         'altitude': 100}
-            if self.rg_fn is not None and (rg_results := self.rg_fn(
-                (
-                    node_info['position']['latitude'],
-                    node_info['position']['longitude'],
-                )
-            )):
-                node_info['position']['admin1'] = rg_results[0]['admin1']
-            node_list.append(node_info)
-        return node_list
+        position = self.base_position(node_info)
+        if self.rg_fn is not None and (admin1 := self.geocoder.lookup(position['latitude'], position['longitude'])):
+            position['admin1'] = admin1
+        return position
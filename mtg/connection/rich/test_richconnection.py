@@ -136,6 +136,39 @@ class TestRichConnection:
             assert lon == -89.9750  # -90.0 + 250/10000
             mock_database.set_coordinates.assert_called_once_with("!12345678", lat, lon)
 
+    def test_get_set_last_position_memoized(self, rich_connection, mock_database, mock_config):
+        """Test fallback position is generated and stored once, repeat lookups skip database"""
+        mock_database.get_last_coordinates.side_effect = RuntimeError("No coordinates")
+        mock_config.WebApp.Center_Latitude = 45.0
+        mock_config.WebApp.Center_Longitude = -90.0
+
+        first = rich_connection.get_set_last_position("!12345678")
+        assert rich_connection.get_set_last_position("!12345678") == first
+        mock_database.get_last_coordinates.assert_called_once_with("!12345678")
+        mock_database.set_coordinates.assert_called_once()
+
+        # node reported its own position, last known one is read from database again
+        rich_connection.forget_position("!12345678")
+        mock_database.get_last_coordinates.side_effect = None
+        mock_database.get_last_coordinates.return_value = (46.0, 30.0)
+        assert rich_connection.get_set_last_position("!12345678") == (46.0, 30.0)
+        assert mock_database.get_last_coordinates.call_count == 2
+
+    def test_get_set_last_position_stored_not_memoized(self, rich_connection, mock_database):
+        """Test stored coordinates are read from database on every lookup"""
+        assert rich_connection.get_set_last_position("!12345678") == (45.123, -90.456)
+        mock_database.get_last_coordinates.return_value = (46.0, 30.0)
+        assert rich_connection.get_set_last_position("!12345678") == (46.0, 30.0)
+        assert not rich_connection.fallback_positions
+
+    def test_gps_position_drops_generated_one(self, rich_connection, mock_database):
+        """Test node reporting GPS position drops its generated fallback"""
+        mock_database.get_last_coordinates.side_effect = RuntimeError("No coordinates")
+        rich_connection.get_set_last_position("!12345678")
+        rich_connection.node_position({'user': {'id': '!12345678'},
+                                       'position': {'latitude': 46.0, 'longitude': 30.0}})
+        assert "!12345678" not in rich_connection.fallback_positions
+
     def test_get_set_last_position_zero_coordinates(self, rich_connection, mock_database, mock_config):
         """Test get_set_last_position with zero coordinates from database"""
         mock_database.get_last_coordinates.return_value = (0.0, 0.0)
@@ -300,6 +333,27 @@ class TestRichConnection:
         # Should not have admin1 field since rg_fn returned empty list
         assert 'admin1' not in result[0]['position']
 
+    def test_rebuild_single_reverse_search(self, rich_connection):
+        """Test all positions are reverse geocoded with single search and cached"""
+        rg_fn = MagicMock(side_effect=lambda coordinates: [{'admin1': 'TestState'} for _ in coordinates])
+        rich_connection.rg_fn = rg_fn
+        mock_interface = MagicMock()
+        mock_interface.nodes = {
+            f'!0000000{num}': {'user': {'id': f'!0000000{num}'},
+                               'position': {'latitude': 45.0 + num, 'longitude': -90.0}}
+            for num in range(5)
+        }
+        rich_connection.interface = mock_interface
+
+        result = rich_connection.nodes_with_position
+
+        assert [node['position']['admin1'] for node in result] == ['TestState'] * 5
+        rg_fn.assert_called_once()
+        assert len(rg_fn.call_args[0][0]) == 5
+        rich_connection.node_index.rebuild(mock_interface.nodes)
+        rg_fn.assert_called_once()
+        assert rich_connection.geocoder.stats()['hits'] == 5
+
     def test_latitude_longitude_i_conversion(self, rich_connection):
         """Test that latitudeI and longitudeI are properly calculated"""
         test_nodes = {
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 """ Telegram connection module """
 
+from .flood import FloodControl, Priority, TokenBucket
 from .telegram import TelegramConnection
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+""" Telegram flood control module """
+
+import heapq
+import time
+from datetime import timedelta
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """
+    Priority - Telegram message priority classes. Lower value is sent first
+    """
+    ALERT = 0
+    CHAT = 1
+    NOTIFICATION = 2
+
+
+# priority, sequence, enqueue time, args, kwargs
+QueueItem = Tuple[int, int, float, Tuple[Any, ...], Dict[str, Any]]
+
+
+def chat_of(item: QueueItem) -> Any:
+    """
+    chat_of - destination chat of queued message
+
+    :param item:
+    :return:
+    """
+    _, _, _, args, kwargs = item
+    return kwargs.get('chat_id', args[0] if args else None)
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """
+    retry_after - seconds Telegram asked to wait (RetryAfter), None for other errors
+
+    :param exc:
+    :return:
+    """
+    delay = getattr(exc, 'retry_after', None)
+    if isinstance(delay, timedelta):
+        return delay.total_seconds()
+    if isinstance(delay, (int, float)) and not isinstance(delay, bool):
+        return float(delay)
+    return None
+
+
+class TokenBucket:
+    """
+    TokenBucket - rate messages per period with burst. Used from event loop only, not thread safe
+    """
+
+    def __init__(self, rate: int, period: float, burst: Optional[int] = None) -> None:
+        self.capacity = float(max(1, burst if burst is not None else rate))
+        self.fill_rate = rate / period
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.stamp:
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.fill_rate)
+            self.stamp = now
+
+    def wait(self, now: Optional[float] = None) -> float:
+        """
+        wait - seconds until token is available
+
+        :param now:
+        :return:
+        """
+        self._refill(time.monotonic() if now is None else now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.fill_rate
+
+    def take(self, now: Optional[float] = None) -> bool:
+        """
+        take - consume token if available
+
+        :param now:
+        :return:
+        """
+        if self.wait(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+
+# pylint:disable=too-many-instance-attributes
+class FloodControl:
+    """
+    FloodControl - per-chat queues paced by Telegram limits: ~30 messages per second overall,
+    20 per minute in a group and 1 per second in a private chat.
+    Chats waiting for their bucket or for RetryAfter do not hold back other chats.
+    Chat holds at most max_per_chat messages, oldest of least important ones are dropped first
+    """
+    global_rate = (30, 1.0)
+    group_rate = (20, 60.0)
+    group_burst = 3
+    private_rate = (1, 1.0)
+    max_per_chat = 200
+
+    def __init__(self) -> None:
+        self.global_bucket = TokenBucket(*self.global_rate)
+        self.buckets: Dict[Any, TokenBucket] = {}
+        # chat -> queued messages, ordered by priority and arrival
+        self.held: Dict[Any, List[QueueItem]] = {}
+        # chat -> monotonic time RetryAfter expires
+        self.blocked: Dict[Any, float] = {}
+        self.wait_stats: Dict[Any, Dict[str, float]] = {}
+        # chat -> messages dropped because chat queue was full
+        self.dropped: Dict[Any, int] = {}
+
+    def bucket(self, chat: Any) -> TokenBucket:
+        """
+        bucket - token bucket of chat, negative ids and @channel names are groups
+
+        :param chat:
+        :return:
+        """
+        if chat not in self.buckets:
+            group = str(chat).startswith(('-', '@'))
+            self.buckets[chat] = (TokenBucket(*self.group_rate, burst=self.group_burst) if group
+                                  else TokenBucket(*self.private_rate))
+        return self.buckets[chat]
+
+    def push(self, item: QueueItem) -> None:
+        """
+        push - queue message for its chat. Full chat queue drops oldest message of lowest priority,
+        so notifications go before chat messages and alerts
+
+        :param item:
+        :return:
+        """
+        chat = chat_of(item)
+        items = self.held.setdefault(chat, [])
+        heapq.heappush(items, item)
+        if len(items) <= self.max_per_chat:
+            return
+        lowest = max(entry[0] for entry in items)
+        items.remove(min(entry for entry in items if entry[0] == lowest))
+        heapq.heapify(items)
+        self.dropped[chat] = self.dropped.get(chat, 0) + 1
+
+    def chat_wait(self, chat: Any, now: float) -> float:
+        """
+        chat_wait - seconds until chat can receive next message
+
+        :param chat:
+        :param now:
+        :return:
+        """
+        blocked = self.blocked.get(chat, 0.0) - now
+        if blocked > 0:
+            return blocked
+        self.blocked.pop(chat, None)
+        return self.bucket(chat).wait(now)
+
+    def pop(self, now: Optional[float] = None) -> Tuple[Optional[QueueItem], float]:
+        """
+        pop - most important message among chats that may be sent to now, consumes chat token
+
+        :param now:
+        :return: message or None and seconds until next one is due
+        """
+        now = time.monotonic() if now is None else now
+        best: Optional[Any] = None
+        next_due = float('inf')
+        for chat, items in self.held.items():
+            wait = self.chat_wait(chat, now)
+            if wait > 0:
+                next_due = min(next_due, wait)
+            elif best is None or items[0] < self.held[best][0]:
+                best = chat
+        if best is None:
+            return None, next_due
+        self.bucket(best).take(now)
+        item = heapq.heappop(self.held[best])
+        if not self.held[best]:
+            del self.held[best]
+        return item, 0.0
+
+    def requeue(self, item: QueueItem, delay: float, now: Optional[float] = None) -> None:
+        """
+        requeue - put message back, its chat is paused for delay seconds
+
+        :param item:
+        :param delay:
+        :param now:
+        :return:
+        """
+        now = time.monotonic() if now is None else now
+        chat = chat_of(item)
+        self.blocked[chat] = max(self.blocked.get(chat, 0.0), now + delay)
+        self.push(item)
+
+    def record(self, item: QueueItem, now: Optional[float] = None) -> float:
+        """
+        record - account queue wait of delivered or dropped message
+
+        :param item:
+        :param now:
+        :return: seconds message spent in queue
+        """
+        now = time.monotonic() if now is None else now
+        waited = now - item[2]
+        stats = self.wait_stats.setdefault(chat_of(item), {'sent': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+        stats['sent'] += 1
+        stats['wait_total'] += waited
+        stats['wait_max'] = max(stats['wait_max'], waited)
+        return waited
+
+    def queued(self) -> int:
+        """
+        queued - messages waiting for their chats
+
+        :return:
+        """
+        return sum(map(len, list(self.held.values())))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        stats - queue depth, drops and wait time per chat
+
+        :return:
+        """
+        result = {}
+        for chat in set(self.wait_stats) | set(self.held) | set(self.dropped):
+            stats = self.wait_stats.get(chat, {'sent': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+            result[str(chat)] = {
+                'sent': int(stats['sent']),
+                'queued': len(self.held.get(chat, [])),
+                'dropped': self.dropped.get(chat, 0),
+                'wait_avg': round(stats['wait_total'] / stats['sent'], 3) if stats['sent'] else 0.0,
+                'wait_max': round(stats['wait_max'], 3),
+            }
+        return result
@@ -3,90 +3,141 @@
 
 
 import asyncio
+import itertools
 import logging
-import queue
-from typing import Any, Optional
+import time
+from threading import RLock
+from typing import Any, Dict, List, Optional, Tuple
 
 from telegram import Update  # type: ignore[attr-defined]
 from telegram.ext import Application
 
+from .flood import FloodControl, Priority, QueueItem, chat_of, retry_after
 
-class TelegramConnection:
+
+class TelegramConnection:  # pylint:disable=too-many-instance-attributes
     """
     Telegram connection
     """
+    # how often event loop lag is sampled, seconds
+    lag_interval = 0.5
 
     def __init__(self, token: str, logger: logging.Logger):
         self.logger = logger
         self.msg_queue: Optional[asyncio.Queue] = None
-        self.q: queue.Queue = queue.Queue()
+        # event loop running Telegram application, messages from other threads are handed over to it
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.lock = RLock()
+        # messages sent before event loop is started
+        self.pending: List[QueueItem] = []
         self.queue_task: Optional[asyncio.Task] = None
+        self.lag_task: Optional[asyncio.Task] = None
         self.running = False
+        self.counter = itertools.count()
+        # messages are paced per chat, alerts go first
+        self.flood = FloodControl()
+        self.counters: Dict[str, float] = {'sent': 0, 'failed': 0, 'wait_max': 0.0, 'wait_total': 0.0,
+                                           'lag': 0.0, 'lag_max': 0.0, 'retried': 0}
         logging.getLogger("httpx").setLevel(logging.WARNING)
         self.application = Application.builder().token(token).build()
 
+    def _enqueue(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        priority = Priority(kwargs.pop('priority', Priority.CHAT))
+        item: QueueItem = (int(priority), next(self.counter), time.monotonic(), args, kwargs)
+        with self.lock:
+            loop, msg_queue = self.loop, self.msg_queue
+            if loop is None or msg_queue is None or loop.is_closed():
+                self.pending.append(item)
+                return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            msg_queue.put_nowait(item)
+        else:
+            # never blocks caller thread, queue is touched only from its own loop
+            loop.call_soon_threadsafe(msg_queue.put_nowait, item)
 
     def send_message_sync(self, *args: Any, **kwargs: Any) -> None:
         """
-        Send a Telegram message by putting it in the thread-safe queue
+        Send a Telegram message from any thread. Optional priority keyword takes Priority value
         """
-        self.q.put((args, kwargs))
+        self._enqueue(args, kwargs)
 
     def send_message(self, *args: Any, **kwargs: Any) -> None:
         """
-        Send a Telegram message by putting it in the queue
+        Send a Telegram message by putting it in the queue. Optional priority keyword takes Priority value
 
         :param args:
         :param kwargs:
         :return:
         """
-        if self.msg_queue is None:
-            self.logger.warning("Message queue not initialized yet, message will be dropped")
-            return
+        self._enqueue(args, kwargs)
 
+    async def _send(self, item: QueueItem) -> None:
+        _, _, _, args, kwargs = item
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            await self.application.bot.send_message(*args, **kwargs)
+        except Exception as e:  # pylint:disable=broad-exception-caught
+            delay = retry_after(e)
+            if delay is not None:
+                # flood control hit, message keeps its place once chat is unblocked
+                self.counters['retried'] += 1
+                self.flood.requeue(item, delay)
+                self.logger.warning(f"Telegram flood control for chat {chat_of(item)}, retrying in {delay:.0f}s")
+                return
+            self._account(item)
+            self.counters['failed'] += 1
+            self.logger.error(f"Failed to send message: {e}")
+            return
+        self._account(item)
+        self.counters['sent'] += 1
+        self.logger.debug(f"Message sent successfully: {kwargs.get('text', 'photo/document')}")
 
-        # Put the message in the queue using thread-safe method
-        asyncio.run_coroutine_threadsafe(
-            self.msg_queue.put((args, kwargs)),
-            loop
-        )
+    def _account(self, item: QueueItem) -> None:
+        waited = self.flood.record(item)
+        self.counters['wait_total'] += waited
+        self.counters['wait_max'] = max(self.counters['wait_max'], waited)
 
     async def _process_message_queue(self) -> None:
         """
-        Process messages from the queue asynchronously
+        Process messages from the queue asynchronously, paced by Telegram flood limits
         """
         if self.msg_queue is None:
             self.logger.error("Message queue not initialized")
             return
 
         while self.running:
-            try:
-                # Get message from the thread-safe queue
-                args, kwargs = self.q.get(timeout=1.0)
-            except queue.Empty:
+            # move handed over messages to their chat queues
+            while not self.msg_queue.empty():
+                self.flood.push(self.msg_queue.get_nowait())
+            item, next_due = self.flood.pop()
+            if item is None:
                 try:
-                    args, kwargs = await asyncio.wait_for(self.msg_queue.get(), timeout=1.0)
+                    # awaiting keeps event loop free for handlers and polling
+                    self.flood.push(await asyncio.wait_for(self.msg_queue.get(), timeout=min(next_due, 1.0)))
                 except asyncio.TimeoutError:
-                    continue
-            try:
-                # Wait for a message with timeout to allow shutdown
-                self.logger.info(args, kwargs)
-                try:
-                    await self.application.bot.send_message(*args, **kwargs)
-                    self.logger.debug(f"Message sent successfully: {kwargs.get('text', 'photo/document')}")
-                except (ValueError, TypeError, RuntimeError) as e:
-                    if self.logger:
-                        self.logger.error(f"Failed to send message: {e}")
-            except asyncio.TimeoutError:
-                # Timeout is normal, continue checking if we should keep running
+                    pass
                 continue
-            except (ValueError, TypeError, RuntimeError) as e:
-                self.logger.error(f"Error in message queue processor: {e}")
+            while (delay := self.flood.global_bucket.wait()) > 0:
+                await asyncio.sleep(delay)
+            self.flood.global_bucket.take()
+            await self._send(item)
+
+    async def _measure_loop_lag(self) -> None:
+        """
+        Sample how late event loop wakes up, lag means something blocks the loop
+        """
+        loop = asyncio.get_running_loop()
+        while self.running:
+            started = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - started - self.lag_interval)
+            self.counters['lag'] = lag
+            self.counters['lag_max'] = max(self.counters['lag_max'], lag)
+            if lag > 1.0:
+                self.logger.warning(f"Telegram event loop was blocked for {lag:.2f}s")
 
     async def start_queue_processor(self) -> None:
         """
@@ -96,9 +147,15 @@ class TelegramConnection:
             # Initialize the async queue
             if self.msg_queue is None:
                 self.msg_queue = asyncio.Queue()
+            with self.lock:
+                self.loop = asyncio.get_running_loop()
+                pending, self.pending = self.pending, []
+            for item in pending:
+                self.msg_queue.put_nowait(item)
 
             self.running = True
             self.queue_task = asyncio.create_task(self._process_message_queue())
+            self.lag_task = asyncio.create_task(self._measure_loop_lag())
             self.logger.info("Message queue processor started")
 
     async def stop_queue_processor(self) -> None:
@@ -106,6 +163,9 @@ class TelegramConnection:
         Stop the message queue processor
         """
         self.running = False
+        if self.lag_task:
+            self.lag_task.cancel()
+            self.lag_task = None
         if self.queue_task:
             await self.queue_task
             self.queue_task = None
@@ -118,22 +178,44 @@ class TelegramConnection:
         # Signal the queue processor to stop
         self.running = False
 
-        # If there's a queue task, try to handle it properly
-        if self.queue_task:
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running() and not loop.is_closed():
-                    # Cancel the task - this is safe even in a running loop
-                    self.queue_task.cancel()
-                elif not loop.is_closed():
-                    # Loop exists but not running, we can wait for cleanup
-                    loop.run_until_complete(self.stop_queue_processor())
-            except RuntimeError:
-                # No event loop or loop issues, nothing we can do
-                pass
-            finally:
-                self.queue_task = None
+        # tasks belong to Telegram event loop, cancel them there
+        loop = self.loop
+        try:
+            if loop is not None and loop.is_running():
+                for task in (self.queue_task, self.lag_task):
+                    if task is not None:
+                        loop.call_soon_threadsafe(task.cancel)
+            elif loop is not None and not loop.is_closed() and self.queue_task:
+                # Loop exists but not running, we can wait for cleanup
+                loop.run_until_complete(self.stop_queue_processor())
+        except RuntimeError:
+            # loop is closing, nothing we can do
+            pass
+        finally:
+            if self.queue_task:
                 self.logger.info("Message queue processor stopped")
+            self.queue_task = None
+            self.lag_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - queue depth, wait time overall and per chat, event loop lag
+
+        :return:
+        """
+        sent = self.counters['sent'] + self.counters['failed']
+        return {
+            'queued': (self.msg_queue.qsize() if self.msg_queue is not None else 0) + len(self.pending) +
+                      self.flood.queued(),
+            'sent': int(self.counters['sent']),
+            'failed': int(self.counters['failed']),
+            'wait_avg': round(self.counters['wait_total'] / sent, 3) if sent else 0.0,
+            'wait_max': round(self.counters['wait_max'], 3),
+            'retried': int(self.counters['retried']),
+            'chats': self.flood.stats(),
+            'loop_lag': round(self.counters['lag'], 3),
+            'loop_lag_max': round(self.counters['lag_max'], 3),
+        }
 
     def poll(self) -> None:
         """
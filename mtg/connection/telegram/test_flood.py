@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+from datetime import timedelta
+
+from mtg.connection.telegram.flood import FloodControl, Priority, TokenBucket, retry_after
+
+
+def item(chat, seq, priority=Priority.CHAT, enqueued=0.0):
+    """Queued message of chat"""
+    return (int(priority), seq, enqueued, (), {'chat_id': chat, 'text': str(seq)})
+
+
+def test_token_bucket_burst_and_refill():
+    """Test bucket allows burst, then refills at its rate"""
+    bucket = TokenBucket(20, 60.0, burst=3)
+    now = bucket.stamp
+    assert [bucket.take(now) for _ in range(4)] == [True, True, True, False]
+    assert bucket.wait(now) == 3.0
+    assert bucket.take(now + 3.0)
+
+
+def test_retry_after():
+    """Test RetryAfter delay in seconds or timedelta, None for other errors"""
+    class RetryAfter(Exception):
+        def __init__(self, value):
+            self.retry_after = value
+
+    assert retry_after(RetryAfter(7)) == 7.0
+    assert retry_after(RetryAfter(timedelta(seconds=2))) == 2.0
+    assert retry_after(ValueError('bad')) is None
+
+
+def test_group_limited_to_twenty_per_minute():
+    """Test group chat gets burst and then 20 messages per minute"""
+    flood = FloodControl()
+    for seq in range(30):
+        flood.push(item(-100, seq))
+    now = flood.bucket(-100).stamp
+    sent = 0
+    for step in range(600):
+        while flood.pop(now + step * 0.1)[0] is not None:
+            sent += 1
+    # burst plus one message every 3 seconds
+    assert sent == 3 + 19
+
+
+def test_throttled_chat_does_not_block_others():
+    """Test priority order within chat and throttled chat does not hold others"""
+    flood = FloodControl()
+    now = flood.bucket(1).stamp
+    flood.push(item(1, 0))
+    flood.push(item(1, 1, Priority.ALERT))
+    flood.push(item(2, 2, Priority.NOTIFICATION))
+    first, _ = flood.pop(now)
+    assert first[1] == 1
+    second, _ = flood.pop(now)
+    assert second[1] == 2
+    third, due = flood.pop(now)
+    assert third is None
+    assert 0 < due <= 1.0
+
+
+def test_requeue_blocks_chat():
+    """Test requeued message waits for RetryAfter delay"""
+    flood = FloodControl()
+    now = flood.bucket(1).stamp
+    flood.requeue(item(1, 0), 10.0, now)
+    assert flood.pop(now + 5)[0] is None
+    assert flood.pop(now + 10)[0][1] == 0
+
+
+def test_stats_per_chat():
+    """Test per chat sent, queued and wait times"""
+    flood = FloodControl()
+    flood.record(item(1, 0, enqueued=1.0), now=3.0)
+    flood.record(item(1, 1, enqueued=2.0), now=3.0)
+    flood.push(item(2, 2))
+    stats = flood.stats()
+    assert stats['1'] == {'sent': 2, 'queued': 0, 'dropped': 0, 'wait_avg': 1.5, 'wait_max': 2.0}
+    assert stats['2']['queued'] == 1
+
+
+def test_full_chat_drops_notifications_first():
+    """Test full chat queue drops oldest notification, then oldest chat message"""
+    flood = FloodControl()
+    flood.max_per_chat = 3
+    flood.push(item(1, 0, Priority.NOTIFICATION))
+    flood.push(item(1, 1))
+    flood.push(item(1, 2, Priority.NOTIFICATION))
+    flood.push(item(1, 3, Priority.ALERT))
+    assert sorted(entry[1] for entry in flood.held[1]) == [1, 2, 3]
+    flood.push(item(1, 4))
+    flood.push(item(1, 5))
+    assert sorted(entry[1] for entry in flood.held[1]) == [3, 4, 5]
+    assert flood.stats()['1']['dropped'] == 3
+    now = flood.bucket(1).stamp
+    assert flood.pop(now)[0][1] == 3
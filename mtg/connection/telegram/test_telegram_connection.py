@@ -3,6 +3,7 @@
 import pytest
 import asyncio
 import sys
+import threading
 from unittest.mock import MagicMock, patch, AsyncMock
 
 # Mock external dependencies to avoid import conflicts
@@ -14,6 +15,7 @@ sys.modules['telegram'] = mock_telegram
 sys.modules['telegram.ext'] = MagicMock()
 
 from mtg.connection.telegram.telegram import TelegramConnection
+from mtg.connection.telegram.flood import Priority
 
 
 @pytest.fixture
@@ -50,36 +52,154 @@ class TestTelegramConnection:
                 mock_get_logger.assert_called_once_with("httpx")
                 mock_logger_httpx.setLevel.assert_called_once_with(30)  # logging.WARNING = 30
 
+    def test_send_message_before_loop_started(self, telegram_connection):
+        """Test messages sent before event loop starts are kept and handed over on start"""
+        telegram_connection.send_message_sync(chat_id=12345, text="Early message")
+        assert len(telegram_connection.pending) == 1
+
+        async def start():
+            await telegram_connection.start_queue_processor()
+            queued = telegram_connection.msg_queue.qsize()
+            await telegram_connection.stop_queue_processor()
+            return queued
+
+        telegram_connection.application.bot = AsyncMock()
+        assert asyncio.run(start()) in (0, 1)
+        assert telegram_connection.pending == []
+
     @pytest.mark.asyncio
     async def test_send_message(self, telegram_connection):
-        """Test send_message method"""
+        """Test send_message from event loop thread queues message directly"""
         telegram_connection.application.bot = AsyncMock()
-        # Initialize the message queue with the current event loop
         telegram_connection.msg_queue = asyncio.Queue()
+        telegram_connection.loop = asyncio.get_running_loop()
 
-        with patch('asyncio.run_coroutine_threadsafe') as mock_run_threadsafe:
-            telegram_connection.send_message(chat_id=12345, text="Test message")
+        telegram_connection.send_message(12345, "Test message", parse_mode="HTML")
 
-            mock_run_threadsafe.assert_called_once()
-            # Verify the coroutine was passed to asyncio.run_coroutine_threadsafe
-            coro = mock_run_threadsafe.call_args[0][0]
-            assert asyncio.iscoroutine(coro)
+        priority, _, _, args, kwargs = telegram_connection.msg_queue.get_nowait()
+        assert priority == Priority.CHAT
+        assert args == (12345, "Test message")
+        assert kwargs == {'parse_mode': 'HTML'}
 
     @pytest.mark.asyncio
-    async def test_send_message_with_args_and_kwargs(self, telegram_connection):
-        """Test send_message method with various args and kwargs"""
-        telegram_connection.application.bot = AsyncMock()
-        # Initialize the message queue with the current event loop
+    async def test_send_message_priority(self, telegram_connection):
+        """Test priority keyword is taken off message arguments"""
         telegram_connection.msg_queue = asyncio.Queue()
+        telegram_connection.loop = asyncio.get_running_loop()
+
+        telegram_connection.send_message(chat_id=1, text="Alert", priority=Priority.ALERT)
+
+        priority, _, _, _, kwargs = telegram_connection.msg_queue.get_nowait()
+        assert priority == Priority.ALERT
+        assert kwargs == {'chat_id': 1, 'text': 'Alert'}
 
-        with patch('asyncio.run_coroutine_threadsafe') as mock_run_threadsafe:
-            telegram_connection.send_message(
-                12345, "Test message",
-                parse_mode="HTML",
-                reply_to_message_id=67890
-            )
+    @pytest.mark.asyncio
+    async def test_alerts_sent_before_chat_and_notifications(self, telegram_connection):
+        """Test queued messages are sent in priority order"""
+        sent = []
+
+        async def send(*args, **kwargs):
+            sent.append(kwargs['text'])
+
+        telegram_connection.application.bot = MagicMock()
+        telegram_connection.application.bot.send_message = send
+        telegram_connection.send_message_sync(chat_id=1, text='node', priority=Priority.NOTIFICATION)
+        telegram_connection.send_message_sync(chat_id=2, text='chat')
+        telegram_connection.send_message_sync(chat_id=3, text='alert', priority=Priority.ALERT)
+        await telegram_connection.start_queue_processor()
+        for _ in range(100):
+            if len(sent) == 3:
+                break
+            await asyncio.sleep(0.01)
+        await telegram_connection.stop_queue_processor()
+        assert sent == ['alert', 'chat', 'node']
+
+    @pytest.mark.asyncio
+    async def test_retry_after_requeues_message(self, telegram_connection):
+        """Test RetryAfter pauses chat and message is delivered afterwards"""
+        class RetryAfter(Exception):
+            def __init__(self, retry_after):
+                super().__init__('Flood control exceeded')
+                self.retry_after = retry_after
+
+        calls = []
+
+        async def send(*args, **kwargs):
+            calls.append(kwargs['text'])
+            if len(calls) == 1:
+                raise RetryAfter(0.05)
+
+        telegram_connection.application.bot = MagicMock()
+        telegram_connection.application.bot.send_message = send
+        await telegram_connection.start_queue_processor()
+        telegram_connection.send_message(chat_id=-100, text='first')
+        telegram_connection.send_message(chat_id=-100, text='second')
+        for _ in range(100):
+            if len(calls) == 3:
+                break
+            await asyncio.sleep(0.01)
+        stats = telegram_connection.stats()
+        await telegram_connection.stop_queue_processor()
+        assert calls == ['first', 'first', 'second']
+        assert stats['retried'] == 1
+        assert stats['sent'] == 2
+        assert stats['failed'] == 0
+        assert stats['chats']['-100']['sent'] == 2
+        assert stats['chats']['-100']['wait_max'] >= 0.05
 
-            mock_run_threadsafe.assert_called_once()
+    @pytest.mark.asyncio
+    async def test_send_message_sync_from_thread(self, telegram_connection):
+        """Test send_message_sync from other thread is handed over with call_soon_threadsafe"""
+        telegram_connection.application.bot = AsyncMock()
+        await telegram_connection.start_queue_processor()
+        thread = threading.Thread(target=telegram_connection.send_message_sync,
+                                  kwargs={'chat_id': 12345, 'text': 'From mesh'})
+        thread.start()
+        thread.join()
+        for _ in range(100):
+            if telegram_connection.application.bot.send_message.await_count:
+                break
+            await asyncio.sleep(0.01)
+        await telegram_connection.stop_queue_processor()
+        telegram_connection.application.bot.send_message.assert_awaited_once_with(chat_id=12345, text='From mesh')
+        assert telegram_connection.stats()['sent'] == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_latency_under_load(self, telegram_connection):
+        """Test mesh threads never wait for event loop and every queued message is delivered"""
+        delivered = []
+
+        async def slow_send(*args, **kwargs):
+            await asyncio.sleep(0.001)
+            delivered.append(kwargs['text'])
+
+        telegram_connection.application.bot = MagicMock()
+        telegram_connection.application.bot.send_message = slow_send
+        telegram_connection.lag_interval = 0.05
+        await telegram_connection.start_queue_processor()
+
+        def producer(num):
+            for seq in range(5):
+                telegram_connection.send_message_sync(chat_id=num * 10 + seq, text=f'mesh {num}.{seq}')
+
+        producers = [threading.Thread(target=producer, args=(num,)) for num in range(4)]
+        for thread in producers:
+            thread.start()
+        # event loop is blocked here on purpose, producers finish only if enqueueing never waits for it
+        for thread in producers:
+            thread.join(timeout=5)
+        assert not any(thread.is_alive() for thread in producers)
+        assert delivered == []
+        for _ in range(200):
+            if len(delivered) == 20:
+                break
+            await asyncio.sleep(0.01)
+        stats = telegram_connection.stats()
+        await telegram_connection.stop_queue_processor()
+
+        assert sorted(delivered) == sorted(f'mesh {num}.{seq}' for num in range(4) for seq in range(5))
+        assert stats['sent'] == 20
+        assert stats['loop_lag_max'] < 1.0
 
     def test_poll(self, telegram_connection):
         """Test poll method"""
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 """ Utilities module """
 
-from .geo import get_lat_lon_distance
+from .geo import get_lat_lon_distance, nearest_points
 from .degrees import deg_to_cardinal
+from .geohash import geohash
+from .regions import RegionIndex
+from .reverse import ReverseGeocoder
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 """ Geographical utilities module """
 
+from typing import List, Sequence, Tuple
+
 import haversine
+import numpy as np
 
 
 def get_lat_lon_distance(latlon1: tuple, latlon2: tuple) -> float:
@@ -17,3 +20,27 @@ def get_lat_lon_distance(latlon1: tuple, latlon2: tuple) -> float:
     if not isinstance(latlon2, tuple):
         raise RuntimeError('Tuple expected for latlon2')
     return haversine.haversine(latlon1, latlon2, unit=haversine.Unit.METERS)
+
+
+def nearest_points(origin: Tuple[float, float], points: Sequence[Tuple[float, float]],
+                   count: int) -> List[Tuple[int, float]]:
+    """
+    Find points closest to origin. Distances are computed in single vectorized pass,
+    only selected points are sorted
+
+    :param origin: (lat, lon)
+    :param points: (lat, lon) pairs
+    :param count:
+    :return: (index in points, distance in meters) pairs, closest first
+    """
+    if not points or count <= 0:
+        return []
+    coordinates = np.asarray(points, dtype=float)
+    distances = haversine.haversine_vector(coordinates, np.broadcast_to(origin, coordinates.shape),
+                                           unit=haversine.Unit.METERS)
+    if count < len(distances):
+        selected = np.argpartition(distances, count)[:count]
+    else:
+        selected = np.arange(len(distances))
+    selected = selected[np.argsort(distances[selected], kind='stable')]
+    return [(int(pos), float(distances[pos])) for pos in selected]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+""" Geohash module """
+
+from typing import List
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat: float, lon: float, precision: int = 5) -> str:
+    """
+    geohash - encode coordinates as geohash cell. Precision 5 is ~4.9 x 4.9 km cell
+
+    :param lat:
+    :param lon:
+    :param precision: number of characters
+    :return:
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    result: List[str] = []
+    bits, char, even = 0, 0, True
+    while len(result) < precision:
+        # even bits split longitude, odd ones latitude
+        interval, value = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        char <<= 1
+        if value >= middle:
+            char |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            result.append(BASE32[char])
+            bits, char = 0, 0
+    return ''.join(result)
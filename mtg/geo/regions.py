@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+""" Offline admin region (admin1) lookup module """
+
+import json
+import logging
+import math
+import time
+from threading import RLock
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+Point = Tuple[float, float]
+Ring = List[Point]
+
+
+class Region(NamedTuple):
+    """
+    Region - simplified region polygons, each polygon is outer ring followed by holes
+    """
+    name: str
+    polygons: List[List[Ring]]
+    bbox: Tuple[float, float, float, float]
+
+
+def simplify(ring: Ring, tolerance: float) -> Ring:  # pylint:disable=too-many-locals
+    """
+    simplify - Douglas-Peucker ring simplification, tolerance in degrees
+
+    :param ring:
+    :param tolerance:
+    :return:
+    """
+    if tolerance <= 0 or len(ring) < 5:
+        return ring
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = ring[first], ring[last]
+        length = math.hypot(x2 - x1, y2 - y1)
+        farthest, distance = 0, 0.0
+        for pos in range(first + 1, last):
+            x0, y0 = ring[pos]
+            if length:
+                current = abs((x2 - x1) * (y1 - y0) - (x1 - x0) * (y2 - y1)) / length
+            else:
+                current = math.hypot(x0 - x1, y0 - y1)
+            if current > distance:
+                farthest, distance = pos, current
+        if distance > tolerance:
+            keep[farthest] = True
+            stack.extend(((first, farthest), (farthest, last)))
+    result = [point for point, kept in zip(ring, keep) if kept]
+    # too coarse tolerance for tiny ring, keep original shape
+    return result if len(result) >= 4 else ring
+
+
+def in_ring(lon: float, lat: float, ring: Ring) -> bool:
+    """
+    in_ring - ray casting point in polygon test
+
+    :param lon:
+    :param lat:
+    :param ring:
+    :return:
+    """
+    inside = False
+    x2, y2 = ring[-1]
+    for x1, y1 in ring:
+        if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x2, y2 = x1, y1
+    return inside
+
+
+# pylint:disable=too-many-instance-attributes
+class RegionIndex:
+    """
+    RegionIndex - admin1 lookup from GeoJSON region polygons (e.g. geoBoundaries ADM1 of single country).
+    Polygons are simplified and indexed by bounding box grid on first query.
+    search() returns reverse_geocoder compatible results
+    """
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, path: str, logger: logging.Logger, name_property: str = 'name',
+                 tolerance: float = 0.01, cell_size: float = 0.1) -> None:
+        self.path = path
+        self.logger = logger
+        self.name_property = name_property
+        self.tolerance = tolerance
+        self.cell_size = cell_size
+        self.lock = RLock()
+        self.regions: List[Region] = []
+        # grid cell -> indexes of regions which bounding box overlaps it
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        # grid cell lying entirely inside single region -> region index, no polygon test needed
+        self.pure: Dict[Tuple[int, int], int] = {}
+        # cells crossed by region edges. Other cells are either pure or outside of all regions
+        self.boundary: Set[Tuple[int, int]] = set()
+        # (grid row, region index) -> region edges overlapping row, ray casting in boundary cells
+        # looks at these few edges instead of whole rings
+        self.slabs: Dict[Tuple[int, int], List[Tuple[float, float, float, float]]] = {}
+        self.loaded = False
+
+    def cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        """
+        cell - grid cell of point
+
+        :param lon:
+        :param lat:
+        :return:
+        """
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+
+    def feature_name(self, properties: Dict[str, Any]) -> Optional[str]:
+        """
+        feature_name - region name from GeoJSON feature properties
+
+        :param properties:
+        :return:
+        """
+        for key in (self.name_property, 'name', 'shapeName', 'admin1', 'NAME_1'):
+            if properties.get(key):
+                return str(properties[key])
+        return None
+
+    def add_feature(self, feature: Dict[str, Any]) -> None:
+        """
+        add_feature - simplify and index single GeoJSON feature
+
+        :param feature:
+        :return:
+        """
+        geometry = feature.get('geometry') or {}
+        name = self.feature_name(feature.get('properties') or {})
+        if name is None:
+            return
+        if geometry.get('type') == 'Polygon':
+            raw = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            raw = geometry['coordinates']
+        else:
+            return
+        polygons = [[simplify([(float(x), float(y)) for x, y, *_ in ring], self.tolerance) for ring in polygon]
+                    for polygon in raw if polygon]
+        points = [point for polygon in polygons for point in polygon[0]]
+        if not points:
+            return
+        bbox = (min(x for x, _ in points), min(y for _, y in points),
+                max(x for x, _ in points), max(y for _, y in points))
+        self.regions.append(Region(name, polygons, bbox))
+        (min_x, min_y), (max_x, max_y) = self.cell(bbox[0], bbox[1]), self.cell(bbox[2], bbox[3])
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                self.grid.setdefault((cell_x, cell_y), []).append(len(self.regions) - 1)
+        self.add_pure_cells(len(self.regions) - 1, [ring for polygon in polygons for ring in polygon])
+
+    def add_pure_cells(self, pos: int, rings: List[Ring]) -> None:  # pylint:disable=too-many-locals
+        """
+        add_pure_cells - find cells without region edges whose centers are inside region
+        and collect region edges of every grid row.
+        Scanline over cell row centers, even-odd rule handles holes and islands
+
+        :param pos: region index
+        :param rings: all rings of region
+        :return:
+        """
+        size = self.cell_size
+        boundary: Set[Tuple[int, int]] = set()
+        crossings: Dict[int, List[float]] = {}
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                min_x, min_y = self.cell(min(x1, x2), min(y1, y2))
+                max_x, max_y = self.cell(max(x1, x2), max(y1, y2))
+                boundary.update((cell_x, cell_y) for cell_x in range(min_x, max_x + 1)
+                                for cell_y in range(min_y, max_y + 1))
+                for row in range(min_y, max_y + 1):
+                    self.slabs.setdefault((row, pos), []).append((x1, y1, x2, y2))
+                    center = (row + 0.5) * size
+                    if (y1 > center) != (y2 > center):
+                        crossings.setdefault(row, []).append(x1 + (x2 - x1) * (center - y1) / (y2 - y1))
+        for row, xs in crossings.items():
+            xs.sort()
+            for start, end in zip(xs[::2], xs[1::2]):
+                for column in range(math.ceil(start / size), math.floor(end / size)):
+                    if (column, row) not in boundary:
+                        self.pure[(column, row)] = pos
+        self.boundary.update(boundary)
+
+    def load(self) -> None:
+        """
+        load - read regions file, done once on first query
+
+        :return:
+        """
+        with self.lock:
+            if self.loaded:
+                return
+            started = time.time()
+            try:
+                with open(self.path, 'r', encoding='utf-8') as regions_file:
+                    data = json.load(regions_file)
+                for feature in data.get('features', []):
+                    self.add_feature(feature)
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                self.logger.error(f'Could not load regions from {self.path}: {exc}')
+            self.loaded = True
+            self.logger.info(f'Loaded {len(self.regions)} regions in {time.time() - started:.3f}s')
+
+    def locate(self, cell: Tuple[int, int], lat: float, lon: float) -> Optional[str]:
+        """
+        locate - region of point in boundary cell. Even-odd ray casting over edges of cell row
+
+        :param cell:
+        :param lat:
+        :param lon:
+        :return:
+        """
+        for pos in self.grid.get(cell, ()):
+            inside = False
+            for x1, y1, x2, y2 in self.slabs.get((cell[1], pos), ()):
+                if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+                    inside = not inside
+            if inside:
+                return self.regions[pos].name
+        return None
+
+    def region(self, lat: float, lon: float) -> Optional[str]:
+        """
+        region - admin1 name of point, None if point is outside of all regions
+
+        :param lat:
+        :param lon:
+        :return:
+        """
+        return self.search([(lat, lon)])[0]['admin1'] or None
+
+    def search(self, coordinates: Sequence[Point]) -> List[Dict[str, str]]:
+        """
+        search - batch lookup with reverse_geocoder.search compatible result.
+        Most points fall into pure cells and cost single dict lookup
+
+        :param coordinates: (lat, lon) pairs
+        :return:
+        """
+        if not self.loaded:
+            self.load()
+        size, pure, boundary, regions = self.cell_size, self.pure, self.boundary, self.regions
+        floor = math.floor
+        result = []
+        for lat, lon in coordinates:
+            cell = (floor(lon / size), floor(lat / size))
+            if (pos := pure.get(cell)) is not None:
+                name = regions[pos].name
+            elif cell in boundary:
+                name = self.locate(cell, lat, lon) or ''
+            else:
+                name = ''
+            result.append({'admin1': name})
+        return result
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+""" Cached reverse geocoding module """
+
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class ReverseGeocoder:
+    """
+    ReverseGeocoder - admin1 lookup with memo keyed on rounded coordinates.
+    Cache misses of one batch are resolved by a single search call
+    """
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, search_fn: Callable[[List[Tuple[float, float]]], Any], precision: int = 2,
+                 ttl: float = 86400.0, max_size: int = 10000) -> None:
+        # 2 decimal places are ~1.1 km of latitude, fine for region lookup
+        self.search_fn = search_fn
+        self.precision = precision
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = RLock()
+        self.cache: OrderedDict[Tuple[float, float], Tuple[Optional[str], float]] = OrderedDict()
+        self.counters = {'hits': 0, 'misses': 0, 'searches': 0}
+
+    def key(self, lat: float, lon: float) -> Tuple[float, float]:
+        """
+        key - cache key for coordinates
+
+        :param lat:
+        :param lon:
+        :return:
+        """
+        return round(float(lat), self.precision), round(float(lon), self.precision)
+
+    def _cached(self, key: Tuple[float, float], now: float) -> Tuple[bool, Optional[str]]:
+        item = self.cache.get(key)
+        if item is None or now - item[1] > self.ttl:
+            return False, None
+        self.cache.move_to_end(key)
+        return True, item[0]
+
+    def lookup_many(self, coordinates: Sequence[Tuple[float, float]]) -> List[Optional[str]]:
+        """
+        lookup_many - admin1 for every coordinate pair, None if unknown
+
+        :param coordinates:
+        :return:
+        """
+        now = time.time()
+        keys = [self.key(lat, lon) for lat, lon in coordinates]
+        found: Dict[Tuple[float, float], Optional[str]] = {}
+        with self.lock:
+            for key in keys:
+                hit, value = self._cached(key, now)
+                if hit:
+                    found[key] = value
+            misses = [key for key in dict.fromkeys(keys) if key not in found]
+            self.counters['hits'] += len(keys) - len(misses)
+            self.counters['misses'] += len(misses)
+        if misses:
+            results = self.search_fn(misses) or []
+            with self.lock:
+                self.counters['searches'] += 1
+                for pos, key in enumerate(misses):
+                    value = results[pos].get('admin1') if pos < len(results) else None
+                    found[key] = value
+                    self.cache[key] = (value, now)
+                    self.cache.move_to_end(key)
+                while len(self.cache) > self.max_size:
+                    self.cache.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def lookup(self, lat: float, lon: float) -> Optional[str]:
+        """
+        lookup - admin1 for single coordinate pair
+
+        :param lat:
+        :param lon:
+        :return:
+        """
+        return self.lookup_many([(lat, lon)])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - cache size and hit counters
+
+        :return:
+        """
+        with self.lock:
+            return dict(self.counters, size=len(self.cache))
@@ -54,4 +54,15 @@ def test_get_lat_lon_distance_haversine_called(mock_haversine):
     result = get_lat_lon_distance(point1, point2)
 
     mock_haversine.assert_called_once()
-    assert result == 1000.0
\ No newline at end of file
+    assert result == 1000.0
+
+def test_nearest_points():
+    """Test closest points are returned in order with haversine distances"""
+    from mtg.geo.geo import nearest_points
+    origin = (50.0, 30.0)
+    points = [(51.0, 30.0), (50.0, 30.1), (60.0, 30.0), (50.5, 30.0)]
+    result = nearest_points(origin, points, 2)
+    assert [pos for pos, _ in result] == [1, 3]
+    assert result[0][1] == pytest.approx(get_lat_lon_distance(origin, points[1]))
+    assert [pos for pos, _ in nearest_points(origin, points, 10)] == [1, 3, 0, 2]
+    assert nearest_points(origin, [], 3) == []
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+from mtg.geo.geohash import geohash
+
+
+def test_geohash_known_cells():
+    """Test reference geohash values"""
+    assert geohash(57.64911, 10.40744, precision=11) == 'u4pruydqqvj'
+    assert geohash(50.4501, 30.5234) == 'u8vxn'
+    assert geohash(-33.8688, 151.2093, precision=3) == 'r3g'
+
+
+def test_geohash_nearby_points_share_cell():
+    """Test nearby points share cell, distant ones do not"""
+    assert geohash(50.4501, 30.5234) == geohash(50.4510, 30.5240)
+    assert geohash(50.4501, 30.5234) != geohash(50.6, 30.5234)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import json
+import math
+import random
+import pytest
+from unittest.mock import MagicMock
+
+from mtg.geo.regions import RegionIndex, in_ring, simplify
+
+
+def square(min_x, min_y, max_x, max_y):
+    """Closed square ring"""
+    return [[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y], [min_x, min_y]]
+
+
+@pytest.fixture
+def regions_file(tmp_path):
+    """Two regions, second one has hole and separate island"""
+    data = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'shapeName': 'West'},
+         'geometry': {'type': 'Polygon', 'coordinates': [square(24.0, 48.0, 26.0, 50.0)]}},
+        {'type': 'Feature', 'properties': {'shapeName': 'East'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [
+             [square(26.0, 48.0, 30.0, 50.0), square(27.0, 48.5, 28.0, 49.5)],
+             [square(31.0, 45.0, 32.0, 46.0)],
+         ]}},
+        {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [square(0, 0, 1, 1)]}},
+    ]}
+    path = tmp_path / 'regions.geojson'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+
+def test_simplify():
+    """Test nearly collinear points are dropped, corners kept"""
+    ring = [(0.0, 0.0), (1.0, 0.001), (2.0, 0.0), (2.0, 2.0), (1.0, 2.001), (0.0, 2.0), (0.0, 0.0)]
+    assert simplify(ring, 0.01) == [(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0), (0.0, 0.0)]
+    assert simplify(ring, 0) == ring
+
+
+def test_in_ring():
+    """Test ray casting"""
+    ring = [(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)]
+    assert in_ring(1.0, 1.0, ring)
+    assert not in_ring(3.0, 1.0, ring)
+
+
+def test_lookup_lazy(regions_file):
+    """Test regions are loaded on first query, holes and islands are respected"""
+    index = RegionIndex(regions_file, MagicMock())
+    assert not index.loaded
+    assert index.region(49.0, 25.0) == 'West'
+    assert index.loaded
+    assert len(index.regions) == 2
+    assert index.region(49.0, 29.5) == 'East'
+    assert index.region(49.0, 27.5) is None
+    assert index.region(45.5, 31.5) == 'East'
+    assert index.region(10.0, 10.0) is None
+    assert index.search([(49.0, 25.0), (0.5, 0.5)]) == [{'admin1': 'West'}, {'admin1': ''}]
+
+
+def test_boundary_cells_match_ray_casting(tmp_path):
+    """Test edge slabs of boundary cells give same answer as ray casting over whole ring"""
+    ring = [[28.0 + math.cos(angle) * (1.0 + 0.3 * math.sin(5 * angle)),
+             49.0 + math.sin(angle) * (1.0 + 0.3 * math.sin(5 * angle))]
+            for angle in (2 * math.pi * pos / 200 for pos in range(200))]
+    ring.append(ring[0])
+    path = tmp_path / 'star.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'name': 'Star'},
+         'geometry': {'type': 'Polygon', 'coordinates': [ring]}}]}), encoding='utf-8')
+    index = RegionIndex(str(path), MagicMock(), tolerance=0)
+    points = [(random.uniform(47.5, 50.5), random.uniform(26.5, 29.5)) for _ in range(2000)]
+    expected = [{'admin1': 'Star' if in_ring(lon, lat, [tuple(point) for point in ring]) else ''}
+                for lat, lon in points]
+    assert index.search(points) == expected
+
+
+def test_missing_file(tmp_path):
+    """Test missing file is logged once, lookups return nothing"""
+    logger = MagicMock()
+    index = RegionIndex(str(tmp_path / 'none.geojson'), logger)
+    assert index.region(49.0, 25.0) is None
+    assert index.region(49.0, 25.0) is None
+    logger.error.assert_called_once()
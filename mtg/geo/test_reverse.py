@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import pytest
+from unittest.mock import MagicMock, patch
+
+from mtg.geo.reverse import ReverseGeocoder
+
+
+@pytest.fixture
+def search():
+    """Search function returning admin1 named after rounded latitude"""
+    return MagicMock(side_effect=lambda coordinates: [{'admin1': f'R{lat}'} for lat, _ in coordinates])
+
+
+def test_batch_single_search(search):
+    """Test misses of one batch are resolved by single search, nearby points share key"""
+    geocoder = ReverseGeocoder(search)
+    result = geocoder.lookup_many([(50.4501, 30.5234), (50.4521, 30.5201), (46.4825, 30.7233)])
+    assert result == ['R50.45', 'R50.45', 'R46.48']
+    search.assert_called_once_with([(50.45, 30.52), (46.48, 30.72)])
+    assert geocoder.lookup(50.4499, 30.5249) == 'R50.45'
+    assert search.call_count == 1
+    assert geocoder.stats() == {'hits': 2, 'misses': 2, 'searches': 1, 'size': 2}
+
+
+def test_empty_results(search):
+    """Test failed search is cached as unknown"""
+    search.side_effect = lambda coordinates: None
+    geocoder = ReverseGeocoder(search)
+    assert geocoder.lookup(1.0, 2.0) is None
+    assert geocoder.lookup(1.0, 2.0) is None
+    search.assert_called_once()
+
+
+@patch('mtg.geo.reverse.time')
+def test_ttl_and_size(mock_time, search):
+    """Test entries expire and cache is bounded"""
+    mock_time.time.return_value = 1000.0
+    geocoder = ReverseGeocoder(search, ttl=60, max_size=2)
+    geocoder.lookup(1.0, 1.0)
+    mock_time.time.return_value = 1100.0
+    geocoder.lookup(1.0, 1.0)
+    assert search.call_count == 2
+    geocoder.lookup_many([(2.0, 2.0), (3.0, 3.0)])
+    assert list(geocoder.cache) == [(2.0, 2.0), (3.0, 3.0)]
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+""" Local message ingestion: protocol and lightweight client """
+
+from .client import IngestClient, add_post_arguments, post2mesh
+from .protocol import DEFAULT_FIFO, DEFAULT_SOCKET, encode_message, parse_line
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+""" Lightweight post2mesh client. Standard library only, so alert scripts start fast """
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .protocol import DEFAULT_FIFO, DEFAULT_SOCKET, PRIORITIES, encode_message
+
+
+class IngestClient:  # pylint:disable=too-few-public-methods
+    """
+    IngestClient - streams messages to gateway ingestion socket
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: float = 30.0) -> None:
+        self.path = path
+        self.timeout = timeout
+
+    def post(self, lines: Iterable[bytes]) -> Dict[str, Any]:
+        """
+        post - send request lines over single connection and wait for summary
+
+        :param lines: encoded request lines, see encode_message
+        :return: {'queued': int, 'failed': int, 'errors': [...]}
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            for line in lines:
+                sock.sendall(line)
+            sock.shutdown(socket.SHUT_WR)
+            response = bytearray()
+            while chunk := sock.recv(4096):
+                response.extend(chunk)
+        return json.loads(response.decode('utf-8'))
+
+
+def read_messages(args: argparse.Namespace) -> Iterator[str]:
+    """
+    read_messages - messages from command line, then from stdin if requested
+
+    :param args:
+    :return:
+    """
+    messages = list(args.message or [])
+    stdin = args.stdin or '-' in messages
+    for message in messages:
+        if message != '-':
+            yield message
+    if stdin:
+        for line in sys.stdin:
+            if line := line.rstrip('\n'):
+                yield line
+
+
+def post_fifo(messages: Iterable[str], path: str = DEFAULT_FIFO) -> int:
+    """
+    post_fifo - broadcast messages using gateway FIFO
+
+    :param messages:
+    :param path:
+    :return: number of messages
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as fifo:
+        for message in messages:
+            fifo.write(f'{message}\n')
+            count += 1
+    return count
+
+
+def post2mesh(args: argparse.Namespace) -> Optional[str]:
+    """
+    post2mesh - send messages from console using Meshtastic networks. For alerts etc
+
+    :param args:
+    :return:
+    """
+    if not args.message and not args.stdin:
+        logging.error('Cannot send empty message...')
+        return None
+    messages = read_messages(args)
+    lines = (encode_message(message, args.destination, args.channel, args.priority) for message in messages)
+    try:
+        result = IngestClient(args.socket).post(lines)
+    except (FileNotFoundError, ConnectionRefusedError):
+        if (args.destination, args.channel, args.priority) != (None, None, None):
+            logging.error('Gateway socket %s is not available', args.socket)
+            return None
+        if not os.path.exists(args.fifo):
+            logging.error('Gateway FIFO %s is not available', args.fifo)
+            return None
+        # older gateway or socket disabled
+        return f'queued: {post_fifo(messages, args.fifo)} (FIFO)'
+    for error in result.get('errors', []):
+        logging.error(error)
+    return f"queued: {result.get('queued', 0)}, failed: {result.get('failed', 0)}"
+
+
+def add_post_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    add_post_arguments - post2mesh command line options
+
+    :param parser:
+    :return:
+    """
+    parser.add_argument("-m", "--message", action="append",
+                        help="message to post to Meshtastic, can be repeated. '-' reads stdin")
+    parser.add_argument("--stdin", action="store_true", help="read messages from stdin, one per line")
+    parser.add_argument("-d", "--destination", help="destination node id, e.g. !a1b2c3d4. Broadcast by default")
+    parser.add_argument("--channel", type=int, help="channel index")
+    parser.add_argument("-p", "--priority", choices=PRIORITIES, help="outbound priority")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="gateway ingestion socket")
+    parser.add_argument("--fifo", default=DEFAULT_FIFO, help="gateway FIFO, used when socket is not available")
+
+
+def main(argv: List[str]) -> None:
+    """
+    main - post2mesh entry point that does not load the gateway
+
+    :param argv:
+    :return:
+    """
+    parser = argparse.ArgumentParser(prog='mesh.py post2mesh')
+    add_post_arguments(parser)
+    result = post2mesh(parser.parse_args(argv))
+    if result is None:
+        sys.exit(1)
+    print(result)
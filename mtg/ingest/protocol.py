@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+""" Local ingestion protocol. Standard library only, shared by gateway and post2mesh client """
+
+import json
+from typing import Any, Dict, List
+
+DEFAULT_SOCKET = '/tmp/mtg.sock'
+DEFAULT_FIFO = '/tmp/mtg.fifo'
+BROADCAST_ADDR = '^all'
+# names of mtg.connection.meshtastic.Priority members
+PRIORITIES = ('command', 'direct', 'broadcast', 'bulk')
+MAX_CHANNEL = 7
+
+
+def encode_message(text: str, destination: Any = None, channel: Any = None, priority: Any = None) -> bytes:
+    """
+    encode_message - single request line. Options that are not set are omitted
+
+    :param text:
+    :param destination:
+    :param channel:
+    :param priority:
+    :return:
+    """
+    message: Dict[str, Any] = {'text': text}
+    if destination is not None:
+        message['destination'] = destination
+    if channel is not None:
+        message['channel'] = channel
+    if priority is not None:
+        message['priority'] = priority
+    return json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def validate_message(message: Any) -> Dict[str, Any]:
+    """
+    validate_message - check request fields and fill defaults
+
+    :param message:
+    :return:
+    """
+    if not isinstance(message, dict):
+        raise ValueError('message should be an object')
+    text = message.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError('text is required')
+    destination = message.get('destination', BROADCAST_ADDR)
+    if not isinstance(destination, (str, int)) or isinstance(destination, bool):
+        raise ValueError(f'bad destination: {destination!r}')
+    channel = message.get('channel', 0)
+    if not isinstance(channel, int) or isinstance(channel, bool) or not 0 <= channel <= MAX_CHANNEL:
+        raise ValueError(f'bad channel: {channel!r}')
+    priority = message.get('priority')
+    if priority is not None:
+        if not isinstance(priority, str) or priority.lower() not in PRIORITIES:
+            raise ValueError(f'bad priority: {priority!r}')
+        priority = priority.lower()
+    return {'text': text, 'destination': destination, 'channel': channel, 'priority': priority}
+
+
+def parse_line(line: str) -> List[Dict[str, Any]]:
+    """
+    parse_line - request line is JSON object, JSON array of objects (batch) or plain text to broadcast.
+    Line that only looks like JSON (e.g. "[INFO] done") is plain text as well
+
+    :param line:
+    :return:
+    """
+    stripped = line.strip()
+    if not stripped:
+        return []
+    if stripped[0] not in '{[':
+        return [validate_message({'text': line})]
+    try:
+        request = json.loads(stripped)
+    except json.JSONDecodeError:
+        return [validate_message({'text': line})]
+    if isinstance(request, list):
+        return [validate_message(message) for message in request]
+    return [validate_message(request)]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import argparse
+import io
+import pytest
+from unittest.mock import MagicMock, patch
+
+from mtg.ingest.client import add_post_arguments, post2mesh, read_messages
+
+
+def parse(argv):
+    """Parse post2mesh arguments"""
+    parser = argparse.ArgumentParser()
+    add_post_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_read_messages_from_args_and_stdin():
+    """Test messages from -m go first, then stdin lines"""
+    args = parse(['-m', 'one', '-m', '-'])
+    with patch('sys.stdin', io.StringIO('two\n\nthree\n')):
+        assert list(read_messages(args)) == ['one', 'two', 'three']
+
+
+def test_post2mesh_empty():
+    """Test nothing to send"""
+    assert post2mesh(parse([])) is None
+
+
+@patch('mtg.ingest.client.IngestClient')
+def test_post2mesh_socket(mock_client_class):
+    """Test messages are encoded with options and streamed over socket"""
+    mock_client = mock_client_class.return_value
+    sent = []
+    mock_client.post.side_effect = lambda lines: sent.extend(lines) or {'queued': 2, 'failed': 0}
+    result = post2mesh(parse(['-m', 'a', '-m', 'b', '-d', '!a1b2c3d4', '-p', 'bulk', '--channel', '1']))
+    assert result == 'queued: 2, failed: 0'
+    assert sent[0] == b'{"text": "a", "destination": "!a1b2c3d4", "channel": 1, "priority": "bulk"}\n'
+    assert len(sent) == 2
+
+
+@patch('mtg.ingest.client.IngestClient')
+def test_post2mesh_fifo_fallback(mock_client_class, tmp_path):
+    """Test broadcast falls back to FIFO when socket is not available"""
+    mock_client_class.return_value.post.side_effect = FileNotFoundError
+    fifo = tmp_path / 'mtg.fifo'
+    fifo.write_text('')
+    assert post2mesh(parse(['-m', 'a', '-m', 'b', '--fifo', str(fifo)])) == 'queued: 2 (FIFO)'
+    assert fifo.read_text() == 'a\nb\n'
+
+
+@patch('mtg.ingest.client.IngestClient')
+def test_post2mesh_no_fallback_with_options(mock_client_class, tmp_path):
+    """Test FIFO can not carry destination, so request fails"""
+    mock_client_class.return_value.post.side_effect = ConnectionRefusedError
+    fifo = tmp_path / 'mtg.fifo'
+    fifo.write_text('')
+    assert post2mesh(parse(['-m', 'a', '-d', '!a1b2c3d4', '--fifo', str(fifo)])) is None
+    assert fifo.read_text() == ''
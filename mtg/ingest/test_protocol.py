@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import json
+import pytest
+
+from mtg.ingest.protocol import encode_message, parse_line
+
+
+def test_encode_message_omits_defaults():
+    """Test only set options are encoded"""
+    assert json.loads(encode_message('hi')) == {'text': 'hi'}
+    line = encode_message('привіт', destination='!a1b2c3d4', channel=1, priority='bulk')
+    assert line.endswith(b'\n')
+    assert json.loads(line) == {'text': 'привіт', 'destination': '!a1b2c3d4', 'channel': 1, 'priority': 'bulk'}
+
+
+def test_parse_plain_text():
+    """Test plain text line is broadcast"""
+    assert parse_line('Alert: test\n') == [
+        {'text': 'Alert: test\n', 'destination': '^all', 'channel': 0, 'priority': None}
+    ]
+    assert parse_line('   ') == []
+
+
+@pytest.mark.parametrize('line', ['[INFO] backup done', '{broken', '[1] first item', '{}{}'])
+def test_parse_bracketed_plain_text(line):
+    """Test text starting with bracket that is not JSON is broadcast as is"""
+    assert parse_line(line) == [{'text': line, 'destination': '^all', 'channel': 0, 'priority': None}]
+
+
+def test_parse_object_and_batch():
+    """Test JSON object and JSON array batch"""
+    assert parse_line('{"text": "a", "priority": "BULK", "channel": 2}') == [
+        {'text': 'a', 'destination': '^all', 'channel': 2, 'priority': 'bulk'}
+    ]
+    batch = parse_line('[{"text": "a"}, {"text": "b", "destination": 305419896}]')
+    assert [message['text'] for message in batch] == ['a', 'b']
+    assert batch[1]['destination'] == 305419896
+
+
+@pytest.mark.parametrize('line', [
+    '{"text": ""}',
+    '{"text": "a", "channel": 8}',
+    '{"text": "a", "channel": true}',
+    '{"text": "a", "priority": "urgent"}',
+    '{"text": "a", "destination": [1]}',
+    '[{"text": "a"}, 1]',
+])
+def test_parse_invalid(line):
+    """Test invalid requests are rejected"""
+    with pytest.raises(ValueError):
+        parse_line(line)
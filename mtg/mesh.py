@@ -6,6 +6,9 @@ import argparse
 import logging
 import os
 import sys
+from functools import partial
+from threading import Thread
+from typing import Any, Callable, Dict
 #
 import reverse_geocoder as rg
 import sentry_sdk
@@ -14,14 +17,16 @@ from sentry_sdk.integrations.flask import FlaskIntegration
 from mtg.bot.meshtastic import MeshtasticBot
 from mtg.bot.openai import OpenAIBot
 from mtg.bot.telegram import TelegramBot
-from mtg.config import Config
+from mtg.config import Config, ConfigReloader
 from mtg.connection.aprs import APRSStreamer
-from mtg.connection.meshtastic import FIFO, FIFO_CMD
+from mtg.connection.meshtastic import FIFO_CMD
 from mtg.connection.mqtt import MQTT, MQTTHandler
 from mtg.connection.rich import RichConnection
 from mtg.connection.telegram import TelegramConnection
 from mtg.database import sql_debug, MeshtasticDB
 from mtg.filter import CallSignFilter, MeshtasticFilter, TelegramFilter
+from mtg.geo import RegionIndex
+from mtg.ingest import add_post_arguments, post2mesh
 from mtg.log import setup_logger, LOGFORMAT
 from mtg.utils import create_fifo, ExternalPlugins
 from mtg.utils.thread_manager import ThreadManager
@@ -36,6 +41,46 @@ def before_send(event, hint):  # pylint:disable=unused-argument
     # Remove sensitive data exposure - don't print to stdout
     return event
 
+def openai_options(config: Config) -> Dict[str, Any]:
+    """
+    openai_options - OpenAI bot settings from configuration
+
+    :param config:
+    :return:
+    """
+    return {
+        'workers': int(config.enforce_type(int, config.OpenAI.Workers)),
+        'timeout': float(config.enforce_type(float, config.OpenAI.Timeout)),
+        'rate': (int(config.enforce_type(int, config.OpenAI.RateLimit)),
+                 float(config.enforce_type(float, config.OpenAI.RatePeriod))),
+        'cache_size': int(config.enforce_type(int, config.OpenAI.CacheSize)),
+        'max_packets': int(config.enforce_type(int, config.OpenAI.MaxPackets)),
+    }
+
+
+def region_search(config: Config, basedir: str, logger: logging.Logger, debug: bool) -> Callable:
+    """
+    region_search - admin1 lookup. Region polygons or reverse_geocoder KD-tree (single process)
+    are built in background, so first position query does not wait for them
+
+    :param config:
+    :param basedir:
+    :param logger:
+    :param debug:
+    :return:
+    """
+    warm_up: Callable
+    if regions_file := str(config.WebApp.RegionsFile):
+        index = RegionIndex(os.path.join(basedir, regions_file), logger,
+                            name_property=str(config.WebApp.RegionsNameProperty))
+        search, warm_up = index.search, index.load
+    else:
+        search = partial(rg.search, mode=1, verbose=debug)
+        warm_up = partial(search, [(50.5, 30.5)])
+    Thread(target=warm_up, name='Region Lookup Warm-up', daemon=True).start()
+    return search
+
+
 # pylint:disable=too-many-locals,too-many-statements
 def main(args):
     """
@@ -60,10 +105,9 @@ def main(args):
                         before_send=before_send,
                         integrations=[FlaskIntegration()]
         )
-    # warm up reverse cache
-    rg.search((50.5, 30.5), verbose=debug)
     # our logger
     logger = setup_logger('mesh', level)
+    rg_search = region_search(config, args.basedir, logger, debug)
     # meshtastic logger
     logging.basicConfig(level=level,
                         format=LOGFORMAT)
@@ -73,7 +117,7 @@ def main(args):
     #
     telegram_connection = TelegramConnection(config.Telegram.Token, logger)
     meshtastic_connection = RichConnection(config.Meshtastic.Device, logger, config, meshtastic_filter,
-                                           database, rg_fn=rg.search)
+                                           database, rg_fn=rg_search)
     database.set_meshtastic(meshtastic_connection)
     meshtastic_connection.connect()
     #
@@ -99,8 +143,9 @@ def main(args):
     telegram_bot.set_aprs(aprs_streamer)
     telegram_bot.set_filter(telegram_filter)
     telegram_bot.set_logger(logger)
+    telegram_bot.subscribe()
     #
-    open_ai = OpenAIBot(logger)
+    open_ai = OpenAIBot(logger, **openai_options(config))
     meshtastic_bot = MeshtasticBot(database, config, meshtastic_connection, telegram_connection, open_ai)
     # set filter for MQTT
     mqtt_handler.set_filter(meshtastic_filter)
@@ -117,8 +162,16 @@ def main(args):
                            logger,
                            static_folder=static_folder,
                            template_folder=template_folder)
+    web_server.add_stats('receive', meshtastic_bot.workers.stats)
+    web_server.add_stats('weather', meshtastic_bot.weather.stats)
+    web_server.add_stats('openai', open_ai.stats)
+    web_server.add_stats('telegram', telegram_connection.stats)
+    web_server.add_stats('shortener', telegram_bot.shortener.stats)
+    web_server.add_stats('qr', telegram_bot.channel_qr.stats)
+    web_server.add_stats('traceroute', telegram_bot.traceroutes.stats)
     # external plugins
     external_plugins = ExternalPlugins(database, config, meshtastic_connection, telegram_connection, logger)
+    external_plugins.set_commands(meshtastic_bot.commands)
 
     # Initialize thread manager for runners with restart functionality
     thread_manager = ThreadManager(logger)
@@ -131,7 +184,11 @@ def main(args):
     if config is not None and config.enforce_type(bool, config.Meshtastic.FIFOEnabled):
         thread_manager.register_runner("Meshtastic Connection", meshtastic_connection,
                                   restart_delay=5.0,
-                                  thread_patterns=["Meshtastic Connection", "MeshtasticCmd"])
+                                  thread_patterns=["Meshtastic Connection", "Meshtastic Command"])
+    if meshtastic_connection.ingest is not None:
+        thread_manager.register_runner("Meshtastic Ingest", meshtastic_connection.ingest,
+                                  restart_delay=5.0,
+                                  thread_patterns=["Meshtastic Ingest"])
     if config is not None and config.enforce_type(bool, config.WebApp.Enabled):
         thread_manager.register_runner("Web Server", web_server,
                                   restart_delay=5.0,
@@ -140,6 +197,21 @@ def main(args):
         thread_manager.register_runner("MQTT Connection", mqtt_connection,
                                   restart_delay=10.0,
                                   thread_patterns=["MQTT Connection"])
+    thread_manager.register_runner("Meshtastic Receive", meshtastic_bot.workers,
+                                  restart_delay=5.0,
+                                  thread_patterns=["Meshtastic Receive"])
+    thread_manager.register_runner("Weather Fetch", meshtastic_bot.weather_workers,
+                                  restart_delay=5.0,
+                                  thread_patterns=["Weather Fetch"])
+    thread_manager.register_runner("OpenAI Responder", open_ai.workers,
+                                  restart_delay=5.0,
+                                  thread_patterns=["OpenAI Responder"])
+    thread_manager.register_runner("Node Log Writer", meshtastic_bot.writer,
+                                  restart_delay=5.0,
+                                  thread_patterns=["Node Log Writer"])
+    thread_manager.register_runner("Traceroute Scheduler", telegram_bot.traceroutes,
+                                  restart_delay=5.0,
+                                  thread_patterns=["Traceroute Scheduler"])
     thread_manager.register_runner("External Plugins", external_plugins,
                                   restart_delay=15.0,
                                   thread_patterns=[])
@@ -147,6 +219,52 @@ def main(args):
     # Start all managed runners
     thread_manager.start_all()
 
+    # SIGHUP or `mesh.py command -c reload`. Rooms, hop limit, messages etc. are read on use
+    reloader = ConfigReloader(config, logger)
+    reloader.watch('MQTT Connection', ['MQTT.Host', 'MQTT.Port', 'MQTT.User', 'MQTT.Password', 'MQTT.Topic'],
+                   lambda _: (mqtt_connection.reconfigure(config),
+                              setattr(mqtt_handler, 'topic', config.MQTT.Topic)))
+    reloader.watch('Mesh commands', ['Meshtastic.CommandRateLimit'], lambda _: meshtastic_bot.register_commands())
+    reloader.watch('Weather cache', ['DEFAULT.WeatherCacheTTL'],
+                   lambda _: setattr(meshtastic_bot.weather, 'ttl', config.DEFAULT.WeatherCacheTTL))
+    reloader.watch('MQTT Connection', ['MQTT.Enabled'],
+                   lambda _: thread_manager.toggle_runner("MQTT Connection", mqtt_connection,
+                                                          config.enforce_type(bool, config.MQTT.Enabled),
+                                                          restart_delay=10.0, thread_patterns=["MQTT Connection"]))
+    # FromMeshtastic/ToMeshtastic are read on use, connection settings need new APRS-IS session
+    reloader.watch('APRS Streamer', ['APRS.Enabled', 'APRS.Callsign', 'APRS.Password',
+                                     'WebApp.Center_Latitude', 'WebApp.Center_Longitude'],
+                   lambda _: thread_manager.toggle_runner("APRS Streamer", aprs_streamer,
+                                                          config.enforce_type(bool, config.APRS.Enabled),
+                                                          restart_delay=10.0, thread_patterns=["APRS Streamer"]))
+    reloader.watch('Web Server', ['WebApp.Enabled', 'WebApp.Port'],
+                   lambda _: thread_manager.toggle_runner("Web Server", web_server,
+                                                          config.enforce_type(bool, config.WebApp.Enabled),
+                                                          restart_delay=5.0, thread_patterns=['WebApp Server']))
+    reloader.watch('Region lookup', ['WebApp.RegionsFile', 'WebApp.RegionsNameProperty'],
+                   lambda _: meshtastic_connection.set_region_search(
+                       region_search(config, args.basedir, logger, debug)))
+    reloader.watch('OpenAI Responder', ['OpenAI'],
+                   lambda _: thread_manager.restart_runner("OpenAI Responder",
+                                                           lambda: open_ai.reconfigure(**openai_options(config))))
+    reloader.watch('URL Shortener', ['WebApp.ShortenerTimeout', 'WebApp.ShortenerCacheSize',
+                                     'WebApp.ShortenerCacheTTL', 'WebApp.ShortenerCacheFile'],
+                   lambda _: telegram_bot.shortener.reconfigure(**telegram_bot.shortener_options()))
+    reloader.watch('Traceroute Scheduler', ['Meshtastic.TracerouteConcurrency', 'Meshtastic.TracerouteInterval',
+                                            'Meshtastic.TracerouteTimeout', 'Meshtastic.RouteTableFile'],
+                   lambda _: telegram_bot.traceroutes.reconfigure(**telegram_bot.traceroute_options()))
+    reloader.watch('Node Log Writer', ['Meshtastic.NodeLogFile', 'Meshtastic.NodeLogFormat',
+                                       'Meshtastic.NodeLogFlushRows', 'Meshtastic.NodeLogFlushInterval',
+                                       'Meshtastic.NodeLogRotateSize', 'Meshtastic.NodeLogRotateDaily',
+                                       'Meshtastic.NodeLogCompress', 'Meshtastic.NodeLogKeep'],
+                   lambda _: meshtastic_bot.writer.reconfigure(**meshtastic_bot.writer_options()))
+    # radio, database and receive pool are shared by everything else
+    reloader.require_restart('Telegram.Token', 'Meshtastic.Device', 'Meshtastic.DatabaseFile',
+                             'Meshtastic.ModemPreset', 'Meshtastic.DutyCycle', 'Meshtastic.DutyCycleWindow',
+                             'Meshtastic.ReceiveWorkers', 'Meshtastic.ReceiveQueueSize', 'Meshtastic.FIFOEnabled',
+                             'Meshtastic.IngestSocket', 'Meshtastic.ChannelRoutes')
+    reloader.subscribe()
+
     # our main loop, blocking
     telegram_bot.run()
     logger.info('Exiting...')
@@ -155,19 +273,6 @@ def main(args):
     sys.exit(0)
 
 
-def post2mesh(args):
-    """
-    post2mesh - send messages from console using Meshtastic networks. For alerts etc
-
-    :return:
-    """
-    if args.message is None:
-        logging.error('Cannot send empty message...')
-        return
-    create_fifo(FIFO)
-    with open(FIFO, 'w', encoding='utf-8') as fifo:
-        fifo.write(args.message + '\n')
-
 def post_cmd(args):
     """
     post_cmd - send commands to Meshtastic connection
@@ -192,7 +297,7 @@ def cmd(basedir):
     subparser = parser.add_subparsers(title="commands", help="commands")
 
     post = subparser.add_parser("post2mesh", help="site command")
-    post.add_argument("-m", "--message", help="message to post to Meshtastic")
+    add_post_arguments(post)
     post.set_defaults(func=post2mesh)
     #
     run = subparser.add_parser("run", help="run")
@@ -201,7 +306,7 @@ def cmd(basedir):
     run.set_defaults(func=main)
     #
     reboot = subparser.add_parser("command", help="Send command")
-    reboot.add_argument("-c", "--command", help="Send command")
+    reboot.add_argument("-c", "--command", help="Send command: reboot, reset_db or reload")
     reboot.set_defaults(func=post_cmd)
     #
     argv = sys.argv[1:]
@@ -3,3 +3,4 @@
 
 
 from .csv import CSVFileWriter
+from .nodelog import NodeLogWriter, read_binary
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+""" Buffered, rotating node position log module """
+
+import csv
+import glob
+import gzip
+import io
+import os
+import queue
+import shutil
+import struct
+import time
+from threading import RLock, Thread
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# u16 record length followed by rx time, from, to, snr, latitude, longitude
+BINARY_RECORD = struct.Struct('<dIIfdd')
+BINARY_LENGTH = struct.Struct('<H')
+BROADCAST_NUM = 0xFFFFFFFF
+
+Row = Tuple[float, Any, Any, Any, Any, Any]
+
+
+def node_num(node_id: Any) -> int:
+    """
+    node_num - numeric node id of !abcdef12 style id
+
+    :param node_id:
+    :return:
+    """
+    if node_id == '^all':
+        return BROADCAST_NUM
+    try:
+        return int(str(node_id).lstrip('!'), 16) & BROADCAST_NUM
+    except ValueError:
+        return 0
+
+
+def read_binary(path: str) -> Iterator[Tuple[float, int, int, float, float, float]]:
+    """
+    read_binary - records of binary node log, rotated .gz files are supported
+
+    :param path:
+    :return:
+    """
+    opener: Any = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as log_file:
+        while header := log_file.read(BINARY_LENGTH.size):
+            (length,) = BINARY_LENGTH.unpack(header)
+            record = log_file.read(length)
+            # newer record versions may append fields
+            yield BINARY_RECORD.unpack(record[:BINARY_RECORD.size])
+
+
+# pylint:disable=too-many-instance-attributes
+class NodeLogWriter:
+    """
+    NodeLogWriter - node position log. Rows are buffered in memory and appended in batches,
+    log is rotated by size or day. Rotated files are gzipped and old ones removed on background
+    thread, so writer does not hold its lock while compressing
+    """
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, dst: str = 'logfile.csv', fmt: str = 'csv', flush_rows: int = 100,
+                 flush_interval: float = 30.0, rotate_size: int = 0, rotate_daily: bool = False,
+                 compress: bool = True, keep: int = 0) -> None:
+        self.logger: Any = None
+        self.dst = dst
+        self.fmt = 'binary' if fmt == 'binary' else 'csv'
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = flush_interval
+        self.rotate_size = rotate_size
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.keep = keep
+        self.lock = RLock()
+        self.buffer: List[Row] = []
+        self.last_flush = time.time()
+        self.day: Optional[str] = None
+        self.flusher: Optional[Thread] = None
+        # rotated logs waiting for compression, thread runs while there are any
+        self.rotated: queue.Queue = queue.Queue()
+        self.compressor: Optional[Thread] = None
+        self.exit = False
+        self.counters = {'rows': 0, 'flushes': 0, 'rotations': 0, 'errors': 0}
+
+    # pylint:disable=too-many-arguments,too-many-positional-arguments
+    def reconfigure(self, dst: str = 'logfile.csv', fmt: str = 'csv', flush_rows: int = 100,
+                    flush_interval: float = 30.0, rotate_size: int = 0, rotate_daily: bool = False,
+                    compress: bool = True, keep: int = 0) -> None:
+        """
+        reconfigure - apply new settings, buffered rows are written with old ones first
+
+        :param dst:
+        :param fmt:
+        :param flush_rows:
+        :param flush_interval:
+        :param rotate_size:
+        :param rotate_daily:
+        :param compress:
+        :param keep:
+        :return:
+        """
+        with self.lock:
+            self.flush()
+            if dst != self.dst:
+                self.day = None
+            self.dst = dst
+            self.fmt = 'binary' if fmt == 'binary' else 'csv'
+            self.flush_rows = max(1, flush_rows)
+            self.flush_interval = flush_interval
+            self.rotate_size = rotate_size
+            self.rotate_daily = rotate_daily
+            self.compress = compress
+            self.keep = keep
+
+    def set_logger(self, logger: Any) -> None:
+        """
+        set_logger - set up logger
+
+        :param logger:
+        :return:
+        """
+        self.logger = logger
+
+    def write(self, packet: Dict[str, Any]) -> None:
+        """
+        write - buffer position packet, flushed when buffer or time threshold is reached
+
+        :param packet:
+        :return:
+        """
+        decoded = packet.get('decoded', {})
+        position = decoded.get('position', {})
+        # local node
+        snr = packet.get('rxSnr', 10)
+        row = (time.time(), packet.get('fromId'), packet.get('toId'), snr,
+               position.get('latitude'), position.get('longitude'))
+        with self.lock:
+            self.buffer.append(row)
+            due = len(self.buffer) >= self.flush_rows or time.time() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def encode(self, rows: List[Row]) -> bytes:
+        """
+        encode - rows in configured output format
+
+        :param rows:
+        :return:
+        """
+        if self.fmt == 'binary':
+            records = []
+            for rx_time, from_id, to_id, snr, latitude, longitude in rows:
+                record = BINARY_RECORD.pack(rx_time, node_num(from_id), node_num(to_id), float(snr or 0),
+                                            float(latitude or 0), float(longitude or 0))
+                records.append(BINARY_LENGTH.pack(len(record)) + record)
+            return b''.join(records)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        for rx_time, *fields in rows:
+            writer.writerow([time.strftime('%d.%m.%y %H:%M:%S', time.localtime(rx_time)), *fields])
+        return output.getvalue().encode('utf-8')
+
+    def flush(self) -> None:
+        """
+        flush - append buffered rows to log with single write
+
+        :return:
+        """
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+            self.last_flush = time.time()
+            if not rows:
+                return
+            try:
+                self.rotate_if_needed()
+                with open(self.dst, 'ab') as log_file:
+                    log_file.write(self.encode(rows))
+                self.counters['rows'] += len(rows)
+                self.counters['flushes'] += 1
+            except OSError as exc:
+                self.counters['errors'] += 1
+                if self.logger is not None:
+                    self.logger.error(f'Could not write node log {self.dst}: {exc}')
+
+    def rotate_if_needed(self) -> None:
+        """
+        rotate_if_needed - rotate log when it is too large or was started on another day
+
+        :return:
+        """
+        today = time.strftime('%Y%m%d')
+        if self.day is None:
+            # log left from previous run belongs to the day it was last written
+            self.day = (time.strftime('%Y%m%d', time.localtime(os.path.getmtime(self.dst)))
+                        if os.path.exists(self.dst) else today)
+        if not os.path.exists(self.dst):
+            self.day = today
+            return
+        if (self.rotate_daily and self.day != today) or \
+                (self.rotate_size > 0 and os.path.getsize(self.dst) >= self.rotate_size):
+            self.rotate()
+            self.day = today
+
+    def rotate(self) -> None:
+        """
+        rotate - move current log aside, compression and cleanup are left to background thread
+
+        :return:
+        """
+        with self.lock:
+            base = rotated = f'{self.dst}.{self.day}-{time.strftime("%H%M%S")}'
+            # rotated twice within a second, suffix sorts after the first one
+            count = 0
+            while os.path.exists(rotated) or os.path.exists(f'{rotated}.gz'):
+                count += 1
+                rotated = f'{base}_{count}'
+            os.replace(self.dst, rotated)
+            self.counters['rotations'] += 1
+            self.rotated.put((self.dst, rotated))
+            if self.compressor is None:
+                self.compressor = Thread(target=self.compress_loop, daemon=True, name='Node Log Compressor')
+                self.compressor.start()
+
+    def compress_loop(self) -> None:
+        """
+        compress_loop - compress rotated logs until none are left
+
+        :return:
+        """
+        while True:
+            with self.lock:
+                try:
+                    dst, rotated = self.rotated.get_nowait()
+                except queue.Empty:
+                    self.compressor = None
+                    return
+            try:
+                self.compress_rotated(dst, rotated)
+            except OSError as exc:
+                with self.lock:
+                    self.counters['errors'] += 1
+                if self.logger is not None:
+                    self.logger.error(f'Could not compress node log {rotated}: {exc}')
+
+    def compress_rotated(self, dst: str, rotated: str) -> None:
+        """
+        compress_rotated - gzip rotated log and drop the oldest ones
+
+        :param dst:
+        :param rotated:
+        :return:
+        """
+        # may be already removed as old one when rotations outpace compression
+        if self.compress and os.path.exists(rotated):
+            with open(rotated, 'rb') as source, gzip.open(f'{rotated}.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        if self.keep > 0:
+            for old in sorted(glob.glob(f'{glob.escape(dst)}.*'))[:-self.keep]:
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        join - wait until rotated logs are compressed
+
+        :param timeout:
+        :return:
+        """
+        with self.lock:
+            compressor = self.compressor
+        if compressor is not None:
+            compressor.join(timeout)
+
+    def flush_loop(self) -> None:
+        """
+        flush_loop - flush idle buffer on time threshold
+
+        :return:
+        """
+        while not self.exit:
+            time.sleep(min(1.0, self.flush_interval))
+            with self.lock:
+                due = self.buffer and time.time() - self.last_flush >= self.flush_interval
+            if due:
+                self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - writer counters
+
+        :return:
+        """
+        with self.lock:
+            return dict(self.counters, buffered=len(self.buffer))
+
+    def run(self) -> None:
+        """
+        run - start flush thread
+
+        :return:
+        """
+        self.exit = False
+        if self.flusher is None or not self.flusher.is_alive():
+            self.flusher = Thread(target=self.flush_loop, daemon=True, name='Node Log Writer')
+            self.flusher.start()
+
+    def shutdown(self) -> None:
+        """
+        shutdown - stop flush thread, write buffered rows and finish compression
+
+        :return:
+        """
+        self.exit = True
+        self.flush()
+        self.join()
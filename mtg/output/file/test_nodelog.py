@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import gzip
+import os
+import shutil
+import threading
+import time
+from unittest.mock import patch
+
+from mtg.output.file.nodelog import NodeLogWriter, node_num, read_binary
+
+
+def position(from_id='!0000abcd', lat=50.45, lon=30.52):
+    """Position packet"""
+    return {'fromId': from_id, 'toId': '^all', 'rxSnr': 5.5,
+            'decoded': {'position': {'latitude': lat, 'longitude': lon}}}
+
+
+def test_rows_buffered_until_threshold(tmp_path):
+    """Test rows are written once flush threshold is reached"""
+    dst = str(tmp_path / 'node_log.csv')
+    writer = NodeLogWriter(dst=dst, flush_rows=3, flush_interval=3600)
+    writer.write(position())
+    writer.write(position())
+    assert not os.path.exists(dst)
+    writer.write(position())
+    with open(dst, encoding='utf-8') as log_file:
+        lines = log_file.read().splitlines()
+    assert len(lines) == 3
+    assert lines[0].endswith(',!0000abcd,^all,5.5,50.45,30.52')
+    writer.write(position())
+    writer.shutdown()
+    assert writer.stats() == {'rows': 4, 'flushes': 2, 'rotations': 0, 'errors': 0, 'buffered': 0}
+
+
+def test_flush_on_time(tmp_path):
+    """Test buffer is flushed after flush interval"""
+    dst = str(tmp_path / 'node_log.csv')
+    writer = NodeLogWriter(dst=dst, flush_rows=100, flush_interval=10)
+    writer.write(position())
+    assert not os.path.exists(dst)
+    writer.last_flush -= 11
+    writer.write(position())
+    assert writer.stats()['rows'] == 2
+
+
+def test_rotate_by_size_with_gzip(tmp_path):
+    """Test log is rotated by size, compressed and old logs removed"""
+    dst = str(tmp_path / 'node_log.csv')
+    writer = NodeLogWriter(dst=dst, flush_rows=1, rotate_size=10, keep=2)
+    for hour in range(4):
+        with patch('mtg.output.file.nodelog.time.strftime', side_effect=lambda fmt, *args, h=hour: f'{fmt}{h}'):
+            writer.write(position())
+    writer.join(timeout=5)
+    rotated = sorted(name for name in os.listdir(tmp_path) if name.endswith('.gz'))
+    assert len(rotated) == 2
+    with gzip.open(tmp_path / rotated[-1], 'rt', encoding='utf-8') as log_file:
+        assert '!0000abcd' in log_file.read()
+    assert writer.stats()['rotations'] == 3
+
+
+def test_compression_does_not_block_writer(tmp_path):
+    """Test rows are written while rotated log is being compressed"""
+    dst = str(tmp_path / 'node_log.csv')
+    writer = NodeLogWriter(dst=dst, flush_rows=1, rotate_size=10)
+    release = threading.Event()
+    copy = shutil.copyfileobj
+
+    def slow_copy(*args):
+        """Compression waiting for test"""
+        release.wait(5)
+        copy(*args)
+
+    # both rotations within the same second
+    with patch('mtg.output.file.nodelog.shutil.copyfileobj', side_effect=slow_copy), \
+            patch('mtg.output.file.nodelog.time.strftime', return_value='20260101'):
+        writer.write(position())
+        writer.write(position())
+        writer.write(position())
+        assert writer.stats()['rows'] == 3
+        assert len([name for name in os.listdir(tmp_path) if not name.endswith(('.csv', '.gz'))]) == 2
+        release.set()
+        writer.join(timeout=5)
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 3
+    assert names[1].endswith('.gz') and names[2].endswith('_1.gz')
+
+
+def test_rotate_daily(tmp_path):
+    """Test log is rotated when day changes"""
+    dst = str(tmp_path / 'node_log.csv')
+    writer = NodeLogWriter(dst=dst, flush_rows=1, rotate_daily=True, compress=False)
+    writer.write(position())
+    writer.day = '19700101'
+    writer.write(position())
+    assert [name for name in os.listdir(tmp_path) if name != 'node_log.csv'][0].startswith('node_log.csv.19700101-')
+    assert writer.day == time.strftime('%Y%m%d')
+
+
+def test_binary_format(tmp_path):
+    """Test binary records round trip"""
+    dst = str(tmp_path / 'node_log.bin')
+    writer = NodeLogWriter(dst=dst, fmt='binary', flush_rows=10)
+    writer.write(position())
+    writer.write(position(from_id='!deadbeef', lat=None))
+    writer.shutdown()
+    records = list(read_binary(dst))
+    assert len(records) == 2
+    assert records[0][1:] == (0xabcd, 0xFFFFFFFF, 5.5, 50.45, 30.52)
+    assert records[1][1] == 0xdeadbeef
+    assert records[1][4] == 0.0
+    assert node_num('bogus') == 0
+
+
+def test_reconfigure(tmp_path):
+    """Test buffered rows go to old log, new rows to new one"""
+    old = str(tmp_path / 'old.csv')
+    new = str(tmp_path / 'new.csv')
+    writer = NodeLogWriter(dst=old, flush_rows=100, flush_interval=3600)
+    writer.write(position())
+    writer.reconfigure(dst=new, flush_rows=1, flush_interval=3600)
+    assert os.path.exists(old)
+    writer.write(position())
+    assert os.path.exists(new)
+    assert writer.stats()['rows'] == 2
@@ -2,8 +2,9 @@
 """ Utilities module """
 
 from .exc import log_exception
-from .fifo import create_fifo
+from .fifo import FifoReader, create_fifo
 from .imp import list_classes
 from .memcache import Memcache
-from .message import split_message
+from .message import split_message, split_text
 from .external import ExternalPlugins
+from .workers import KeyedWorkerPool
@@ -21,6 +21,27 @@ class ExternalPlugins:
         self.meshtastic_connection = meshtastic_connection
         self.telegram_connection = telegram_connection
         self.logger = logger
+        self.commands: Any = None
+
+    def set_commands(self, commands: Any) -> None:
+        """
+        set_commands - mesh command router plugins may add commands to
+
+        :param commands:
+        :return:
+        """
+        self.commands = commands
+
+    def register_commands(self, clsobj: Any) -> None:
+        """
+        register_commands - let plugin register its mesh commands, plugin should
+        implement register_commands(router)
+
+        :param clsobj:
+        :return:
+        """
+        if self.commands is not None and hasattr(clsobj, 'register_commands'):
+            clsobj.register_commands(self.commands)
 
     def run(self) -> None:
         """
@@ -28,15 +49,18 @@ class ExternalPlugins:
         """
         for cls in list_classes(self.logger, package='external', base_class='ExternalBase'):
             clsobj = cls(self.database, self.config, self.meshtastic_connection, self.telegram_connection, self.logger)
+            self.register_commands(clsobj)
             t = Thread(target=clsobj.run)
             t.start()
 
         for cls in list_classes(self.logger, package='external', base_class='ExternalBaseMesh'):
             clsobj = cls(self.database, self.config, self.meshtastic_connection, self.telegram_connection, self.logger)
+            self.register_commands(clsobj)
             t = Thread(target=clsobj.run)
             t.start()
 
         for cls in list_classes(self.logger, package='external', base_class='ExternalBaseTG'):
             clsobj = cls(self.database, self.config, self.meshtastic_connection, self.telegram_connection, self.logger)
+            self.register_commands(clsobj)
             t = Thread(target=clsobj.run)
             t.start()
@@ -2,7 +2,10 @@
 """ FIFO module """
 
 import errno
+import logging
 import os
+import selectors
+from typing import Callable, Dict
 
 
 def create_fifo(path: str) -> None:
@@ -17,3 +20,91 @@ def create_fifo(path: str) -> None:
     except OSError as exc:
         if exc.errno != errno.EEXIST:
             raise
+
+
+class FifoReader:
+    """
+    FifoReader - reads lines from several FIFOs in a single thread.
+
+    Every FIFO is opened non-blocking together with a write end kept by the reader,
+    so it never sees EOF when writers come and go and nobody waits in open().
+    """
+    read_size = 65536
+    max_line = 1024 * 1024
+
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+        self.selector = selectors.DefaultSelector()
+        self.buffers: Dict[int, bytearray] = {}
+        self.keepers: Dict[int, int] = {}
+
+    def add(self, path: str, callback: Callable[[str], None]) -> None:
+        """
+        add - start reading FIFO, callback is invoked for every complete line
+
+        :param path:
+        :param callback:
+        :return:
+        """
+        create_fifo(path)
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        self.keepers[fd] = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        self.buffers[fd] = bytearray()
+        self.selector.register(fd, selectors.EVENT_READ, callback)
+
+    def read(self, fd: int, callback: Callable[[str], None]) -> int:
+        """
+        read - drain available data and dispatch complete lines. Partial line stays buffered
+
+        :param fd:
+        :param callback:
+        :return: number of dispatched lines
+        """
+        try:
+            data = os.read(fd, self.read_size)
+        except BlockingIOError:
+            return 0
+        buffer = self.buffers[fd]
+        buffer.extend(data)
+        count = 0
+        while (pos := buffer.find(b'\n')) >= 0:
+            line = buffer[:pos].decode('utf-8', errors='replace')
+            del buffer[:pos + 1]
+            if not line:
+                continue
+            count += 1
+            try:
+                callback(line)
+            except Exception as exc:  # pylint:disable=broad-exception-caught
+                self.logger.error(f'FIFO line handler failed: {exc}')
+        if len(buffer) > self.max_line:
+            self.logger.warning(f'Dropping {len(buffer)} bytes without newline from FIFO')
+            buffer.clear()
+        return count
+
+    def run_once(self, timeout: float = 0.5) -> int:
+        """
+        run_once - wait for data on any FIFO
+
+        :param timeout:
+        :return: number of dispatched lines
+        """
+        count = 0
+        for key, _ in self.selector.select(timeout):
+            count += self.read(key.fd, key.data)
+        return count
+
+    def close(self) -> None:
+        """
+        close - close all FIFO descriptors
+
+        :return:
+        """
+        for key in list(self.selector.get_map().values()):
+            self.selector.unregister(key.fd)
+            os.close(key.fd)
+        for fd in self.keepers.values():
+            os.close(fd)
+        self.keepers = {}
+        self.buffers = {}
+        self.selector.close()
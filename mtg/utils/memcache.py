@@ -96,6 +96,7 @@ class Memcache:
 
         :return:
         """
+        self.shutdown_flag = False
         if self.reaper_thread is None or not self.reaper_thread.is_alive():
             self.reaper_thread = Thread(target=self.reaper, daemon=True, name=self.name)
             self.reaper_thread.start()
@@ -1,35 +1,144 @@
 # -*- coding: utf-8 -*-
 """ message utilities """
 
-from typing import Any, Callable, List
+from typing import Any, Callable, Iterator, List, Optional
 
 
-def split_message(msg: str, chunk_len: int, callback: Callable[..., Any], **kwargs: Any) -> None:
+def text_size(text: str, encoding: Optional[str] = None) -> int:
     """
-    split_message - split message into smaller parts and invoke callback on each one
+    text_size - length of text in characters or, if encoding is set, in encoded bytes
+
+    :param text:
+    :param encoding:
+    :return:
+    """
+    return len(text.encode(encoding)) if encoding else len(text)
 
+
+def cut_word(word: str, limit: int, encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    cut_word - cut word into pieces not larger than limit. Never cuts multibyte character
+
+    :param word:
+    :param limit:
+    :param encoding:
     :return:
     """
-    # split into parts
-    parts: List[List[str]] = []
+    if not encoding:
+        for pos in range(0, len(word), limit):
+            yield word[pos:pos + limit]
+        return
+    data = word.encode(encoding)
+    start = 0
+    while start < len(data):
+        # incomplete trailing character is dropped by decoder and goes to the next piece
+        piece = data[start:start + limit].decode(encoding, errors='ignore') or data[start:].decode(encoding)[:1]
+        start += len(piece.encode(encoding))
+        yield piece
+
+
+def split_line(line: str, limit: int, encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    split_line - split single line into parts on word boundaries. Words longer than limit are cut
+
+    :param line:
+    :param limit:
+    :param encoding:
+    :return:
+    """
+    space = text_size(' ', encoding)
     part: List[str] = []
+    part_size = 0
+    for word in line.split(' '):
+        word_size = text_size(word, encoding)
+        if part and part_size + space + word_size <= limit:
+            part.append(word)
+            part_size += space + word_size
+            continue
+        if part:
+            yield ' '.join(part).rstrip(' ')
+            part, part_size = [], 0
+        if word_size > limit:
+            pieces = list(cut_word(word, limit, encoding))
+            yield from pieces[:-1]
+            word = pieces[-1]
+            word_size = text_size(word, encoding)
+        if word:
+            part, part_size = [word], word_size
+    if part:
+        yield ' '.join(part).rstrip(' ')
+
+
+def iter_chunks(msg: str, limit: int, encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    iter_chunks - pack lines of message into chunks not larger than limit. Empty lines are skipped
+
+    :param msg:
+    :param limit: max chunk size in characters or, if encoding is set, in encoded bytes
+    :param encoding:
+    :return:
+    """
+    if limit < 1:
+        raise ValueError(f'chunk limit should be positive, got {limit}')
+    newline = text_size('\n', encoding)
+    part: List[str] = []
+    part_size = 0
     for line in msg.split('\n'):
-        if len(line) == 0:
+        if not line:
             continue
-        if len('\n'.join(part) + line) < chunk_len:
+        line_size = text_size(line, encoding)
+        if line_size > limit:
+            pieces = list(split_line(line, limit, encoding))
+            if not pieces:
+                continue
+            if part:
+                yield '\n'.join(part)
+            yield from pieces[:-1]
+            part, part_size = [pieces[-1]], text_size(pieces[-1], encoding)
+            continue
+        if part and part_size + newline + line_size <= limit:
             part.append(line)
-        else:
-            parts.append(part)
-            part = [line]
+            part_size += newline + line_size
+            continue
+        if part:
+            yield '\n'.join(part)
+        part, part_size = [line], line_size
+    if part:
+        yield '\n'.join(part)
 
-    parts.append(part)
 
-    for part in parts:
-        if len(part) == 0:
-            continue
-        line = '\n'.join(part)
-        if len(line) < chunk_len:
-            callback(line, **kwargs)
-        else:
-            for i in range((len(line) // chunk_len) + 1):
-                callback(line[i*chunk_len:i*chunk_len + chunk_len], **kwargs)
+def split_text(msg: str, limit: int, encoding: Optional[str] = None, numbered: bool = False) -> List[str]:
+    """
+    split_text - split message into chunks, optionally marking them with (1/3) sequence numbers
+
+    :param msg:
+    :param limit:
+    :param encoding:
+    :param numbered:
+    :return:
+    """
+    chunks = list(iter_chunks(msg, limit, encoding))
+    if not numbered or len(chunks) < 2:
+        return chunks
+    total = len(chunks)
+    while True:
+        # reserve space for the widest marker and re-split
+        reserve = text_size(f' ({total}/{total})', encoding)
+        if reserve >= limit:
+            raise ValueError(f'chunk limit {limit} is too small for sequence numbers')
+        chunks = list(iter_chunks(msg, limit - reserve, encoding))
+        if len(str(len(chunks))) <= len(str(total)):
+            break
+        total = len(chunks)
+    total = len(chunks)
+    return [f'{chunk} ({pos}/{total})' for pos, chunk in enumerate(chunks, start=1)]
+
+
+def split_message(msg: str, chunk_len: int, callback: Callable[..., Any], **kwargs: Any) -> None:
+    """
+    split_message - split message into smaller parts and invoke callback on each one
+
+    :return:
+    """
+    for chunk in iter_chunks(msg, chunk_len):
+        callback(chunk, **kwargs)
@@ -101,4 +101,68 @@ def test_create_fifo_unicode_path(mock_mkfifo):
 
     create_fifo(test_path)
 
-    mock_mkfifo.assert_called_once_with(test_path)
\ No newline at end of file
+    mock_mkfifo.assert_called_once_with(test_path)
+
+@pytest.fixture
+def fifo_reader():
+    """FIFO reader closed after test"""
+    from mtg.utils.fifo import FifoReader
+    reader = FifoReader(MagicMock())
+    yield reader
+    reader.close()
+
+
+def write_fifo(path, data):
+    """Write to FIFO like post2mesh does"""
+    with open(path, 'wb') as fifo:
+        fifo.write(data)
+
+
+def test_fifo_reader_lines(tmp_path, fifo_reader):
+    """Test complete lines are dispatched, partial line waits for newline"""
+    path = str(tmp_path / 'msg.fifo')
+    lines = []
+    fifo_reader.add(path, lines.append)
+    write_fifo(path, 'first\n\nдруге\npart'.encode('utf-8'))
+    assert fifo_reader.run_once(timeout=1) == 2
+    assert lines == ['first', 'друге']
+    write_fifo(path, b'ial\n')
+    assert fifo_reader.run_once(timeout=1) == 1
+    assert lines[-1] == 'partial'
+
+
+def test_fifo_reader_no_writer_does_not_block(tmp_path, fifo_reader):
+    """Test command FIFO is served while message FIFO has no writer"""
+    messages, commands = [], []
+    fifo_reader.add(str(tmp_path / 'msg.fifo'), messages.append)
+    fifo_reader.add(str(tmp_path / 'cmd.fifo'), commands.append)
+    assert fifo_reader.run_once(timeout=0.01) == 0
+    write_fifo(str(tmp_path / 'cmd.fifo'), b'reboot\n')
+    assert fifo_reader.run_once(timeout=1) == 1
+    assert commands == ['reboot']
+    assert messages == []
+    # writer went away, FIFO is not reported as readable (no EOF busy loop)
+    assert fifo_reader.run_once(timeout=0.01) == 0
+
+
+def test_fifo_reader_many_writers(tmp_path, fifo_reader):
+    """Test lines from many writers are read as a stream"""
+    path = str(tmp_path / 'msg.fifo')
+    lines = []
+    fifo_reader.add(path, lines.append)
+    for num in range(20):
+        write_fifo(path, f'message {num}\n'.encode('utf-8'))
+    while fifo_reader.run_once(timeout=0.1):
+        pass
+    assert lines == [f'message {num}' for num in range(20)]
+
+
+def test_fifo_reader_callback_error(tmp_path, fifo_reader):
+    """Test failing callback does not stop reader"""
+    path = str(tmp_path / 'msg.fifo')
+    callback = MagicMock(side_effect=[RuntimeError('boom'), None])
+    fifo_reader.add(path, callback)
+    write_fifo(path, b'one\ntwo\n')
+    assert fifo_reader.run_once(timeout=1) == 2
+    assert callback.call_count == 2
+    fifo_reader.logger.error.assert_called_once()
@@ -161,6 +161,54 @@ def test_thread_pattern_functionality():
     print("✓ Thread pattern functionality test passed")
 
 
+def test_restart_runner_applies_config():
+    """Test runner is stopped, configured and started again"""
+    logger = logging.getLogger('test')
+    manager = ThreadManager(logger)
+    runner = MockRunner("ReconfigRunner")
+    manager.register_runner("Reconfig", runner, thread_patterns=["ReconfigRunner"])
+    manager.start_all()
+    first = runner.thread
+
+    seen = []
+
+    def apply():
+        """Record whether old thread is gone when configuration is applied"""
+        seen.append(first.is_alive())
+        runner.exit = False
+
+    assert manager.restart_runner("Reconfig", apply)
+    assert seen == [False]
+    assert runner.run_count == 2
+    assert runner.thread.is_alive()
+    assert not manager.restart_runner("Missing", lambda: seen.append('missing'))
+    assert seen == [False, 'missing']
+
+    manager.shutdown_all()
+
+
+def test_toggle_runner():
+    """Test runner is started when enabled and stopped when disabled"""
+    logger = logging.getLogger('test')
+    manager = ThreadManager(logger)
+    runner = MockRunner("ToggleRunner")
+
+    manager.toggle_runner("Toggle", runner, False)
+    assert runner.run_count == 0
+
+    manager.toggle_runner("Toggle", runner, True, thread_patterns=["ToggleRunner"])
+    assert runner.run_count == 1
+    assert "Toggle" in manager.runners
+
+    manager.toggle_runner("Toggle", runner, False)
+    assert runner.exit
+    assert "Toggle" not in manager.runners
+    runner.thread.join(timeout=2)
+    assert not runner.thread.is_alive()
+
+    manager.shutdown_all()
+
+
 def run_all_tests():
     """Run all thread manager tests"""
     print("Running thread manager tests...")
@@ -2,7 +2,7 @@
 # pylint: skip-file
 import pytest
 from unittest.mock import MagicMock
-from mtg.utils.message import split_message
+from mtg.utils.message import cut_word, iter_chunks, split_message, split_text
 
 
 @pytest.fixture
@@ -74,9 +74,8 @@ def test_split_message_very_long_line(mock_callback):
 
     split_message(long_line, chunk_len, mock_callback)
 
-    # Should be called multiple times for the long line
-    # Implementation adds 1 to handle remainder: (150 // 50) + 1 = 4 calls
-    assert mock_callback.call_count == 4
+    # Should be called once per full chunk
+    assert mock_callback.call_count == 3
 
     # Check that each call has the right chunk size or less
     for call in mock_callback.call_args_list:
@@ -90,10 +89,7 @@ def test_split_message_exact_chunk_boundary(mock_callback):
 
     split_message(message, chunk_len, mock_callback)
 
-    # The implementation will call twice: once with the message, once with empty string
-    assert mock_callback.call_count == 2
-    # First call should be with the full message
-    mock_callback.assert_any_call(message)
+    mock_callback.assert_called_once_with(message)
 
 def test_split_message_mixed_line_lengths(mock_callback):
     """Test splitting with mixed line lengths"""
@@ -114,4 +110,52 @@ def test_split_message_callback_not_called_for_empty_parts(mock_callback):
 
     split_message(message, chunk_len, mock_callback)
 
-    mock_callback.assert_not_called()
\ No newline at end of file
+    mock_callback.assert_not_called()
+
+def test_iter_chunks_word_boundaries():
+    """Test long lines are split between words"""
+    chunks = list(iter_chunks("one two three four five", 9))
+    assert chunks == ["one two", "three", "four five"]
+
+def test_iter_chunks_utf8_bytes():
+    """Test chunks are measured in encoded bytes"""
+    message = "Привіт " * 20
+    chunks = list(iter_chunks(message, 30, encoding='utf-8'))
+    assert all(len(chunk.encode('utf-8')) <= 30 for chunk in chunks)
+    assert ' '.join(chunks).split() == message.split()
+    # by characters the same text fits in fewer chunks
+    assert len(list(iter_chunks(message, 30))) < len(chunks)
+
+def test_iter_chunks_packs_lines():
+    """Test remainder of a split line is packed with next lines"""
+    assert list(iter_chunks("aaaa bbbb\ncc", 7)) == ["aaaa", "bbbb\ncc"]
+
+def test_iter_chunks_invalid_limit():
+    """Test non-positive limit is rejected"""
+    with pytest.raises(ValueError):
+        list(iter_chunks("text", 0))
+
+def test_cut_word_never_splits_multibyte():
+    """Test word cut keeps multibyte characters intact"""
+    pieces = list(cut_word("жжжжж", 5, encoding='utf-8'))
+    assert pieces == ["жж", "жж", "ж"]
+    assert list(cut_word("😀x", 2, encoding='utf-8')) == ["😀", "x"]
+
+def test_split_text_numbered():
+    """Test sequence markers fit into limit"""
+    message = "word " * 60
+    chunks = split_text(message, 40, encoding='utf-8', numbered=True)
+    total = len(chunks)
+    assert total > 1
+    for pos, chunk in enumerate(chunks, start=1):
+        assert chunk.endswith(f" ({pos}/{total})")
+        assert len(chunk.encode('utf-8')) <= 40
+
+def test_split_text_single_chunk_not_numbered():
+    """Test short message does not get a marker"""
+    assert split_text("short", 40, numbered=True) == ["short"]
+
+def test_split_text_limit_too_small():
+    """Test marker larger than limit is rejected"""
+    with pytest.raises(ValueError):
+        split_text("a b c d e f", 4, numbered=True)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import pytest
+import logging
+import threading
+from unittest.mock import MagicMock
+
+from mtg.utils.workers import KeyedWorkerPool
+
+
+@pytest.fixture
+def pool():
+    """Pool with 4 workers and 2 queue slots per worker"""
+    pool = KeyedWorkerPool(MagicMock(spec=logging.Logger), workers=4, max_queue=8, name='Test Pool')
+    yield pool
+    pool.shutdown()
+
+
+def test_same_key_same_worker(pool):
+    """Test tasks of one key go to one worker"""
+    assert pool.worker_for('!a1b2c3d4') == pool.worker_for('!a1b2c3d4')
+    assert len({pool.worker_for(f'!{num:08x}') for num in range(100)}) == 4
+
+
+def test_order_and_stats(pool):
+    """Test per key order, latency and error accounting"""
+    done = []
+    pool.submit('!a', 'TEXT_MESSAGE_APP', done.append, 1)
+    pool.submit('!a', 'TEXT_MESSAGE_APP', done.append, 2)
+    pool.submit('!b', 'POSITION_APP', MagicMock(side_effect=RuntimeError('boom')))
+    pool.run()
+    pool.join(timeout=5)
+    assert done == [1, 2]
+    stats = pool.stats()
+    assert stats['handlers']['TEXT_MESSAGE_APP']['count'] == 2
+    assert stats['handlers']['POSITION_APP']['errors'] == 1
+    assert sum(stats['queue_depth']) == 0
+    pool.logger.error.assert_called_once()
+
+
+def test_slow_sender_does_not_block_others(pool):
+    """Test blocked worker delays only its own keys"""
+    release = threading.Event()
+    done = []
+    slow, fast = '!slow', next(f'!{num}' for num in range(100) if pool.worker_for(f'!{num}') != pool.worker_for('!slow'))
+    pool.submit(slow, 'slow', release.wait, 5)
+    pool.submit(fast, 'fast', done.append, fast)
+    pool.run()
+    for _ in range(100):
+        if done:
+            break
+        threading.Event().wait(0.01)
+    assert done == [fast]
+    release.set()
+
+
+def test_drop_when_full(pool):
+    """Test bounded queue drops and counts extra tasks"""
+    assert pool.submit('!a', 'x', print) is True
+    assert pool.submit('!a', 'x', print) is True
+    assert pool.submit('!a', 'x', print) is False
+    assert pool.stats()['dropped'] == 1
+    pool.logger.warning.assert_called_once()
+
+
+def test_resize_keeps_queued_tasks():
+    """Test queued tasks survive resize of stopped pool"""
+    pool = KeyedWorkerPool(MagicMock(spec=logging.Logger), workers=4, max_queue=40, name='Resize Pool')
+    seen = []
+    for key in range(8):
+        assert pool.submit(key, 'test', seen.append, key)
+    pool.resize(2, 20)
+    assert pool.size == 2
+    assert len(pool.queues) == 2
+    pool.run()
+    pool.join(timeout=5)
+    pool.shutdown()
+    assert sorted(seen) == list(range(8))
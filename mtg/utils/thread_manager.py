@@ -5,7 +5,7 @@ import logging
 import time
 import threading
 from threading import Thread, Event
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, List, Optional, Set
 
 
 class ManagedRunner:  # pylint: disable=too-many-instance-attributes
@@ -29,6 +29,8 @@ class ManagedRunner:  # pylint: disable=too-many-instance-attributes
         self.last_thread_count = 0
         self.thread_names_before: Set[str] = set()
         self.startup_time = time.time()
+        # set while runner is stopped to apply new configuration, monitor leaves it alone
+        self.restarting = False
 
     def start(self) -> None:
         """Start the managed runner and its monitor"""
@@ -96,8 +98,8 @@ class ManagedRunner:  # pylint: disable=too-many-instance-attributes
 
     def _should_restart(self) -> bool:
         """Check if the runner needs to be restarted"""
-        # Don't restart if shutting down
-        if hasattr(self.runner_obj, 'exit') and self.runner_obj.exit:
+        # Don't restart if shutting down or reconfiguring
+        if self.restarting or (hasattr(self.runner_obj, 'exit') and self.runner_obj.exit):
             return False
 
         # Don't restart too soon after startup (give time to initialize)
@@ -134,6 +136,31 @@ class ManagedRunner:  # pylint: disable=too-many-instance-attributes
             self.logger.info(f"Restarting {self.name}")
             self._start_runner()
 
+    def restart(self, apply: Optional[Callable[[], Any]] = None, timeout: float = 10.0) -> None:
+        """Stop runner, apply new configuration while its threads are gone and start it again"""
+        if self.shutdown_event.is_set():
+            return
+        self.restarting = True
+        try:
+            self.logger.info(f"Restarting {self.name} to apply configuration")
+            if hasattr(self.runner_obj, 'shutdown'):
+                self.runner_obj.shutdown()
+            deadline = time.time() + timeout
+            while self._running_threads() and time.time() < deadline:
+                time.sleep(0.1)
+            if leftover := self._running_threads():
+                self.logger.warning(f"{self.name} threads still running: {', '.join(sorted(leftover))}")
+            if apply is not None:
+                apply()
+            self._start_runner()
+        finally:
+            self.restarting = False
+
+    def _running_threads(self) -> Set[str]:
+        """Alive threads matching runner thread patterns"""
+        return {t.name for t in threading.enumerate()
+                if t.is_alive() and any(pattern in t.name for pattern in self.thread_patterns)}
+
     def shutdown(self) -> None:
         """Shutdown the managed runner"""
         self.logger.info(f"Shutting down {self.name}")
@@ -182,6 +209,39 @@ class ThreadManager:
             except Exception as exc:  # pylint: disable=broad-exception-caught
                 self.logger.error(f"Failed to start {name}: {exc}")
 
+    def start_runner(self, name: str) -> None:
+        """Start registered runner, used for runners enabled after startup"""
+        self.runners[name].start()
+
+    def restart_runner(self, name: str, apply: Optional[Callable[[], Any]] = None) -> bool:
+        """Restart runner, apply is called while it is stopped. False if runner is not registered"""
+        if name not in self.runners:
+            if apply is not None:
+                apply()
+            return False
+        self.runners[name].restart(apply)
+        return True
+
+    def stop_runner(self, name: str) -> None:
+        """Shutdown runner and forget it, used for runners disabled after startup"""
+        if (runner := self.runners.pop(name, None)) is not None:
+            runner.shutdown()
+
+    def toggle_runner(self, name: str, runner_obj: Any, enabled: bool, *,  # pylint: disable=too-many-arguments
+                      apply: Optional[Callable[[], Any]] = None, **kwargs: Any) -> None:
+        """Start, stop or restart runner to match its Enabled option"""
+        if not enabled:
+            self.stop_runner(name)
+            if apply is not None:
+                apply()
+        elif name in self.runners:
+            self.restart_runner(name, apply)
+        else:
+            if apply is not None:
+                apply()
+            self.register_runner(name, runner_obj, **kwargs)
+            self.start_runner(name)
+
     def shutdown_all(self) -> None:
         """Shutdown all managed runners"""
         self.logger.info("Shutting down all managed runners")
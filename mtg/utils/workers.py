@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+""" Keyed worker pool module """
+
+import logging
+import queue
+import time
+import zlib
+from threading import RLock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# pylint:disable=too-many-instance-attributes
+class KeyedWorkerPool:
+    """
+    KeyedWorkerPool - bounded worker pool. Tasks with the same key go to the same worker,
+    so they are processed in submission order
+    """
+
+    def __init__(self, logger: logging.Logger, workers: int = 4, max_queue: int = 1000,
+                 name: str = 'Worker Pool') -> None:
+        self.logger = logger
+        self.name = name
+        self.size = max(1, workers)
+        self.queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, max_queue // self.size))
+                                          for _ in range(self.size)]
+        self.threads: Dict[int, Thread] = {}
+        self.exit = False
+        self.lock = RLock()
+        self.dropped = 0
+        # handler name -> count, errors, latency total/max, queue wait max
+        self.handlers: Dict[str, Dict[str, float]] = {}
+
+    def worker_for(self, key: Any) -> int:
+        """
+        worker_for - stable worker index for key
+
+        :param key:
+        :return:
+        """
+        return zlib.crc32(str(key).encode('utf-8')) % self.size
+
+    def submit(self, key: Any, handler: str, func: Callable[..., Any], *args: Any) -> bool:
+        """
+        submit - queue task, dropped if worker queue is full
+
+        :param key: tasks with the same key are processed in order
+        :param handler: name used for latency statistics
+        :param func:
+        :param args:
+        :return: True if task was queued
+        """
+        # pool may be resized meanwhile
+        queues = self.queues
+        try:
+            queues[self.worker_for(key) % len(queues)].put_nowait((time.time(), handler, func, args))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            self.logger.warning(f'{self.name} queue is full, dropping {handler} task for {key}')
+            return False
+        return True
+
+    def _account(self, handler: str, waited: float, latency: float, failed: bool) -> None:
+        with self.lock:
+            stats = self.handlers.setdefault(handler, {'count': 0, 'errors': 0, 'latency_total': 0.0,
+                                                       'latency_max': 0.0, 'wait_max': 0.0})
+            stats['count'] += 1
+            stats['errors'] += int(failed)
+            stats['latency_total'] += latency
+            stats['latency_max'] = max(stats['latency_max'], latency)
+            stats['wait_max'] = max(stats['wait_max'], waited)
+
+    def run_once(self, pos: int, timeout: float = 0.5) -> bool:
+        """
+        run_once - process single task of worker
+
+        :param pos: worker index
+        :param timeout:
+        :return: True if task was processed
+        """
+        try:
+            enqueued, handler, func, args = self.queues[pos].get(timeout=timeout)
+        except queue.Empty:
+            return False
+        started = time.time()
+        failed = False
+        try:
+            func(*args)
+        except Exception as exc:  # pylint:disable=broad-exception-caught
+            failed = True
+            self.logger.error(f'{self.name} {handler} task failed: {exc}')
+        finally:
+            self.queues[pos].task_done()
+        self._account(handler, started - enqueued, time.time() - started, failed)
+        return True
+
+    def worker_loop(self, pos: int) -> None:
+        """
+        worker_loop - process tasks until shutdown
+
+        :param pos:
+        :return:
+        """
+        while not self.exit:
+            self.run_once(pos)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        stats - queue depth, drops and per handler latency
+
+        :return:
+        """
+        with self.lock:
+            handlers: List[Tuple[str, Dict[str, float]]] = [(name, dict(stats))
+                                                            for name, stats in self.handlers.items()]
+            dropped = self.dropped
+        return {
+            'workers': self.size,
+            'queue_depth': [item.qsize() for item in self.queues],
+            'dropped': dropped,
+            'handlers': {
+                name: {
+                    'count': int(stats['count']),
+                    'errors': int(stats['errors']),
+                    'avg': round(stats['latency_total'] / stats['count'], 3) if stats['count'] else 0.0,
+                    'max': round(stats['latency_max'], 3),
+                    'wait_max': round(stats['wait_max'], 3),
+                } for name, stats in handlers
+            },
+        }
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        join - wait until queued tasks are processed
+
+        :param timeout:
+        :return:
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        for item in self.queues:
+            while item.unfinished_tasks and (deadline is None or time.time() < deadline):
+                time.sleep(0.01)
+
+    def resize(self, workers: int, max_queue: int) -> None:
+        """
+        resize - change number of workers. Pool has to be stopped, queued tasks of one worker
+        move together, so tasks with the same key stay in order
+
+        :param workers:
+        :param max_queue:
+        :return:
+        """
+        size = max(1, workers)
+        queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, max_queue // size)) for _ in range(size)]
+        with self.lock:
+            old, self.queues, self.size = self.queues, queues, size
+            self.threads = {pos: thread for pos, thread in self.threads.items() if pos < size}
+        for pos, item in enumerate(old):
+            while True:
+                try:
+                    task = item.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    queues[pos % size].put_nowait(task)
+                except queue.Full:
+                    with self.lock:
+                        self.dropped += 1
+                finally:
+                    item.task_done()
+
+    def run(self) -> None:
+        """
+        run - start worker threads, missing ones are restarted
+
+        :return:
+        """
+        self.exit = False
+        for pos in range(self.size):
+            if pos in self.threads and self.threads[pos].is_alive():
+                continue
+            self.threads[pos] = Thread(target=self.worker_loop, args=(pos,), daemon=True, name=f'{self.name} {pos}')
+            self.threads[pos].start()
+
+    def shutdown(self) -> None:
+        """
+        shutdown - stop worker threads
+
+        :return:
+        """
+        self.exit = True
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# pylint: skip-file
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from mtg.connection.meshtastic import Priority
+from mtg.connection.rich import RichConnection
+from mtg.geo import RegionIndex
+from mtg.webapp.webapp import RenderAirRaidView
+
+
+def square(min_x, min_y, max_x, max_y):
+    """Closed square ring"""
+    return [[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y], [min_x, min_y]]
+
+
+@pytest.fixture
+def regions_file(tmp_path):
+    """geoBoundaries style ADM1 regions, Kyiv city is a hole of Kyiv Oblast"""
+    features = [
+        ('Kyiv Oblast', [square(29.0, 49.0, 32.0, 51.5), square(30.2, 50.2, 30.8, 50.6)]),
+        ('Kyiv', [square(30.2, 50.2, 30.8, 50.6)]),
+        ('Lviv Oblast', [square(22.5, 48.5, 25.0, 50.5)]),
+        ('Zaporizhzhia Oblast', [square(34.0, 46.5, 37.0, 48.0)]),
+    ]
+    data = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'shapeName': name}, 'geometry': {'type': 'Polygon', 'coordinates': rings}}
+        for name, rings in features]}
+    path = tmp_path / 'regions.geojson'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def connection(regions_file):
+    """Rich connection resolving admin1 from region polygons"""
+    config = MagicMock()
+    config.enforce_type.side_effect = lambda type_cls, value: type_cls(value) if value else type_cls()
+    conn = RichConnection('/dev/ttyUSB0', MagicMock(), config, MagicMock(), MagicMock(),
+                          rg_fn=RegionIndex(regions_file, MagicMock()).search)
+    conn.interface = MagicMock()
+    conn.interface.nodes = {
+        '!00000001': {'num': 1, 'user': {'id': '!00000001', 'longName': 'Oblast node'},
+                      'position': {'latitude': 50.9, 'longitude': 30.0}},
+        '!00000002': {'num': 2, 'user': {'id': '!00000002', 'longName': 'City node'},
+                      'position': {'latitude': 50.45, 'longitude': 30.5}},
+        '!00000003': {'num': 3, 'user': {'id': '!00000003', 'longName': 'Lviv node'},
+                      'position': {'latitude': 49.8, 'longitude': 24.0}},
+        '!00000004': {'num': 4, 'user': {'id': '!00000004', 'longName': 'Zaporizhzhia node'},
+                      'position': {'latitude': 47.8, 'longitude': 35.1}},
+    }
+    return conn
+
+
+@pytest.fixture
+def view(connection):
+    """Air raid view without Flask app"""
+    return RenderAirRaidView(MagicMock(), MagicMock(), connection, MagicMock(), MagicMock(), MagicMock())
+
+
+def test_translate(view):
+    """Test GeoNames and geoBoundaries names map to alert regions"""
+    assert view.translate('Kyiv Oblast') == 'Kyiv obl'
+    assert view.translate('Kiev') == 'Kyiv obl'
+    assert view.translate('Kyiv') == 'Kyiv'
+    assert view.translate('Kyiv City') == 'Kyiv'
+    assert view.translate('Dnipropetrovsk Oblast') == 'Dnipro'
+    assert view.translate('Zaporizhia') == 'Zaporizhzhja'
+    assert view.translate('Lviv Oblast') == 'Lviv'
+    assert view.translate('Autonomous Republic of Crimea') == 'Krym'
+    assert view.translate('Unknown') == 'Unknown'
+
+
+def test_translation_covers_region_table(view):
+    """Test every alert region is reachable from geoBoundaries name"""
+    shape_names = ['Khmelnytskyi Oblast', 'Vinnytsia Oblast', 'Rivne Oblast', 'Volyn Oblast', 'Dnipropetrovsk Oblast',
+                   'Zhytomyr Oblast', 'Zakarpattia Oblast', 'Zaporizhzhia Oblast', 'Ivano-Frankivsk Oblast',
+                   'Kyiv Oblast', 'Kirovohrad Oblast', 'Luhansk Oblast', 'Mykolaiv Oblast', 'Odesa Oblast',
+                   'Poltava Oblast', 'Sumy Oblast', 'Ternopil Oblast', 'Kharkiv Oblast', 'Kherson Oblast',
+                   'Cherkasy Oblast', 'Chernihiv Oblast', 'Chernivtsi Oblast', 'Lviv Oblast', 'Donetsk Oblast',
+                   'Kyiv', 'Autonomous Republic of Crimea']
+    assert {view.translate(name) for name in shape_names} == set(view.region_table.values())
+
+
+@pytest.mark.parametrize('place, recipients', [
+    ('Kyiv obl', ['!00000001']),
+    ('Kyiv', ['!00000002']),
+    ('Lviv', ['!00000003']),
+    ('Zaporizhzhja', ['!00000004']),
+    ('Sumy', []),
+])
+def test_slow_alert_from_polygons(view, connection, place, recipients):
+    """Test alert reaches nodes located by region polygons"""
+    with patch.object(connection, 'send_text') as send_text:
+        view.slow_alert(place, 'Alert')
+    assert [call.kwargs['destinationId'] for call in send_text.call_args_list] == recipients
+    for call in send_text.call_args_list:
+        assert call.kwargs['priority'] == Priority.BULK
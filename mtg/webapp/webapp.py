@@ -9,7 +9,7 @@ import time
 from datetime import datetime, timedelta
 from threading import Thread
 from typing import (
-    Optional, Tuple,
+    Callable, Dict, Optional, Tuple,
 )
 from urllib.parse import parse_qs
 #
@@ -25,8 +25,9 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.serving import make_server
 #
 from mtg.config import Config
+from mtg.connection.meshtastic import Priority
 from mtg.connection.rich import RichConnection
-from mtg.connection.telegram import TelegramConnection
+from mtg.connection.telegram import Priority as TelegramPriority, TelegramConnection
 from mtg.database import MeshtasticDB
 from mtg.utils import Memcache
 
@@ -191,7 +192,8 @@ class RenderDataView(CommonView):
         nodes = []
         # node default color
         default_color = "red"
-        for node_info in self.meshtastic_connection.nodes_with_user:
+        snapshot = self.meshtastic_connection.node_snapshot
+        for node_info in snapshot.with_user:
             user_info = node_info.get('user', {})
             node_id = user_info.get('id')
             device_metrics = node_info.get('deviceMetrics', {})
@@ -239,7 +241,39 @@ class RenderDataView(CommonView):
                           color,
                           self.meshtastic_connection.node_mqtt_status(node_id)
                           ])
-        return jsonify(nodes)
+        response = jsonify(nodes)
+        # lets clients skip redraw when node table did not change
+        response.headers['X-Nodes-Version'] = str(snapshot.version)
+        return response
+
+
+class RenderStatsView(CommonView):
+    """
+    Gateway runtime statistics renderer
+    """
+
+    def __init__(self, meshtastic_connection: RichConnection,
+                 providers: Optional[Dict[str, Callable[[], Dict]]] = None):
+        self.meshtastic_connection = meshtastic_connection
+        # section name -> stats function of other components
+        self.providers = providers if providers is not None else {}
+
+    def dispatch_request(self) -> flask.Response:
+        """
+        Process Flask request
+
+        :return:
+        """
+        snapshot = self.meshtastic_connection.node_snapshot
+        stats = {
+            'outbound': self.meshtastic_connection.outbound_stats,
+            'delivery': self.meshtastic_connection.delivery.stats(),
+            'geocoder': self.meshtastic_connection.geocoder.stats(),
+            'nodes': {'version': snapshot.version, 'updated': snapshot.timestamp, 'count': len(snapshot.with_info)},
+        }
+        for name, provider in self.providers.items():
+            stats[name] = provider()
+        return jsonify(stats)
 
 
 class RenderAirRaidView(CommonView):  # pylint:disable=too-many-instance-attributes
@@ -268,9 +302,32 @@ class RenderAirRaidView(CommonView):  # pylint:disable=too-many-instance-attribu
                              23: 'Kherson', 24: 'Cherkasy', 25: 'Chernihiv',
                              26: 'Chernivtsi', 27: 'Lviv', 28: 'Donetsjk',
                              31: 'Kyiv', 9999: 'Krym'}
+        # admin1 names of reverse_geocoder (GeoNames) and of region GeoJSON (geoBoundaries ADM1 shapeName,
+        # ' Oblast' suffix is dropped before lookup) -> region_table names. Names missing here must match as is
         self.translation_table = {'Dnipropetrovsk': 'Dnipro',
                                   'Kiev': 'Kyiv obl', 'Kyiv City': 'Kyiv',
-                                  'Odessa': 'Odesa'}
+                                  'Kyiv Oblast': 'Kyiv obl',
+                                  'Odessa': 'Odesa',
+                                  'Khmelnytskyi': 'Khmelnystjka', 'Khmelnytskyy': 'Khmelnystjka',
+                                  'Vinnytsia': 'Vinnytsjka', "Vinnyts'ka": 'Vinnytsjka',
+                                  'Rivne': 'Rivnenska', 'Volyn': 'Volynska', 'Zhytomyr': 'Zhytomyrska',
+                                  'Zakarpattia': 'Zakarpattya',
+                                  'Zaporizhzhia': 'Zaporizhzhja', 'Zaporizhia': 'Zaporizhzhja',
+                                  'Ivano-Frankivsk': 'Ivano-Fr', 'Donetsk': 'Donetsjk',
+                                  'Crimea': 'Krym', 'Autonomous Republic of Crimea': 'Krym',
+                                  'Sevastopol': 'Krym'}
+
+    def translate(self, admin1: str) -> str:
+        """
+        translate - region_table name of node admin1 region
+
+        :param admin1:
+        :return:
+        """
+        if admin1 in self.translation_table:
+            return self.translation_table[admin1]
+        name = admin1.removesuffix(' Oblast')
+        return self.translation_table.get(name, name)
 
     def dispatch_request(self) -> ResponseReturnValue:  # pylint:disable=too-many-locals
         """
@@ -298,13 +355,14 @@ class RenderAirRaidView(CommonView):  # pylint:disable=too-many-instance-attribu
         if region_id in [14, 31]:
             chat_id = self.config.enforce_type(int, self.config.Telegram.NotificationsRoom)
             self.telegram_connection.send_message_sync(chat_id=chat_id,
-                                                  text=new_msg)
+                                                  text=new_msg,
+                                                  priority=TelegramPriority.ALERT)
         Thread(target=self.slow_alert, args=(alert_place, new_msg)).start()
         return 'Ok'
 
     def slow_alert(self, alert_place: str, new_msg: str) -> None:
         """
-        slow_alert - slowly send air raid alerts
+        slow_alert - queue air raid alerts as bulk traffic. Pacing is done by outbound scheduler
 
         :return:
         """
@@ -316,15 +374,14 @@ class RenderAirRaidView(CommonView):  # pylint:disable=too-many-instance-attribu
             if not position:
                 continue
             #
-            translated = self.translation_table.get(position, position)
+            translated = self.translate(position)
             self.logger.info(f"{node_id},{name},{position} {alert_place}")
             if translated == alert_place:
                 self.logger.info(f"Sending alert to {node_id}....")
-                time.sleep(1)
-                self.meshtastic_connection.send_text(new_msg, destinationId=node_id)
+                self.meshtastic_connection.send_text(new_msg, destinationId=node_id, priority=Priority.BULK)
 
 
-class WebApp:  # pylint:disable=too-few-public-methods
+class WebApp:  # pylint:disable=too-few-public-methods,too-many-instance-attributes
     """
     WebApp: web application container
     """
@@ -334,7 +391,8 @@ class WebApp:  # pylint:disable=too-few-public-methods
                  meshtastic_connection: RichConnection,
                  telegram_connection: TelegramConnection,
                  logger: logging.Logger,
-                 memcache: Memcache):
+                 memcache: Memcache,
+                 stats_providers: Optional[Dict[str, Callable[[], Dict]]] = None):
         self.database = database
         self.app = app
         self.config = config
@@ -342,6 +400,7 @@ class WebApp:  # pylint:disable=too-few-public-methods
         self.meshtastic_connection = meshtastic_connection
         self.telegram_connection = telegram_connection
         self.memcache = memcache
+        self.stats_providers = stats_providers if stats_providers is not None else {}
 
     def register(self) -> None:
         """
@@ -363,6 +422,10 @@ class WebApp:  # pylint:disable=too-few-public-methods
             config=self.config,
             meshtastic_connection=self.meshtastic_connection, logger=self.logger))
 
+        self.app.add_url_rule('/stats.json', view_func=RenderStatsView.as_view(
+            'stats_page',
+            meshtastic_connection=self.meshtastic_connection, providers=self.stats_providers))
+
         # This should be moved out to separate directory
         self.app.add_url_rule(
             f'/airraid/{self.config.enforce_type(str, self.config.WebApp.AirRaidPrivate)}',
@@ -460,6 +523,18 @@ class WebServer:  # pylint:disable=too-few-public-methods,too-many-instance-attr
         )
         self.server: Optional[ServerThread] = None
         self.memcache: Optional[Memcache] = None
+        self.web_app: Optional[WebApp] = None
+        self.stats_providers: Dict[str, Callable[[], Dict]] = {}
+
+    def add_stats(self, name: str, provider: Callable[[], Dict]) -> None:
+        """
+        Add section to /stats.json
+
+        :param name:
+        :param provider:
+        :return:
+        """
+        self.stats_providers[name] = provider
 
     def run(self) -> None:
         """
@@ -467,14 +542,18 @@ class WebServer:  # pylint:disable=too-few-public-methods,too-many-instance-attr
 
         :return:
         """
-        self.memcache = Memcache(self.logger)
+        if self.memcache is None:
+            self.memcache = Memcache(self.logger)
         self.memcache.run_noblock()
-        web_app = WebApp(self.database, self.app, self.config,
-                             self.meshtastic_connection,
-                             self.telegram_connection,
-                             self.logger,
-                             self.memcache)
-        web_app.register()
+        # routes are registered once, server is started again on restart (e.g. port change)
+        if self.web_app is None:
+            self.web_app = WebApp(self.database, self.app, self.config,
+                                  self.meshtastic_connection,
+                                  self.telegram_connection,
+                                  self.logger,
+                                  self.memcache,
+                                  self.stats_providers)
+            self.web_app.register()
         self.server = ServerThread(self.app, self.config, self.logger)
         self.server.start()
 